@@ -24,6 +24,10 @@ def create_app():
     # Central per-request performance + slow-request logging (audit Phase 2).
     from coach.services.request_timing import register_request_timing
     register_request_timing(app)
+    # Per-team data revision: Session flush hooks that bump the cache key.
+    from coach.services import team_revision  # noqa: F401
+    # Team event index: Session flush hook mirroring TrainingEvent writes.
+    from coach.services import event_index  # noqa: F401
 
     # ---- Prague-time DISPLAY filter (DST-safe) ----
     # DB stores timestamps as naive UTC (datetime.utcnow). User-facing displays
@@ -123,6 +127,7 @@ def create_app():
             ('/drill-sessions', 'drill_sessions', 'drills.drill_sessions', None),
             ('/drill-sessions/delete/<int:sess_id>', 'delete_drill_session', 'drills.delete_drill_session', ['POST']),
             ('/drills/export_result', 'drills_export_result', 'drills.drills_export_result', None),
+            ('/drill-image/<digest>', 'drill_image', 'drills.drill_image', None),
             ('/exports/<path:filename>', 'download_export', 'files.download_export', None),
             ('/admin/audit-log', 'audit_log', 'admin.audit_log', None),
             ('/settings', 'settings', 'settings.settings', ['GET','POST']),
@@ -165,6 +170,64 @@ def create_app():
         deleted_teams, deleted_files = prune_inactive_teams(days)
         click.echo(f"Deleted teams: {deleted_teams}, files: {deleted_files}")
 
+    @app.cli.command('integrations:refresh-all')
+    @click.option('--workers', default=4, type=int, help='Concurrent refresh jobs (1 = inline)')
+    @click.option('--per-host', default=2, type=int, help='Max concurrent requests to one upstream host')
+    @click.option('--jitter', default=5.0, type=float, help='Random start delay per job, in seconds')
+    @click.option('--force', is_flag=True, help='Refresh even when the cache is fresh')
+    @click.option('--team', 'team_ids', multiple=True, type=int, help='Only these team ids')
+    @click.option('--loop', 'interval', default=0, type=int,
+                  help='Keep running, one round every N seconds (jittered); 0 = run once')
+    def integrations_refresh_all(workers, per_host, jitter, force, team_ids, interval):
+        """Refresh Týmuj and league caches for every configured team."""
+        import random
+        import time
+        from coach.services.integration_refresh import run_all
+        while True:
+            results = run_all(app, workers=workers, per_host=per_host, jitter=jitter,
+                              force=force, team_ids=list(team_ids) or None)
+            for r in results:
+                click.echo(f"team {r.team_id} {r.kind:<6} {r.outcome:<7} {r.duration:7.2f}s  {r.message}")
+            done = sum(1 for r in results if r.outcome == 'ok')
+            click.echo(f"Refreshed: {done}, total: {len(results)}")
+            if not interval:
+                break
+            time.sleep(max(1.0, interval + random.uniform(-jitter, jitter)))
+
+    @app.cli.command('events:reindex')
+    @click.option('--team', 'team_ids', multiple=True, type=int, help='Only these team ids')
+    def events_reindex(team_ids):
+        """Rebuild the team event index from events, series and Týmuj data."""
+        from coach.models import Team
+        from coach.services.event_index import rebuild
+        ids = list(team_ids) or [t for (t,) in db.session.query(Team.id).order_by(Team.id)]
+        for tid in ids:
+            n = rebuild(tid)
+            db.session.commit()
+            click.echo(f"team {tid}: {n} events")
+
+    @app.cli.command('blobs:gc')
+    @click.option('--min-age', default=3600, type=int, help='Keep blobs younger than this (s)')
+    def blobs_gc(min_age):
+        """Delete stored drill images no drill references any more."""
+        from coach.models import Drill
+        from coach.services import blob_store
+        referenced = {h for row in db.session.query(Drill.image_hash, Drill.thumb_hash)
+                      for h in row if h}
+        click.echo(f"removed {blob_store.sweep(referenced, min_age)} blobs")
+
+    @app.cli.command('drills:thumbnails')
+    def drills_thumbnails():
+        """Generate missing drill thumbnails from the stored snapshots."""
+        from coach.models import Drill
+        from coach.services.drill_media import thumb_for
+        done = 0
+        for drill in Drill.query.filter(Drill.image_hash.isnot(None), Drill.thumb_hash.is_(None)):
+            drill.thumb_hash = thumb_for(drill.image_hash)
+            done += bool(drill.thumb_hash)
+        db.session.commit()
+        click.echo(f"thumbnails: {done}")
+
     @app.errorhandler(Exception)
     def _log_unhandled_exception(exc):
         from flask import render_template
@@ -315,6 +378,10 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # Protected export directory (not served by /static)
 app.config['EXPORT_FOLDER'] = os.path.join(BASE_DIR, 'protected_exports')
 os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
+# Content-addressed drill images (services.blob_store), served by drill_image
+app.config['BLOB_FOLDER'] = os.path.join(BASE_DIR, 'protected_blobs')
+# Rendered drill PDF pages keyed by content (services.drill_pdf)
+app.config['PAGE_CACHE_FOLDER'] = os.path.join(BASE_DIR, 'protected_cache', 'drill_pages')
 # Secure cookies (critical)
 # Prepare environment flags
 APP_ENV = (os.getenv('APP_ENV') or os.getenv('FLASK_ENV') or '').lower()
@@ -405,6 +472,9 @@ def _env_bool(key: str, default: bool = True) -> bool:
         return default
     return str(v).strip().lower() in ('1', 'true', 'yes', 'y', 'on')
 app.config['REQUIRE_EMAIL_CONFIRMATION'] = _env_bool('REQUIRE_EMAIL_CONFIRMATION', True)
+# New recurring series are stored as one rule row and expanded on read
+# (services/event_series.py) instead of one TrainingEvent per occurrence.
+app.config['LAZY_SERIES'] = _env_bool('LAZY_SERIES', False)
 
 # Lazy extensions
 from coach.extensions import db, migrate, login_manager, bcrypt, csrf, limiter
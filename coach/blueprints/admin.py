@@ -1,4 +1,5 @@
 from flask import Blueprint, render_template
+from sqlalchemy.orm import undefer
 from coach.auth_utils import team_login_required, get_team_id, coach_required
 from coach.models import AuditEvent
 
@@ -15,7 +16,7 @@ def audit_log():
     tid = get_team_id()
     logs = []
     if tid:
-        logs = (AuditEvent.query
+        logs = (AuditEvent.query.options(undefer(AuditEvent.meta))
                 .filter_by(team_id=tid)
                 .order_by(AuditEvent.created_at.desc())
                 .limit(200)
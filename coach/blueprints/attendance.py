@@ -13,6 +13,7 @@ import os
 
 from flask import (Blueprint, render_template, request, redirect, url_for, flash,
                    current_app, jsonify, Response, abort)
+from sqlalchemy import func, update
 
 from coach.auth_utils import (team_login_required, coach_required, get_team_id,
                               get_team_role, get_player_id, is_verified_player)
@@ -21,7 +22,10 @@ from coach.models import Player, AttendanceEntry, AttendanceImport
 from coach.services import attendance_import as ai
 from coach.services import attendance_stats as stats
 from coach.services import attendance_reminder as reminder
-from coach.blueprints.calendar import _collect_events_for_team
+from coach.services import team_revision
+from coach.services import xlsx_writer
+from coach.blueprints.calendar import (_collect_events_for_team, _resolve_event_for_team,
+                                       _resolve_events_for_team)
 
 bp = Blueprint('attendance', __name__)
 
@@ -185,12 +189,11 @@ def attendance_reminder():
     # dochazka POST handler) → prevents cross-team event access.
     start_date = date.today() - timedelta(days=45)
     end_date = date.today() + timedelta(days=180)
-    event = next((e for e in _collect_events_for_team(tid, start_date, end_date)
-                  if e['key'] == event_key), None)
+    event = _resolve_event_for_team(tid, event_key, start_date, end_date)
     if event is None:
         abort(404)
     players = Player.query.filter_by(team_id=tid).order_by(Player.name.asc()).all()
-    entries = AttendanceEntry.query.filter_by(team_id=tid).all()
+    entries = AttendanceEntry.query.filter_by(team_id=tid, event_key=event_key).all()
     names = reminder.unanswered_player_names(players, entries, event_key)
     if not names:
         flash('Všichni hráči již mají docházku vyplněnou.', 'info')
@@ -226,9 +229,8 @@ def attendance_set():
         flash('Hráč nebyl nalezen.', 'error')
         return redirect(request.referrer or url_for('attendance.attendance'))
     # validate the event_key belongs to this team's known events (wide window)
-    known = _collect_events_for_team(tid, date.today() - timedelta(days=365),
-                                     date.today() + timedelta(days=365))
-    meta = next((e for e in known if e['key'] == event_key), None)
+    meta = _resolve_event_for_team(tid, event_key, date.today() - timedelta(days=365),
+                                   date.today() + timedelta(days=365))
     if not meta:
         flash('Událost nebyla nalezena.', 'error')
         return redirect(request.referrer or url_for('attendance.attendance'))
@@ -274,9 +276,8 @@ def attendance_cell():
     player = Player.query.filter_by(id=player_id, team_id=tid).first()
     if not player:
         return jsonify({'ok': False, 'error': 'bad_player'}), 404
-    known = _collect_events_for_team(tid, date.today() - timedelta(days=365),
-                                     date.today() + timedelta(days=365))
-    meta = next((e for e in known if e['key'] == event_key), None)
+    meta = _resolve_event_for_team(tid, event_key, date.today() - timedelta(days=365),
+                                   date.today() + timedelta(days=365))
     if not meta:
         return jsonify({'ok': False, 'error': 'bad_event'}), 404
     from datetime import datetime
@@ -295,11 +296,117 @@ def attendance_cell():
     entry.updated_by_role = 'coach'
     entry.updated_at = now
     db.session.commit()
-    players = Player.query.filter_by(team_id=tid).all()
-    ev_entries = AttendanceEntry.query.filter_by(team_id=tid, event_key=event_key).all()
     return jsonify({'ok': True, 'status': status, 'player_id': player_id,
                     'event_key': event_key,
-                    'event_summary': stats.event_summary(players, ev_entries)})
+                    'event_summary': _event_summaries(tid, [event_key])[event_key]})
+
+
+def _event_summaries(tid, event_keys):
+    """{event_key: matrix summary} from two aggregate reads (roster size and
+    answers per event and status) instead of loading the roster and entries."""
+    keys = sorted(set(event_keys))
+    total = db.session.query(func.count(Player.id)).filter(Player.team_id == tid).scalar() or 0
+    counts = {k: {} for k in keys}
+    if keys:
+        rows = (db.session.query(AttendanceEntry.event_key, AttendanceEntry.status,
+                                 func.count(AttendanceEntry.id))
+                .join(Player, Player.id == AttendanceEntry.player_id)
+                .filter(AttendanceEntry.team_id == tid, Player.team_id == tid,
+                        AttendanceEntry.event_key.in_(keys))
+                .group_by(AttendanceEntry.event_key, AttendanceEntry.status))
+        for key, st, n in rows:
+            counts[key][st] = n
+    return {k: stats.summary_from_counts(c, total) for k, c in counts.items()}
+
+
+# Upper bound on one /attendance/batch request (a full event column or a
+# player's season row fits comfortably).
+MAX_BATCH_CHANGES = 500
+
+
+@bp.route('/attendance/batch', methods=['POST'], endpoint='attendance_batch')
+@team_login_required
+def attendance_batch():
+    """Apply many cell changes in one transaction; JSON in/out.
+
+    Body: {"changes": [{"player_id", "event_key", "status"}, ...]}. Same rules
+    as /attendance/cell and /attendance/set: a coach may write any player of
+    the team, a verified player only themselves (posted ids are ignored), and
+    the writer's source (coach > player) replaces whatever was there. The batch
+    is all-or-nothing: one bad player, event or status rejects it. Later
+    changes to the same cell win. Returns the fresh summary of every touched
+    event.
+    """
+    tid = get_team_id()
+    role = get_team_role()
+    data = request.get_json(silent=True) or {}
+    changes = data.get('changes') if isinstance(data, dict) else None
+    if not isinstance(changes, list) or not changes or len(changes) > MAX_BATCH_CHANGES:
+        return jsonify({'ok': False, 'error': 'bad_request'}), 400
+    self_id = None
+    if role != 'coach':
+        self_id, err = _resolve_attendance_target(tid, role, 0)
+        if err:
+            return jsonify({'ok': False, 'error': 'forbidden'}), 403
+    cells = {}                                   # (player_id, event_key) -> status
+    for ch in changes:
+        if not isinstance(ch, dict):
+            return jsonify({'ok': False, 'error': 'bad_request'}), 400
+        status = str(ch.get('status') or '').strip().lower()
+        if status not in stats.STATUSES:
+            return jsonify({'ok': False, 'error': 'bad_status'}), 400
+        try:
+            pid = self_id or int(ch.get('player_id') or 0)
+        except (TypeError, ValueError):
+            pid = 0
+        cells[(pid, str(ch.get('event_key') or '').strip())] = status
+    pids = {pid for pid, _ in cells}
+    found = {pid for (pid,) in db.session.query(Player.id)
+             .filter(Player.team_id == tid, Player.id.in_(sorted(pids)))}
+    if found != pids:
+        return jsonify({'ok': False, 'error': 'bad_player'}), 404
+    today = date.today()
+    metas = _resolve_events_for_team(tid, {k for _, k in cells},
+                                     today - timedelta(days=365), today + timedelta(days=365))
+    missing = sorted({k for _, k in cells} - set(metas))
+    if missing:
+        return jsonify({'ok': False, 'error': 'bad_event', 'event_key': missing[0]}), 404
+
+    from datetime import datetime
+    now = datetime.utcnow()
+    src = ai.SOURCE_COACH if role == 'coach' else ai.SOURCE_PLAYER
+    existing = {}                                # (player_id, event_key) -> entry id
+    for eid, pid, key in (db.session.query(AttendanceEntry.id, AttendanceEntry.player_id,
+                                           AttendanceEntry.event_key)
+                          .filter(AttendanceEntry.team_id == tid,
+                                  AttendanceEntry.player_id.in_(sorted(pids)),
+                                  AttendanceEntry.event_key.in_(sorted(metas)))
+                          .order_by(AttendanceEntry.id.asc())):
+        existing.setdefault((pid, key), eid)
+    updates, inserts = [], []
+    for (pid, key), status in cells.items():
+        eid = existing.get((pid, key))
+        if eid is not None:
+            updates.append({'id': eid, 'status': status, 'source': src,
+                            'updated_by_role': role, 'updated_at': now})
+            continue
+        meta = metas[key]
+        inserts.append({'team_id': tid, 'player_id': pid, 'event_key': key, 'status': status,
+                        'event_title': (meta.get('title') or '')[:200],
+                        'event_day': meta.get('day') or today,
+                        'event_time': (meta.get('time') or '')[:10],
+                        'event_kind': (meta.get('kind') or 'training')[:20],
+                        'event_source': (meta.get('source') or 'local')[:20],
+                        'source': src, 'updated_by_role': role, 'updated_at': now})
+    if updates:
+        db.session.execute(update(AttendanceEntry), updates)
+    if inserts:
+        db.session.execute(AttendanceEntry.__table__.insert(), inserts)
+    # Bulk statements bypass the flush hook.
+    team_revision.bump(tid)
+    db.session.commit()
+    return jsonify({'ok': True, 'applied': len(cells),
+                    'event_summaries': _event_summaries(tid, metas)})
 
 
 _EXPORT_STATUS = {'going': 'Jdu', 'not_going': 'Nejdu', 'maybe': 'Možná', 'unknown': 'Nevyplněno'}
@@ -310,7 +417,11 @@ _EXPORT_STATUS = {'going': 'Jdu', 'not_going': 'Nejdu', 'maybe': 'Možná', 'unk
 def attendance_export():
     """Export attendance respecting the current filters (range + event type).
     format=long (one row per player×event) or format=matrix (players × events).
-    Excel-friendly CSV: UTF-8 BOM + ';' delimiter (no XLSX dependency)."""
+    file=csv (default): Excel-friendly CSV, UTF-8 BOM + ';' delimiter;
+    file=xlsx: a native workbook from the stdlib xlsx_writer.
+
+    Only the entries of the exported events are read, and rows are streamed
+    as they are written instead of building the whole file in memory."""
     resp = coach_required(lambda: None)()
     if resp is not None:
         return resp
@@ -320,47 +431,84 @@ def attendance_export():
     rng = stats.normalize_range(request.args.get('range'))
     etype = (request.args.get('etype') or 'all').strip()
     fmt = (request.args.get('format') or 'long').strip()
+    as_xlsx = (request.args.get('file') or '').strip() == 'xlsx'
     today = date.today()
     start, end = stats.range_window(rng, today)
     events = _collect_events_for_team(tid, start, end)
     if etype in ('training', 'match', 'camp', 'other'):
         events = [e for e in events if (e.get('kind') or 'training') == etype]
     events.sort(key=lambda e: (e['day'], e.get('time') or ''))
-    players = Player.query.filter_by(team_id=tid).order_by(Player.name.asc()).all()
-    entries = AttendanceEntry.query.filter_by(team_id=tid).all()
-    by_key = {(e.player_id, e.event_key): e for e in entries}
-
-    buf = io.StringIO()
-    buf.write('﻿')                               # BOM so Excel detects UTF-8
-    w = csv.writer(buf, delimiter=';')
+    # Plain tuples: the generators below run after the view has returned.
+    players = (db.session.query(Player.id, Player.name, Player.position)
+               .filter(Player.team_id == tid).order_by(Player.name.asc()).all())
+    cells = _export_cells(tid, [e['key'] for e in events]) if players else {}
+    rows = _export_rows(fmt, events, players, cells)
+    fname = 'dochazka_%s_%s_%s.%s' % (fmt, rng, today.isoformat(), 'xlsx' if as_xlsx else 'csv')
+    headers = {'Content-Disposition': 'attachment; filename="%s"' % fname}
+    if as_xlsx:
+        return Response(xlsx_writer.iter_xlsx(rows, title='Docházka'),
+                        mimetype=xlsx_writer.MIMETYPE, headers=headers)
+    return Response(_csv_chunks(rows), mimetype='text/csv; charset=utf-8', headers=headers)
+
+
+def _export_cells(tid, keys):
+    """{(player_id, event_key): (status, source, updated_at)} for these events
+    only; the last row wins on duplicates, as the full-table read did."""
+    cells = {}
+    if not keys:
+        return cells
+    rows = (db.session.query(AttendanceEntry.player_id, AttendanceEntry.event_key,
+                             AttendanceEntry.status, AttendanceEntry.source,
+                             AttendanceEntry.updated_at)
+            .filter(AttendanceEntry.team_id == tid,
+                    AttendanceEntry.event_key.in_(sorted(set(keys))))
+            .order_by(AttendanceEntry.id.asc()))
+    for pid, key, st, src, updated in rows:
+        cells[(pid, key)] = (st, src, updated)
+    return cells
+
+
+def _export_rows(fmt, events, players, cells):
+    """Yield the export rows (header first) for either format."""
     if fmt == 'matrix':
-        w.writerow(['Hráč', 'Pozice'] + ['%s %s' % (e['day'].strftime('%d.%m.%Y'), e.get('title') or '')
-                                         for e in events])
-        for p in players:
-            row = [p.name, p.position or '']
+        yield ['Hráč', 'Pozice'] + ['%s %s' % (e['day'].strftime('%d.%m.%Y'), e.get('title') or '')
+                                    for e in events]
+        for pid, name, position in players:
+            row = [name, position or '']
             for e in events:
-                ent = by_key.get((p.id, e['key']))
-                row.append(_EXPORT_STATUS.get(ent.status if ent else 'unknown', ''))
-            w.writerow(row)
-    else:                                             # long (default)
-        w.writerow(['Hráč', 'Pozice', 'Datum', 'Čas', 'Typ', 'Událost',
-                    'Stav', 'Zdroj', 'Aktualizováno'])
-        for p in players:
-            for e in events:
-                ent = by_key.get((p.id, e['key']))
-                st = ent.status if ent else 'unknown'
-                w.writerow([
-                    p.name, p.position or '',
-                    e['day'].strftime('%d.%m.%Y'), e.get('time') or '',
-                    _KIND_LABELS.get(e.get('kind') or 'training', 'Ostatní'),
-                    e.get('title') or '',
-                    _EXPORT_STATUS.get(st, st),
-                    ai.SOURCE_LABELS.get(ent.source) if ent else '',
-                    ent.updated_at.strftime('%Y-%m-%d %H:%M') if (ent and ent.updated_at) else '',
-                ])
-    fname = 'dochazka_%s_%s_%s.csv' % (fmt, rng, today.isoformat())
-    return Response(buf.getvalue(), mimetype='text/csv; charset=utf-8',
-                    headers={'Content-Disposition': 'attachment; filename="%s"' % fname})
+                cell = cells.get((pid, e['key']))
+                row.append(_EXPORT_STATUS.get(cell[0] if cell else 'unknown', ''))
+            yield row
+        return
+    # long (default)
+    yield ['Hráč', 'Pozice', 'Datum', 'Čas', 'Typ', 'Událost', 'Stav', 'Zdroj', 'Aktualizováno']
+    labels = [(e['day'].strftime('%d.%m.%Y'), e.get('time') or '',
+               _KIND_LABELS.get(e.get('kind') or 'training', 'Ostatní'), e.get('title') or '')
+              for e in events]
+    for pid, name, position in players:
+        for e, (day, time_, kind, title) in zip(events, labels):
+            cell = cells.get((pid, e['key']))
+            st = cell[0] if cell else 'unknown'
+            yield [
+                name, position or '', day, time_, kind, title,
+                _EXPORT_STATUS.get(st, st),
+                ai.SOURCE_LABELS.get(cell[1]) if cell else '',
+                cell[2].strftime('%Y-%m-%d %H:%M') if (cell and cell[2]) else '',
+            ]
+
+
+def _csv_chunks(rows, chunk_chars=64 * 1024):
+    """Yield `rows` as ';' CSV with a BOM, in chunks of roughly chunk_chars."""
+    buf = io.StringIO()
+    w = csv.writer(buf, delimiter=';')
+    buf.write('\ufeff')                          # BOM so Excel detects UTF-8
+    for row in rows:
+        w.writerow(row)
+        if buf.tell() >= chunk_chars:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
 
 
 # ----------------------------- CSV/Excel import -------------------------
@@ -1,7 +1,12 @@
+import hashlib
+import json
 import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, abort
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, Response, abort,
+                   current_app)
 from coach.auth_utils import (team_login_required, get_team_id, coach_required,
                               get_team_role, get_player_id)
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import undefer
 from coach.extensions import db
 from datetime import date, datetime, timedelta
 import calendar as calmod
@@ -9,6 +14,8 @@ from coach.models import TrainingEvent, AuditEvent, Player, AttendanceEntry, Lin
 from coach.services import tymuj as tymuj_svc
 from coach.services import calendar_export
 from coach.services import calendar_feed
+from coach.services import decoded_cache, team_revision
+from coach.services import event_index, event_series
 
 bp = Blueprint('calendar', __name__)
 
@@ -57,67 +64,170 @@ def team_feed(token):
     No login: the URL token IS the bearer secret. An invalid/rotated token
     returns a plain 404 and never reveals whether a team exists. Only the
     token's own team's future events are included — no cross-team leakage.
+
+    Phone calendars poll this hourly, so the rendered bytes are cached per
+    token, keyed by the team's data revision and the day; a poll is a token
+    lookup plus a revision read, and a strong ETag / Last-Modified lets the
+    client revalidate with a 304 and no body.
     """
     tid = calendar_feed.team_for_token(token)
     if not tid:
         abort(404)
     today = date.today()
+    # Feed is not session-authenticated -> use the general player attendance page.
+    attendance_url = _prod_external('attendance.attendance')
+    rev_token = team_revision.token(tid)
+    if rev_token is None:
+        body, etag, last_modified = _render_team_feed(tid, today, attendance_url), None, None
+    else:
+        key = ('calendar.feed', tid, token, rev_token, today, attendance_url)
+        cached = decoded_cache.get(key)
+        if cached is None:
+            changed_at = team_revision.current(tid)[1] or datetime.utcnow()
+            body = _render_team_feed(tid, today, attendance_url, stamp=changed_at)
+            # The window also moves at midnight, without a data change.
+            cached = (body, hashlib.sha256(body).hexdigest()[:32],
+                      max(changed_at, datetime.combine(today, datetime.min.time())))
+            decoded_cache.put(key, cached, cost=len(body))
+        body, etag, last_modified = cached
+    resp = Response(body)
+    resp.headers['Content-Type'] = 'text/calendar; charset=utf-8'
+    resp.headers['Content-Disposition'] = 'inline; filename="coachhub-team.ics"'
+    if etag is None:
+        return resp
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+
+def _render_team_feed(tid, today, attendance_url, stamp=None):
+    """The team's .ics document (UTF-8 bytes) for today .. +_FEED_HORIZON_DAYS.
+
+    `stamp` is used for DTSTAMP; passing the team's last data change keeps the
+    bytes (and so the ETag) identical for identical data."""
     events = (TrainingEvent.query
               .filter(TrainingEvent.team_id == tid,
                       TrainingEvent.day >= today,
                       TrainingEvent.day <= today + timedelta(days=_FEED_HORIZON_DAYS))
               .order_by(TrainingEvent.day.asc(), TrainingEvent.time.asc())
               .all())
-    # Feed is not session-authenticated -> use the general player attendance page.
-    attendance_url = _prod_external('attendance.attendance')
-    ics = calendar_export.build_feed(events, attendance_url, cal_name='CoachHub')
-    resp = Response(ics)
-    resp.headers['Content-Type'] = 'text/calendar; charset=utf-8'
-    resp.headers['Content-Disposition'] = 'inline; filename="coachhub-team.ics"'
-    return resp
+    series = event_series.occurrences(tid, today, today + timedelta(days=_FEED_HORIZON_DAYS))
+    if series:
+        events = sorted(events + series, key=lambda ev: (ev.day, ev.time or ''))
+    ics = calendar_export.build_feed(events, attendance_url, cal_name='CoachHub', now_utc=stamp)
+    return ics.encode('utf-8')
 
 
-@bp.route('/app', endpoint='home')
-@team_login_required
-def home():
+_CS_MONTHS = ['-', "leden", "únor", "březen", "duben", "květen", "červen",
+              "červenec", "srpen", "září", "říjen", "listopad", "prosinec"]
+
+
+def _requested_month(today):
+    """(year, month) from ?year=&month=, falling back to the current month."""
     try:
         y = int(request.args.get('year', ''))
         m = int(request.args.get('month', ''))
     except Exception:
         y = 0; m = 0
-    today = date.today()
     if not (1 <= m <= 12) or y < 1900:
         y, m = today.year, today.month
-    cal = calmod.Calendar(firstweekday=0)
-    weeks = [list(wk) for wk in cal.monthdatescalendar(y, m)]
+    return y, m
+
+
+def _adjacent_months(y, m):
+    prev = (y-1, 12) if m == 1 else (y, m-1)
+    nxt = (y+1, 1) if m == 12 else (y, m+1)
+    return prev, nxt
+
+
+def _month_events(tid, y, m):
+    """Local + cached Týmuj events of one month grouped by ISO day, each day
+    sorted by time (TrainingEvent rows and Týmuj dicts, as the grid uses them)."""
     first_day = date(y, m, 1)
     next_first = date(y+1, 1, 1) if m == 12 else date(y, m+1, 1)
     last_day = next_first - timedelta(days=1)
     events_by_day = {}
+    if not tid:
+        return events_by_day
+    evs = (TrainingEvent.query
+           .filter(TrainingEvent.team_id == tid,
+                   TrainingEvent.day >= first_day,
+                   TrainingEvent.day <= last_day)
+           .order_by(TrainingEvent.day.asc(), TrainingEvent.time.asc())
+           .all())
+    for e in evs + event_series.occurrences(tid, first_day, last_day):
+        key = e.day.isoformat()
+        events_by_day.setdefault(key, []).append(e)
+    for item in tymuj_svc.get_cached_events(tid, first_day, last_day):
+        key = item['day'].isoformat()
+        events_by_day.setdefault(key, []).append(item)
+    # sort events in each day by time and source
+    for key, items in events_by_day.items():
+        items.sort(key=lambda ev: ((ev.get('time') or '') if isinstance(ev, dict) else (ev.time or ''), ev.get('source') if isinstance(ev, dict) else getattr(ev, 'kind', '')))
+    return events_by_day
+
+
+def _grid_event(ev):
+    """JSON shape of one grid entry (TrainingEvent row or cached Týmuj dict)."""
+    if isinstance(ev, dict):
+        return {'id': None, 'time': ev.get('time') or '', 'title': ev.get('title') or '',
+                'kind': ev.get('kind') or 'training', 'source': ev.get('source') or 'tymuj',
+                'series_id': None}
+    return {'id': ev.id, 'time': ev.time or '', 'title': ev.title or '',
+            'kind': ev.kind or 'training', 'source': 'local', 'series_id': ev.series_id}
+
+
+@bp.route('/calendar/month.json', endpoint='month_json')
+@team_login_required
+def month_json():
+    """One month of the dashboard calendar grid, for Prev/Today/Next.
+
+    Only the grid data is built (two indexed range queries), not the rest of
+    the dashboard. The body is cached per team data revision and day, and the
+    ETag turns a revisit of an unchanged month into a 304."""
+    today = date.today()
+    y, m = _requested_month(today)
     tid = get_team_id()
-    if tid:
-        evs = (TrainingEvent.query
-               .filter(TrainingEvent.team_id == tid,
-                       TrainingEvent.day >= first_day,
-                       TrainingEvent.day <= last_day)
-               .order_by(TrainingEvent.day.asc(), TrainingEvent.time.asc())
-               .all())
-        for e in evs:
-            key = e.day.isoformat()
-            events_by_day.setdefault(key, []).append(e)
-        for item in tymuj_svc.get_cached_events(tid, first_day, last_day):
-            key = item['day'].isoformat()
-            events_by_day.setdefault(key, []).append(item)
-    if m == 1:
-        prev_y, prev_m = y-1, 12
-    else:
-        prev_y, prev_m = y, m-1
-    if m == 12:
-        next_y, next_m = y+1, 1
-    else:
-        next_y, next_m = y, m+1
-    cs_months = ['-', "leden","únor","březen","duben","květen","červen",
-                 "červenec","srpen","září","říjen","listopad","prosinec"]
+    rev_token = team_revision.token(tid)
+    key = ('calendar.month', tid, y, m, today, rev_token)
+    cached = decoded_cache.get(key) if rev_token else None
+    if cached is None:
+        (prev_y, prev_m), (next_y, next_m) = _adjacent_months(y, m)
+        events_by_day = {day: [_grid_event(ev) for ev in items]
+                         for day, items in _month_events(tid, y, m).items()}
+        weeks = calmod.Calendar(firstweekday=0).monthdatescalendar(y, m)
+        body = json.dumps({
+            'year': y, 'month': m, 'title': f"{_CS_MONTHS[m]} {y}",
+            'today': today.isoformat(),
+            'prev': {'year': prev_y, 'month': prev_m},
+            'next': {'year': next_y, 'month': next_m},
+            'weeks': [[d.isoformat() for d in wk] for wk in weeks],
+            'events_by_day': events_by_day,
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        cached = (body, hashlib.sha256(body).hexdigest()[:32])
+        if rev_token:
+            decoded_cache.put(key, cached, cost=len(body))
+    body, etag = cached
+    resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+
+@bp.route('/app', endpoint='home')
+@team_login_required
+def home():
+    today = date.today()
+    y, m = _requested_month(today)
+    cal = calmod.Calendar(firstweekday=0)
+    weeks = [list(wk) for wk in cal.monthdatescalendar(y, m)]
+    tid = get_team_id()
+    events_by_day = _month_events(tid, y, m)
+    (prev_y, prev_m), (next_y, next_m) = _adjacent_months(y, m)
+    cs_months = _CS_MONTHS
     month_title = f"{cs_months[m]} {y}"
     today_label = f"{today.day}. {cs_months[today.month]} {today.year}"
     # Load team messages (message board) without DB migration, using AuditEvent
@@ -126,7 +236,7 @@ def home():
     month_num = m  # keep month safe from shadowing
     if tid:
         try:
-            msgs = (AuditEvent.query
+            msgs = (AuditEvent.query.options(undefer(AuditEvent.meta))
                     .filter(AuditEvent.team_id == tid, AuditEvent.event == 'message')
                     .order_by(AuditEvent.created_at.desc())
                     .limit(50)
@@ -151,9 +261,6 @@ def home():
     # Determine role explicitly for template (robust against any transient context issues)
     from coach.auth_utils import get_team_role
     is_coach_home = (get_team_role() == 'coach')
-    # sort events in each day by time and source
-    for key, items in events_by_day.items():
-        items.sort(key=lambda ev: ((ev.get('time') or '') if isinstance(ev, dict) else (ev.time or ''), ev.get('source') if isinstance(ev, dict) else getattr(ev, 'kind', '')))
 
     # ---- Dashboard widgets: read-only derived data (never break the page) ----
     cs_wd = ['Po', 'Út', 'St', 'Čt', 'Pá', 'So', 'Ne']
@@ -266,42 +373,26 @@ def home():
 
 
 def _collect_events_for_team(tid: int, start_date: date, end_date: date) -> list[dict]:
-    events = []
-    if not tid:
-        return events
-    local_events = (TrainingEvent.query
-                    .filter(TrainingEvent.team_id == tid,
-                            TrainingEvent.day >= start_date,
-                            TrainingEvent.day <= end_date)
-                    .order_by(TrainingEvent.day.asc(), TrainingEvent.time.asc())
-                    .all())
-    for ev in local_events:
-        events.append({
-            'id': ev.id,
-            'key': f"local:{ev.id}",
-            'day': ev.day,
-            'time': ev.time or '',
-            'title': ev.title or 'Trénink',
-            'kind': ev.kind or 'training',
-            'source': 'local',
-            # Additive, read-only: lets the mobile Dashboard event manager show the
-            # recurrence scope selector (one/future/series). Desktop calendar uses a
-            # separate data path (events_by_day) and never reads this.
-            'series_id': ev.series_id,
-        })
-    for item in tymuj_svc.get_cached_events(tid, start_date, end_date):
-        key = tymuj_svc.make_event_key(item['title'], item['day'], item.get('time') or '', item.get('kind') or 'tymuj', 'tymuj')
-        events.append({
-            'id': None,
-            'key': key,
-            'day': item['day'],
-            'time': item.get('time') or '',
-            'title': item['title'],
-            'kind': item.get('kind') or 'training',
-            'source': 'tymuj',
-        })
-    events.sort(key=lambda ev: (ev['day'], ev['time'], ev['title']))
-    return events
+    """Local events, lazy series occurrences and cached Týmuj events between
+    the two days, ordered by (day, time, title): one range read of the team
+    event index (services/event_index.py). Local entries carry `series_id`
+    (additive, read-only) so the mobile Dashboard event manager can show the
+    recurrence scope selector; the desktop calendar uses `events_by_day`."""
+    return event_index.events(tid, start_date, end_date)
+
+
+def _resolve_events_for_team(tid: int, keys, start_date: date, end_date: date) -> dict:
+    """{key: event} — the `_collect_events_for_team` entries for these keys,
+    without building the list: one read on the index's (team_id, event_key)
+    index. Keys that are not this team's events inside the window are absent."""
+    keys = {(k or '').strip() for k in keys or ()} - {''}
+    return event_index.events_by_key(tid, keys, start_date, end_date)
+
+
+def _resolve_event_for_team(tid: int, key: str, start_date: date, end_date: date):
+    """One key of `_resolve_events_for_team`, or None."""
+    key = (key or '').strip()
+    return _resolve_events_for_team(tid, [key], start_date, end_date).get(key)
 
 
 @bp.route('/dochazka', methods=['GET', 'POST'], endpoint='dochazka')
@@ -444,18 +535,23 @@ def calendar_add():
         if not dates:
             flash('Opakování nevygenerovalo žádné události. Zkontroluj nastavení.', 'error')
             return redirect(request.referrer or url_for('home'))
-        import uuid
-        series_id = uuid.uuid4().hex
-        rule = rec.build_rule(repeat, weekdays)
-        for od in dates:
-            db.session.add(TrainingEvent(team_id=tid, day=od, time=time_s[:10], title=title[:200],
-                                         kind=kind, series_id=series_id, recurrence_rule=rule,
-                                         source='coachhub_recurring'))
+        if current_app.config.get('LAZY_SERIES'):
+            # One rule row; occurrences are expanded on read.
+            event_series.create(tid, d, dates, repeat, weekdays, time_s[:10], title[:200], kind)
+        else:
+            import uuid
+            series_id = uuid.uuid4().hex
+            rule = rec.build_rule(repeat, weekdays)
+            for od in dates:
+                db.session.add(TrainingEvent(team_id=tid, day=od, time=time_s[:10], title=title[:200],
+                                             kind=kind, series_id=series_id, recurrence_rule=rule,
+                                             source='coachhub_recurring'))
         db.session.commit()
         # Týmuj overlap warning (does not block; never overwrites external events)
         try:
-            cached_days = {date.fromisoformat(it.get('day')) for it in
-                           (tymuj_svc._cache_payload(tid).get('events') or []) if it.get('day')}
+            cached_days = {it['day'] for it in
+                           tymuj_svc.get_cached_events(tid, min(dates), max(dates),
+                                                       include_cancelled=True)}
             if cached_days & set(dates):
                 flash('Pozor: některé termíny se kryjí s událostmi z Týmuj kalendáře.', 'info')
         except Exception:
@@ -495,6 +591,8 @@ def calendar_update():
     resp = coach_required(lambda: None)()
     if resp is not None:
         return resp
+    if event_series.parse_key(request.form.get('id')):
+        return _series_update(request.form.get('id'))
     try:
         ev_id = int(request.form.get('id') or '0')
     except Exception:
@@ -516,19 +614,23 @@ def calendar_update():
     new_time = time_s[:10]
     # Scope for recurring series: one (default) | future | series
     scope = (request.form.get('scope') or 'one').strip()
-    targets = [ev]
-    if ev.series_id and scope in ('future', 'series'):
-        q = TrainingEvent.query.filter_by(team_id=ev.team_id, series_id=ev.series_id)
-        if scope == 'future':
-            q = q.filter(TrainingEvent.day >= ev.day)
-        targets = q.all()
-    for t in targets:
-        t.title = new_title
-        t.time = new_time
-        t.kind = kind
+    y, m = ev.day.year, ev.day.month
+    where = _scope_where(ev, scope)
+    if where is None:
+        ev.title = new_title
+        ev.time = new_time
+        ev.kind = kind
+        n = 1
+    else:
+        n = db.session.execute(
+            update(TrainingEvent).where(*where)
+            .values(title=new_title, time=new_time, kind=kind)
+            .execution_options(synchronize_session=False)).rowcount
+        # Bulk statements bypass the flush hook.
+        team_revision.bump(ev.team_id)
     db.session.commit()
-    flash('Upraveno %d událostí.' % len(targets) if len(targets) > 1 else 'Událost byla upravena.', 'success')
-    return redirect(url_for('home', year=ev.day.year, month=ev.day.month))
+    flash('Upraveno %d událostí.' % n if n > 1 else 'Událost byla upravena.', 'success')
+    return redirect(url_for('home', year=y, month=m))
 
 
 @bp.route('/calendar/delete', methods=['POST'], endpoint='calendar_delete')
@@ -536,6 +638,8 @@ def calendar_delete():
     resp = coach_required(lambda: None)()
     if resp is not None:
         return resp
+    if event_series.parse_key(request.form.get('id')):
+        return _series_delete(request.form.get('id'))
     try:
         ev_id = int(request.form.get('id') or '0')
     except Exception:
@@ -546,29 +650,82 @@ def calendar_delete():
         return redirect(request.referrer or url_for('home'))
     y, m = ev.day.year, ev.day.month
     scope = (request.form.get('scope') or 'one').strip()
-    targets = [ev]
-    if ev.series_id and scope in ('future', 'series'):
-        q = TrainingEvent.query.filter_by(team_id=ev.team_id, series_id=ev.series_id)
-        if scope == 'future':
-            q = q.filter(TrainingEvent.day >= ev.day)
-        targets = q.all()
-    n = len(targets)
+    where = _scope_where(ev, scope)
+    if where is None:
+        where = (TrainingEvent.id == ev.id,)
     # Delete each occurrence's attendance too, otherwise the rows are orphaned and
     # SQLite reuses the freed TrainingEvent id -> a future event inherits the old
     # attendance via the colliding 'local:<id>' key. Clean up keeps keys unique.
-    keys = ['local:%d' % t.id for t in targets]
-    if keys:
-        AttendanceEntry.query.filter(
-            AttendanceEntry.team_id == ev.team_id,
-            AttendanceEntry.event_key.in_(keys)
-        ).delete(synchronize_session=False)
-    for t in targets:
-        db.session.delete(t)
+    # The rows are matched on the integer event_id against the same WHERE as the
+    # event delete (ix_attendance_team_event_player), so the whole scope is two
+    # statements however long the series is.
+    ids = select(TrainingEvent.id).where(*where)
+    db.session.execute(
+        delete(AttendanceEntry)
+        .where(AttendanceEntry.team_id == ev.team_id, AttendanceEntry.event_id.in_(ids))
+        .execution_options(synchronize_session=False))
+    n = db.session.execute(
+        delete(TrainingEvent).where(*where)
+        .execution_options(synchronize_session=False)).rowcount
+    db.session.expunge(ev)
+    # Bulk statements bypass the flush hook.
+    team_revision.bump(ev.team_id)
     db.session.commit()
     flash('Smazáno %d událostí.' % n if n > 1 else 'Událost byla smazána.', 'success')
     return redirect(url_for('home', year=y, month=m))
 
 
+def _scope_where(ev, scope):
+    """WHERE clauses selecting the occurrences of ev's series an edit or delete
+    with `scope` applies to; None when it applies to ev alone."""
+    if not ev.series_id or scope not in ('future', 'series'):
+        return None
+    where = [TrainingEvent.team_id == ev.team_id, TrainingEvent.series_id == ev.series_id]
+    if scope == 'future':
+        where.append(TrainingEvent.day >= ev.day)
+    return where
+
+
+def _series_update(key):
+    """calendar_update for an occurrence of a lazily stored series."""
+    oc = event_series.occurrences_by_key(get_team_id(), [key], date.min, date.max).get(key)
+    if oc is None:
+        flash('Událost nebyla nalezena.', 'error')
+        return redirect(request.referrer or url_for('home'))
+    title = (request.form.get('title') or oc.title).strip()
+    hh = (request.form.get('time_hour') or '').strip()
+    mm = (request.form.get('time_minute') or '').strip()
+    if len(hh) == 2 and len(mm) == 2 and hh.isdigit() and mm.isdigit():
+        time_s = f"{hh}:{mm}"
+    else:
+        time_s = (request.form.get('time') or (oc.time or '')).strip()
+    kind = (request.form.get('kind') or (oc.kind or 'training')).strip()
+    kind = kind if kind in ('training', 'match') else (oc.kind or 'training')
+    scope = (request.form.get('scope') or 'one').strip()
+    done = event_series.update(get_team_id(), key, scope, time_s[:10],
+                               title[:200] or oc.title, kind)
+    if done is None:
+        flash('Událost nebyla nalezena.', 'error')
+        return redirect(request.referrer or url_for('home'))
+    n, day = done
+    db.session.commit()
+    flash('Upraveno %d událostí.' % n if n > 1 else 'Událost byla upravena.', 'success')
+    return redirect(url_for('home', year=day.year, month=day.month))
+
+
+def _series_delete(key):
+    """calendar_delete for an occurrence of a lazily stored series."""
+    scope = (request.form.get('scope') or 'one').strip()
+    done = event_series.delete(get_team_id(), key, scope)
+    if done is None:
+        flash('Událost nebyla nalezena.', 'error')
+        return redirect(request.referrer or url_for('home'))
+    n, day = done
+    db.session.commit()
+    flash('Smazáno %d událostí.' % n if n > 1 else 'Událost byla smazána.', 'success')
+    return redirect(url_for('home', year=day.year, month=day.month))
+
+
 MAX_MESSAGE_LEN = 500
 
 
@@ -630,7 +787,7 @@ def message_pin(msg_id: int):
     tid = get_team_id()
     if not tid:
         return redirect(request.referrer or url_for('home'))
-    ev = AuditEvent.query.get_or_404(msg_id)
+    ev = AuditEvent.query.options(undefer(AuditEvent.meta)).get_or_404(msg_id)
     if ev.team_id != tid or ev.event != 'message':
         return redirect(request.referrer or url_for('home'))
     from json import loads, dumps
@@ -25,6 +25,7 @@ def _to_prague(dt):
     return dt.astimezone(_PRAGUE) if _PRAGUE else dt
 
 from flask import (Blueprint, render_template, request, redirect, url_for, jsonify)
+from sqlalchemy.orm import undefer
 
 from coach.auth_utils import team_login_required, coach_required, get_team_id, get_team_role
 from coach.extensions import db
@@ -101,7 +102,8 @@ def _view(ev):
 
 
 def _messages(tid):
-    rows = (AuditEvent.query.filter_by(team_id=tid, event='message')
+    rows = (AuditEvent.query.options(undefer(AuditEvent.meta))
+            .filter_by(team_id=tid, event='message')
             .order_by(AuditEvent.created_at.desc()).limit(300).all())
     views = [_view(r) for r in rows]
     views.sort(key=lambda v: (not v['pinned'], -(v['created_at'].timestamp() if v['created_at'] else 0)))
@@ -109,7 +111,7 @@ def _messages(tid):
 
 
 def _get_msg(tid, msg_id):
-    ev = AuditEvent.query.get(msg_id)
+    ev = AuditEvent.query.options(undefer(AuditEvent.meta)).get(msg_id)
     if not ev or ev.team_id != tid or ev.event != 'message':
         return None
     return ev
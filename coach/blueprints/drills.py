@@ -1,14 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, make_response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, make_response, send_file, abort
 from coach.extensions import db
 from coach.auth_utils import team_login_required, coach_required, get_team_id
 from coach.models import Drill, TrainingSession
-from PIL import Image, ImageDraw, ImageFont
+from coach.services import blob_store, drill_media, drill_pdf
 from datetime import datetime
-import base64
-import io
 import os
 import uuid
 from sqlalchemy import or_, case
+from sqlalchemy.orm import undefer
 
 bp = Blueprint('drills', __name__)
 
@@ -64,7 +63,7 @@ def new_drill():
 @team_login_required
 def edit_drill(drill_id):
     # Allow team members to open the editor; saving is still coach-gated
-    drill = Drill.query.get_or_404(drill_id)
+    drill = Drill.query.options(undefer(Drill.path_data)).get_or_404(drill_id)
     tid = get_team_id()
     if tid and drill.team_id != tid:
         flash('Není povoleno upravovat cvičení jiného týmu.', 'error')
@@ -82,14 +81,15 @@ def save_drill():
     description = request.form.get('description')
     duration = request.form.get('duration')
     category = request.form.get('category')
-    image_data = request.form.get('image_data')
     path_data = request.form.get('path_data') or '[]'
+    image_hash, thumb_hash = drill_media.store_snapshot(request.form.get('image_data'))
     drill = Drill(
         name=name,
         description=description,
         duration=_parse_optional_int(duration, 0, 600),
         category=category,
-        image_data=image_data,
+        image_hash=image_hash,
+        thumb_hash=thumb_hash,
         path_data=path_data,
         team_id=(get_team_id())
     )
@@ -114,7 +114,10 @@ def update_drill(drill_id):
     duration = request.form.get('duration')
     drill.duration = _parse_optional_int(duration, 0, 600)
     drill.category = request.form.get('category')
-    drill.image_data = request.form.get('image_data')
+    # The editor posts a fresh snapshot; an empty field keeps the stored one.
+    image_hash, thumb_hash = drill_media.store_snapshot(request.form.get('image_data'))
+    if image_hash:
+        drill.image_hash, drill.thumb_hash = image_hash, thumb_hash
     drill.path_data = request.form.get('path_data') or '[]'
     db.session.commit()
     flash('Cvičení bylo upraveno.', 'success')
@@ -137,7 +140,7 @@ def drills():
     # Additive, read-only context for the MOBILE Practice Library only: a flat,
     # team-scoped drill list rendered by templates/mobile/_drills_library.html.
     # The desktop category grid (this same template) never reads `drills`.
-    # All rendered fields (name, category, description, duration, image_data) are
+    # All rendered fields (name, category, description, duration, image_hash) are
     # columns on Drill itself, so no relationships are touched and no eager loading
     # is needed (no N+1).
     drill_q = Drill.query
@@ -166,7 +169,7 @@ def drills_by_category(category):
 @team_login_required
 def drill_detail(drill_id):
     # using imported Drill
-    drill = Drill.query.get_or_404(drill_id)
+    drill = Drill.query.options(undefer(Drill.path_data)).get_or_404(drill_id)
     tid = get_team_id()
     if tid and drill.team_id != tid:
         flash('Toto cvičení nepatří do vašeho týmu.', 'error')
@@ -216,67 +219,28 @@ def drills_select():
     return render_template('drills_select.html', drills=drills, query=q, default_title=default_title)
 
 
-def _decode_image(data_url: str):
-    try:
-        if not data_url:
-            return None
-        b64 = data_url.split(',', 1)[1] if ',' in data_url else data_url
-        raw = base64.b64decode(b64)
-        im = Image.open(io.BytesIO(raw))
-        return im.convert('RGBA')
-    except Exception:
-        return None
-
-
-def _compose_page(drill, im, page_size=(595, 842)):
-    pg = Image.new('RGB', page_size, 'white')
-    draw = ImageDraw.Draw(pg)
-    title = drill.name or 'Bez názvu'
-    sub = []
-    if drill.category: sub.append(f'Kategorie: {drill.category}')
-    if drill.duration: sub.append(f'Doba: {drill.duration} min')
-    subline = '  •  '.join(sub)
-    desc = (drill.description or '').strip()
-    try:
-        font_title = ImageFont.truetype('arial.ttf', 18)
-        font_sub = ImageFont.truetype('arial.ttf', 12)
-        font_desc = ImageFont.truetype('arial.ttf', 12)
-    except Exception:
-        font_title = ImageFont.load_default(); font_sub = ImageFont.load_default(); font_desc = ImageFont.load_default()
-    margin = 36
-    y = margin
-    draw.text((margin, y), title, fill=(0, 0, 0), font=font_title); y += 24
-    if subline:
-        draw.text((margin, y), subline, fill=(0, 0, 0), font=font_sub); y += 18
-    if desc:
-        max_width = page_size[0] - 2 * margin
-        words = desc.split(); lines = []; cur = ''
-        for w in words:
-            test = (cur + ' ' + w).strip()
-            if draw.textlength(test, font=font_desc) <= max_width: cur = test
-            else:
-                if cur: lines.append(cur)
-                cur = w
-            if len(lines) >= 6: break
-        if cur and len(lines) < 6: lines.append(cur)
-        for line in lines:
-            draw.text((margin, y), line, fill=(0, 0, 0), font=font_desc); y += 16
-        y += 8
-    top = y; bottom = page_size[1] - margin; left = margin; right = page_size[0] - margin
-    if im is not None:
-        if im.mode == 'RGBA':
-            bg = Image.new('RGB', im.size, 'white'); bg.paste(im, mask=im.split()[3]); im_rgb = bg
-        else:
-            im_rgb = im.convert('RGB')
-        box_w = right - left; box_h = bottom - top
-        iw, ih = im_rgb.size; scale = min(box_w / iw, box_h / ih)
-        nw = int(iw * scale); nh = int(ih * scale)
-        im_resized = im_rgb.resize((nw, nh), Image.LANCZOS)
-        ox = left + (box_w - nw) // 2; oy = top + (box_h - nh) // 2
-        pg.paste(im_resized, (ox, oy))
-    else:
-        draw.text((left, top), '(Bez náhledu cvičení)', fill=(0, 0, 0), font=font_sub)
-    return pg
+@bp.route('/drill-image/<digest>', endpoint='drill_image')
+@team_login_required
+def drill_image(digest):
+    """A drill snapshot or thumbnail from the blob store. The URL names the
+    content, so it is cached for a year and never revalidated; access still
+    requires a drill of the current team that references it."""
+    if not blob_store.is_digest(digest):
+        abort(404)
+    q = db.session.query(Drill.id).filter(or_(Drill.image_hash == digest, Drill.thumb_hash == digest))
+    tid = get_team_id()
+    if tid:
+        q = q.filter(Drill.team_id == tid)
+    if q.first() is None:
+        abort(404)
+    found = blob_store.locate(digest)
+    if found is None:
+        abort(404)
+    resp = send_file(found[0], mimetype=found[1], etag=digest, max_age=31536000,
+                     conditional=True)
+    resp.cache_control.private = True
+    resp.cache_control.immutable = True
+    return resp
 
 
 @bp.route('/drills/export_pdf', methods=['POST'], endpoint='export_drills_pdf')
@@ -344,18 +308,11 @@ def export_drills_pdf():
     drills.sort(key=order_key)
     if not drills:
         return redirect(url_for('drills_select'))
-    pages = []
-    for d in drills:
-        im = _decode_image(d.image_data or '')
-        pages.append(_compose_page(d, im))
     export_dir = current_app.config['EXPORT_FOLDER']
     ts = datetime.now().strftime('%Y%m%d-%H%M%S'); token = uuid.uuid4().hex[:8]
     filename = f'drills-{ts}-{token}.pdf'
     path = os.path.join(export_dir, filename)
-    if len(pages) == 1:
-        pages[0].save(path, format='PDF')
-    else:
-        pages[0].save(path, save_all=True, append_images=pages[1:], format='PDF')
+    drill_pdf.export(drills, path)
     if not session_title:
         session_title = f"Tréninková jednotka {datetime.now().strftime('%Y-%m-%d %H:%M')}"
     target_session = existing_session if existing_session is not None else TrainingSession()
@@ -384,6 +341,7 @@ def export_drills_pdf():
     stale_q.delete(synchronize_session=False)
     db.session.commit()
     cleanup_exports()
+    drill_pdf.prune_cache()
     return redirect(url_for('drills_export_result', file=filename))
 
 
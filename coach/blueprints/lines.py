@@ -2,7 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from coach.extensions import db
 from coach.auth_utils import team_login_required, get_team_id, coach_required
 from coach.models import Roster, LineAssignment, Player, LineupSession, Team
-from PIL import Image, ImageDraw, ImageFont
+from coach.services.pdf_writer import A4, Page, PdfWriter
 from datetime import datetime
 import uuid
 import os
@@ -21,24 +21,17 @@ def _current_line_assignments():
 
 def _compose_lines_pdf(title: str) -> str:
     export_dir = current_app.config['EXPORT_FOLDER']
-    page = Image.new('RGB', (595, 842), 'white')
-    draw = ImageDraw.Draw(page)
-    try:
-        font_title = ImageFont.truetype('arial.ttf', 18)
-        font_h = ImageFont.truetype('arial.ttf', 14)
-        font_b = ImageFont.truetype('arial.ttf', 12)
-    except Exception:
-        font_title = ImageFont.load_default()
-        font_h = ImageFont.load_default()
-        font_b = ImageFont.load_default()
+    page = Page(A4)
     margin = 36
     y = margin
     team = Team.query.get(get_team_id()) if get_team_id() else None
     if team:
-        draw.text((margin, y), team.name, fill=(0, 0, 0), font=font_h)
+        page.text(margin, y, team.name, size=14, bold=True)
         y += 20
-    draw.text((margin, y), title or 'Sestava', fill=(0, 0, 0), font=font_title)
-    y += 28
+    page.text(margin, y, title or 'Sestava', size=18, bold=True)
+    y += 24
+    page.line(margin, y, page.width - margin, y, width=0.5, gray=0.7)
+    y += 4
     assigns = _current_line_assignments()
 
     def nm(p):
@@ -48,25 +41,25 @@ def _compose_lines_pdf(title: str) -> str:
         return [assigns[s].name for s in slots if assigns.get(s)]
 
     for line in range(1, 5):
-        draw.text((margin, y), f"{line}. lajna", fill=(0, 0, 0), font=font_h)
+        page.text(margin, y, f"{line}. lajna", size=14, bold=True)
         y += 18
         lw = nm(assigns.get(f"L{line}LW"))
         c = nm(assigns.get(f"L{line}C"))
         rw = nm(assigns.get(f"L{line}RW"))
-        draw.text((margin, y), f"Útok: {lw} – {c} – {rw}", fill=(0, 0, 0), font=font_b)
+        page.text(margin, y, f"Útok: {lw} – {c} – {rw}", size=12)
         y += 16
         ld = nm(assigns.get(f"D{line}LD"))
         rd = nm(assigns.get(f"D{line}RD"))
-        draw.text((margin, y), f"Obrana: {ld} – {rd}", fill=(0, 0, 0), font=font_b)
+        page.text(margin, y, f"Obrana: {ld} – {rd}", size=12)
         y += 22
     y += 8
-    draw.text((margin, y), 'Brankáři', fill=(0, 0, 0), font=font_h)
+    page.text(margin, y, 'Brankáři', size=14, bold=True)
     y += 18
     g1 = nm(assigns.get('G1'))
     g2 = nm(assigns.get('G2'))
-    draw.text((margin, y), f"G1: {g1}", fill=(0, 0, 0), font=font_b)
+    page.text(margin, y, f"G1: {g1}", size=12)
     y += 16
-    draw.text((margin, y), f"G2: {g2}", fill=(0, 0, 0), font=font_b)
+    page.text(margin, y, f"G2: {g2}", size=12)
     y += 22
 
     # Substitutes (only if any are set)
@@ -74,14 +67,14 @@ def _compose_lines_pdf(title: str) -> str:
     subs_d = names(['SUBD1', 'SUBD2'])
     subs_g = names(['SUBG1'])
     if subs_f or subs_d or subs_g:
-        draw.text((margin, y), 'Náhradníci', fill=(0, 0, 0), font=font_h)
+        page.text(margin, y, 'Náhradníci', size=14, bold=True)
         y += 18
         if subs_f:
-            draw.text((margin, y), 'Útočníci: ' + ', '.join(subs_f), fill=(0, 0, 0), font=font_b); y += 16
+            page.text(margin, y, 'Útočníci: ' + ', '.join(subs_f), size=12); y += 16
         if subs_d:
-            draw.text((margin, y), 'Obránci: ' + ', '.join(subs_d), fill=(0, 0, 0), font=font_b); y += 16
+            page.text(margin, y, 'Obránci: ' + ', '.join(subs_d), size=12); y += 16
         if subs_g:
-            draw.text((margin, y), 'Brankář: ' + ', '.join(subs_g), fill=(0, 0, 0), font=font_b); y += 16
+            page.text(margin, y, 'Brankář: ' + ', '.join(subs_g), size=12); y += 16
         y += 6
 
     # Special teams (only units that have players)
@@ -97,17 +90,20 @@ def _compose_lines_pdf(title: str) -> str:
     st_present = [(t, names(sl)) for t, sl in units]
     st_present = [(t, ns) for t, ns in st_present if ns]
     if st_present:
-        draw.text((margin, y), 'Speciální formace', fill=(0, 0, 0), font=font_h)
+        page.text(margin, y, 'Speciální formace', size=14, bold=True)
         y += 18
         for t, ns in st_present:
-            draw.text((margin, y), f"{t}: " + ', '.join(ns), fill=(0, 0, 0), font=font_b)
+            page.text(margin, y, f"{t}: " + ', '.join(ns), size=12)
             y += 16
 
     ts = datetime.now().strftime('%Y%m%d-%H%M%S')
     token = uuid.uuid4().hex[:6]
     filename = f"lineup-{ts}-{token}.pdf"
     out_path = os.path.join(export_dir, filename)
-    page.save(out_path, format='PDF')
+    with open(out_path, 'wb') as fh:
+        pdf = PdfWriter(fh)
+        pdf.add_page(page)
+        pdf.close()
     return filename
 
 
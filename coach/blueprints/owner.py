@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from sqlalchemy import text, func
+from sqlalchemy.orm import undefer
 
 from coach.extensions import db, limiter
 from coach.models import (AuditEvent, LeagueIntegration, Team, TeamKey, Player,
@@ -300,7 +301,7 @@ def _team_rows():
 
 def _events(names, limit):
     try:
-        q = AuditEvent.query
+        q = AuditEvent.query.options(undefer(AuditEvent.meta))
         if names:
             q = q.filter(AuditEvent.event.in_(names))
         return q.order_by(AuditEvent.created_at.desc()).limit(limit).all()
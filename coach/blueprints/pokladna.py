@@ -6,15 +6,18 @@ matching — those are Pokladna 2.0.
 """
 from datetime import date, datetime
 
-from flask import (Blueprint, render_template, request, redirect, url_for, flash, jsonify)
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, jsonify,
+                   Response)
 
 from coach.auth_utils import team_login_required, coach_required, get_team_id, get_team_role
 from coach.extensions import db
 from coach.models import Player, PaymentPeriod, PaymentStatus
+from coach.services import xlsx_writer
 
 bp = Blueprint('pokladna', __name__)
 
 STATUSES = ('paid', 'partial', 'unpaid')
+STATUS_LABELS = {'paid': 'Zaplaceno', 'partial': 'Částečně', 'unpaid': 'Nezaplaceno'}
 _CS_MONTHS = ['', 'Leden', 'Únor', 'Březen', 'Duben', 'Květen', 'Červen',
               'Červenec', 'Srpen', 'Září', 'Říjen', 'Listopad', 'Prosinec']
 
@@ -165,3 +168,77 @@ def pokladna_status():
     players = Player.query.filter_by(team_id=tid).all()
     return jsonify({'ok': True, 'status': status, 'player_id': player.id,
                     'summary': _summary(period, players)})
+
+
+# ----------------------------- XLSX export ------------------------------
+def _xlsx_response(rows, title, fname):
+    return Response(xlsx_writer.iter_xlsx(rows, title=title), mimetype=xlsx_writer.MIMETYPE,
+                    headers={'Content-Disposition': 'attachment; filename="%s"' % fname})
+
+
+def _roster(tid):
+    # Plain tuples: the rows are generated after the view has returned.
+    return (db.session.query(Player.id, Player.name, Player.position)
+            .filter(Player.team_id == tid).order_by(Player.name.asc()).all())
+
+
+def _statuses(period_ids):
+    """{(period_id, player_id): status} for these periods, one read."""
+    if not period_ids:
+        return {}
+    return {(per, pid): st for per, pid, st in
+            db.session.query(PaymentStatus.period_id, PaymentStatus.player_id, PaymentStatus.status)
+            .filter(PaymentStatus.period_id.in_(sorted(period_ids)))}
+
+
+@bp.route('/pokladna/<int:year>/<int:month>/export.xlsx', methods=['GET'],
+          endpoint='pokladna_export_month')
+@team_login_required
+def pokladna_export_month(year, month):
+    """One month: player, position, status, the month's contribution."""
+    resp = _coach_gate()
+    if resp is not None:
+        return resp
+    tid = get_team_id()
+    period = _get_or_create_period(tid, year, month) if tid and 1 <= month <= 12 else None
+    if not period:
+        flash('Období nebylo nalezeno.', 'error')
+        return redirect(url_for('pokladna.pokladna'))
+    players = _roster(tid)
+    period_id, amount = period.id, period.amount or 0
+    smap = _statuses([period_id])
+
+    def rows():
+        yield ['Hráč', 'Pozice', 'Stav', 'Příspěvek (Kč)']
+        for pid, name, position in players:
+            yield [name, position or '',
+                   STATUS_LABELS[smap.get((period_id, pid), 'unpaid')], amount]
+    return _xlsx_response(rows(), _month_label(year, month),
+                          'pokladna_%04d_%02d.xlsx' % (year, month))
+
+
+@bp.route('/pokladna/<int:year>/export.xlsx', methods=['GET'], endpoint='pokladna_export_year')
+@team_login_required
+def pokladna_export_year(year):
+    """One year: players × months; months without a period stay empty."""
+    resp = _coach_gate()
+    if resp is not None:
+        return resp
+    tid = get_team_id()
+    if not tid:
+        return redirect(url_for('team_auth'))
+    by_month = {m: (per, amount) for per, m, amount in
+                db.session.query(PaymentPeriod.id, PaymentPeriod.month, PaymentPeriod.amount)
+                .filter(PaymentPeriod.team_id == tid, PaymentPeriod.year == year)}
+    periods = [by_month.get(m) for m in range(1, 13)]       # (period_id, amount) | None
+    players = _roster(tid)
+    smap = _statuses([per for per, _amount in by_month.values()])
+
+    def rows():
+        yield ['Hráč', 'Pozice'] + _CS_MONTHS[1:]
+        yield ['Příspěvek (Kč)', ''] + [pr[1] if pr else None for pr in periods]
+        for pid, name, position in players:
+            yield [name, position or ''] + [
+                STATUS_LABELS[smap.get((pr[0], pid), 'unpaid')] if pr else None
+                for pr in periods]
+    return _xlsx_response(rows(), 'Pokladna %d' % year, 'pokladna_%04d.xlsx' % year)
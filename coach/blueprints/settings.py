@@ -109,7 +109,7 @@ def settings():
                 log_event('team.delete_failed', team_id=team.id, role='coach', level='warning', message='Delete confirmation did not match team name')
                 return redirect(url_for('settings'))
             # delete related rows
-            from coach.models import Player, Roster, LineAssignment, Drill, TrainingSession, LineupSession, TrainingEvent, TeamKey, AuditEvent, AttendanceEntry, LeagueIntegration, TeamLoginAttempt
+            from coach.models import Player, Roster, LineAssignment, Drill, TrainingSession, LineupSession, TrainingEvent, TeamKey, AuditEvent, AttendanceEntry, LeagueIntegration, TeamLoginAttempt, TymujEvent, EventSeries, EventSeriesException, TeamEventIndex
             try:
                 # remove export files
                 from flask import current_app
@@ -130,7 +130,7 @@ def settings():
                     except Exception:
                         pass
                 # delete rows
-                for mdl in (Roster, LineAssignment, AttendanceEntry, Player, Drill, TrainingSession, LineupSession, TrainingEvent, LeagueIntegration, TeamLoginAttempt, TeamKey, AuditEvent):
+                for mdl in (Roster, LineAssignment, AttendanceEntry, Player, Drill, TrainingSession, LineupSession, TrainingEvent, EventSeriesException, EventSeries, TymujEvent, TeamEventIndex, LeagueIntegration, TeamLoginAttempt, TeamKey, AuditEvent):
                     mdl.query.filter_by(team_id=team.id).delete()
                 db.session.delete(team)
                 db.session.commit()
@@ -1,10 +1,10 @@
 import os
-from datetime import date, datetime, timedelta
 from flask import url_for
 from flask_login import current_user
 from flask import session
-from coach.models import Team, Drill, TrainingEvent, AuditEvent, Player, PaymentPeriod, PaymentStatus
+from coach.models import Drill
 from coach.extensions import db
+from coach.services.team_context import get_snapshot
 from coach.services.db_state import is_database_not_ready_error, log_db_not_ready_once
 
 # One release/asset version, bumped per deploy (env APP_VERSION overrides). Used
@@ -31,14 +31,14 @@ def register_context(app):
                     session.pop('team_role', None)
                     session.pop('team_login', None)
                     return dict(brand=brand)
-                t = Team.query.get(team_id)
+                t = get_snapshot(team_id)
                 if t:
                     if t.logo_path:
                         brand['logo_url'] = url_for('static', filename=t.logo_path)
                     brand['primary'] = t.primary_color or None
                     brand['secondary'] = t.secondary_color or None
-                    brand['tertiary'] = getattr(t, 'tertiary_color', None)
-                    brand['team_name'] = t.name or None
+                    brand['tertiary'] = t.tertiary_color
+                    brand['team_name'] = t.team_name or None
                 elif session.get('team_id'):
                     session.pop('team_id', None)
                     session.pop('team_role', None)
@@ -54,12 +54,16 @@ def register_context(app):
     @app.context_processor
     def inject_drill_nav():
         try:
-            q = db.session.query(Drill.category)
             team_id = session.get('team_id') or (current_user.team_id if current_user.is_authenticated else None)
-            if team_id:
-                q = q.filter(Drill.team_id == team_id)
-            cats = q.distinct().all()
-            categories = [c[0] for c in cats if c and c[0]]
+            snap = get_snapshot(team_id) if team_id else None
+            if snap is not None:
+                categories = list(snap.drill_categories)
+            else:
+                q = db.session.query(Drill.category)
+                if team_id:
+                    q = q.filter(Drill.team_id == team_id)
+                cats = q.distinct().all()
+                categories = [c[0] for c in cats if c and c[0]]
         except Exception as e:
             db.session.rollback()
             if is_database_not_ready_error(e):
@@ -76,8 +80,8 @@ def register_context(app):
         pending_access = 0
         if role == 'coach' and session.get('team_id'):
             try:
-                from coach.services.player_identity import pending_requests_for_team
-                pending_access = len(pending_requests_for_team(int(session['team_id'])))
+                snap = get_snapshot(int(session['team_id']))
+                pending_access = snap.pending_access_count if snap else 0
             except Exception:
                 db.session.rollback()
                 pending_access = 0
@@ -98,8 +102,9 @@ def register_context(app):
 
     @app.context_processor
     def inject_notifications():
-        """Lightweight, read-only notifications for the header bell. A handful of
-        cheap queries; safe empty state on any error. No storage, no polling."""
+        """Lightweight, read-only notifications for the header bell. Built from
+        the shared team snapshot (no extra queries); safe empty state on any
+        error. No storage, no polling."""
         items = []
         try:
             team_id = session.get('team_id') or (current_user.team_id if current_user.is_authenticated else None)
@@ -108,50 +113,30 @@ def register_context(app):
             team_id = int(team_id)
             role = session.get('team_role') or (getattr(current_user, 'role', 'player') if current_user.is_authenticated else 'player')
             is_coach = (role == 'coach')
-            today = date.today()
-            tomorrow = today + timedelta(days=1)
+            snap = get_snapshot(team_id)
+            if snap is None:
+                return dict(notifications=[], notifications_count=0)
             # today's training / game
-            ev_today = (TrainingEvent.query.filter_by(team_id=team_id, day=today)
-                        .order_by(TrainingEvent.time.asc()).first())
-            if ev_today:
-                kind = 'Zápas' if (ev_today.kind == 'match') else 'Trénink'
-                items.append({'icon': '📅', 'text': 'Dnes %s: %s' % (kind, ev_today.title or ''),
+            if snap.has_today_event:
+                kind = 'Zápas' if (snap.today_event_kind == 'match') else 'Trénink'
+                items.append({'icon': '📅', 'text': 'Dnes %s: %s' % (kind, snap.today_event_title or ''),
                               'url': url_for('home')})
             # tomorrow's game
-            game_tom = (TrainingEvent.query.filter_by(team_id=team_id, day=tomorrow, kind='match')
-                        .order_by(TrainingEvent.time.asc()).first())
-            if game_tom:
-                items.append({'icon': '🥅', 'text': 'Zítra zápas: %s' % (game_tom.title or ''),
+            if snap.has_tomorrow_game:
+                items.append({'icon': '🥅', 'text': 'Zítra zápas: %s' % (snap.tomorrow_game_title or ''),
                               'url': url_for('home')})
             # new message board post in last 24h
-            since = datetime.utcnow() - timedelta(hours=24)
-            new_msg = (AuditEvent.query.filter(AuditEvent.team_id == team_id,
-                                               AuditEvent.event == 'message',
-                                               AuditEvent.created_at >= since).count())
-            if new_msg:
-                items.append({'icon': '💬', 'text': 'Nové zprávy na nástěnce (%d)' % new_msg,
+            if snap.recent_message_count:
+                items.append({'icon': '💬', 'text': 'Nové zprávy na nástěnce (%d)' % snap.recent_message_count,
                               'url': url_for('communication.feed')})
             # pending player-access requests (coach only). Count only, no names.
-            if is_coach:
-                try:
-                    from coach.services.player_identity import pending_requests_for_team
-                    waiting = len(pending_requests_for_team(team_id))
-                except Exception:
-                    db.session.rollback()
-                    waiting = 0
-                if waiting:
-                    items.append({'icon': '🔐', 'text': 'Žádosti o přístup hráčů: %d' % waiting,
-                                  'url': url_for('playerauth.player_access')})
+            if is_coach and snap.pending_access_count:
+                items.append({'icon': '🔐', 'text': 'Žádosti o přístup hráčů: %d' % snap.pending_access_count,
+                              'url': url_for('playerauth.player_access')})
             # unpaid monthly contributions (coach only)
-            if is_coach:
-                period = PaymentPeriod.query.filter_by(team_id=team_id, year=today.year, month=today.month).first()
-                if period:
-                    total = Player.query.filter_by(team_id=team_id).count()
-                    paid = PaymentStatus.query.filter_by(period_id=period.id, status='paid').count()
-                    unpaid = max(0, total - paid)
-                    if unpaid:
-                        items.append({'icon': '💰', 'text': 'Nezaplacené příspěvky: %d' % unpaid,
-                                      'url': url_for('pokladna.pokladna')})
+            if is_coach and snap.unpaid_count:
+                items.append({'icon': '💰', 'text': 'Nezaplacené příspěvky: %d' % snap.unpaid_count,
+                              'url': url_for('pokladna.pokladna')})
         except Exception as e:
             db.session.rollback()
             if is_database_not_ready_error(e):
@@ -1,10 +1,12 @@
 from coach.extensions import db
 from datetime import datetime
 from sqlalchemy.dialects.mysql import MEDIUMTEXT, DATETIME as _MYSQL_DATETIME
+from sqlalchemy.orm import deferred
 
 # Portable large-text type: plain TEXT on SQLite (dev/tests), MEDIUMTEXT on
-# MySQL (up to 16 MB). Needed because Drill.image_data holds base64 snapshots
-# that exceed MySQL's 64 KB TEXT limit; on SQLite this compiles to normal TEXT.
+# MySQL (up to 16 MB). Needed because Drill.path_data (and the legacy base64
+# Drill.image_data) exceed MySQL's 64 KB TEXT limit; on SQLite this compiles to
+# normal TEXT.
 _LARGE_TEXT = db.Text().with_variant(MEDIUMTEXT(), 'mysql')
 
 # Portable microsecond-precise datetime: plain DATETIME on SQLite (which already
@@ -15,6 +17,11 @@ _LARGE_TEXT = db.Text().with_variant(MEDIUMTEXT(), 'mysql')
 # See migration a4b5c6d7e8f9.
 _DT6 = db.DateTime().with_variant(_MYSQL_DATETIME(fsp=6), 'mysql')
 
+# Large payload columns are `deferred`: list and lookup queries leave them out
+# of the SELECT, and the few views that render them ask for them with
+# `.options(undefer(...))`. Touching one on a row loaded without it costs an
+# extra query per row, so loops over many rows must undefer.
+
 
 class Player(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -48,8 +55,14 @@ class Drill(db.Model):
     description = db.Column(db.Text, nullable=True)
     duration = db.Column(db.Integer, nullable=True)  # minutes
     category = db.Column(db.String(50), nullable=True)
-    image_data = db.Column(_LARGE_TEXT, nullable=True)   # base64 image (MEDIUMTEXT on MySQL)
-    path_data = db.Column(_LARGE_TEXT, nullable=True)    # JSON (MEDIUMTEXT on MySQL)
+    # sha256 of the editor snapshot in services.blob_store (served by drill_image).
+    image_hash = db.Column(db.String(64), nullable=True, index=True)
+    # Its small WebP/PNG card preview (services.drill_media), same store.
+    thumb_hash = db.Column(db.String(64), nullable=True, index=True)
+    # Legacy inline base64 snapshot: moved to the blob store by migration
+    # c8d9e0f1a2b3 and no longer written.
+    image_data = deferred(db.Column(_LARGE_TEXT, nullable=True))
+    path_data = deferred(db.Column(_LARGE_TEXT, nullable=True))    # JSON (MEDIUMTEXT on MySQL)
 
 
 class TrainingSession(db.Model):
@@ -88,7 +101,7 @@ class AuditEvent(db.Model):
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=True, index=True)
     role = db.Column(db.String(10), nullable=True)
     ip_truncated = db.Column(db.String(50), nullable=True)
-    meta = db.Column(db.Text, nullable=True)  # JSON string payload
+    meta = deferred(db.Column(db.Text, nullable=True))  # JSON string payload
     created_at = db.Column(_DT6, default=datetime.utcnow)
 
 
@@ -130,6 +143,47 @@ class TrainingEvent(db.Model):
     created_at = db.Column(_DT6, default=datetime.utcnow)
 
 
+class EventSeries(db.Model):
+    """One segment of a lazily expanded recurring series (LAZY_SERIES mode).
+
+    The rule is stored once and occurrences are generated on read for the
+    requested window (services/event_series.py); nothing is materialized per
+    occurrence. A "this and following" edit splits the rule into segments that
+    share `series_id`, so an occurrence's attendance key
+    (`series:<series_id>:<day>`) never changes. `until` is the last occurrence
+    of the segment (inclusive); `start_day` is the rule anchor."""
+    __tablename__ = 'event_series'
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    series_id = db.Column(db.String(36), nullable=False, index=True)
+    start_day = db.Column(db.Date, nullable=False)
+    until = db.Column(db.Date, nullable=False)
+    freq = db.Column(db.String(12), nullable=False)          # recurrence.FREQUENCIES
+    weekdays = db.Column(db.String(30), nullable=True)       # 'MO,WE' (weekly/biweekly)
+    time = db.Column(db.String(10), nullable=True)           # HH:MM
+    title = db.Column(db.String(200), nullable=False, default='Trénink')
+    kind = db.Column(db.String(20), nullable=True)
+    created_at = db.Column(_DT6, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_event_series_team_range', 'team_id', 'start_day', 'until'),)
+
+
+class EventSeriesException(db.Model):
+    """One occurrence of an EventSeries that differs from its rule: edited
+    fields (NULL = inherit from the segment) or cancelled. Keyed by the day the
+    rule puts the occurrence on."""
+    __tablename__ = 'event_series_exception'
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False, index=True)
+    series_id = db.Column(db.String(36), nullable=False)
+    occurrence_day = db.Column(db.Date, nullable=False)
+    cancelled = db.Column(db.Boolean, nullable=False, default=False)
+    time = db.Column(db.String(10), nullable=True)
+    title = db.Column(db.String(200), nullable=True)
+    kind = db.Column(db.String(20), nullable=True)
+    updated_at = db.Column(_DT6, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('series_id', 'occurrence_day', name='uq_series_exception'),)
+
+
 class LeagueIntegration(db.Model):
     """Per-team league (vysledky.com etc.) integration config + cached data.
 
@@ -143,18 +197,36 @@ class LeagueIntegration(db.Model):
     connector = db.Column(db.String(30), nullable=True)        # 'vysledky' | 'generic'
     highlight_team = db.Column(db.String(120), nullable=True)  # coach-entered name
     resolved_team = db.Column(db.String(120), nullable=True)   # confirmed exact name
-    data_json = db.Column(db.Text, nullable=True)              # cached normalized data
+    data_json = deferred(db.Column(db.Text, nullable=True))    # cached normalized data
     last_updated = db.Column(_DT6, nullable=True)       # last successful parse
     last_error = db.Column(db.String(400), nullable=True)
     last_attempt = db.Column(_DT6, nullable=True)       # for rate limiting
     created_at = db.Column(_DT6, default=datetime.utcnow)
 
 
+def local_event_id(event_key):
+    """TrainingEvent id of a canonical 'local:<id>' attendance key, else None."""
+    if not event_key or not event_key.startswith('local:'):
+        return None
+    n = event_key[6:]
+    return int(n) if n.isdigit() and n == str(int(n)) else None
+
+
+def _event_id_default(context):
+    # Column default, so ORM adds and bulk `__table__.insert()` rows alike get
+    # it from their own event_key (event_key is never rewritten afterwards).
+    return local_event_id(context.get_current_parameters().get('event_key'))
+
+
 class AttendanceEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False, index=True)
     player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False, index=True)
     event_key = db.Column(db.String(120), nullable=False, index=True)
+    # TrainingEvent.id for 'local:<id>' keys (NULL for series/Týmuj events), so
+    # local-event attendance joins and cascades on integers. No FK constraint:
+    # imports may record keys of events that no longer exist. See a6b7c8d9e0f1.
+    event_id = db.Column(db.Integer, nullable=True, default=_event_id_default)
     event_title = db.Column(db.String(200), nullable=False, default='')
     event_day = db.Column(db.Date, nullable=False)
     event_time = db.Column(db.String(10), nullable=True)
@@ -171,6 +243,7 @@ class AttendanceEntry(db.Model):
     updated_at = db.Column(_DT6, default=datetime.utcnow)
 
     player = db.relationship('Player')
+    __table_args__ = (db.Index('ix_attendance_team_event_player', 'team_id', 'event_id', 'player_id'),)
 
 
 class AttendanceImport(db.Model):
@@ -317,9 +390,82 @@ class TeamCalendarFeedToken(db.Model):
     rotated_at = db.Column(_DT6, nullable=True)
 
 
+class TeamDataRevision(db.Model):
+    """Monotonic per-team data revision: one cheap, correct cache key.
+
+    Bumped inside the writing transaction by the Session flush hooks in
+    services/team_revision.py whenever team-scoped data changes, so dashboard,
+    attendance, feed and ETag caches can key on it instead of re-running their
+    queries. Deliberately NO foreign key to team: the row may outlive the team
+    row within the delete transaction, and it must never block a team delete."""
+    __tablename__ = 'team_data_revision'
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, nullable=False, unique=True, index=True)
+    revision = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(_DT6, nullable=True)
+
+
+class TymujEvent(db.Model):
+    """One normalized Týmuj calendar event, materialized from the team's ICS.
+
+    Written only by services/tymuj.py refresh (delete + insert of the team's
+    rows in the same transaction as the `tymuj.cache` status payload), read by
+    date range via the (team_id, day) index. `event_key` is the precomputed
+    attendance key (`tymuj.make_event_key`), so readers never re-hash; the
+    (team_id, event_key) index resolves one key without a range read."""
+    __tablename__ = 'tymuj_event'
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    time = db.Column(db.String(10), nullable=True)       # HH:MM or '' (all-day)
+    end_time = db.Column(db.String(10), nullable=True)
+    # Text, not String: the attendance key hashes the full SUMMARY, so it must
+    # round-trip untruncated.
+    title = db.Column(db.Text, nullable=False)
+    location = db.Column(db.String(200), nullable=True)
+    kind = db.Column(db.String(20), nullable=False, default='training')  # 'training' | 'match'
+    cancelled = db.Column(db.Boolean, nullable=False, default=False)
+    recurring = db.Column(db.Boolean, nullable=False, default=False)
+    uid = db.Column(db.String(255), nullable=True)
+    event_key = db.Column(db.String(40), nullable=False)
+    __table_args__ = (
+        db.Index('ix_tymuj_event_team_day', 'team_id', 'day'),
+        db.Index('ix_tymuj_event_team_key', 'team_id', 'event_key'),
+    )
+
+
+class TeamEventIndex(db.Model):
+    """Read model of a team's calendar: one row per event the attendance pages
+    list, whatever its source — a TrainingEvent (`local`), a lazy series
+    occurrence (`series`) or a live Týmuj event (`tymuj`).
+
+    Derived data, maintained by services/event_index.py in the transaction of
+    every write to the sources; `flask events:reindex` rebuilds it. `event_key`
+    is the attendance key and `title` is already defaulted, so readers get the
+    `_collect_events_for_team` entries from one ordered (team_id, day) range
+    read."""
+    __tablename__ = 'team_event_index'
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    time = db.Column(db.String(10), nullable=False, default='')
+    title = db.Column(db.Text, nullable=False)
+    kind = db.Column(db.String(20), nullable=False, default='training')
+    source = db.Column(db.String(10), nullable=False)     # 'local' | 'series' | 'tymuj'
+    event_key = db.Column(db.String(120), nullable=False)
+    local_id = db.Column(db.Integer, nullable=True, index=True)   # TrainingEvent.id
+    series_id = db.Column(db.String(36), nullable=True)
+    __table_args__ = (
+        db.Index('ix_team_event_index_team_day', 'team_id', 'day', 'time'),
+        db.Index('ix_team_event_index_team_key', 'team_id', 'event_key'),
+        db.Index('ix_team_event_index_team_series', 'team_id', 'series_id'),
+    )
+
+
 __all__ = [
     'db', 'Player', 'Roster', 'LineAssignment', 'Drill', 'TrainingSession',
     'LineupSession', 'Team', 'AuditEvent', 'TrainingEvent', 'AttendanceEntry', 'TeamKey', 'TeamLoginAttempt',
     'LeagueIntegration', 'AttendanceImport', 'PaymentPeriod', 'PaymentStatus', 'TeamCalendarFeedToken',
-    'PlayerRegistrationRequest', 'PasskeyCredential'
+    'PlayerRegistrationRequest', 'PasskeyCredential', 'TeamDataRevision', 'TymujEvent',
+    'EventSeries', 'EventSeriesException', 'TeamEventIndex'
 ]
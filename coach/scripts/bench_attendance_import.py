@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Benchmark: set-based vs row-by-row attendance import confirm.
+
+Builds a synthetic Týmuj attendance sheet (players x events, every cell
+answered) and confirms it twice against a file-backed SQLite database:
+
+  first     every player and event is created, every cell inserted
+  reimport  the same sheet merged onto the existing players/events with
+            overwrite_imported=True, so every cell is an update
+
+Two engines run each scenario on a fresh database:
+
+  rowwise   the previous confirm_import: a SELECT per cell and a flush per
+            created player and event
+  bulk      attendance_import.confirm_import: one prefetch, one executemany
+            INSERT, one bulk UPDATE
+
+Reported per run: statements sent, total seconds, and the write-lock hold
+time (first INSERT/UPDATE/DELETE to COMMIT) — how long every other request of
+the single worker waits on SQLite. Both engines must leave identical rows and
+batch counters; the script exits non-zero if they differ.
+
+    python -m coach.scripts.bench_attendance_import --players 50 --events 250
+
+Uses a throwaway SQLite file (main() sets DB_URL before importing the app).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+
+from coach.extensions import db
+from coach.models import AttendanceEntry, Player, Team, TrainingEvent
+from coach.scripts.import_reference import rowwise_confirm, synthetic_sheet
+from coach.services import attendance_import as ai
+
+
+class WriteLockProbe:
+    """Counts statements and times first write statement -> COMMIT."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = 0
+        self.first_write = None
+        self.committed = None
+
+    def _on_exec(self, conn, cursor, statement, *a):
+        self.statements += 1
+        if self.first_write is None and statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.first_write = time.perf_counter()
+
+    def _on_commit(self, conn):
+        self.committed = time.perf_counter()
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_exec)
+        event.listen(self.engine, 'commit', self._on_commit)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_exec)
+        event.remove(self.engine, 'commit', self._on_commit)
+
+    @property
+    def lock_seconds(self):
+        if self.first_write is None or self.committed is None:
+            return 0.0
+        return self.committed - self.first_write
+
+
+def _snapshot(team_id, batch):
+    rows = sorted((e.player_id, e.event_key, e.status, e.source, e.source_detail)
+                  for e in AttendanceEntry.query.filter_by(team_id=team_id))
+    counters = (batch.players_created, batch.events_created, batch.attendance_imported,
+                batch.skipped, batch.overwritten)
+    return rows, counters
+
+
+def run(confirm, sheet, reimport):
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    team = Team(name='HC Bench'); db.session.add(team); db.session.commit()
+    tid = team.id
+    p_dec, e_dec, overwrite = {}, {}, False
+    if reimport:
+        first = ai.confirm_import(tid, sheet, {}, {e['idx']: 'create' for e in sheet['events']})
+        ids = [p.id for p in Player.query.filter_by(team_id=tid).order_by(Player.id)]
+        evs = [e.id for e in TrainingEvent.query.filter_by(team_id=tid).order_by(TrainingEvent.id)]
+        p_dec = {i: 'merge:%d' % pid for i, pid in enumerate(ids)}
+        e_dec = {j: 'use:local:%d' % eid for j, eid in enumerate(evs)}
+        overwrite = True
+        db.session.expire_all()
+        assert first.attendance_imported == len(sheet['cells'])
+    else:
+        e_dec = {e['idx']: 'create' for e in sheet['events']}
+    with WriteLockProbe(db.engine) as probe:
+        t0 = time.perf_counter()
+        batch = confirm(tid, sheet, p_dec, e_dec, overwrite_imported=overwrite)
+        elapsed = time.perf_counter() - t0
+    return _snapshot(tid, batch), probe.statements, elapsed, probe.lock_seconds
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--players', type=int, default=50)
+    ap.add_argument('--events', type=int, default=250)
+    args = ap.parse_args(argv)
+    # The app reads DB_URL at import time, so point it at a throwaway file first.
+    os.environ['DB_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='coachhub-bench-'),
+                                                       'bench.db')
+    os.environ.setdefault('APP_ENV', 'dev')
+    from coach.app import app
+    sheet = synthetic_sheet(args.players, args.events)
+    print('%d players x %d events = %d cells' % (args.players, args.events, len(sheet['cells'])))
+    print('%-9s %-8s %10s %9s %9s' % ('scenario', 'engine', 'statements', 'seconds', 'lock s'))
+    status = 0
+    with app.app_context():
+        for scenario in ('first', 'reimport'):
+            results = {}
+            for name, fn in (('rowwise', rowwise_confirm), ('bulk', ai.confirm_import)):
+                snap, stmts, secs, lock = run(fn, sheet, scenario == 'reimport')
+                results[name] = snap
+                print('%-9s %-8s %10d %9.3f %9.3f' % (scenario, name, stmts, secs, lock))
+            if results['rowwise'] != results['bulk']:
+                print('MISMATCH in %s: bulk result differs from rowwise' % scenario, file=sys.stderr)
+                status = 1
+        db.session.remove()
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Benchmark: grid-backed vs dict-backed attendance matrix view.
+
+Builds a synthetic roster and season of events with a realistic response mix
+and runs two engines over it:
+
+  dicts   the previous build_matrix_view: a (player_id, event_key) -> status
+          dict, looked up once per cell in each of several Python loops
+  grid    attendance_stats.build_matrix_view: statuses in one bytearray,
+          aggregated per event column / player row in bulk
+
+Both must return the same view; the script exits non-zero if they differ.
+
+    python -m coach.scripts.bench_attendance_matrix --players 25 50 --events 120 250
+
+No app context or database is needed.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import date
+
+from coach.services import attendance_stats as stats
+from coach.scripts.matrix_reference import dict_view, synthetic_matrix
+
+
+def measure(fn, args, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--players', type=int, nargs='+', default=[25, 50])
+    ap.add_argument('--events', type=int, nargs='+', default=[120, 250])
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args(argv)
+    today = date(2026, 1, 15)
+    print('%-8s %7s  %-6s %9s' % ('players', 'events', 'engine', 'ms'))
+    for n_players in args.players:
+        for n_events in args.events:
+            data = synthetic_matrix(n_players, n_events, today) + (today,)
+            results = {}
+            for name, fn in (('dicts', dict_view), ('grid', stats.build_matrix_view)):
+                res, secs = measure(fn, data, args.repeat)
+                results[name] = res
+                print('%-8d %7d  %-6s %9.2f' % (n_players, n_events, name, secs * 1000))
+            if results['dicts'] != results['grid']:
+                print('MISMATCH: grid view differs from dict view', file=sys.stderr)
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Benchmark: vector drill sheet PDF vs the previous rasterized (PIL) one.
+
+Builds synthetic drill snapshots (900x600 RGBA line diagrams, like the editor
+posts) and writes the same drill sheet three ways:
+
+  pil      the previous export: each page drawn into a 595x842 PIL bitmap
+           (text included) and saved with Image.save(save_all=True)
+  vector   drill_pdf.write: text as text, each snapshot prepared
+           (drill_pdf.prepare_image) and embedded once
+  cached   drill_pdf.write with snapshots already prepared, as on a
+           re-export served from the image cache
+
+Every fourth drill reuses an earlier snapshot, as sessions often repeat one.
+Reports the best time of --repeat runs and the file size; exits non-zero if
+an engine produces the wrong number of pages.
+
+    python -m coach.scripts.bench_pdf_export --drills 5 15 30
+
+No app context or database is needed.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+from coach.services import drill_pdf
+
+
+def pil_page(spec, im, page_size=(595, 842)):
+    """Reference engine: the bitmap page the vector writer replaced."""
+    pg = Image.new('RGB', page_size, 'white')
+    draw = ImageDraw.Draw(pg)
+    sub = []
+    if spec['category']: sub.append(f"Kategorie: {spec['category']}")
+    if spec['duration']: sub.append(f"Doba: {spec['duration']} min")
+    subline = '  •  '.join(sub)
+    desc = spec['description']
+    try:
+        font_title = ImageFont.truetype('arial.ttf', 18)
+        font_sub = ImageFont.truetype('arial.ttf', 12)
+        font_desc = ImageFont.truetype('arial.ttf', 12)
+    except Exception:
+        font_title = ImageFont.load_default(); font_sub = ImageFont.load_default(); font_desc = ImageFont.load_default()
+    margin = 36
+    y = margin
+    draw.text((margin, y), spec['title'], fill=(0, 0, 0), font=font_title); y += 24
+    if subline:
+        draw.text((margin, y), subline, fill=(0, 0, 0), font=font_sub); y += 18
+    if desc:
+        max_width = page_size[0] - 2 * margin
+        words = desc.split(); lines = []; cur = ''
+        for w in words:
+            test = (cur + ' ' + w).strip()
+            if draw.textlength(test, font=font_desc) <= max_width: cur = test
+            else:
+                if cur: lines.append(cur)
+                cur = w
+            if len(lines) >= 6: break
+        if cur and len(lines) < 6: lines.append(cur)
+        for line in lines:
+            draw.text((margin, y), line, fill=(0, 0, 0), font=font_desc); y += 16
+        y += 8
+    top = y; bottom = page_size[1] - margin; left = margin; right = page_size[0] - margin
+    if im is not None:
+        bg = Image.new('RGB', im.size, 'white'); bg.paste(im, mask=im.split()[3]); im_rgb = bg
+        box_w = right - left; box_h = bottom - top
+        iw, ih = im_rgb.size; scale = min(box_w / iw, box_h / ih)
+        nw = int(iw * scale); nh = int(ih * scale)
+        im_resized = im_rgb.resize((nw, nh), Image.LANCZOS)
+        ox = left + (box_w - nw) // 2; oy = top + (box_h - nh) // 2
+        pg.paste(im_resized, (ox, oy))
+    else:
+        draw.text((left, top), '(Bez náhledu cvičení)', fill=(0, 0, 0), font=font_sub)
+    return pg
+
+
+def run_pil(specs, paths, out):
+    pages = []
+    for spec in specs:
+        path = paths.get(spec['image_hash'])
+        im = None
+        if path:
+            with Image.open(path) as src:
+                im = src.convert('RGBA')
+        pages.append(pil_page(spec, im))
+    pages[0].save(out, save_all=True, append_images=pages[1:], format='PDF')
+
+
+def run_vector(specs, paths, out):
+    images = {digest: drill_pdf.prepare_image(path) for digest, path in paths.items()}
+    drill_pdf.write(specs, images, out)
+
+
+def snapshot(rnd, size=(900, 600)):
+    """A rink-like diagram: boards, red/blue lines, a few drawn paths."""
+    im = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(im)
+    w, h = size
+    draw.rounded_rectangle((10, 10, w - 10, h - 10), radius=120, fill=(245, 248, 252, 255),
+                           outline=(30, 30, 30, 255), width=4)
+    for x, color in ((w // 2, (200, 30, 30, 255)), (w // 3, (30, 60, 200, 255)),
+                     (2 * w // 3, (30, 60, 200, 255))):
+        draw.line((x, 10, x, h - 10), fill=color, width=6)
+    for _ in range(rnd.randint(4, 9)):
+        pts = [(rnd.randint(40, w - 40), rnd.randint(40, h - 40)) for _ in range(rnd.randint(2, 6))]
+        draw.line(pts, fill=(rnd.randint(0, 90), rnd.randint(0, 90), rnd.randint(0, 90), 255), width=4)
+        x, y = pts[-1]
+        draw.ellipse((x - 9, y - 9, x + 9, y + 9), outline=(0, 0, 0, 255), width=3)
+    return im
+
+
+def synthetic_session(n_drills, folder, seed=0):
+    """(specs, {image_hash: png path}) for a session of `n_drills`."""
+    rnd = random.Random(seed)
+    specs, paths = [], {}
+    for i in range(n_drills):
+        if i % 4 == 3:
+            digest = specs[rnd.randrange(len(specs))]['image_hash']
+        else:
+            digest = '%064x' % rnd.getrandbits(256)
+            paths[digest] = os.path.join(folder, digest + '.png')
+            snapshot(rnd).save(paths[digest], 'PNG')
+        specs.append({'title': 'Cvičení %02d – přechod do útoku' % (i + 1),
+                      'category': rnd.choice(['Útok', 'Obrana', 'Bruslení', 'Přesilovka']),
+                      'duration': rnd.choice([5, 8, 10, 12, 15]),
+                      'description': ' '.join(rnd.choice(['přihrávka', 'střela', 'obrat', 'zpět',
+                                                          'do', 'pásma', 'brankář', 'kotouč', 'rychle'])
+                                              for _ in range(rnd.randint(10, 60))),
+                      'image_hash': digest})
+    return specs, paths
+
+
+def measure(fn, repeat):
+    best, data = None, b''
+    for _ in range(repeat):
+        out = io.BytesIO()
+        t0 = time.perf_counter()
+        fn(out)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+        data = out.getvalue()
+    return data, best
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--drills', type=int, nargs='+', default=[5, 15, 30])
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+    folder = tempfile.mkdtemp(prefix='bench-pdf-')
+    try:
+        print('%-7s %-7s %10s %10s' % ('drills', 'engine', 'ms', 'KiB'))
+        for n in args.drills:
+            specs, paths = synthetic_session(n, folder)
+            prepared = {digest: drill_pdf.prepare_image(path) for digest, path in paths.items()}
+            engines = (
+                ('pil', lambda out: run_pil(specs, paths, out)),
+                ('vector', lambda out: run_vector(specs, paths, out)),
+                ('cached', lambda out: drill_pdf.write(specs, prepared, out)),
+            )
+            for name, fn in engines:
+                data, secs = measure(fn, args.repeat)
+                print('%-7d %-7s %10.1f %10.1f' % (n, name, secs * 1000, len(data) / 1024))
+                pages = len(re.findall(rb'/Type\s*/Page\b', data))
+                if pages != n:
+                    print('MISMATCH: %s wrote %d pages, expected %d' % (name, pages, n), file=sys.stderr)
+                    return 1
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Benchmark: streamed vs buffered parsing of large Týmuj ICS feeds.
+
+Builds a synthetic multi-season calendar (practices + games, each with an
+attendee list and a folded description, like real Týmuj exports) and parses
+it two ways:
+
+  buffered   read the whole response, decode it, parse the text
+             (the pre-streaming refresh path)
+  streamed   feed READ_CHUNK-sized chunks to IcsStreamParser
+             (what refresh_cache() does now)
+
+Reports wall time and the tracemalloc peak for each. Both must produce the
+same events; the script exits non-zero if they differ.
+
+    python -m coach.scripts.bench_tymuj_ics --seasons 1 3 6
+
+No app context, database or network is needed. The caps are lifted for the
+run so the largest feeds are measured rather than rejected.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from coach.services import tymuj
+
+
+def synthetic_feed(seasons: int, attendees: int = 25) -> bytes:
+    """~4 events a week, August to March, per season."""
+    out = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//bench//tymuj//CS']
+    names = ['Hráč Číslo%02d Příjmení' % i for i in range(attendees)]
+    uid = 0
+    for season in range(seasons):
+        start = datetime(2020 + season, 8, 1, 17, 30)
+        for day in range(240):
+            d = start + timedelta(days=day)
+            if d.weekday() not in (0, 2, 4, 5):
+                continue
+            uid += 1
+            game = d.weekday() == 5
+            out += ['BEGIN:VEVENT', 'UID:%d@bench' % uid,
+                    'DTSTART:%s' % d.strftime('%Y%m%dT%H%M%S'),
+                    'DTEND:%s' % (d + timedelta(hours=1, minutes=30)).strftime('%Y%m%dT%H%M%S'),
+                    'SUMMARY:%s' % ('Zápas s HC Soupeř %d' % uid if game else 'Trénink mládeže'),
+                    'LOCATION:Zimní stadion Praha',
+                    'DESCRIPTION:' + 'Poznámka trenéra k tréninku. ' * 2,
+                    ' ' + 'Pokračování dlouhého popisu události. ' * 2]
+            if uid % 17 == 0:
+                out.append('STATUS:CANCELLED')
+            out += ['ATTENDEE;CN="%s";PARTSTAT=ACCEPTED:mailto:p%d@example.cz' % (n, i)
+                    for i, n in enumerate(names)]
+            out.append('END:VEVENT')
+    out.append('END:VCALENDAR')
+    return ('\r\n'.join(out) + '\r\n').encode('utf-8')
+
+
+def _chunks(raw: bytes):
+    buf = io.BytesIO(raw)
+    while True:
+        chunk = buf.read(tymuj.READ_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+
+def buffered(raw: bytes) -> dict:
+    body = b''.join(_chunks(raw))
+    text, _enc = tymuj._decode_ics(body, 'text/calendar; charset=utf-8')
+    return tymuj.parse_ics(text)
+
+
+def streamed(raw: bytes) -> dict:
+    parser = tymuj.IcsStreamParser('text/calendar; charset=utf-8')
+    for chunk in _chunks(raw):
+        parser.feed(chunk)
+    return parser.close()
+
+
+def measure(fn, raw: bytes):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn(raw)
+    elapsed = time.perf_counter() - t0
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--seasons', type=int, nargs='+', default=[1, 3, 6])
+    ap.add_argument('--attendees', type=int, default=25)
+    args = ap.parse_args(argv)
+    tymuj.MAX_EVENTS = 0
+    print('%-8s %9s %7s  %-9s %9s %11s' % ('seasons', 'feed KiB', 'events', 'mode', 'seconds', 'peak KiB'))
+    for seasons in args.seasons:
+        raw = synthetic_feed(seasons, args.attendees)
+        results = {}
+        for name, fn in (('buffered', buffered), ('streamed', streamed)):
+            res, secs, peak = measure(fn, raw)
+            results[name] = res
+            print('%-8d %9d %7d  %-9s %9.3f %11d' % (seasons, len(raw) // 1024,
+                                                     res['stats']['event_count'], name,
+                                                     secs, peak // 1024))
+        if results['buffered'] != results['streamed']:
+            print('MISMATCH: streamed parse differs from buffered parse', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Frozen reference for the attendance import confirm.
+
+`rowwise_confirm` is the previous confirm_import (a SELECT per cell, a flush
+per created player and event), kept verbatim as the oracle the set-based
+attendance_import.confirm_import must match; `synthetic_sheet` builds a
+parsed Týmuj sheet (every cell answered). test_attendance_import asserts
+against it and bench_attendance_import times it; change it only together
+with those tests.
+"""
+import json
+from datetime import date, datetime, timedelta
+
+from coach.extensions import db
+from coach.models import AttendanceEntry, AttendanceImport, Player, TrainingEvent
+from coach.services import attendance_import as ai
+
+
+def rowwise_confirm(team_id, parsed, player_decisions, event_decisions, *,
+                    role='coach', overwrite_imported=False, filename=None):
+    """Reference engine: the per-cell confirm_import the bulk version replaced."""
+    now = datetime.utcnow()
+    batch = AttendanceImport(team_id=team_id, created_by_role=role, source=ai.SOURCE_IMPORT,
+                             file_type=parsed.get('file_type'), filename=(filename or None),
+                             created_at=now, status='completed')
+    db.session.add(batch)
+    db.session.flush()
+    players_created = events_created = imported = skipped = overwritten = 0
+    p_resolved = {}
+    for p in parsed['players']:
+        dec = (player_decisions.get(str(p['idx'])) or player_decisions.get(p['idx']) or 'create')
+        if dec == 'ignore':
+            continue
+        if isinstance(dec, str) and dec.startswith('merge:'):
+            try:
+                pid = int(dec.split(':', 1)[1])
+            except ValueError:
+                pid = None
+            if pid and Player.query.filter_by(id=pid, team_id=team_id).first():
+                p_resolved[p['idx']] = pid
+            continue
+        pl = Player(team_id=team_id, name=p['name'][:100], position='F')
+        db.session.add(pl)
+        db.session.flush()
+        p_resolved[p['idx']] = pl.id
+        players_created += 1
+    e_resolved = {}
+    for ev in parsed['events']:
+        dec = (event_decisions.get(str(ev['idx'])) or event_decisions.get(ev['idx']) or '')
+        if dec == 'ignore' or not dec:
+            continue
+        if isinstance(dec, str) and dec.startswith('use:'):
+            e_resolved[ev['idx']] = (dec.split(':', 1)[1], ev)
+            continue
+        if dec == 'create':
+            if not ev.get('date'):
+                continue
+            te = TrainingEvent(team_id=team_id, day=date.fromisoformat(ev['date']),
+                               time=(ev.get('time') or '')[:10],
+                               title=(ev.get('title') or 'Trénink')[:200], kind='training')
+            db.session.add(te)
+            db.session.flush()
+            e_resolved[ev['idx']] = ('local:%d' % te.id, ev)
+            events_created += 1
+    for cell in parsed['cells']:
+        pid = p_resolved.get(cell['p'])
+        ev_res = e_resolved.get(cell['e'])
+        if not pid or not ev_res:
+            skipped += 1
+            continue
+        ev_key, ev = ev_res
+        status = cell['status']
+        if status not in ('going', 'not_going', 'maybe'):
+            skipped += 1
+            continue
+        existing = AttendanceEntry.query.filter_by(team_id=team_id, player_id=pid,
+                                                   event_key=ev_key).first()
+        if existing:
+            if existing.source in ai.COACHHUB_SOURCES or not overwrite_imported:
+                skipped += 1
+                continue
+            existing.status = status
+            existing.source = ai.SOURCE_IMPORT
+            existing.source_detail = str(batch.id)
+            existing.updated_by_role = role
+            existing.imported_at = now
+            existing.updated_at = now
+            overwritten += 1
+            continue
+        db.session.add(AttendanceEntry(
+            team_id=team_id, player_id=pid, event_key=ev_key, status=status,
+            event_title=(ev.get('title') or '')[:200],
+            event_day=date.fromisoformat(ev['date']) if ev.get('date') else now.date(),
+            event_time=(ev.get('time') or '')[:10], event_kind='training',
+            event_source=('tymuj' if ev_key and not ev_key.startswith('local:') else 'local'),
+            source=ai.SOURCE_IMPORT, source_detail=str(batch.id), updated_by_role=role,
+            imported_at=now, updated_at=now))
+        imported += 1
+    batch.players_created = players_created
+    batch.events_created = events_created
+    batch.attendance_imported = imported
+    batch.skipped = skipped
+    batch.overwritten = overwritten
+    batch.warnings = json.dumps(list(parsed.get('warnings') or []), ensure_ascii=False)
+    db.session.commit()
+    return batch
+
+
+def synthetic_sheet(n_players, n_events, start=date(2025, 9, 1)):
+    statuses = ('going', 'going', 'going', 'not_going', 'maybe')
+    players = [{'idx': i, 'name': 'Hráč %03d Příjmení' % i} for i in range(n_players)]
+    events = [{'idx': j, 'raw': 'E%d' % j, 'date': (start + timedelta(days=j)).isoformat(),
+               'time': '18:00', 'title': 'Trénink %d' % j} for j in range(n_events)]
+    cells = [{'p': i, 'e': j, 'status': statuses[(i * 7 + j) % len(statuses)]}
+             for i in range(n_players) for j in range(n_events)]
+    return {'players': players, 'events': events, 'cells': cells, 'warnings': [],
+            'file_type': 'csv'}
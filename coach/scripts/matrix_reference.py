@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Frozen reference for the attendance matrix view.
+
+`dict_view` is the dict-per-cell build_matrix_view that the bytearray grid in
+services.attendance_stats replaced, kept verbatim as the oracle the grid must
+match; `synthetic_matrix` builds a roster/season to compare them on.
+test_attendance_matrix asserts against it and bench_attendance_matrix times
+it; change it only together with those tests.
+"""
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from coach.services import attendance_stats as stats
+
+
+def dict_view(events, players, entries, today=None):
+    """Reference engine: the dict-per-cell implementation the grid replaced."""
+    today = today or date.today()
+    smap = {}
+    for e in entries:
+        smap[(e.player_id, e.event_key)] = e.status or 'unknown'
+
+    def status_of(pid, key):
+        return smap.get((pid, key), 'unknown')
+
+    n_players = len(players)
+    events_view = []
+    for ev in events:
+        c = stats._empty_counts()
+        by_pos = {'G': stats._empty_counts(), 'D': stats._empty_counts(), 'F': stats._empty_counts()}
+        names = {'going': [], 'not_going': [], 'maybe': [], 'unknown': []}
+        for p in players:
+            st = status_of(p.id, ev['key'])
+            c[st] += 1
+            pos = p.position if p.position in by_pos else 'F'
+            by_pos[pos][st] += 1
+            names[st].append(p.name)
+        d = ev['day']
+        pct = stats._pct(c['going'], n_players)
+        events_view.append({
+            'key': ev['key'], 'day': d.isoformat(),
+            'day_label': '%d.%d.' % (d.day, d.month),
+            'day_full': d.strftime('%d.%m.%Y'),
+            'time': ev.get('time') or '', 'title': ev.get('title') or '',
+            'kind': ev.get('kind') or 'training', 'source': ev.get('source') or 'local',
+            'is_upcoming': d >= today,
+            'summary': {**c, 'total': n_players, 'pct': pct, 'color': stats._color(pct, n_players)},
+            'by_position': by_pos, 'names': names,
+        })
+
+    n_events = len(events)
+    n_train = sum(1 for e in events if e.get('kind') != 'match')
+    n_games = n_events - n_train
+    chron = sorted(events, key=lambda e: (e['day'], e.get('time') or ''))
+    past_chron = [e for e in chron if e['day'] <= today]
+
+    players_view = []
+    for p in players:
+        c = stats._empty_counts()
+        tr = {'going': 0, 'total': 0}
+        gm = {'going': 0, 'total': 0}
+        for ev in events:
+            st = status_of(p.id, ev['key'])
+            c[st] += 1
+            if ev.get('kind') == 'match':
+                gm['total'] += 1
+                gm['going'] += (st == 'going')
+            else:
+                tr['total'] += 1
+                tr['going'] += (st == 'going')
+        streak = 0
+        for ev in reversed(past_chron):
+            if status_of(p.id, ev['key']) == 'going':
+                streak += 1
+            else:
+                break
+        longest = run = 0
+        for ev in past_chron:
+            if status_of(p.id, ev['key']) == 'going':
+                run += 1
+                longest = max(longest, run)
+            else:
+                run = 0
+        recent = [{'key': ev['key'], 'status': status_of(p.id, ev['key']),
+                   'day': ev['day'].isoformat(), 'kind': ev.get('kind') or 'training'}
+                  for ev in past_chron[-10:]]
+        pct = stats._pct(c['going'], n_events)
+        players_view.append({
+            'id': p.id, 'name': p.name, 'position': p.position or 'F',
+            'initials': stats._initials(p.name),
+            'summary': {**c, 'total': n_events, 'pct': pct, 'color': stats._color(pct, n_events)},
+            'trainings': {**tr, 'pct': stats._pct(tr['going'], tr['total'])},
+            'games': {**gm, 'pct': stats._pct(gm['going'], gm['total'])},
+            'streak': streak, 'longest_streak': longest, 'recent': recent,
+        })
+
+    rated = [pv for pv in players_view if pv['summary']['total'] > 0]
+    avg_pct = round(sum(pv['summary']['pct'] for pv in rated) / len(rated)) if rated else 0
+    best = max(rated, key=lambda pv: pv['summary']['pct'], default=None)
+    worst = min(rated, key=lambda pv: pv['summary']['pct'], default=None)
+    upcoming = [ev for ev in events_view if ev['is_upcoming']]
+    up_total = sum(ev['summary']['total'] for ev in upcoming)
+    up_going = sum(ev['summary']['going'] for ev in upcoming)
+    no_response = sum(ev['summary']['unknown'] for ev in upcoming)
+    team = {
+        'avg_pct': avg_pct,
+        'avg_color': stats._color(avg_pct, len(rated)),
+        'upcoming_pct': stats._pct(up_going, up_total),
+        'no_response_count': no_response,
+        'best_player': {'name': best['name'], 'pct': best['summary']['pct']} if best else None,
+        'worst_player': {'name': worst['name'], 'pct': worst['summary']['pct']} if worst else None,
+        'total_events': n_events, 'total_trainings': n_train, 'total_games': n_games,
+        'upcoming_count': len(upcoming),
+        'players_total': n_players,
+    }
+    client_map = {}
+    for (pid, key), st in smap.items():
+        if st and st != 'unknown':
+            client_map.setdefault(pid, {})[key] = st
+    return {'events': events_view, 'players': players_view, 'team': team,
+            'status_map': client_map}
+
+
+def synthetic_matrix(n_players, n_events, today, seed=0):
+    """(events, players, entries) for a roster/season; ~15 % of cells unanswered."""
+    rnd = random.Random(seed)
+    positions = ['G', 'G'] + ['D'] * 8 + ['F'] * 14 + [None]
+    players = [SimpleNamespace(id=i + 1, name='Hráč %03d Příjmení' % i,
+                               position=rnd.choice(positions)) for i in range(n_players)]
+    start = today - timedelta(days=n_events // 2)
+    events = []
+    for i in range(n_events):
+        events.append({'key': 'local:%d' % (i + 1), 'day': start + timedelta(days=i // 2),
+                       'time': rnd.choice(['07:00', '17:30', '18:00', '']),
+                       'title': 'Akce %d' % i, 'kind': rnd.choice(['training'] * 3 + ['match']),
+                       'source': 'local'})
+    rnd.shuffle(events)
+    weights = ['going'] * 6 + ['not_going'] * 2 + ['maybe', 'unknown']
+    entries = []
+    for p in players:
+        for ev in events:
+            if rnd.random() < 0.85:
+                entries.append(SimpleNamespace(player_id=p.id, event_key=ev['key'],
+                                               status=rnd.choice(weights)))
+    entries.append(SimpleNamespace(player_id=n_players + 99, event_key='local:1', status='going'))
+    return events, players, entries
@@ -1,7 +1,8 @@
 """CoachHub-first attendance: Týmuj CSV/Excel import (manual migration path).
 
-Pure-stdlib (no pandas/openpyxl). The uploaded file is parsed entirely in
-memory and never persisted. Spreadsheet content is treated as untrusted text:
+Pure-stdlib (no pandas/openpyxl). The uploaded file is parsed in memory and
+never persisted; XLSX worksheets and shared strings are streamed with
+iterparse, so only the resulting grid is held. Spreadsheet content is treated as untrusted text:
 formulas are ignored (cached values only), emails/phones are never stored.
 
 Pipeline: parse_attendance_file -> build_import_preview (no writes) ->
@@ -16,8 +17,11 @@ import zipfile
 import xml.etree.ElementTree as ET
 from datetime import date, datetime
 
+from sqlalchemy import update
+
 from coach.extensions import db
 from coach.models import AttendanceEntry, AttendanceImport, Player, TrainingEvent
+from coach.services import event_series, team_revision
 from coach.services import tymuj as tymuj_svc
 
 # ---- sources + overwrite priority --------------------------------------
@@ -38,6 +42,8 @@ STATUSES = ('going', 'not_going', 'maybe', 'unknown')
 MAX_FILE_BYTES = 2 * 1024 * 1024
 MAX_ROWS = 2000
 MAX_COLS = 400
+MAX_SHEET_BYTES = 32 * 1024 * 1024            # uncompressed worksheet XML
+MAX_SHARED_STRINGS_BYTES = 16 * 1024 * 1024   # larger string tables are ignored
 
 _EMAIL_RE = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
 _PHONE_RE = re.compile(r'(?<!\d)(?:\+?\d[\d \-]{7,}\d)(?!\d)')
@@ -139,50 +145,99 @@ def _col_to_idx(ref):
     return idx - 1
 
 
+class _SharedStrings:
+    """`xl/sharedStrings.xml`, parsed on demand: entries are read with
+    iterparse only as far as the highest index a cell has asked for, and each
+    parsed <si> is cleared once its text is taken."""
+
+    def __init__(self, zf, name):
+        self._items = []
+        self._events = None
+        if name and zf.getinfo(name).file_size <= MAX_SHARED_STRINGS_BYTES:
+            self._events = ET.iterparse(zf.open(name), events=('end',))
+
+    def get(self, i):
+        while i >= len(self._items) and self._events is not None:
+            self._advance()
+        return self._items[i] if 0 <= i < len(self._items) else ''
+
+    def _advance(self):
+        try:
+            _ev, el = next(self._events)
+        except StopIteration:
+            self._events = None
+            return
+        except ET.ParseError:
+            self._events = None
+            raise
+        if el.tag == '%ssi' % _XLSX_NS:
+            self._items.append(''.join(t.text or '' for t in el.iter('%st' % _XLSX_NS)))
+            el.clear()
+
+
+def _xlsx_cell_value(c, shared):
+    t = c.get('t')
+    v = c.find('%sv' % _XLSX_NS)            # cached value only; <f> ignored
+    if t == 's' and v is not None and v.text is not None:
+        try:
+            return shared.get(int(v.text))
+        except ValueError:
+            return ''
+    if t == 'inlineStr':
+        isn = c.find('%sis' % _XLSX_NS)
+        return ''.join(tt.text or '' for tt in isn.iter('%st' % _XLSX_NS)) if isn is not None else ''
+    return v.text if (v is not None and v.text is not None) else ''
+
+
+def _iter_xlsx_rows(zf, sheet_name, shared):
+    """Sanitized rows of a worksheet, streamed: each <row> is turned into a
+    list as soon as it is complete and then cleared, so memory stays at about
+    one row however large the sheet is."""
+    row_tag, c_tag = '%srow' % _XLSX_NS, '%sc' % _XLSX_NS
+    col_of = {}            # 'AB' -> 27; refs repeat on every row
+    clean = {}             # raw value -> sanitized (statuses repeat on every row)
+    for _ev, el in ET.iterparse(zf.open(sheet_name), events=('end',)):
+        if el.tag != row_tag:
+            continue
+        cells = {}
+        for c in el.findall(c_tag):
+            letters = c.get('r', '').rstrip('0123456789')
+            ci = col_of.get(letters, -1)
+            if ci == -1:
+                ci = col_of[letters] = _col_to_idx(letters)
+            if ci is None or ci >= MAX_COLS:
+                continue
+            val = _xlsx_cell_value(c, shared)
+            out = clean.get(val)
+            if out is None:
+                out = clean[val] = _sanitize_cell(val)
+            cells[ci] = out
+        width = (max(cells) + 1) if cells else 0
+        yield [cells.get(i, '') for i in range(width)]
+        el.clear()
+
+
 def _read_xlsx(data):
     try:
         zf = zipfile.ZipFile(io.BytesIO(data))
     except Exception:
         raise AttendanceImportError('Soubor není platný XLSX.')
     names = zf.namelist()
-    # shared strings
-    shared = []
-    if 'xl/sharedStrings.xml' in names:
-        if zf.getinfo('xl/sharedStrings.xml').file_size <= 16 * 1024 * 1024:
-            root = ET.fromstring(zf.read('xl/sharedStrings.xml'))
-            for si in root.findall('%ssi' % _XLSX_NS):
-                shared.append(''.join(t.text or '' for t in si.iter('%st' % _XLSX_NS)))
     # first worksheet
     sheet_name = next((n for n in names if re.match(r'xl/worksheets/sheet\d+\.xml$', n)), None)
     if not sheet_name:
         raise AttendanceImportError('XLSX neobsahuje žádný list.')
-    if zf.getinfo(sheet_name).file_size > 32 * 1024 * 1024:
+    if zf.getinfo(sheet_name).file_size > MAX_SHEET_BYTES:
         raise AttendanceImportError('XLSX list je příliš velký.')
-    root = ET.fromstring(zf.read(sheet_name))
+    shared = _SharedStrings(zf, 'xl/sharedStrings.xml' if 'xl/sharedStrings.xml' in names else None)
     grid = []
-    for r_i, row in enumerate(root.iter('%srow' % _XLSX_NS)):
-        if r_i >= MAX_ROWS:
-            break
-        cells = {}
-        for c in row.findall('%sc' % _XLSX_NS):
-            ci = _col_to_idx(c.get('r', ''))
-            if ci is None or ci >= MAX_COLS:
-                continue
-            t = c.get('t')
-            v = c.find('%sv' % _XLSX_NS)            # cached value only; <f> ignored
-            if t == 's' and v is not None and v.text is not None:
-                try:
-                    val = shared[int(v.text)]
-                except (ValueError, IndexError):
-                    val = ''
-            elif t == 'inlineStr':
-                isn = c.find('%sis' % _XLSX_NS)
-                val = ''.join(tt.text or '' for tt in isn.iter('%st' % _XLSX_NS)) if isn is not None else ''
-            else:
-                val = v.text if (v is not None and v.text is not None) else ''
-            cells[ci] = _sanitize_cell(val)
-        width = (max(cells) + 1) if cells else 0
-        grid.append([cells.get(i, '') for i in range(width)])
+    try:
+        for row in _iter_xlsx_rows(zf, sheet_name, shared):
+            if len(grid) >= MAX_ROWS:
+                break
+            grid.append(row)
+    except (ET.ParseError, zipfile.BadZipFile, EOFError):
+        raise AttendanceImportError('Soubor není platný XLSX.')
     return grid
 
 
@@ -352,7 +407,8 @@ def _match_event(team_id, ev, local_events, tymuj_keys):
     nt = _norm(ev.get('title') or '')
     for le in local_events:
         if le.day.isoformat() == d and (not nt or _norm(le.title or '').find(nt) >= 0 or nt.find(_norm(le.title or '')) >= 0):
-            return 'local', 'local:%d' % le.id, '%s %s' % (d, le.title or '')
+            key = getattr(le, 'key', None) or 'local:%d' % le.id     # Occurrence | TrainingEvent
+            return 'local', key, '%s %s' % (d, le.title or '')
     for k in tymuj_keys.get(d, []):
         # tymuj_keys[date] = list of (key, title)
         kt = _norm(k[1])
@@ -365,16 +421,19 @@ def build_import_preview(team_id, parsed):
     """Build a full preview WITHOUT any DB writes."""
     existing_players = Player.query.filter_by(team_id=team_id).all()
     local_events = TrainingEvent.query.filter_by(team_id=team_id).all()
-    # cached tymuj events grouped by date for matching
+    # cached tymuj events grouped by date for matching (only the imported span)
     tymuj_keys = {}
-    payload_events = (tymuj_svc._cache_payload(team_id).get('events') or [])
-    for it in payload_events:
-        d = it.get('day')
-        if not d:
-            continue
-        k = tymuj_svc.make_event_key(it.get('title') or '', date.fromisoformat(d),
-                                     it.get('time') or '', it.get('kind') or 'training', 'tymuj')
-        tymuj_keys.setdefault(d, []).append((k, it.get('title') or ''))
+    days = []
+    for ev in parsed['events']:
+        try:
+            days.append(date.fromisoformat(ev.get('date') or ''))
+        except ValueError:
+            pass
+    if days:
+        local_events += event_series.occurrences(team_id, min(days), max(days))
+        for it in tymuj_svc.get_cached_events(team_id, min(days), max(days),
+                                              include_cancelled=True):
+            tymuj_keys.setdefault(it['day'].isoformat(), []).append((it['event_key'], it['title']))
 
     players_view = []
     for p in parsed['players']:
@@ -425,32 +484,40 @@ def confirm_import(team_id, parsed, player_decisions, event_decisions, *,
     db.session.add(batch)
     db.session.flush()                       # get batch.id
     warnings = list(parsed.get('warnings') or [])
-    players_created = events_created = imported = skipped = overwritten = 0
+    imported = skipped = overwritten = 0
 
     # resolve players idx -> player_id (or None if ignored)
-    p_resolved = {}
+    decisions = {}
     for p in parsed['players']:
         dec = (player_decisions.get(str(p['idx'])) or player_decisions.get(p['idx']) or 'create')
-        if dec == 'ignore':
-            continue
+        if dec != 'ignore':
+            decisions[p['idx']] = dec
+    merge_ids = {}
+    for idx, dec in decisions.items():
         if isinstance(dec, str) and dec.startswith('merge:'):
             try:
-                pid = int(dec.split(':', 1)[1])
+                merge_ids[idx] = int(dec.split(':', 1)[1])
             except ValueError:
-                pid = None
-            if pid and Player.query.filter_by(id=pid, team_id=team_id).first():
-                p_resolved[p['idx']] = pid
+                pass
+    valid_ids = set()
+    if merge_ids:
+        valid_ids = {pid for (pid,) in db.session.query(Player.id).filter(
+            Player.team_id == team_id, Player.id.in_(sorted(set(merge_ids.values()))))}
+    p_resolved = {}
+    new_players = {}
+    for p in parsed['players']:
+        dec = decisions.get(p['idx'])
+        if dec is None:
             continue
-        # create
-        pl = Player(team_id=team_id, name=p['name'][:100], position='F')
-        db.session.add(pl)
-        db.session.flush()
-        p_resolved[p['idx']] = pl.id
-        players_created += 1
+        if isinstance(dec, str) and dec.startswith('merge:'):
+            if merge_ids.get(p['idx']) in valid_ids:
+                p_resolved[p['idx']] = merge_ids[p['idx']]
+            continue
+        new_players[p['idx']] = Player(team_id=team_id, name=p['name'][:100], position='F')
 
     # resolve events idx -> (event_key, meta)
-    ev_by_idx = {e['idx']: e for e in parsed['events']}
     e_resolved = {}
+    new_events = {}
     for ev in parsed['events']:
         dec = (event_decisions.get(str(ev['idx'])) or event_decisions.get(ev['idx']) or '')
         if dec == 'ignore' or not dec:
@@ -461,15 +528,34 @@ def confirm_import(team_id, parsed, player_decisions, event_decisions, *,
         if dec == 'create':
             if not ev.get('date'):
                 continue
-            te = TrainingEvent(team_id=team_id, day=date.fromisoformat(ev['date']),
-                               time=(ev.get('time') or '')[:10], title=(ev.get('title') or 'Trénink')[:200],
-                               kind='training')
-            db.session.add(te)
-            db.session.flush()
-            e_resolved[ev['idx']] = ('local:%d' % te.id, ev)
-            events_created += 1
-
-    # write attendance cells
+            new_events[ev['idx']] = TrainingEvent(
+                team_id=team_id, day=date.fromisoformat(ev['date']),
+                time=(ev.get('time') or '')[:10], title=(ev.get('title') or 'Trénink')[:200],
+                kind='training')
+    # one flush assigns every new player/event id
+    if new_players or new_events:
+        db.session.add_all(list(new_players.values()) + list(new_events.values()))
+        db.session.flush()
+    for idx, pl in new_players.items():
+        p_resolved[idx] = pl.id
+    ev_by_idx = {e['idx']: e for e in parsed['events']}
+    for idx, te in new_events.items():
+        e_resolved[idx] = ('local:%d' % te.id, ev_by_idx[idx])
+    players_created, events_created = len(new_players), len(new_events)
+
+    # write attendance cells: existing rows prefetched in one query, then one
+    # executemany INSERT and one bulk UPDATE (by primary key)
+    cells = {}                 # (player_id, event_key) -> ('db', id, source) | ('new', row)
+    if p_resolved and e_resolved:
+        for eid, pid, key, src in (
+                db.session.query(AttendanceEntry.id, AttendanceEntry.player_id,
+                                 AttendanceEntry.event_key, AttendanceEntry.source)
+                .filter(AttendanceEntry.team_id == team_id,
+                        AttendanceEntry.player_id.in_(sorted(set(p_resolved.values()))),
+                        AttendanceEntry.event_key.in_(sorted({k for k, _ in e_resolved.values()})))
+                .order_by(AttendanceEntry.id.asc())):
+            cells.setdefault((pid, key), ('db', eid, src))
+    inserts, updates = [], {}
     for cell in parsed['cells']:
         pid = p_resolved.get(cell['p'])
         ev_res = e_resolved.get(cell['e'])
@@ -481,34 +567,42 @@ def confirm_import(team_id, parsed, player_decisions, event_decisions, *,
         if status not in ('going', 'not_going', 'maybe'):
             skipped += 1
             continue
-        existing = AttendanceEntry.query.filter_by(team_id=team_id, player_id=pid, event_key=ev_key).first()
-        if existing:
-            if existing.source in COACHHUB_SOURCES:
-                skipped += 1                 # never overwrite CoachHub attendance
-                continue
-            if not overwrite_imported:
-                skipped += 1
-                continue
-            existing.status = status
-            existing.source = SOURCE_IMPORT
-            existing.source_detail = str(batch.id)
-            existing.updated_by_role = role
-            existing.imported_at = now
-            existing.updated_at = now
-            overwritten += 1
+        state = cells.get((pid, ev_key))
+        if state is None:
+            row = {
+                'team_id': team_id, 'player_id': pid, 'event_key': ev_key, 'status': status,
+                'event_title': (ev.get('title') or '')[:200],
+                'event_day': date.fromisoformat(ev['date']) if ev.get('date') else now.date(),
+                'event_time': (ev.get('time') or '')[:10],
+                'event_kind': 'training',
+                'event_source': ('tymuj' if ev_key and not ev_key.startswith(('local:', event_series.KEY_PREFIX))
+                                 else 'local'),
+                'source': SOURCE_IMPORT, 'source_detail': str(batch.id), 'updated_by_role': role,
+                'imported_at': now, 'updated_at': now,
+            }
+            inserts.append(row)
+            cells[(pid, ev_key)] = ('new', row)
+            imported += 1
+            continue
+        if state[0] == 'db' and state[2] in COACHHUB_SOURCES:
+            skipped += 1                     # never overwrite CoachHub attendance
             continue
-        entry = AttendanceEntry(
-            team_id=team_id, player_id=pid, event_key=ev_key, status=status,
-            event_title=(ev.get('title') or '')[:200],
-            event_day=date.fromisoformat(ev['date']) if ev.get('date') else now.date(),
-            event_time=(ev.get('time') or '')[:10],
-            event_kind='training',
-            event_source=('tymuj' if ev_key and not ev_key.startswith('local:') else 'local'),
-            source=SOURCE_IMPORT, source_detail=str(batch.id), updated_by_role=role,
-            imported_at=now, updated_at=now,
-        )
-        db.session.add(entry)
-        imported += 1
+        if not overwrite_imported:
+            skipped += 1
+            continue
+        if state[0] == 'new':                # repeated cell in this file: last one wins
+            state[1]['status'] = status
+        else:
+            updates[state[1]] = {'id': state[1], 'status': status, 'source': SOURCE_IMPORT,
+                                 'source_detail': str(batch.id), 'updated_by_role': role,
+                                 'imported_at': now, 'updated_at': now}
+        overwritten += 1
+    if inserts:
+        db.session.execute(AttendanceEntry.__table__.insert(), inserts)
+    if updates:
+        db.session.execute(update(AttendanceEntry), list(updates.values()))
+    # Bulk statements bypass the flush hook.
+    team_revision.bump(team_id)
 
     batch.players_created = players_created
     batch.events_created = events_created
@@ -3,8 +3,13 @@
 Pure functions over already-loaded events/players/entries (no DB access here,
 so callers load once and avoid N+1). Statuses: going|not_going|maybe|unknown
 (missing entry = unknown / "no response").
+
+`build_matrix_view` aggregates over an `AttendanceGrid` (one status byte per
+player x event); `python -m coach.scripts.bench_attendance_matrix` compares it
+with the former dict-per-cell engine.
 """
 from datetime import date, timedelta
+from itertools import compress
 
 STATUSES = ('going', 'not_going', 'maybe', 'unknown')
 
@@ -67,29 +72,93 @@ def _empty_counts():
     return {'going': 0, 'not_going': 0, 'maybe': 0, 'unknown': 0}
 
 
-def build_matrix_view(events, players, entries, today=None):
-    today = today or date.today()
-    smap = {}                      # (player_id, event_key) -> status
-    for e in entries:
-        smap[(e.player_id, e.event_key)] = e.status or 'unknown'
+# Grid cell codes; 0 is "no response", so a fresh grid is all unknown.
+_CODE = {'unknown': 0, 'going': 1, 'not_going': 2, 'maybe': 3}
+_BY_CODE = ('unknown', 'going', 'not_going', 'maybe')
+# bytes.translate tables: cell -> 1 where it holds the code, else 0
+_IS = tuple(bytes(int(i == code) for i in range(256)) for code in range(4))
+_POSITIONS = ('G', 'D', 'F')
+
+
+class AttendanceGrid:
+    """Players x events status grid: one byte per cell in a flat bytearray.
+
+    Columns are the events in chronological order, stored contiguously
+    (cell = col * n_players + row), so one event is a plain slice and one
+    player a strided slice. Aggregates run over those slices with
+    bytes.count/translate and int bit operations instead of a dict lookup per
+    cell. Last entry per (player, event) wins, like the old status map.
+    """
+
+    def __init__(self, events, players, entries):
+        self.n_players = len(players)
+        self.order = sorted(range(len(events)),
+                            key=lambda j: (events[j]['day'], events[j].get('time') or ''))
+        self.col_of = [0] * len(events)
+        for col, j in enumerate(self.order):
+            self.col_of[j] = col
+        n = self.n_players
+        rows, cols = {}, {}            # player_id -> row, event_key -> column
+        dup_rows, dup_cols = [], []    # repeated ids/keys share their first slot's cells
+        for r, p in enumerate(players):
+            if p.id in rows:
+                dup_rows.append((r, rows[p.id]))
+            else:
+                rows[p.id] = r
+        for col, j in enumerate(self.order):
+            key = events[j]['key']
+            if key in cols:
+                dup_cols.append((col, cols[key]))
+            else:
+                cols[key] = col
+        self.smap = {}                 # (player_id, event_key) -> status
+        cells = bytearray(n * len(events))
+        for e in entries:
+            st = self.smap[(e.player_id, e.event_key)] = e.status or 'unknown'
+            r, col = rows.get(e.player_id), cols.get(e.event_key)
+            if r is not None and col is not None:
+                cells[col * n + r] = _CODE.get(st, 0)
+        for col, src in dup_cols:
+            cells[col * n:(col + 1) * n] = cells[src * n:(src + 1) * n]
+        for r, src in dup_rows:
+            cells[r::n] = cells[src::n]
+        self.cells = cells
+
+    def column(self, j):
+        """Statuses of event `j` (input order), one byte per player."""
+        start = self.col_of[j] * self.n_players
+        return self.cells[start:start + self.n_players]
+
+    def row(self, r):
+        """Statuses of player `r`, one byte per event in chronological order."""
+        return self.cells[r::self.n_players]
 
-    def status_of(pid, key):
-        return smap.get((pid, key), 'unknown')
 
+def _bits(flags):
+    """0/1 byte flags -> int with bit 8*i set for every flagged slot i."""
+    return int.from_bytes(flags, 'little')
+
+
+def build_matrix_view(events, players, entries, today=None):
+    today = today or date.today()
+    grid = AttendanceGrid(events, players, entries)
     n_players = len(players)
+    names = [p.name for p in players]
+    pos_bits = {pos: _bits(bytes((p.position if p.position in _POSITIONS else 'F') == pos
+                                 for p in players))
+                for pos in _POSITIONS}
     # ---- events ----
     events_view = []
-    for ev in events:
-        is_match = (ev.get('kind') == 'match')
-        c = _empty_counts()
-        by_pos = {'G': _empty_counts(), 'D': _empty_counts(), 'F': _empty_counts()}
-        names = {'going': [], 'not_going': [], 'maybe': [], 'unknown': []}
-        for p in players:
-            st = status_of(p.id, ev['key'])
-            c[st] += 1
-            pos = p.position if p.position in by_pos else 'F'
-            by_pos[pos][st] += 1
-            names[st].append(p.name)
+    for j, ev in enumerate(events):
+        col = grid.column(j)
+        c, by_pos, who = {}, {pos: {} for pos in _POSITIONS}, {}
+        for st in STATUSES:
+            flags = col.translate(_IS[_CODE[st]])
+            bits = _bits(flags)
+            c[st] = bits.bit_count()
+            for pos in _POSITIONS:
+                by_pos[pos][st] = (bits & pos_bits[pos]).bit_count()
+            who[st] = list(compress(names, flags))
         d = ev['day']
         pct = _pct(c['going'], n_players)
         events_view.append({
@@ -100,49 +169,41 @@ def build_matrix_view(events, players, entries, today=None):
             'kind': ev.get('kind') or 'training', 'source': ev.get('source') or 'local',
             'is_upcoming': d >= today,
             'summary': {**c, 'total': n_players, 'pct': pct, 'color': _color(pct, n_players)},
-            'by_position': by_pos, 'names': names,
+            'by_position': by_pos, 'names': who,
         })
 
     n_events = len(events)
     n_train = sum(1 for e in events if e.get('kind') != 'match')
     n_games = n_events - n_train
-    # chronological event keys (for streaks / recent history)
-    chron = sorted(events, key=lambda e: (e['day'], e.get('time') or ''))
-    past_chron = [e for e in chron if e['day'] <= today]
+    # masks over the chronological columns; past events are a prefix of them
+    chron = [events[j] for j in grid.order]
+    n_past = sum(1 for e in chron if e['day'] <= today)
+    train_bits = _bits(bytes(e.get('kind') != 'match' for e in chron))
+    past_bits = _bits(b'\x01' * n_past)
+    recent_from = max(0, n_past - 10)
+    recent_meta = [(e['key'], e['day'].isoformat(), e.get('kind') or 'training')
+                   for e in chron[recent_from:n_past]]
 
     # ---- players ----
     players_view = []
-    for p in players:
-        c = _empty_counts()
-        tr = {'going': 0, 'total': 0}
-        gm = {'going': 0, 'total': 0}
-        for ev in events:
-            st = status_of(p.id, ev['key'])
-            c[st] += 1
-            if ev.get('kind') == 'match':
-                gm['total'] += 1
-                gm['going'] += (st == 'going')
-            else:
-                tr['total'] += 1
-                tr['going'] += (st == 'going')
+    for r, p in enumerate(players):
+        row = grid.row(r)
+        c = {st: row.count(_CODE[st]) for st in STATUSES}
+        going = _bits(row.translate(_IS[_CODE['going']]))
+        tr_going = (going & train_bits).bit_count()
+        tr = {'going': tr_going, 'total': n_train}
+        gm = {'going': c['going'] - tr_going, 'total': n_games}
         # streak: consecutive 'going' from the most recent past event backwards
-        streak = 0
-        for ev in reversed(past_chron):
-            if status_of(p.id, ev['key']) == 'going':
-                streak += 1
-            else:
-                break
+        run = going & past_bits
+        missed = past_bits ^ run
+        streak = n_past - (missed.bit_length() + 7) // 8
         # longest run of consecutive 'going' across past events
-        longest = run = 0
-        for ev in past_chron:
-            if status_of(p.id, ev['key']) == 'going':
-                run += 1
-                longest = max(longest, run)
-            else:
-                run = 0
-        recent = [{'key': ev['key'], 'status': status_of(p.id, ev['key']),
-                   'day': ev['day'].isoformat(), 'kind': ev.get('kind') or 'training'}
-                  for ev in past_chron[-10:]]
+        longest = 0
+        while run:
+            longest += 1
+            run &= run >> 8
+        recent = [{'key': key, 'status': _BY_CODE[code], 'day': day, 'kind': kind}
+                  for (key, day, kind), code in zip(recent_meta, row[recent_from:n_past])]
         pct = _pct(c['going'], n_events)
         players_view.append({
             'id': p.id, 'name': p.name, 'position': p.position or 'F',
@@ -175,7 +236,7 @@ def build_matrix_view(events, players, entries, today=None):
     }
     # compact status map for the client (non-unknown only)
     client_map = {}
-    for (pid, key), st in smap.items():
+    for (pid, key), st in grid.smap.items():
         if st and st != 'unknown':
             client_map.setdefault(pid, {})[key] = st
 
@@ -189,6 +250,15 @@ def event_summary(players, entries_for_event):
     c = _empty_counts()
     for p in players:
         c[smap.get(p.id, 'unknown')] += 1
-    total = len(players)
+    return summary_from_counts(c, len(players))
+
+
+def summary_from_counts(counts, total):
+    """Event summary from per-status answer counts (e.g. a GROUP BY over one
+    event's entries); players without an answer count as unknown."""
+    c = _empty_counts()
+    for st in ('going', 'not_going', 'maybe'):
+        c[st] = int(counts.get(st) or 0)
+    c['unknown'] = max(0, total - c['going'] - c['not_going'] - c['maybe'])
     pct = _pct(c['going'], total)
     return {**c, 'total': total, 'pct': pct, 'color': _color(pct, total)}
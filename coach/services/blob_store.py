@@ -0,0 +1,142 @@
+"""Content-addressed blob store for drill images.
+
+Images live on disk under BLOB_FOLDER, named by the sha256 of their bytes
+(``<folder>/ab/abcdef...``), so identical snapshots are stored once however
+many drills or teams use them, and a stored file never changes: its URL can
+be cached forever. Rows keep only the 64-char hex digest (Drill.image_hash).
+
+Only image formats a browser renders as an image are accepted; anything else
+(HTML, SVG, garbage) is refused, because the files are served from our origin.
+Files are written atomically (temp file + rename), so a reader never sees a
+partial blob. Unreferenced blobs are removed by `sweep` (`flask blobs:gc`).
+"""
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+import time
+
+from flask import current_app
+
+# Magic bytes -> mimetype of the formats the drill editor produces or could.
+_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def mimetype(data: bytes):
+    """Image mimetype of `data` from its magic bytes, or None."""
+    for magic, mt in _SIGNATURES:
+        if data.startswith(magic):
+            return mt
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def is_digest(value) -> bool:
+    return (isinstance(value, str) and len(value) == 64
+            and all(c in '0123456789abcdef' for c in value))
+
+
+def _root():
+    return current_app.config['BLOB_FOLDER']
+
+
+def path_for(digest: str) -> str:
+    return os.path.join(_root(), digest[:2], digest)
+
+
+def put(data: bytes):
+    """Store image bytes; returns their digest, or None if not an image."""
+    if not data or mimetype(data) is None:
+        return None
+    digest = hashlib.sha256(data).hexdigest()
+    path = path_for(digest)
+    if os.path.exists(path):
+        return digest
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return digest
+
+
+def get(digest: str):
+    """The stored bytes, or None when the digest is malformed or missing."""
+    if not is_digest(digest):
+        return None
+    try:
+        with open(path_for(digest), 'rb') as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+def locate(digest: str):
+    """(path, mimetype) of a stored blob for streaming it, or None."""
+    if not is_digest(digest):
+        return None
+    path = path_for(digest)
+    try:
+        with open(path, 'rb') as fh:
+            head = fh.read(16)
+    except OSError:
+        return None
+    mt = mimetype(head)
+    return (path, mt) if mt else None
+
+
+def decode_data_url(value):
+    """Bytes of a ``data:image/...;base64,`` URL (or bare base64), else None."""
+    if not value or not isinstance(value, str):
+        return None
+    b64 = value.split(',', 1)[1] if ',' in value else value
+    try:
+        return base64.b64decode(b64, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def put_data_url(value):
+    """Store the image of a data URL posted by the drill editor; its digest or None."""
+    return put(decode_data_url(value) or b'')
+
+
+def sweep(referenced, min_age=3600):
+    """Delete blobs whose digest is not in `referenced` and that are older than
+    `min_age` seconds (a blob written by a request still in flight is younger).
+    Returns the number of files removed."""
+    root = _root()
+    cutoff = time.time() - min_age
+    removed = 0
+    if not os.path.isdir(root):
+        return 0
+    for shard in os.listdir(root):
+        folder = os.path.join(root, shard)
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            if name in referenced:
+                continue
+            fpath = os.path.join(folder, name)
+            try:
+                if os.stat(fpath).st_mtime < cutoff:
+                    os.remove(fpath)
+                    removed += 1
+            except OSError:
+                continue
+    return removed
@@ -0,0 +1,85 @@
+"""Process-level LRU of decoded integration payloads and built view models.
+
+The Týmuj status payload and the league `data_json` are stored as JSON text and
+only change when a refresh writes them. Decoding them (and, for the league,
+re-running team matching / form building) on every dashboard hit is wasted work
+on a single long-lived worker, so callers keep the decoded result here:
+
+    value = decoded_cache.get(key)
+    if value is None:
+        value = build()
+        decoded_cache.put(key, value, cost=len(raw_json))
+
+Keys must change whenever the source data changes — callers include the team's
+data revision token (services/team_revision.py), which every write to the
+source row bumps, so stale entries are never hit; they just age out.
+
+The cache is bounded by an approximate memory budget, not an entry count:
+`cost` is the size of the JSON text the value was decoded from, multiplied by
+`_OVERHEAD` for the Python object graph. `DECODED_CACHE_MAX_BYTES` (env) sets
+the budget; 0 disables caching. Cached values are shared between requests and
+MUST be treated as read-only by callers.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    MAX_BYTES = max(0, int(os.getenv('DECODED_CACHE_MAX_BYTES', str(32 * 1024 * 1024))))
+except (TypeError, ValueError):
+    MAX_BYTES = 32 * 1024 * 1024
+
+# Decoded dict/list/str objects take several times the size of their JSON text.
+_OVERHEAD = 6
+
+_entries = OrderedDict()     # key -> (charged_bytes, value)
+_used = 0
+_lock = threading.Lock()
+
+
+def get(key):
+    """Cached value for `key` (marked most recently used), or None."""
+    with _lock:
+        hit = _entries.get(key)
+        if hit is None:
+            return None
+        _entries.move_to_end(key)
+        return hit[1]
+
+
+def put(key, value, cost: int = 0) -> None:
+    """Store `value`, evicting least recently used entries to stay within the
+    budget. Values that alone exceed the budget are not cached."""
+    global _used
+    charged = max(1, int(cost or 0)) * _OVERHEAD
+    if not MAX_BYTES or value is None or charged > MAX_BYTES:
+        return
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _used -= old[0]
+        while _entries and _used + charged > MAX_BYTES:
+            _k, (size, _v) = _entries.popitem(last=False)
+            _used -= size
+        _entries[key] = (charged, value)
+        _used += charged
+
+
+def invalidate(namespace=None, team_id=None) -> None:
+    """Drop entries by namespace (key[0]) and/or team (key[1]); all when both
+    are None. Keys are tuples of the form (namespace, team_id, ...)."""
+    global _used
+    with _lock:
+        if namespace is None and team_id is None:
+            _entries.clear()
+            _used = 0
+            return
+        for key in [k for k in _entries
+                    if (namespace is None or k[0] == namespace)
+                    and (team_id is None or k[1] == team_id)]:
+            _used -= _entries.pop(key)[0]
+
+
+def stats() -> dict:
+    with _lock:
+        return {'entries': len(_entries), 'bytes': _used, 'max_bytes': MAX_BYTES}
@@ -0,0 +1,49 @@
+"""Drill snapshot + thumbnail, both kept in services.blob_store.
+
+The editor posts a ~900 px PNG snapshot. Library and picker cards show it at
+52-300 CSS px, so a small WebP (PNG where Pillow lacks WebP) is generated when
+the drill is saved and the pages link that instead: a 40-drill library page
+stays in the tens of kilobytes. The detail page and PDF export keep using the
+full snapshot.
+"""
+import io
+
+from PIL import Image, features
+
+from coach.services import blob_store
+
+THUMB_BOX = (480, 360)
+_WEBP = features.check('webp')
+
+
+def thumbnail(data: bytes):
+    """Encoded thumbnail of image bytes, or None if they do not decode."""
+    try:
+        im = Image.open(io.BytesIO(data))
+        im.thumbnail(THUMB_BOX, Image.LANCZOS)
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGBA')
+        out = io.BytesIO()
+        if _WEBP:
+            im.save(out, 'WEBP', quality=80, method=4)
+        else:
+            im.save(out, 'PNG', optimize=True)
+        return out.getvalue()
+    except Exception:
+        return None
+
+
+def store_snapshot(data_url):
+    """(image_hash, thumb_hash) for an editor data URL; (None, None) when it
+    is not an image. The thumbnail is best effort (None on failure)."""
+    raw = blob_store.decode_data_url(data_url)
+    image_hash = blob_store.put(raw or b'')
+    if image_hash is None:
+        return None, None
+    return image_hash, blob_store.put(thumbnail(raw) or b'')
+
+
+def thumb_for(image_hash):
+    """Thumbnail digest for an already stored snapshot (backfill)."""
+    raw = blob_store.get(image_hash)
+    return blob_store.put(thumbnail(raw) or b'') if raw else None
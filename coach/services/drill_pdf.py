@@ -0,0 +1,262 @@
+"""Drill sheet PDF engine used by drills.export_drills_pdf.
+
+One A4 page per drill: title, category/duration line and up to six
+description lines as real (searchable) text, a rule, and the drill snapshot
+fitted below, written with services.pdf_writer. A snapshot is embedded once
+per document however many pages show it. Three parts:
+
+  * image cache — the only expensive step is turning a snapshot into a PDF
+    image stream (decode, flatten onto white, zlib). The result is kept on
+    disk under PAGE_CACHE_FOLDER, named by the sha256 of the snapshot digest
+    plus LAYOUT_VERSION, so re-exporting a session only lays out text. Bump
+    LAYOUT_VERSION whenever `prepare_image` output changes. Files unused for
+    CACHE_RETENTION_DAYS are pruned after exports;
+  * process pool — off by default: preparing a snapshot takes ~25 ms, less
+    than starting workers, and production is one web worker. PDF_WORKERS=N
+    (N >= 2, env) prepares uncached snapshots in a lazily started, reused
+    `spawn` pool of N processes. Each pool call is bounded by POOL_TIMEOUT;
+    if the pool breaks or times out it is shut down, the export is prepared
+    serially, and the pool stays off for the rest of the process;
+  * fonts — the standard Helvetica faces, written once per document; their
+    metrics are a table in pdf_writer, nothing is loaded.
+
+`prepare_image` runs in the workers on a blob-store path, so no app context
+or image bytes cross the process boundary. `write` needs no app context
+either (scripts/bench_pdf_export.py calls it directly).
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from PIL import Image
+
+from coach.services import blob_store
+from coach.services.pdf_writer import A4, Page, PdfWriter, wrap
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_VERSION = 2
+CACHE_RETENTION_DAYS = 30
+MARGIN = 36
+
+POOL_TIMEOUT = 30                        # seconds for one export's pool call
+
+
+def _env_workers():
+    try:
+        return max(0, int(os.getenv('PDF_WORKERS') or 0))
+    except ValueError:
+        return 0
+
+
+WORKERS = _env_workers()
+
+_pool = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+
+
+# ----------------------------- layout -----------------------------
+def page_spec(drill):
+    """Everything drawn on the drill's page, as a plain dict."""
+    return {
+        'title': drill.name or 'Bez názvu',
+        'category': drill.category or '',
+        'duration': drill.duration or 0,
+        'description': (drill.description or '').strip(),
+        'image_hash': drill.image_hash or '',
+    }
+
+
+def compose_page(spec, image=None, image_size=None):
+    """The `Page` for `spec`; `image` is the snapshot's resource name."""
+    page = Page(A4)
+    right = page.width - MARGIN
+    y = MARGIN
+    page.text(MARGIN, y, spec['title'], size=18, bold=True); y += 24
+    sub = []
+    if spec['category']: sub.append(f"Kategorie: {spec['category']}")
+    if spec['duration']: sub.append(f"Doba: {spec['duration']} min")
+    if sub:
+        page.text(MARGIN, y, '  •  '.join(sub), size=12); y += 18
+    if spec['description']:
+        for line in wrap(spec['description'], 12, right - MARGIN, max_lines=6):
+            page.text(MARGIN, y, line, size=12); y += 16
+        y += 8
+    page.line(MARGIN, y, right, y, width=0.5, gray=0.7); y += 8
+    top, bottom = y, page.height - MARGIN
+    if image is None:
+        page.text(MARGIN, top, '(Bez náhledu cvičení)', size=12)
+        return page
+    box_w, box_h = right - MARGIN, bottom - top
+    iw, ih = image_size
+    scale = min(box_w / iw, box_h / ih)
+    w, h = iw * scale, ih * scale
+    page.image(image, MARGIN + (box_w - w) / 2, top + (box_h - h) / 2, w, h)
+    return page
+
+
+def prepare_image(path):
+    """(width, height, zlib RGB stream) of a snapshot file flattened onto
+    white, or None. Runs in pool workers (no app context)."""
+    try:
+        with Image.open(path) as im:
+            im = im.convert('RGBA')
+    except Exception:
+        return None
+    bg = Image.new('RGB', im.size, 'white')
+    bg.paste(im, mask=im.split()[3])
+    return bg.size[0], bg.size[1], zlib.compress(bg.tobytes(), 6)
+
+
+def write(specs, images, fh):
+    """Write one page per spec to `fh`. `images` maps image_hash to a
+    `prepare_image` result; each is embedded on first use only."""
+    pdf = PdfWriter(fh)
+    for spec in specs:
+        prepared = images.get(spec['image_hash'])
+        if prepared is None:
+            pdf.add_page(compose_page(spec))
+            continue
+        w, h, data = prepared
+        name = pdf.add_image(spec['image_hash'], (w, h), data, compressed=True)
+        pdf.add_page(compose_page(spec, name, (w, h)))
+    pdf.close()
+
+
+# ----------------------------- image cache -----------------------------
+def _cache_dir():
+    return current_app.config['PAGE_CACHE_FOLDER']
+
+
+def _cache_key(image_hash):
+    return hashlib.sha256(b'%d:%s' % (LAYOUT_VERSION, image_hash.encode('ascii'))).hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(_cache_dir(), key + '.img')
+
+
+def _cache_get(key):
+    path = _cache_path(key)
+    try:
+        with open(path, 'rb') as fh:
+            header = fh.readline().split()
+            data = fh.read()
+        os.utime(path)                   # keeps used entries out of `prune_cache`
+        return int(header[0]), int(header[1]), data
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _cache_put(key, prepared):
+    folder = _cache_dir()
+    w, h, data = prepared
+    try:
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(b'%d %d\n' % (w, h))
+            fh.write(data)
+        os.replace(tmp, _cache_path(key))
+    except OSError as exc:
+        logger.warning('drill image cache write failed: %s', exc)
+
+
+def prune_cache(retention_days=CACHE_RETENTION_DAYS):
+    """Remove cache files not used for `retention_days`. Best effort."""
+    folder = _cache_dir()
+    cutoff = time.time() - retention_days * 86400
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return
+    for name in names:
+        fpath = os.path.join(folder, name)
+        try:
+            if os.stat(fpath).st_mtime < cutoff:
+                os.remove(fpath)
+        except OSError:
+            continue
+
+
+# ----------------------------- process pool -----------------------------
+def _executor():
+    global _pool
+    if WORKERS < 2 or _pool_failed:
+        return None
+    with _pool_lock:
+        if _pool is None and not _pool_failed:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is None:
+        return
+    # A hung worker ignores shutdown(); terminate what is still running.
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for proc in processes:
+        try:
+            proc.terminate()
+        except Exception:
+            pass
+
+
+def _disable_pool():
+    """Shut the pool down for good: a pool that broke or hung once (workers
+    that cannot start, a stuck decode) would do it again on every export."""
+    global _pool_failed
+    _pool_failed = True
+    _shutdown_pool()
+
+
+def _prepare_all(paths):
+    """`prepare_image` of each path, in order; in the pool when enabled."""
+    pool = _executor() if len(paths) > 1 else None
+    if pool is not None:
+        try:
+            return list(pool.map(prepare_image, paths, timeout=POOL_TIMEOUT))
+        except (BrokenProcessPool, FuturesTimeout, OSError) as exc:
+            logger.warning('drill PDF pool failed, disabled; preparing serially: %r', exc)
+            _disable_pool()
+    return [prepare_image(p) for p in paths]
+
+
+# ----------------------------- export -----------------------------
+def export(drills, path):
+    """Write the drills' sheet to `path`, one page each in the given order.
+    Returns {'pages', 'images', 'cached', 'rendered'} (counts of snapshots
+    read from the cache / prepared now)."""
+    specs = [page_spec(d) for d in drills]
+    images, todo = {}, {}
+    for digest in dict.fromkeys(s['image_hash'] for s in specs if s['image_hash']):
+        prepared = _cache_get(_cache_key(digest))
+        if prepared is not None:
+            images[digest] = prepared
+            continue
+        located = blob_store.locate(digest)
+        if located:
+            todo[digest] = located[0]
+    cached = len(images)
+    for digest, prepared in zip(todo, _prepare_all(list(todo.values()))):
+        if prepared is not None:
+            images[digest] = prepared
+            _cache_put(_cache_key(digest), prepared)
+    with open(path, 'wb') as fh:
+        write(specs, images, fh)
+    return {'pages': len(specs), 'images': len(images), 'cached': cached, 'rendered': len(todo)}
@@ -0,0 +1,272 @@
+"""Per-team calendar index — one table the attendance pages read events from.
+
+`TeamEventIndex` holds every event `_collect_events_for_team` lists, whichever
+source it comes from, with its attendance key precomputed:
+
+  local   a TrainingEvent row            key `local:<id>`
+  series  a lazy series occurrence       key `series:<series_id>:<day>`
+  tymuj   a live (not cancelled) Týmuj   key `tymuj.make_event_key(...)`
+
+so a page reads one ordered (team_id, day) range — no per-request merge of the
+sources, no re-hashing, no Python sort.
+
+The index is derived data, written in the same transaction as its source:
+
+  * writes of TrainingEvent are mirrored from Session hooks: `after_flush`
+    for unit-of-work changes, `do_orm_execute` for bulk UPDATE/DELETE
+    statements run through the session (`Query.update()/delete()`,
+    `session.execute(delete(...))`), which re-index the rows their WHERE
+    clause selected before the statement ran. Statements sent on a bare
+    Connection are not seen. Only a missing index table (migration not
+    applied yet) is tolerated; any other index error fails the write;
+  * services/event_series.py re-lists what each series write touched: one
+    row for a single-occurrence edit (`set_series_occurrence`), the rows from
+    the split day on for "this and following", all of them otherwise
+    (`replace_series`);
+  * services/tymuj.py calls `replace_tymuj` when it swaps the team's events.
+
+`rebuild(team_id)` recomputes a team from the sources (`flask events:reindex`).
+"""
+import logging
+
+from sqlalchemy import String, cast, event, func, literal, select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from coach.extensions import db
+from coach.models import TeamEventIndex, TrainingEvent, TymujEvent
+
+logger = logging.getLogger(__name__)
+
+LOCAL = 'local'
+SERIES = 'series'
+TYMUJ = 'tymuj'
+
+_table = TeamEventIndex.__table__
+_warned = False
+# How SQLite, MySQL and PostgreSQL report a missing table.
+_MISSING_TABLE = ('no such table', "doesn't exist", 'does not exist')
+
+
+def _local_select(where):
+    """INSERT ... SELECT source for the TrainingEvent rows matching `where`,
+    with the defaults `_collect_events_for_team` always applied."""
+    return select(
+        TrainingEvent.team_id, TrainingEvent.day,
+        func.coalesce(TrainingEvent.time, ''),
+        func.coalesce(func.nullif(TrainingEvent.title, ''), 'Trénink'),
+        func.coalesce(func.nullif(TrainingEvent.kind, ''), 'training'),
+        literal(LOCAL, String),
+        literal('local:', String) + cast(TrainingEvent.id, String),
+        TrainingEvent.id, TrainingEvent.series_id,
+    ).where(TrainingEvent.team_id.isnot(None), *where)
+
+
+_COLUMNS = ('team_id', 'day', 'time', 'title', 'kind', 'source', 'event_key', 'local_id',
+            'series_id')
+
+
+def drop_local(where, session=None):
+    """Remove the index rows of the TrainingEvents matching `where` (before
+    they are deleted: afterwards nothing matches)."""
+    session = session or db.session
+    ids = select(TrainingEvent.id).where(*where)
+    session.execute(_table.delete().where(_table.c.local_id.in_(ids)))
+
+
+def sync_local(where, session=None):
+    """Re-index the TrainingEvents matching `where` (after they changed)."""
+    session = session or db.session
+    drop_local(where, session)
+    session.execute(_table.insert().from_select(_COLUMNS, _local_select(where)))
+
+
+def _local_row(ev):
+    return {'team_id': ev.team_id, 'day': ev.day, 'time': ev.time or '',
+            'title': ev.title or 'Trénink', 'kind': ev.kind or 'training', 'source': LOCAL,
+            'event_key': 'local:%d' % ev.id, 'local_id': ev.id, 'series_id': ev.series_id}
+
+
+def _series_values(oc):
+    return {'time': oc.time or '', 'title': oc.title or 'Trénink', 'kind': oc.kind or 'training'}
+
+
+def replace_series(team_id, series_id, occurrences, session=None, since=None):
+    """Swap the index rows of one lazy series for `occurrences`
+    (event_series.Occurrence, cancelled ones already left out). With `since`,
+    only the rows on or after that day are swapped ("this and following")."""
+    session = session or db.session
+    where = [_table.c.team_id == team_id, _table.c.series_id == series_id,
+             _table.c.source == SERIES]
+    if since is not None:
+        where.append(_table.c.day >= since)
+        occurrences = [oc for oc in occurrences if oc.day >= since]
+    session.execute(_table.delete().where(*where))
+    rows = [dict(_series_values(oc), team_id=team_id, day=oc.day, source=SERIES,
+                 event_key=oc.key, local_id=None, series_id=series_id)
+            for oc in occurrences]
+    if rows:
+        session.execute(_table.insert(), rows)
+
+
+def set_series_occurrence(team_id, key, occurrence, session=None):
+    """Re-list one lazy-series occurrence after a single-occurrence edit, or
+    drop its row when `occurrence` is None (cancelled). One statement on the
+    (team_id, event_key) index."""
+    session = session or db.session
+    where = (_table.c.team_id == team_id, _table.c.event_key == key)
+    if occurrence is None:
+        session.execute(_table.delete().where(*where))
+    else:
+        session.execute(_table.update().where(*where).values(**_series_values(occurrence)))
+
+
+def replace_tymuj(team_id, rows, session=None):
+    """Swap the team's Týmuj index rows for `rows` (the TymujEvent insert
+    dicts); cancelled events are not listed, so they are not indexed."""
+    session = session or db.session
+    session.execute(_table.delete().where(_table.c.team_id == team_id,
+                                          _table.c.source == TYMUJ))
+    out = [{'team_id': team_id, 'day': r['day'], 'time': r.get('time') or '',
+            'title': r.get('title') or '', 'kind': r.get('kind') or 'training', 'source': TYMUJ,
+            'event_key': r['event_key'], 'local_id': None, 'series_id': None}
+           for r in rows if not r.get('cancelled')]
+    if out:
+        session.execute(_table.insert(), out)
+
+
+def rebuild(team_id, session=None):
+    """Recompute a team's index from its TrainingEvents, lazy series and
+    Týmuj events. Does not commit. Returns the number of rows written."""
+    from coach.services import event_series
+    session = session or db.session
+    session.execute(_table.delete().where(_table.c.team_id == team_id))
+    session.execute(_table.insert().from_select(
+        _COLUMNS, _local_select((TrainingEvent.team_id == team_id,))))
+    for sid, occurrences in event_series.all_occurrences(team_id).items():
+        replace_series(team_id, sid, occurrences, session)
+    tymuj_rows = [{'day': r.day, 'time': r.time, 'title': r.title, 'kind': r.kind,
+                   'event_key': r.event_key}
+                  for r in (session.query(TymujEvent.day, TymujEvent.time, TymujEvent.title,
+                                          TymujEvent.kind, TymujEvent.event_key)
+                            .filter(TymujEvent.team_id == team_id,
+                                    TymujEvent.cancelled.is_(False))
+                            .order_by(TymujEvent.id.asc()))]
+    replace_tymuj(team_id, tymuj_rows, session)
+    return session.query(func.count(TeamEventIndex.id)).filter(
+        TeamEventIndex.team_id == team_id).scalar()
+
+
+# ----------------------------- read API -----------------------------
+_READ_COLUMNS = (TeamEventIndex.day, TeamEventIndex.time, TeamEventIndex.title,
+                 TeamEventIndex.kind, TeamEventIndex.source, TeamEventIndex.event_key,
+                 TeamEventIndex.local_id, TeamEventIndex.series_id)
+
+
+def _as_event(r):
+    """The `_collect_events_for_team` dict for one index row."""
+    if r.source == TYMUJ:
+        return {'id': None, 'key': r.event_key, 'day': r.day, 'time': r.time,
+                'title': r.title, 'kind': r.kind, 'source': 'tymuj'}
+    return {'id': r.local_id if r.source == LOCAL else r.event_key, 'key': r.event_key,
+            'day': r.day, 'time': r.time, 'title': r.title, 'kind': r.kind,
+            'source': 'local', 'series_id': r.series_id}
+
+
+def events(team_id, start, end):
+    """The team's events with start <= day <= end, ordered by (day, time,
+    title). One read on the (team_id, day, time) index."""
+    if not team_id:
+        return []
+    q = (db.session.query(*_READ_COLUMNS)
+         .filter(TeamEventIndex.team_id == team_id,
+                 TeamEventIndex.day >= start, TeamEventIndex.day <= end)
+         .order_by(TeamEventIndex.day.asc(), TeamEventIndex.time.asc(),
+                   TeamEventIndex.title.asc(), TeamEventIndex.id.asc()))
+    return [_as_event(r) for r in q]
+
+
+def events_by_key(team_id, keys, start, end):
+    """{key: event} for the keys that are the team's events inside the
+    window. One read on the (team_id, event_key) index."""
+    keys = {k for k in keys or () if k}
+    if not team_id or not keys:
+        return {}
+    q = (db.session.query(*_READ_COLUMNS)
+         .filter(TeamEventIndex.team_id == team_id,
+                 TeamEventIndex.event_key.in_(sorted(keys)),
+                 TeamEventIndex.day >= start, TeamEventIndex.day <= end)
+         .order_by(TeamEventIndex.id.asc()))
+    out = {}
+    for r in q:
+        out.setdefault(r.event_key, _as_event(r))
+    return out
+
+
+# ----------------------------- session hooks -----------------------------
+def _index_missing(exc):
+    """True (logged once) if `exc` says the index table does not exist yet:
+    a migration not applied must never break a write. Anything else fails
+    the write like any other SQL error."""
+    global _warned
+    message = str(exc.orig).lower()
+    if _table.name not in message or not any(m in message for m in _MISSING_TABLE):
+        return False
+    if not _warned:
+        _warned = True
+        logger.warning('event index table missing, not updated: %s', exc.orig)
+    return True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mirror_bulk(state):
+    if not (state.is_update or state.is_delete):
+        return None
+    # The statement's own target table, not bind_mapper: that also resolves
+    # from subqueries, e.g. this module's DELETE on the index by event ids.
+    table = getattr(state.statement, 'table', None)
+    if table is None or getattr(table, 'name', None) != TrainingEvent.__table__.name:
+        return None
+    clause = state.statement.whereclause
+    where = () if clause is None else (clause,)
+    if state.is_delete:
+        try:
+            drop_local(where, state.session)
+        except (OperationalError, ProgrammingError) as exc:
+            if not _index_missing(exc):
+                raise
+        return None
+    # Resolve the rows first: the UPDATE may change a column its WHERE reads.
+    ids = state.session.execute(select(TrainingEvent.id).where(*where)).scalars().all()
+    result = state.invoke_statement()
+    if ids:
+        try:
+            sync_local((TrainingEvent.id.in_(ids),), state.session)
+        except (OperationalError, ProgrammingError) as exc:
+            if not _index_missing(exc):
+                raise
+    return result
+
+
+@event.listens_for(Session, 'after_flush')
+def _mirror_on_flush(session, flush_context):
+    stale, rows = set(), []
+    for objs, is_new in ((session.new, True), (session.dirty, False), (session.deleted, False)):
+        for obj in list(objs):
+            if not isinstance(obj, TrainingEvent) or obj.id is None:
+                continue
+            if not is_new:
+                stale.add(obj.id)
+            if obj not in session.deleted and obj.team_id:
+                rows.append(_local_row(obj))
+    if not stale and not rows:
+        return
+    try:
+        conn = session.connection()
+        if stale:
+            conn.execute(_table.delete().where(_table.c.local_id.in_(sorted(stale))))
+        if rows:
+            conn.execute(_table.insert(), rows)
+    except (OperationalError, ProgrammingError) as exc:
+        if not _index_missing(exc):
+            raise
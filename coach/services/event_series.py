@@ -0,0 +1,324 @@
+"""Lazily expanded recurring series (LAZY_SERIES mode).
+
+A series is stored as its rule (EventSeries segments) and expanded on read for
+the requested window; per-occurrence edits and cancellations are
+EventSeriesException rows. Creating or rewriting a season-long series is a
+couple of rows instead of one TrainingEvent per occurrence.
+
+An occurrence is addressed by its attendance key, `series:<series_id>:<day>`,
+where day is the date the rule puts it on. The key is also the occurrence's
+`id` in the calendar UI (the edit/delete forms post it back), and it never
+changes: "this and following" edits split the rule into segments under the
+same series_id instead of starting a new series.
+
+Every write re-lists what it touched in the team event index
+(services/event_index.py), which is what the attendance pages read: one row
+for a single-occurrence edit or cancel, the rows from the split day on for
+"this and following", the whole series only for series-wide writes.
+
+Materialized series (one TrainingEvent per occurrence, the default) are not
+touched by this module.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+import uuid
+
+from coach.extensions import db
+from coach.models import AttendanceEntry, EventSeries, EventSeriesException
+from coach.services import event_index
+from coach.services import recurrence as rec
+from coach.services import team_revision
+
+KEY_PREFIX = 'series:'
+SOURCE = 'coachhub_recurring'
+
+
+def occurrence_key(series_id, day):
+    return '%s%s:%s' % (KEY_PREFIX, series_id, day.isoformat())
+
+
+def parse_key(key):
+    """(series_id, day) for a well-formed occurrence key, else None."""
+    if not isinstance(key, str) or not key.startswith(KEY_PREFIX):
+        return None
+    sid, _, day_s = key[len(KEY_PREFIX):].partition(':')
+    try:
+        day = date.fromisoformat(day_s)
+    except ValueError:
+        return None
+    if not sid or occurrence_key(sid, day) != key:
+        return None
+    return sid, day
+
+
+class Occurrence:
+    """One expanded occurrence. Quacks like a TrainingEvent row where the
+    calendar grid and the .ics feed read one; `id` is the occurrence key."""
+    __slots__ = ('id', 'key', 'team_id', 'day', 'time', 'title', 'kind', 'series_id',
+                 'recurrence_rule', 'source')
+
+    def __init__(self, seg, day, exc=None):
+        self.key = self.id = occurrence_key(seg.series_id, day)
+        self.team_id = seg.team_id
+        self.day = day
+        self.series_id = seg.series_id
+        self.time = (exc.time if exc is not None and exc.time is not None else seg.time) or ''
+        self.title = (exc.title if exc is not None and exc.title is not None else seg.title)
+        self.kind = (exc.kind if exc is not None and exc.kind is not None else seg.kind)
+        self.recurrence_rule = rec.build_rule(seg.freq, _weekdays(seg))
+        self.source = SOURCE
+
+    def as_event(self):
+        """The `_collect_events_for_team` dict shape."""
+        return {'id': self.id, 'key': self.key, 'day': self.day, 'time': self.time,
+                'title': self.title or 'Trénink', 'kind': self.kind or 'training',
+                'source': 'local', 'series_id': self.series_id}
+
+
+def _weekdays(seg):
+    return tuple(w for w in (seg.weekdays or '').split(',') if w)
+
+
+def _dates(seg):
+    return rec.expand(seg.start_day, seg.freq, _weekdays(seg), seg.until)
+
+
+def _window(seg, start, end):
+    dates = _dates(seg)
+    return dates[bisect_left(dates, start):bisect_right(dates, end)]
+
+
+def _exceptions(team_id, series_ids, start=None, end=None):
+    q = EventSeriesException.query.filter(EventSeriesException.team_id == team_id,
+                                          EventSeriesException.series_id.in_(sorted(series_ids)))
+    if start is not None:
+        q = q.filter(EventSeriesException.occurrence_day >= start,
+                     EventSeriesException.occurrence_day <= end)
+    return {(x.series_id, x.occurrence_day): x for x in q}
+
+
+def occurrences(team_id, start, end):
+    """Occurrences of the team's lazy series between start and end (inclusive),
+    cancelled ones left out, sorted by (day, time). Two indexed reads."""
+    if not team_id:
+        return []
+    segs = (EventSeries.query
+            .filter(EventSeries.team_id == team_id, EventSeries.start_day <= end,
+                    EventSeries.until >= start)
+            .all())
+    if not segs:
+        return []
+    exc = _exceptions(team_id, {s.series_id for s in segs}, start, end)
+    out = []
+    for seg in segs:
+        for d in _window(seg, start, end):
+            x = exc.get((seg.series_id, d))
+            if x is not None and x.cancelled:
+                continue
+            out.append(Occurrence(seg, d, x))
+    out.sort(key=lambda o: (o.day, o.time))
+    return out
+
+
+def occurrences_by_key(team_id, keys, start, end):
+    """{key: Occurrence} for the occurrence keys among `keys` that are this
+    team's live occurrences inside the window."""
+    wanted = {}
+    for key in keys or ():
+        ref = parse_key(key)
+        if ref and start <= ref[1] <= end:
+            wanted[key] = ref
+    if not team_id or not wanted:
+        return {}
+    sids = {sid for sid, _ in wanted.values()}
+    segs = (EventSeries.query
+            .filter(EventSeries.team_id == team_id, EventSeries.series_id.in_(sorted(sids)))
+            .all())
+    exc = _exceptions(team_id, sids)
+    out = {}
+    for key, (sid, day) in wanted.items():
+        seg = _segment_of([s for s in segs if s.series_id == sid], day)
+        x = exc.get((sid, day))
+        if seg is not None and not (x is not None and x.cancelled):
+            out[key] = Occurrence(seg, day, x)
+    return out
+
+
+def all_occurrences(team_id, series_ids=None):
+    """{series_id: [Occurrence]} — every live occurrence of the team's lazy
+    series (or of `series_ids`), for the event index."""
+    q = EventSeries.query.filter(EventSeries.team_id == team_id)
+    if series_ids is not None:
+        q = q.filter(EventSeries.series_id.in_(sorted(series_ids)))
+    segs = q.order_by(EventSeries.start_day.asc()).all()
+    out = {sid: [] for sid in series_ids or ()}
+    if not segs:
+        return out
+    exc = _exceptions(team_id, {s.series_id for s in segs})
+    for seg in segs:
+        for d in _dates(seg):
+            x = exc.get((seg.series_id, d))
+            if not (x is not None and x.cancelled):
+                out.setdefault(seg.series_id, []).append(Occurrence(seg, d, x))
+    return out
+
+
+def _reindex(team_id, series_id, since=None):
+    """Re-list the series in the event index; with `since`, only the
+    occurrences on or after that day."""
+    event_index.replace_series(team_id, series_id,
+                               all_occurrences(team_id, [series_id])[series_id], since=since)
+
+
+def create(team_id, anchor, dates, freq, weekdays, time, title, kind):
+    """Store a new series whose occurrences are `dates` (as generated from
+    `anchor` by recurrence.generate_dates). Returns the series_id."""
+    if freq in ('weekly', 'biweekly') and not weekdays:
+        weekdays = [rec.WEEKDAYS[anchor.weekday()]]
+    series_id = uuid.uuid4().hex
+    db.session.add(EventSeries(
+        team_id=team_id, series_id=series_id, start_day=anchor, until=max(dates), freq=freq,
+        weekdays=(','.join(weekdays) if freq in ('weekly', 'biweekly') else None),
+        time=time, title=title, kind=kind))
+    _reindex(team_id, series_id)
+    return series_id
+
+
+def _segment_of(segs, day):
+    for seg in segs:
+        dates = _dates(seg)
+        i = bisect_left(dates, day)
+        if i < len(dates) and dates[i] == day:
+            return seg
+    return None
+
+
+def _tail(seg, day):
+    """The part of `seg` from `day` on, splitting it in two when it also has
+    occurrences before `day`; None when it ends before `day`. The new segment
+    is anchored on its first occurrence, which keeps the rule's week parity
+    and day of month."""
+    dates = _dates(seg)
+    i = bisect_left(dates, day)
+    if i == len(dates):
+        return None
+    if i == 0:
+        return seg
+    tail = EventSeries(team_id=seg.team_id, series_id=seg.series_id, start_day=dates[i],
+                       until=seg.until, freq=seg.freq, weekdays=seg.weekdays,
+                       time=seg.time, title=seg.title, kind=seg.kind)
+    seg.until = dates[i - 1]
+    db.session.add(tail)
+    return tail
+
+
+def _load(team_id, key):
+    """(series_id, day, segments, cancelled days) for a live occurrence key of
+    this team, else None."""
+    ref = parse_key(key)
+    if not ref or not team_id:
+        return None
+    sid, day = ref
+    segs = (EventSeries.query.filter_by(team_id=team_id, series_id=sid)
+            .order_by(EventSeries.start_day.asc()).all())
+    cancelled = {d for (d,) in db.session.query(EventSeriesException.occurrence_day)
+                 .filter(EventSeriesException.team_id == team_id,
+                         EventSeriesException.series_id == sid,
+                         EventSeriesException.cancelled.is_(True))}
+    if _segment_of(segs, day) is None or day in cancelled:
+        return None
+    return sid, day, segs, cancelled
+
+
+def _exception_row(team_id, sid, day):
+    x = EventSeriesException.query.filter_by(series_id=sid, occurrence_day=day).first()
+    if x is None:
+        x = EventSeriesException(team_id=team_id, series_id=sid, occurrence_day=day)
+        db.session.add(x)
+    x.updated_at = datetime.utcnow()
+    return x
+
+
+def update(team_id, key, scope, time, title, kind):
+    """Apply an edit to one occurrence, it and the following ones, or the whole
+    series. Returns (occurrences changed, occurrence day) or None when the key
+    is not a live occurrence of this team. Does not commit."""
+    loaded = _load(team_id, key)
+    if loaded is None:
+        return None
+    sid, day, segs, cancelled = loaded
+    if scope not in ('future', 'series'):
+        x = _exception_row(team_id, sid, day)
+        x.cancelled = False
+        x.time, x.title, x.kind = time, title, kind
+        event_index.set_series_occurrence(team_id, key, Occurrence(_segment_of(segs, day), day, x))
+        return 1, day
+    start = day if scope == 'future' else None
+    n = 0
+    for seg in segs:
+        part = seg if start is None else _tail(seg, start)
+        if part is None:
+            continue
+        part.time, part.title, part.kind = time, title, kind
+        n += sum(1 for d in _dates(part) if d not in cancelled)
+    # Per-occurrence edits in the range are superseded by the new values.
+    q = EventSeriesException.query.filter(EventSeriesException.team_id == team_id,
+                                          EventSeriesException.series_id == sid,
+                                          EventSeriesException.cancelled.is_(False))
+    if start is not None:
+        q = q.filter(EventSeriesException.occurrence_day >= start)
+    q.delete(synchronize_session=False)
+    _reindex(team_id, sid, since=start)
+    # Bulk statements bypass the flush hook.
+    team_revision.bump(team_id)
+    return n, day
+
+
+def _key_range(sid, start):
+    """Attendance keys of the series' occurrences on or after `start`, as an
+    event_key index range: ISO days sort in date order, and ';' is the
+    character after ':', so the range ends right after this series' keys."""
+    prefix = '%s%s:' % (KEY_PREFIX, sid)
+    low = prefix if start == date.min else prefix + start.isoformat()
+    return (AttendanceEntry.event_key >= low) & (AttendanceEntry.event_key < prefix[:-1] + ';')
+
+
+def delete(team_id, key, scope):
+    """Remove one occurrence (a cancellation exception), it and the following
+    ones, or the whole series, with the attendance of every removed
+    occurrence. Returns (occurrences removed, occurrence day) or None when the
+    key is not a live occurrence of this team. Does not commit."""
+    loaded = _load(team_id, key)
+    if loaded is None:
+        return None
+    sid, day, segs, cancelled = loaded
+    if scope not in ('future', 'series'):
+        x = _exception_row(team_id, sid, day)
+        x.cancelled = True
+        x.time = x.title = x.kind = None
+        removed = [day]
+        gone = AttendanceEntry.event_key == occurrence_key(sid, day)
+        event_index.set_series_occurrence(team_id, key, None)
+    else:
+        start = day if scope == 'future' else date.min
+        removed = []
+        for seg in segs:
+            dates = _dates(seg)
+            i = bisect_left(dates, start)
+            removed.extend(d for d in dates[i:] if d not in cancelled)
+            if i == 0:
+                db.session.delete(seg)
+            elif i < len(dates):
+                seg.until = dates[i - 1]
+        (EventSeriesException.query
+         .filter(EventSeriesException.team_id == team_id,
+                 EventSeriesException.series_id == sid,
+                 EventSeriesException.occurrence_day >= start)
+         .delete(synchronize_session=False))
+        gone = _key_range(sid, start)
+        _reindex(team_id, sid, since=(None if start == date.min else start))
+    AttendanceEntry.query.filter(AttendanceEntry.team_id == team_id, gone).delete(
+        synchronize_session=False)
+    # Bulk statements bypass the flush hook.
+    team_revision.bump(team_id)
+    return len(removed), day
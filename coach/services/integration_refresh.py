@@ -0,0 +1,184 @@
+"""Background refresh of Týmuj and league integrations, off the request path.
+
+`flask integrations:refresh-all` (see app.py) calls `run_all()`, once or in a
+loop. Every team with a Týmuj ICS URL and every enabled league integration
+becomes a job:
+
+  * Týmuj jobs are planned here from the cached status: a cache is refreshed
+    once it is older than `TYMUJ_REFRESH_SECONDS` (never later than
+    `tymuj.STALE_AFTER_SECONDS`, so caches do not go stale while the job runs),
+    and a team whose last attempt failed is left alone for a quarter of that
+    interval before retrying.
+  * League jobs go through `league.service.maybe_auto_refresh()`, which owns the
+    league staleness / schema / back-off rules.
+
+Jobs run on a bounded thread pool, each in its own app context and DB session.
+A per-host semaphore caps concurrent requests to one upstream (all Týmuj feeds
+live on one host), and each job starts after a random jitter so a cron-driven
+run never hits the sources in a burst. `run_all()` returns one
+`RefreshResult` per team/integration with the outcome and the duration.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from flask import current_app
+
+from coach.extensions import db
+from coach.models import LeagueIntegration, Team
+from coach.services import tymuj
+from coach.services.league import service as league_svc
+from coach.services.logging import log_event
+
+logger = logging.getLogger(__name__)
+
+try:
+    TYMUJ_REFRESH_SECONDS = int(os.getenv('TYMUJ_REFRESH_SECONDS', str(6 * 3600)))
+except (TypeError, ValueError):
+    TYMUJ_REFRESH_SECONDS = 6 * 3600
+DEFAULT_WORKERS = 4
+DEFAULT_PER_HOST = 2
+DEFAULT_JITTER = 5.0        # seconds; each job starts after uniform(0, jitter)
+
+
+@dataclass
+class RefreshJob:
+    team_id: int
+    kind: str               # 'tymuj' | 'league'
+    url: str
+    host: str
+
+
+@dataclass
+class RefreshResult:
+    team_id: int
+    kind: str
+    outcome: str            # 'ok' | 'failed' | 'skipped' | 'error'
+    message: str = ''
+    duration: float = 0.0   # seconds, including time spent waiting for the host slot
+
+
+def _host(url):
+    try:
+        return (urlsplit(url or '').hostname or '').lower()
+    except Exception:
+        return ''
+
+
+def _tymuj_skip_reason(status, force=False):
+    """None when the team's Týmuj cache is due for a refresh, else why not."""
+    if force or status.get('never_succeeded'):
+        return None
+    interval = min(TYMUJ_REFRESH_SECONDS, tymuj.STALE_AFTER_SECONDS)
+    age = status.get('cache_age_seconds')
+    if age is not None and age < interval:
+        return 'cache is fresh (%ds old)' % age
+    failed_age = tymuj._age_seconds(status.get('last_failure'))
+    if (status.get('last_error') and failed_age is not None
+            and failed_age < interval / 4 and not status.get('stale')):
+        return 'backing off after a failure %ds ago' % failed_age
+    return None
+
+
+def plan_jobs(team_ids=None, force=False):
+    """Return (jobs, skipped_results) for every configured integration."""
+    jobs, skipped = [], []
+    q = Team.query.filter(Team.tymuj_ics_url.isnot(None), Team.tymuj_ics_url != '')
+    if team_ids:
+        q = q.filter(Team.id.in_(team_ids))
+    for tid, url in q.with_entities(Team.id, Team.tymuj_ics_url).order_by(Team.id.asc()):
+        url = (url or '').strip()
+        reason = _tymuj_skip_reason(tymuj.get_status(tid), force=force)
+        if reason:
+            skipped.append(RefreshResult(tid, 'tymuj', 'skipped', reason))
+        else:
+            jobs.append(RefreshJob(tid, 'tymuj', url, _host(url)))
+    q = LeagueIntegration.query.filter(LeagueIntegration.enabled.is_(True),
+                                       LeagueIntegration.source_url.isnot(None),
+                                       LeagueIntegration.source_url != '')
+    if team_ids:
+        q = q.filter(LeagueIntegration.team_id.in_(team_ids))
+    for tid, url in q.with_entities(LeagueIntegration.team_id, LeagueIntegration.source_url) \
+                     .order_by(LeagueIntegration.team_id.asc()):
+        url = (url or '').strip()
+        jobs.append(RefreshJob(tid, 'league', url, _host(url)))
+    return jobs, skipped
+
+
+class HostLimiter:
+    """Caps concurrent jobs per upstream host."""
+
+    def __init__(self, per_host):
+        self.per_host = max(1, int(per_host))
+        self._sems = {}
+        self._lock = threading.Lock()
+
+    def slot(self, host):
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = self._sems[host] = threading.BoundedSemaphore(self.per_host)
+        return sem
+
+
+def _refresh(job, force):
+    if job.kind == 'tymuj':
+        ok, msg = tymuj.refresh_cache(job.team_id, job.url)
+        return ('ok' if ok else 'failed'), msg
+    res = (league_svc.refresh(job.team_id, manual=False) if force
+           else league_svc.maybe_auto_refresh(job.team_id))
+    if res is None:
+        return 'skipped', 'league cache is fresh or backing off'
+    ok, msg = res
+    return ('ok' if ok else 'failed'), msg
+
+
+def run_job(app, job, limiter, force=False, jitter=0.0, sleep=time.sleep):
+    """Run one job in its own app context; never raises."""
+    start = time.monotonic()
+    if jitter:
+        sleep(random.uniform(0, jitter))
+    with limiter.slot(job.host):
+        with app.app_context():
+            try:
+                outcome, msg = _refresh(job, force)
+            except Exception as exc:   # refresh functions catch their own errors
+                db.session.rollback()
+                logger.exception('integration refresh crashed (team %s, %s)', job.team_id, job.kind)
+                outcome, msg = 'error', str(exc)[:300]
+            finally:
+                db.session.remove()
+    return RefreshResult(job.team_id, job.kind, outcome, msg or '',
+                         round(time.monotonic() - start, 3))
+
+
+def run_all(app=None, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+            jitter=DEFAULT_JITTER, force=False, team_ids=None, sleep=time.sleep):
+    """Refresh every due integration; returns results ordered by team/kind.
+
+    `workers <= 1` runs the jobs inline on the calling thread."""
+    app = app or current_app._get_current_object()
+    with app.app_context():
+        jobs, results = plan_jobs(team_ids=team_ids, force=force)
+    limiter = HostLimiter(per_host)
+    if workers <= 1 or len(jobs) <= 1:
+        results.extend(run_job(app, j, limiter, force, jitter, sleep) for j in jobs)
+    else:
+        with ThreadPoolExecutor(max_workers=int(workers),
+                                thread_name_prefix='integration-refresh') as pool:
+            results.extend(pool.map(lambda j: run_job(app, j, limiter, force, jitter, sleep), jobs))
+    results.sort(key=lambda r: (r.team_id, r.kind))
+    with app.app_context():
+        counts = {}
+        for r in results:
+            counts[r.outcome] = counts.get(r.outcome, 0) + 1
+        log_event('integration.refresh_all', role='system', level='info',
+                  message='Scheduled integration refresh finished',
+                  meta={'jobs': len(jobs), **counts,
+                        'seconds': round(sum(r.duration for r in results), 3)})
+    return results
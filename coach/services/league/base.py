@@ -6,7 +6,9 @@ without changing the data contract consumed by the UI.
 """
 from __future__ import annotations
 
+import hashlib
 import re
+import urllib.error
 import urllib.request
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timezone
@@ -88,32 +90,56 @@ def _detect_encoding(raw, ctype=""):
     return enc
 
 
-def fetch_html_with_meta(url):
+def fetch_html_with_meta(url, validators=None):
     """GET a page with polite headers, size + time limits. Returns decoded text.
 
     Only http(s); no cookies/auth (never bypasses logins). Raises on failure.
+
+    `validators` ({etag, last_modified, sha256} from the last stored fetch)
+    makes the request conditional: a 304, or a body with the same SHA-256,
+    returns (None, meta) with meta['not_modified'] = True and nothing decoded.
     """
     ok, msg = validate_public_http_url(url)
     if not ok:
         raise ValueError(msg)
+    validators = validators or {}
     headers = {
         "User-Agent": USER_AGENT,
         "Accept": "text/html,application/xhtml+xml",
         "Accept-Language": "cs,en;q=0.8",
     }
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
     # safe_urlopen re-validates every redirect hop (SSRF protection).
-    with safe_urlopen(url, timeout=TIMEOUT, headers=headers, max_redirects=3) as resp:
-        raw = resp.read(MAX_BYTES + 1)[:MAX_BYTES]
-        ctype = resp.headers.get('Content-Type', '')
-        status = getattr(resp, 'status', None) or getattr(resp, 'code', None)
-    encoding = _detect_encoding(raw, ctype)
-    return decode_html(raw, ctype), {
+    try:
+        with safe_urlopen(url, timeout=TIMEOUT, headers=headers, max_redirects=3) as resp:
+            raw = resp.read(MAX_BYTES + 1)[:MAX_BYTES]
+            ctype = resp.headers.get('Content-Type', '')
+            etag = resp.headers.get('ETag')
+            last_modified = resp.headers.get('Last-Modified')
+            status = getattr(resp, 'status', None) or getattr(resp, 'code', None)
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and validators:
+            return None, {'url': url, 'http_status': 304, 'bytes': 0, 'content_type': '',
+                          'encoding': None, 'not_modified': True}
+        raise
+    digest = hashlib.sha256(raw).hexdigest()
+    meta = {
         'url': url,
         'http_status': status,
         'bytes': len(raw),
         'content_type': ctype,
-        'encoding': encoding or 'auto',
+        'etag': etag,
+        'last_modified': last_modified,
+        'sha256': digest,
     }
+    if validators.get('sha256') == digest:
+        meta.update(encoding=None, not_modified=True)
+        return None, meta
+    meta['encoding'] = _detect_encoding(raw, ctype) or 'auto'
+    return decode_html(raw, ctype), meta
 
 
 def fetch_html(url):
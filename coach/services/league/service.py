@@ -2,11 +2,15 @@
 
 Responsibilities:
   * refresh()           — fetch + parse + store (manual or auto), rate limited.
-  * maybe_auto_refresh()— refresh only if cache is stale (>= AUTO_REFRESH_HOURS).
+  * maybe_auto_refresh()— refresh only if cache is stale (>= AUTO_REFRESH_HOURS);
+                          driven by `flask integrations:refresh-all`.
   * get_view()          — read-only cached data for templates (NEVER fetches),
                           with team highlight + fuzzy-match suggestions + form.
 
 Dashboard widgets call get_view() only -> external sites are not hit on load.
+The data-derived part of the view (decoded `data_json`, team match, form) is
+kept in services.decoded_cache keyed by (team_id, row id, last_updated, data
+revision), so repeated renders skip JSON decoding until a refresh writes.
 """
 from __future__ import annotations
 
@@ -15,8 +19,11 @@ import unicodedata
 import difflib
 from datetime import datetime
 
+from sqlalchemy.orm import undefer
+
 from coach.extensions import db
 from coach.models import LeagueIntegration, Team
+from coach.services import decoded_cache, team_revision
 from coach.services.logging import log_event
 from coach.services.url_safety import validate_public_http_url
 from . import get_connector
@@ -169,6 +176,23 @@ def _competition_id(url):
         return ''
 
 
+def _validators_for(li, form_team):
+    """HTTP validators stored with the current cache, or None when that cache
+    cannot stand in for a fresh parse (missing, old schema, other form team)."""
+    if not li.data_json:
+        return None
+    try:
+        data = json.loads(li.data_json)
+    except Exception:
+        return None
+    http = data.get('_http') or {}
+    if not (http.get('etag') or http.get('last_modified') or http.get('sha256')):
+        return None
+    if not _cache_validation(data)[0] or http.get('form_team') != form_team:
+        return None
+    return http
+
+
 def refresh(team_id, manual=False):
     """Fetch + parse + store. Returns (ok: bool, message: str).
     On failure keeps the last successful cache and records last_error."""
@@ -182,7 +206,18 @@ def refresh(team_id, manual=False):
     db.session.commit()
     try:
         conn = get_connector(li.source_url)
-        html, fetch_meta = fetch_html_with_meta(li.source_url)
+        team = li.resolved_team or li.highlight_team or ''
+        html, fetch_meta = fetch_html_with_meta(li.source_url,
+                                                validators=_validators_for(li, team))
+        if html is None:
+            # Unchanged page (304 / same hash): no parse, no form walk and no
+            # data_json rewrite — only the freshness stamp moves.
+            li.last_updated = now
+            li.last_error = None
+            db.session.commit()
+            log_event('integration.league.not_modified', team_id=team_id, role='coach', level='info',
+                      message='League page unchanged', meta={'status': fetch_meta.get('http_status')})
+            return (True, 'Data jsou aktuální (beze změny).')
         data_obj = conn.parse(parse_doc(html), li.source_url)
         data_obj.info.source_url = li.source_url
         data_obj.info.last_updated = now.isoformat()
@@ -203,11 +238,12 @@ def refresh(team_id, manual=False):
         if not data.get('standings'):
             raise ValueError('Parser nenašel ligovou tabulku.')
         # team form from last completed games (walks previous rounds politely)
-        team = li.resolved_team or li.highlight_team or ''
         form, partial = _collect_form(conn, li.source_url, team, data.get('results', []), html=html)
         data['team_form'] = form
         data['form_partial'] = partial
         data['_schema'] = CACHE_SCHEMA
+        data['_http'] = {'etag': fetch_meta.get('etag'), 'last_modified': fetch_meta.get('last_modified'),
+                         'sha256': fetch_meta.get('sha256'), 'form_team': team}
         li.connector = conn.name
         li.data_json = json.dumps(data, ensure_ascii=False)
         li.last_updated = now
@@ -236,11 +272,14 @@ def refresh(team_id, manual=False):
 
 def maybe_auto_refresh(team_id):
     """Refresh only when enabled and the cache is stale, and not hammered.
-    Safe to call on a page load (Settings); a fetch happens at most ~every
-    AUTO_REFRESH_HOURS. Never called from the dashboard render path."""
+    Called by the scheduled `flask integrations:refresh-all` job
+    (services/integration_refresh.py); a fetch happens at most ~every
+    AUTO_REFRESH_HOURS. Never called from the dashboard render path.
+
+    Returns refresh()'s (ok, message), or None when no refresh was due."""
     li = get_integration(team_id)
     if not li or not li.enabled or not (li.source_url or '').strip():
-        return
+        return None
     now = datetime.utcnow()
     stale = (li.last_updated is None) or ((now - li.last_updated).total_seconds() > AUTO_REFRESH_HOURS * 3600)
     # Also re-parse if the cache was written by an older parser (schema bump).
@@ -252,12 +291,15 @@ def maybe_auto_refresh(team_id):
             schema_old = True
     backoff = li.last_attempt and (now - li.last_attempt).total_seconds() < (AUTO_REFRESH_HOURS * 3600 / 4)
     if (stale or schema_old) and not backoff:
-        refresh(team_id, manual=False)
+        return refresh(team_id, manual=False)
+    return None
 
 
 def get_view(team_id):
     """Read cached data for templates. No external fetch. Returns None when the
-    integration is missing/disabled (dashboard simply renders nothing)."""
+    integration is missing/disabled (dashboard simply renders nothing).
+
+    The nested lists/dicts are shared across requests — read-only."""
     li = get_integration(team_id)
     if not li or not li.enabled:
         return None
@@ -267,18 +309,37 @@ def get_view(team_id):
         'updated': li.last_updated,
         'connector': li.connector,
         'source_url': li.source_url,
+        'form_labels': FORM_LABELS,
+        'highlight': li.resolved_team or li.highlight_team,
+    }
+    # The revision token moves on every data_json / team-match change, and
+    # last_error is read fresh above, so the cached part can never go stale.
+    # data_json is deferred: a cache hit never reads it; on a miss
+    # _build_data_view loads that one column.
+    token = team_revision.token(team_id)
+    key = ('league.view', li.team_id, li.id, li.last_updated, token)
+    data_view = decoded_cache.get(key) if token else None
+    if data_view is None:
+        data_view = _build_data_view(li)
+        if token and li.data_json:
+            decoded_cache.put(key, data_view, cost=len(li.data_json))
+    view.update(data_view)
+    return view
+
+
+def _build_data_view(li):
+    """The part of get_view() derived from `data_json` + the team match."""
+    view = {
         'info': None,
         'standings': [],
         'results': [],
         'team_row': None,
         'form': [],
         'form_cards': [],
-        'form_labels': FORM_LABELS,
         'form_partial': False,
         'stale_schema': False,
         'suggestions': [],
         'needs_confirm': False,
-        'highlight': li.resolved_team or li.highlight_team,
     }
     if not li.data_json:
         return view
@@ -330,7 +391,7 @@ def get_view(team_id):
 
 def league_debug_rows():
     rows = []
-    integrations = (LeagueIntegration.query
+    integrations = (LeagueIntegration.query.options(undefer(LeagueIntegration.data_json))
                     .order_by(LeagueIntegration.team_id.asc(), LeagueIntegration.id.asc())
                     .all())
     for li in integrations:
@@ -434,6 +495,8 @@ def diagnostic_refresh(team_id):
         data['team_form'] = form
         data['form_partial'] = partial
         data['_schema'] = CACHE_SCHEMA
+        data['_http'] = {'etag': fetch_meta.get('etag'), 'last_modified': fetch_meta.get('last_modified'),
+                         'sha256': fetch_meta.get('sha256'), 'form_team': form_team}
         valid, validation = _cache_validation(data)
         trace.append({'step': 'cache validation result', 'ok': valid, 'detail': validation})
         if not valid:
@@ -2,6 +2,7 @@ import json
 from datetime import datetime
 
 from flask import request
+from sqlalchemy.orm import undefer
 
 from coach.extensions import db
 from coach.models import AuditEvent
@@ -38,7 +39,7 @@ def log_event(event: str, *, team_id=None, role=None, level='info', message='',
 
 
 def recent_events(limit=100, prefix=None):
-    q = AuditEvent.query
+    q = AuditEvent.query.options(undefer(AuditEvent.meta))
     if prefix:
         q = q.filter(AuditEvent.event.like(prefix + '%'))
     return q.order_by(AuditEvent.created_at.desc()).limit(limit).all()
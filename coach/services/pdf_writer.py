@@ -0,0 +1,220 @@
+"""Minimal stdlib PDF writer: text, lines and Flate-compressed images.
+
+Pages are drawn on a `Page` (coordinates in points from the top-left corner,
+like the PIL drawing code this replaced) and written object by object straight
+to a binary file, so only the page being added is held in memory:
+
+    with open(path, 'wb') as fh:
+        pdf = PdfWriter(fh)
+        page = Page()
+        page.text(36, 36, 'Přesilovka', size=18, bold=True)
+        page.line(36, 60, 559, 60)
+        name = pdf.add_image(image_hash, (w, h), rgb_bytes)
+        page.image(name, 36, 72, 523, 349)
+        pdf.add_page(page)
+        pdf.close()
+
+Text uses the standard Helvetica fonts (nothing embedded) with Windows-1250
+glyphs mapped over WinAnsi, which covers Czech and Slovak; other characters
+print as '?'. Text stays selectable and searchable. An image is written once
+per document under its key, however many pages show it; all pages share one
+resource dictionary written by `close`.
+"""
+import unicodedata
+import zlib
+
+_CATALOG, _PAGES, _RESOURCES = 1, 2, 3
+
+A4 = (595, 842)
+
+# Helvetica advance widths (1/1000 em) for ' ' .. '~'.
+_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_EXTRA_WIDTHS = {'•': 350, '–': 556, '—': 1000, '…': 1000, '„': 333, '“': 333, '”': 333,
+                 '‚': 222, '‘': 222, '’': 222, '°': 400, '×': 584, 'ß': 611}
+
+# Windows-1250 characters that WinAnsi (cp1252) lacks, by glyph name.
+_GLYPHS = {
+    'Ś': 'Sacute', 'Ť': 'Tcaron', 'Ź': 'Zacute', 'ś': 'sacute', 'ť': 'tcaron', 'ź': 'zacute',
+    'ˇ': 'caron', '˘': 'breve', 'Ł': 'Lslash', 'Ą': 'Aogonek', 'Ş': 'Scedilla', 'Ż': 'Zdotaccent',
+    '˛': 'ogonek', 'ł': 'lslash', 'ą': 'aogonek', 'ş': 'scedilla', 'Ľ': 'Lcaron', '˝': 'hungarumlaut',
+    'ľ': 'lcaron', 'ż': 'zdotaccent', 'Ŕ': 'Racute', 'Ă': 'Abreve', 'Ĺ': 'Lacute', 'Ć': 'Cacute',
+    'Č': 'Ccaron', 'Ę': 'Eogonek', 'Ě': 'Ecaron', 'Ď': 'Dcaron', 'Đ': 'Dcroat', 'Ń': 'Nacute',
+    'Ň': 'Ncaron', 'Ő': 'Ohungarumlaut', 'Ř': 'Rcaron', 'Ů': 'Uring', 'Ű': 'Uhungarumlaut',
+    'Ţ': 'Tcommaaccent', 'ŕ': 'racute', 'ă': 'abreve', 'ĺ': 'lacute', 'ć': 'cacute', 'č': 'ccaron',
+    'ę': 'eogonek', 'ě': 'ecaron', 'ď': 'dcaron', 'đ': 'dcroat', 'ń': 'nacute', 'ň': 'ncaron',
+    'ő': 'ohungarumlaut', 'ř': 'rcaron', 'ů': 'uring', 'ű': 'uhungarumlaut', 'ţ': 'tcommaaccent',
+    '˙': 'dotaccent',
+}
+
+
+def _differences():
+    out = []
+    for code in range(128, 256):
+        try:
+            ch = bytes([code]).decode('cp1250')
+        except UnicodeDecodeError:
+            continue
+        if ch in _GLYPHS and bytes([code]).decode('cp1252', 'replace') != ch:
+            out.append(b'%d /%s' % (code, _GLYPHS[ch].encode('ascii')))
+    return b' '.join(out)
+
+
+_ENCODING = b'<< /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences [%s] >>' % _differences()
+_FONTS = {'F1': b'Helvetica', 'F2': b'Helvetica-Bold'}
+
+
+def _char_width(ch):
+    code = ord(ch)
+    if 32 <= code <= 126:
+        return _WIDTHS[code - 32]
+    if ch in _EXTRA_WIDTHS:
+        return _EXTRA_WIDTHS[ch]
+    base = unicodedata.normalize('NFD', ch)[0]          # accented letter -> its base letter
+    if base != ch and 32 <= ord(base) <= 126:
+        return _WIDTHS[ord(base) - 32]
+    return 556
+
+
+def text_width(s, size):
+    """Width in points of `s` set in Helvetica at `size` (for wrapping)."""
+    return sum(_char_width(ch) for ch in s) * size / 1000.0
+
+
+def wrap(s, size, max_width, max_lines=None):
+    """Greedy word wrap of `s` to `max_width` points."""
+    lines = []; cur = ''
+    for w in s.split():
+        test = (cur + ' ' + w).strip()
+        if text_width(test, size) <= max_width:
+            cur = test
+            continue
+        if cur:
+            lines.append(cur)
+        cur = w
+        if max_lines is not None and len(lines) >= max_lines:
+            return lines
+    if cur:
+        lines.append(cur)
+    return lines[:max_lines] if max_lines is not None else lines
+
+
+def _pdf_string(s):
+    raw = s.encode('cp1250', 'replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _num(v):
+    return (b'%.2f' % v).rstrip(b'0').rstrip(b'.')
+
+
+class Page:
+    """Drawing operations of one page; origin top-left, units are points."""
+
+    def __init__(self, size=A4):
+        self.width, self.height = size
+        self._ops = []
+
+    def text(self, x, y, s, size=12, bold=False):
+        """`s` on one line; `y` is the top of the line, as in PIL."""
+        baseline = self.height - y - size * 0.8
+        self._ops.append(b'BT /%s %s Tf %s %s Td %s Tj ET' % (
+            b'F2' if bold else b'F1', _num(size), _num(x), _num(baseline), _pdf_string(s)))
+
+    def line(self, x1, y1, x2, y2, width=0.5, gray=0.0):
+        self._ops.append(b'%s G %s w %s %s m %s %s l S' % (
+            _num(gray), _num(width), _num(x1), _num(self.height - y1),
+            _num(x2), _num(self.height - y2)))
+
+    def image(self, name, x, y, w, h):
+        """Image resource `name` (from `PdfWriter.add_image`) in the box at
+        (x, y) top-left, `w` x `h` points."""
+        self._ops.append(b'q %s 0 0 %s %s %s cm /%s Do Q' % (
+            _num(w), _num(h), _num(x), _num(self.height - y - h), name.encode('ascii')))
+
+    def content(self):
+        return b'\n'.join(self._ops)
+
+
+class PdfWriter:
+    def __init__(self, fh):
+        self._fh = fh
+        self._offsets = {}
+        self._next = _RESOURCES + 1        # catalog, page tree, resources are written last
+        self._pages = []
+        self._images = {}
+        self._pos = 0
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _write(self, data: bytes):
+        self._fh.write(data)
+        self._pos += len(data)
+
+    def _object(self, num, body: bytes, stream: bytes = None):
+        self._offsets[num] = self._pos
+        self._write(b'%d 0 obj\n' % num)
+        if stream is None:
+            self._write(body + b'\nendobj\n')
+            return
+        self._write(body[:-2] + b' /Length %d >>\nstream\n' % len(stream))
+        self._write(stream)
+        self._write(b'\nendstream\nendobj\n')
+
+    def _reserve(self):
+        num = self._next
+        self._next += 1
+        return num
+
+    def has_image(self, key):
+        return key in self._images
+
+    def add_image(self, key, size, data: bytes, compressed=False):
+        """Resource name of an 8-bit RGB image; written on the first call for
+        `key` only. `data` is raw RGB rows, or already zlib-compressed."""
+        if key in self._images:
+            return self._images[key][0]
+        name, num = 'Im%d' % (len(self._images) + 1), self._reserve()
+        w, h = size
+        self._object(num, b'<< /Type /XObject /Subtype /Image /Width %d /Height %d '
+                          b'/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode >>'
+                     % (w, h), data if compressed else zlib.compress(data, 6))
+        self._images[key] = (name, num)
+        return name
+
+    def add_page(self, page: Page):
+        content, num = self._reserve(), self._reserve()
+        self._object(content, b'<< /Filter /FlateDecode >>', zlib.compress(page.content(), 6))
+        self._object(num, b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %s %s] '
+                          b'/Resources %d 0 R /Contents %d 0 R >>'
+                     % (_PAGES, _num(page.width), _num(page.height), _RESOURCES, content))
+        self._pages.append(num)
+
+    def close(self):
+        encoding = self._reserve()
+        self._object(encoding, _ENCODING)
+        fonts = []
+        for name, base in _FONTS.items():
+            num = self._reserve()
+            self._object(num, b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding %d 0 R >>'
+                         % (base, encoding))
+            fonts.append(b'/%s %d 0 R' % (name.encode('ascii'), num))
+        images = b' '.join(b'/%s %d 0 R' % (name.encode('ascii'), num)
+                           for name, num in self._images.values())
+        self._object(_RESOURCES, b'<< /ProcSet [/PDF /Text /ImageC] /Font << %s >> '
+                                 b'/XObject << %s >> >>' % (b' '.join(fonts), images))
+        kids = b' '.join(b'%d 0 R' % p for p in self._pages)
+        self._object(_PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self._pages)))
+        self._object(_CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % _PAGES)
+        xref = self._pos
+        count = self._next
+        self._write(b'xref\n0 %d\n0000000000 65535 f \n' % count)
+        for num in range(1, count):
+            self._write(b'%010d 00000 n \n' % self._offsets[num])
+        self._write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (count, _CATALOG, xref))
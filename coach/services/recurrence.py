@@ -3,8 +3,12 @@
 Pure date math — no DB. Generates the list of occurrence dates for a series
 from a start date + rule, bounded by an end condition (until OR count) and a
 hard safety cap. Kept deliberately simple (no full RRULE engine).
+
+`expand` is the read side of lazily stored series (services/event_series.py):
+the same generation, memoized per rule segment.
 """
 from datetime import date, timedelta
+from functools import lru_cache
 
 MAX_OCCURRENCES = 100
 FREQUENCIES = ('daily', 'weekly', 'biweekly', 'monthly')
@@ -98,3 +102,12 @@ def generate_dates(start, freq, weekdays=None, until=None, count=None, cap=MAX_O
                 y += 1
 
     return out, capped
+
+
+@lru_cache(maxsize=1024)
+def expand(start, freq, weekdays, until):
+    """Occurrence dates of one stored rule segment, start .. until inclusive,
+    as a sorted tuple. `weekdays` is a tuple of 'MO'..'SU' (hashable for the
+    cache). Memoized: every calendar read expands the same few segments."""
+    dates, _ = generate_dates(start, freq, weekdays=list(weekdays or ()), until=until)
+    return tuple(dates)
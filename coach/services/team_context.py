@@ -0,0 +1,218 @@
+"""Per-request team context snapshot shared by the global context processors.
+
+`inject_brand`, `inject_drill_nav` and `inject_notifications` run on EVERY
+authenticated render (including each calendar AJAX month swap). Separately they
+issued ~8 small queries per page. `get_snapshot()` loads everything they need in
+two statements instead:
+
+  1. the Team row plus scalar subqueries for today's event, tomorrow's game,
+     recent message count, pending player-access requests and the current
+     month's payment counts;
+  2. the team's distinct drill categories.
+
+Lazily stored series (services/event_series.py) have no TrainingEvent rows; a
+scalar subquery flags whether one spans today/tomorrow, and only then are its
+occurrences expanded to fill the today/tomorrow slots.
+
+The snapshot is memoized on `g` for the rest of the request and kept in a small
+process-level cache across requests (single PythonAnywhere worker), keyed by the
+team's data revision token (services/team_revision.py): any committed write to
+the team's data changes the token and the next page rebuilds the snapshot.
+Entries also expire after `TEAM_CONTEXT_CACHE_SECONDS`, because time-windowed
+values such as "messages in the last 24h" and request expiry drift on their
+own. Set the env var to 0 to disable cross-request caching.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+
+from coach.extensions import db
+from coach.models import (AuditEvent, Drill, EventSeries, PaymentPeriod, PaymentStatus, Player,
+                          PlayerRegistrationRequest, Team, TrainingEvent)
+from coach.services import event_series, team_revision
+
+try:
+    CACHE_SECONDS = max(0, int(os.getenv('TEAM_CONTEXT_CACHE_SECONDS', '60')))
+except (TypeError, ValueError):
+    CACHE_SECONDS = 60
+MAX_CACHED_TEAMS = 512
+
+
+@dataclass(frozen=True)
+class TeamContextSnapshot:
+    team_id: int
+    team_name: str | None = None
+    logo_path: str | None = None
+    primary_color: str | None = None
+    secondary_color: str | None = None
+    tertiary_color: str | None = None
+    drill_categories: list = field(default_factory=list)
+    today_event_title: str | None = None
+    today_event_kind: str | None = None
+    has_today_event: bool = False
+    tomorrow_game_title: str | None = None
+    has_tomorrow_game: bool = False
+    recent_message_count: int = 0
+    pending_access_count: int = 0
+    # None when the current month has no PaymentPeriod (nothing to nag about).
+    unpaid_count: int | None = None
+
+
+_cache = {}                  # team_id -> (expires_at, (day, revision token), snapshot)
+_lock = threading.Lock()
+
+
+def _first_event_col(col, team_id, day, kind=None):
+    q = select(col).where(TrainingEvent.team_id == team_id, TrainingEvent.day == day)
+    if kind:
+        q = q.where(TrainingEvent.kind == kind)
+    return q.order_by(TrainingEvent.time.asc(), TrainingEvent.id.asc()).limit(1).scalar_subquery()
+
+
+def load_snapshot(team_id: int, today: date | None = None, now: datetime | None = None):
+    """Build a snapshot straight from the DB (two statements). Returns None when
+    the team no longer exists."""
+    today = today or date.today()
+    now = now or datetime.utcnow()
+    tomorrow = today + timedelta(days=1)
+    period_id = (select(PaymentPeriod.id)
+                 .where(PaymentPeriod.team_id == team_id,
+                        PaymentPeriod.year == today.year,
+                        PaymentPeriod.month == today.month)
+                 .limit(1).scalar_subquery())
+    row = (db.session.query(
+        Team.name, Team.logo_path, Team.primary_color, Team.secondary_color,
+        _first_event_col(TrainingEvent.id, team_id, today).label('today_id'),
+        _first_event_col(TrainingEvent.title, team_id, today).label('today_title'),
+        _first_event_col(TrainingEvent.kind, team_id, today).label('today_kind'),
+        _first_event_col(TrainingEvent.id, team_id, tomorrow, 'match').label('tomorrow_id'),
+        _first_event_col(TrainingEvent.title, team_id, tomorrow, 'match').label('tomorrow_title'),
+        select(func.count(AuditEvent.id))
+        .where(AuditEvent.team_id == team_id, AuditEvent.event == 'message',
+               AuditEvent.created_at >= now - timedelta(hours=24))
+        .scalar_subquery().label('messages'),
+        select(func.count(PlayerRegistrationRequest.id))
+        .where(PlayerRegistrationRequest.team_id == team_id,
+               PlayerRegistrationRequest.status == PlayerRegistrationRequest.STATUS_PENDING,
+               PlayerRegistrationRequest.expires_at > now)
+        .scalar_subquery().label('pending'),
+        period_id.label('period_id'),
+        select(func.count(Player.id)).where(Player.team_id == team_id)
+        .scalar_subquery().label('players'),
+        select(EventSeries.id)
+        .where(EventSeries.team_id == team_id, EventSeries.start_day <= tomorrow,
+               EventSeries.until >= today)
+        .limit(1).scalar_subquery().label('series_id'),
+        select(func.count(PaymentStatus.id))
+        .where(PaymentStatus.period_id == period_id, PaymentStatus.status == 'paid')
+        .scalar_subquery().label('paid'),
+    ).filter(Team.id == team_id).first())
+    if row is None:
+        return None
+    cats = (db.session.query(Drill.category)
+            .filter(Drill.team_id == team_id).distinct().all())
+    unpaid = None
+    if row.period_id is not None:
+        unpaid = max(0, (row.players or 0) - (row.paid or 0))
+    today_ev = (row.today_title, row.today_kind) if row.today_id is not None else None
+    tomorrow_game = row.tomorrow_title if row.tomorrow_id is not None else None
+    if row.series_id is not None and (today_ev is None or tomorrow_game is None):
+        for oc in event_series.occurrences(team_id, today, tomorrow):
+            if today_ev is None and oc.day == today:
+                today_ev = (oc.title, oc.kind)
+            elif tomorrow_game is None and oc.day == tomorrow and oc.kind == 'match':
+                tomorrow_game = oc.title
+    return TeamContextSnapshot(
+        team_id=team_id,
+        team_name=row.name,
+        logo_path=row.logo_path,
+        primary_color=row.primary_color,
+        secondary_color=row.secondary_color,
+        drill_categories=[c[0] for c in cats if c and c[0]],
+        today_event_title=today_ev[0] if today_ev else None,
+        today_event_kind=today_ev[1] if today_ev else None,
+        has_today_event=today_ev is not None,
+        tomorrow_game_title=tomorrow_game,
+        has_tomorrow_game=tomorrow_game is not None,
+        recent_message_count=row.messages or 0,
+        pending_access_count=row.pending or 0,
+        unpaid_count=unpaid,
+    )
+
+
+def _cached(team_id, key):
+    if not CACHE_SECONDS or key[1] is None:
+        return None
+    with _lock:
+        hit = _cache.get(team_id)
+    if hit and hit[0] > time.monotonic() and hit[1] == key:
+        return hit[2]
+    return None
+
+
+def _store(team_id, key, snap):
+    # No revision token (row/table missing) -> never cache across requests.
+    if not CACHE_SECONDS or key[1] is None:
+        return
+    with _lock:
+        if team_id not in _cache and len(_cache) >= MAX_CACHED_TEAMS:
+            _cache.pop(next(iter(_cache)), None)
+        _cache[team_id] = (time.monotonic() + CACHE_SECONDS, key, snap)
+
+
+def invalidate(team_id=None) -> None:
+    """Drop one team's cached snapshot (or all of them when team_id is None)."""
+    with _lock:
+        if team_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(team_id, None)
+    try:
+        from flask import g, has_request_context
+        if has_request_context():
+            memo = getattr(g, '_team_context', None)
+            if memo:
+                if team_id is None:
+                    memo.clear()
+                else:
+                    memo.pop(team_id, None)
+    except Exception:
+        pass
+
+
+def get_snapshot(team_id):
+    """The team's context snapshot for this request (None if the team is gone).
+
+    Lookup order: request memo on `g` -> process cache -> DB."""
+    if not team_id:
+        return None
+    team_id = int(team_id)
+    memo = None
+    try:
+        from flask import g, has_request_context
+        if has_request_context():
+            memo = getattr(g, '_team_context', None)
+            if memo is None:
+                memo = {}
+                g._team_context = memo
+            if team_id in memo:
+                return memo[team_id]
+    except Exception:
+        memo = None
+    today = date.today()
+    key = (today, team_revision.token(team_id))
+    snap = _cached(team_id, key)
+    if snap is None:
+        snap = load_snapshot(team_id, today=today)
+        # A missing team is never cached: the caller clears the session, and a
+        # re-created id must not inherit a stale "gone" answer.
+        if snap is not None:
+            _store(team_id, key, snap)
+    if memo is not None:
+        memo[team_id] = snap
+    return snap
+
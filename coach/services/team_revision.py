@@ -0,0 +1,179 @@
+"""Per-team data revision counter — the shared cache-invalidation key.
+
+Every cache of team data (context snapshot, dashboard, attendance matrix, .ics
+feed, ETag responses) needs one cheap answer to "did anything of this team's
+change?". `token(team_id)` gives it in a single primary-key read.
+
+The counter lives in `TeamDataRevision` and is bumped automatically from a
+Session `after_flush` hook, *inside* the writing transaction, whenever a flush
+inserts, updates or deletes a tracked team-scoped row. A rollback therefore
+rolls the bump back with the data, and other workers see the new revision the
+moment the data commits.
+
+Bulk `Query.update()/delete()` statements bypass flush hooks; code that uses
+them on tracked models must call `bump(team_id)` itself.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from coach.extensions import db
+from coach.models import (AttendanceEntry, AuditEvent, Drill, EventSeries,
+                          EventSeriesException, LeagueIntegration,
+                          PaymentPeriod, PaymentStatus, Player,
+                          PlayerRegistrationRequest, Team, TeamDataRevision,
+                          TrainingEvent, TymujEvent)
+
+logger = logging.getLogger(__name__)
+
+# AuditEvent is mostly an append-only log; only these rows are team data.
+DATA_AUDIT_EVENTS = ('message', 'tymuj.cache')
+
+# model -> None (any change counts) | tuple of columns whose change counts.
+# Team.last_active_at (touched on every login) is deliberately not listed.
+TRACKED = {
+    TrainingEvent: None,
+    EventSeries: None,
+    EventSeriesException: None,
+    AttendanceEntry: None,
+    Player: None,
+    Drill: None,
+    PaymentPeriod: None,
+    PaymentStatus: None,
+    PlayerRegistrationRequest: None,
+    AuditEvent: None,
+    TymujEvent: None,
+    LeagueIntegration: ('data_json', 'enabled', 'highlight_team', 'resolved_team'),
+    Team: ('name', 'logo_path', 'primary_color', 'secondary_color', 'tymuj_ics_url'),
+}
+
+_table = TeamDataRevision.__table__
+_warned = False
+
+
+def _team_id_of(obj):
+    return obj.id if isinstance(obj, Team) else getattr(obj, 'team_id', None)
+
+
+def _counts(obj, is_dirty):
+    cols = TRACKED.get(type(obj), False)
+    if cols is False:
+        return False
+    if isinstance(obj, AuditEvent) and obj.event not in DATA_AUDIT_EVENTS:
+        return False
+    if not is_dirty or cols is None:
+        return True
+    attrs = sa_inspect(obj).attrs
+    return any(attrs[c].history.has_changes() for c in cols)
+
+
+def touched_team_ids(session) -> set:
+    """Team ids whose tracked data the pending flush changes."""
+    ids = set()
+    for objs, dirty in ((session.new, False), (session.dirty, True), (session.deleted, False)):
+        for obj in list(objs):
+            if dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            if _counts(obj, dirty):
+                tid = _team_id_of(obj)
+                if tid:
+                    ids.add(int(tid))
+    return ids
+
+
+def _forget_request_memo(team_ids):
+    # `g` belongs to the app context, which can outlive one request (tests,
+    # CLI), so clear whenever there is one, not only inside a request.
+    try:
+        from flask import g, has_app_context
+        if has_app_context():
+            memo = getattr(g, '_team_revision', None)
+            if memo:
+                for tid in team_ids:
+                    memo.pop(tid, None)
+    except Exception:
+        pass
+
+
+def _bump_on_connection(conn, team_ids) -> None:
+    now = datetime.utcnow()
+    for tid in sorted(team_ids):
+        res = conn.execute(_table.update()
+                           .where(_table.c.team_id == tid)
+                           .values(revision=_table.c.revision + 1, updated_at=now))
+        if not res.rowcount:
+            conn.execute(_table.insert().values(team_id=tid, revision=1, updated_at=now))
+
+
+def bump(team_id, session=None) -> None:
+    """Explicit bump for writes that bypass the flush hook (bulk statements).
+    Runs in the caller's transaction; commits with it."""
+    if not team_id:
+        return
+    session = session or db.session
+    _bump_on_connection(session.connection(), {int(team_id)})
+    _forget_request_memo({int(team_id)})
+
+
+def current(team_id):
+    """(revision, updated_at) for a team, or None when no row exists / the
+    table is unavailable. Memoized per request; flushes clear the memo."""
+    if not team_id:
+        return None
+    team_id = int(team_id)
+    memo = None
+    try:
+        from flask import g, has_request_context
+        if has_request_context():
+            memo = getattr(g, '_team_revision', None)
+            if memo is None:
+                memo = {}
+                g._team_revision = memo
+            if team_id in memo:
+                return memo[team_id]
+    except Exception:
+        memo = None
+    try:
+        row = (db.session.query(TeamDataRevision.revision, TeamDataRevision.updated_at)
+               .filter(TeamDataRevision.team_id == team_id).first())
+    except Exception:
+        # No rollback: this may run mid-transaction, and a failed SELECT does
+        # not poison it. The caller simply does not cache.
+        return None
+    val = (int(row.revision), row.updated_at) if row else None
+    if memo is not None:
+        memo[team_id] = val
+    return val
+
+
+def token(team_id):
+    """Opaque cache token for a team's current data, or None (do not cache).
+
+    Combines the counter with its bump timestamp so a reset/restored database
+    whose counter restarts can never alias an older process-cache entry."""
+    cur = current(team_id)
+    if cur is None:
+        return None
+    rev, ts = cur
+    return '%d.%s' % (rev, ts.strftime('%Y%m%d%H%M%S%f') if ts else '0')
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_flush(session, flush_context):
+    global _warned
+    try:
+        ids = touched_team_ids(session)
+    except Exception:
+        return
+    if not ids:
+        return
+    try:
+        _bump_on_connection(session.connection(), ids)
+    except Exception as exc:
+        # Missing table (migration not applied yet) must never break a write.
+        if not _warned:
+            _warned = True
+            logger.warning('team revision bump failed: %s', exc)
+    _forget_request_memo(ids)
@@ -6,12 +6,19 @@ Design mirrors the League integration:
   * get_cached_events()/get_cached_participants()/get_status() — READ-ONLY,
     never hit the network. Dashboard, attendance and import use these only.
 
-The cache is the source of truth. It is stored as a single AuditEvent row
-(event='tymuj.cache') per team holding a versioned JSON payload — no schema
-migration required. The last successful payload is preserved across failures.
+The cache is the source of truth. Normalized events live in the indexed
+`TymujEvent` table (one row per event, keyed by (team_id, day)) so readers load
+only the date window they render. Refresh status, HTTP diagnostics, stats and
+participants stay in a single AuditEvent row (event='tymuj.cache') per team
+holding a versioned JSON payload marked `events_table: true`; both are written
+in one transaction, together with the team's Týmuj rows of the calendar
+index (services/event_index.py). Payloads written before the table existed
+still carry an `events` list and are read from JSON until the next refresh.
+The last successful data is preserved across failures.
 """
 import hashlib
 import http.client
+import io
 import json
 import logging
 import os
@@ -24,8 +31,11 @@ import urllib.request  # noqa: F401  (kept as a stable monkeypatch target for te
 from datetime import date, datetime, timedelta
 from urllib.parse import urlsplit
 
+from sqlalchemy.orm import undefer
+
 from coach.extensions import db
-from coach.models import AttendanceEntry, AuditEvent, Player, Team
+from coach.models import AttendanceEntry, AuditEvent, Player, Team, TymujEvent
+from coach.services import decoded_cache, event_index, team_revision
 from coach.services.logging import log_event
 from coach.services.url_safety import UnsafeUrlError, validate_public_http_url, safe_urlopen
 
@@ -39,10 +49,19 @@ TIMEOUT = int(os.getenv('TYMUJ_TIMEOUT', '45'))            # first attempt (seco
 RETRY_TIMEOUT = int(os.getenv('TYMUJ_RETRY_TIMEOUT', '60'))  # single read-timeout retry
 RETRY_BACKOFF = float(os.getenv('TYMUJ_RETRY_BACKOFF', '2'))  # seconds before retry
 MAX_BYTES = 3 * 1024 * 1024           # cap ICS download size (parity with league)
+MAX_EVENTS = 20000                    # cap VEVENTs per feed (several seasons of headroom)
+MAX_LINE_BYTES = 64 * 1024            # one physical line; longer means a broken feed
+MAX_LINE_CHARS = 64 * 1024            # one unfolded property; longer values are cut
+MAX_EVENT_CHARS = 256 * 1024          # one VEVENT block; larger blocks are skipped
+MAX_PARTICIPANTS = 2000
+READ_CHUNK = 64 * 1024                # bytes per read from the HTTP response
 MAX_REDIRECTS = 3
 PARSER_VERSION = 2                    # bump when the normalized event shape changes
 CACHE_SCHEMA = 2                      # bump when the cache payload shape changes
 STALE_AFTER_SECONDS = 7 * 24 * 3600  # cache older than this is flagged stale
+# An unchanged feed (304 / same body hash) rewrites nothing; only once the cache
+# is older than this is `last_success` re-stamped so it does not drift stale.
+NOT_MODIFIED_TOUCH_SECONDS = 24 * 3600
 USER_AGENT = "CoachHubHockey/1.0 (+https://coachhubhockey.com; tymuj ICS widget)"
 
 FAIL_MESSAGE = 'Týmuj data could not be refreshed. Showing last saved data.'
@@ -62,7 +81,7 @@ _FAILURE_LABELS = {
 # Response headers safe to surface/store for diagnostics (no auth/cookies).
 _SAFE_HEADER_KEYS = ('Content-Type', 'Content-Length', 'Transfer-Encoding',
                      'Content-Encoding', 'Server', 'Cache-Control', 'Connection',
-                     'Date', 'Last-Modified', 'Age', 'Via')
+                     'Date', 'Last-Modified', 'ETag', 'Age', 'Via')
 
 
 class IcsFetchError(ValueError):
@@ -153,19 +172,6 @@ def _parse_ics_datetime(value: str):
         return None
 
 
-def _unfold_ics_lines(raw: str) -> list:
-    lines = raw.replace('\r\n', '\n').replace('\r', '\n').split('\n')
-    unfolded = []
-    for line in lines:
-        if not line:
-            continue
-        if line[0] in (' ', '\t') and unfolded:
-            unfolded[-1] += line[1:]
-        else:
-            unfolded.append(line)
-    return unfolded
-
-
 def _extract_cn(head: str):
     for param in head.split(';')[1:]:
         if param.strip().upper().startswith('CN='):
@@ -190,25 +196,55 @@ def _decode_ics(raw: bytes, content_type: str = ''):
     return raw.decode('utf-8', errors='replace'), 'utf-8/replace'
 
 
-def _fetch_once(url: str, timeout: int):
+def _not_modified_meta(url, timeout, status, headers, nbytes=0):
+    return {
+        'status': status,
+        'content_type': '',
+        'bytes': nbytes,
+        'encoding': None,
+        'final_url': url,
+        'redirected': False,
+        'timeout': timeout,
+        'max_redirects': MAX_REDIRECTS,
+        'headers': headers,
+        'retry_attempted': False,
+        'not_modified': True,
+    }
+
+
+def _fetch_once(url: str, timeout: int, validators: dict = None, parse: bool = False):
     """One ICS fetch attempt with SSRF protection, size cap and HTTP metadata.
 
     Connect-phase and read-phase errors are classified separately and raised as
-    IcsFetchError. Returns (text, meta) on success."""
+    IcsFetchError. Returns (text, meta) on success; with `parse` the response is
+    streamed through IcsStreamParser chunk by chunk and (parsed, meta) comes
+    back instead, so the raw feed is never held in memory.
+
+    `validators` ({etag, last_modified, sha256} from the last stored fetch)
+    makes the request conditional. A 304, or a body whose SHA-256 matches,
+    returns (None, meta) with meta['not_modified'] = True — nothing decoded."""
     ok, msg = validate_public_http_url(url)
     if not ok:
         raise IcsFetchError('invalid_url', msg)
+    validators = validators or {}
     req_headers = {
         'User-Agent': USER_AGENT,
         'Accept': 'text/calendar, text/plain;q=0.9, */*;q=0.5',
         'Accept-Language': 'cs,en;q=0.8',
     }
+    if validators.get('etag'):
+        req_headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        req_headers['If-Modified-Since'] = validators['last_modified']
     # ---- connect phase (safe_urlopen re-validates every redirect hop) ----
     try:
         resp = safe_urlopen(url, timeout=timeout, headers=req_headers, max_redirects=MAX_REDIRECTS)
     except UnsafeUrlError as e:
         raise IcsFetchError('ssrf_blocked', str(e))
     except urllib.error.HTTPError as e:
+        if e.code == 304 and validators:
+            return None, _not_modified_meta(url, timeout, 304,
+                                            _safe_headers(getattr(e, 'headers', None)))
         raise IcsFetchError('http_error', 'HTTP %s %s' % (e.code, getattr(e, 'reason', '')),
                             status=e.code, headers=_safe_headers(getattr(e, 'headers', None)))
     except urllib.error.URLError as e:
@@ -226,14 +262,34 @@ def _fetch_once(url: str, timeout: int):
     safe_hdrs = _safe_headers(hdrs)
     ctype = hdrs.get('Content-Type', '') if hdrs else ''
     final_url = resp.geturl() if hasattr(resp, 'geturl') else url
+    parser = IcsStreamParser(ctype, max_bytes=MAX_BYTES, max_events=MAX_EVENTS) if parse else None
+    chunks = []
+    sha = hashlib.sha256()
+    nbytes = 0
     try:
-        raw = resp.read(MAX_BYTES + 1)
+        while True:
+            chunk = resp.read(READ_CHUNK)
+            if not chunk:
+                break
+            nbytes += len(chunk)
+            sha.update(chunk)
+            if parser is not None:
+                parser.feed(chunk)          # enforces the byte and event caps
+            elif nbytes > MAX_BYTES:
+                raise IcsFetchError('too_large', 'ICS odpověď je příliš velká (limit %d B).' % MAX_BYTES,
+                                    bytes_read=nbytes)
+            else:
+                chunks.append(chunk)
+        body = parser.close() if parser is not None else None
+    except IcsFetchError as e:
+        e.status, e.headers = status, safe_hdrs
+        raise
     except (socket.timeout, TimeoutError):
         raise IcsFetchError('read_timeout', 'The read operation timed out after %ss' % timeout,
                             status=status, headers=safe_hdrs)
     except http.client.IncompleteRead as e:
-        raise IcsFetchError('incomplete_read', 'Incomplete read (%d bytes)' % len(e.partial),
-                            status=status, headers=safe_hdrs, bytes_read=len(e.partial))
+        raise IcsFetchError('incomplete_read', 'Incomplete read (%d bytes)' % (nbytes + len(e.partial)),
+                            status=status, headers=safe_hdrs, bytes_read=nbytes + len(e.partial))
     except Exception as e:
         raise IcsFetchError('connection_error', str(e), status=status, headers=safe_hdrs)
     finally:
@@ -241,14 +297,18 @@ def _fetch_once(url: str, timeout: int):
             resp.close()
         except Exception:
             pass
-    if len(raw) > MAX_BYTES:
-        raise IcsFetchError('too_large', 'ICS odpověď je příliš velká (limit %d B).' % MAX_BYTES,
-                            status=status, headers=safe_hdrs, bytes_read=len(raw))
-    text, enc = _decode_ics(raw, ctype)
+    digest = sha.hexdigest()
+    if validators.get('sha256') == digest:
+        # Server ignores validators but the body is byte-identical.
+        return None, _not_modified_meta(url, timeout, status, safe_hdrs, nbytes)
+    if parser is not None:
+        enc = parser.encoding
+    else:
+        body, enc = _decode_ics(b''.join(chunks), ctype)
     meta = {
         'status': status,
         'content_type': ctype,
-        'bytes': len(raw),
+        'bytes': nbytes,
         'encoding': enc,
         'final_url': final_url,
         'redirected': bool(final_url and final_url != url),
@@ -256,15 +316,20 @@ def _fetch_once(url: str, timeout: int):
         'max_redirects': MAX_REDIRECTS,
         'headers': safe_hdrs,
         'retry_attempted': False,
+        'etag': hdrs.get('ETag') if hdrs else None,
+        'last_modified': hdrs.get('Last-Modified') if hdrs else None,
+        'sha256': digest,
     }
-    return text, meta
+    return body, meta
 
 
-def _fetch_ics_with_meta(url: str):
+def _fetch_ics_with_meta(url: str, validators: dict = None, parse: bool = False):
     """Fetch the ICS, retrying ONCE on a read timeout (only) with a short backoff
-    and an extended timeout. Other failures are not retried. Returns (text, meta)."""
+    and an extended timeout. Other failures are not retried. Returns (body, meta):
+    ICS text, or the parsed feed with `parse`; None when `validators` show the
+    feed is unchanged (see _fetch_once)."""
     try:
-        return _fetch_once(url, TIMEOUT)
+        return _fetch_once(url, TIMEOUT, validators, parse)
     except IcsFetchError as e:
         if e.reason != 'read_timeout':
             raise
@@ -275,9 +340,9 @@ def _fetch_ics_with_meta(url: str):
         except Exception:
             pass
         try:
-            text, meta = _fetch_once(url, RETRY_TIMEOUT)
+            body, meta = _fetch_once(url, RETRY_TIMEOUT, validators, parse)
             meta['retry_attempted'] = True
-            return text, meta
+            return body, meta
         except IcsFetchError as e2:
             e2.retry_attempted = True
             raise e2
@@ -305,51 +370,161 @@ def _error_info(exc) -> dict:
 
 
 # ----------------------------- parsing -----------------------------
-def parse_ics(raw: str) -> dict:
-    """Parse an ICS document into normalized events + participants + stats.
+_LINE_BREAK_RE = re.compile(r'\r\n?|\n')
+
+
+class IcsStreamParser:
+    """Incremental ICS parser. feed() takes raw bytes as they arrive and returns
+    the VEVENTs completed by that chunk, normalized; close() flushes the tail
+    and returns the parse_ics() result.
+
+    Only the current line and the open VEVENT are buffered, so memory does not
+    grow with the feed. Caps stop pathological feeds early with
+    IcsFetchError('too_large'): `max_bytes` in total, `max_events` VEVENTs
+    (0 = no cap) and MAX_LINE_BYTES per physical line. Property values are cut
+    at MAX_LINE_CHARS and VEVENT blocks over MAX_EVENT_CHARS are skipped.
+
+    Bytes are decoded a chunk of whole lines at a time: an explicit charset
+    first, then the Czech fallbacks of _decode_ics(); once a chunk needs a
+    fallback it sticks for the rest of the feed."""
+
+    def __init__(self, content_type: str = '', max_bytes: int = 0, max_events: int = 0):
+        m = re.search(r'charset=["\']?([\w-]+)', content_type or '', re.I)
+        self._encodings = [c for c in (m.group(1) if m else None, 'utf-8', 'cp1250', 'iso-8859-2') if c]
+        self._enc_idx = 0
+        self._replaced = False
+        self.max_bytes = max_bytes
+        self.max_events = max_events
+        self.bytes_read = 0
+        self._tail = b''
+        self._pending = None        # logical line still collecting folded continuations
+        self._current = None        # properties of the open VEVENT
+        self._event_chars = 0
+        self._seen = set()
+        self._participants = {}
+        self.events = []
+
+    @property
+    def encoding(self) -> str:
+        return 'utf-8/replace' if self._replaced else self._encodings[self._enc_idx]
+
+    def feed(self, chunk: bytes) -> list:
+        start = len(self.events)
+        self.bytes_read += len(chunk)
+        if self.max_bytes and self.bytes_read > self.max_bytes:
+            raise IcsFetchError('too_large', 'ICS odpověď je příliš velká (limit %d B).' % self.max_bytes,
+                                bytes_read=self.bytes_read)
+        buf = self._tail + chunk
+        cut = max(buf.rfind(b'\n'), buf.rfind(b'\r')) + 1   # complete lines only
+        self._tail = buf[cut:]
+        if len(self._tail) > MAX_LINE_BYTES:
+            raise IcsFetchError('too_large', 'ICS řádek je příliš dlouhý (limit %d B).' % MAX_LINE_BYTES,
+                                bytes_read=self.bytes_read)
+        if cut:
+            for line in _LINE_BREAK_RE.split(self._decode(buf[:cut])):
+                self._physical(line)
+        return self.events[start:]
+
+    def feed_text(self, text: str) -> list:
+        """Same as feed() for already decoded text (no byte caps)."""
+        start = len(self.events)
+        for line in io.StringIO(text, newline=None):   # universal newlines
+            self._physical(line.rstrip('\n'))
+        return self.events[start:]
+
+    def close(self) -> dict:
+        if self._tail:
+            self._physical(self._decode(self._tail))
+            self._tail = b''
+        self._flush()
+        events = self.events
+        stats = {
+            'event_count': len(events),
+            'practice_count': sum(1 for e in events if e['kind'] == 'training' and not e['cancelled']),
+            'game_count': sum(1 for e in events if e['kind'] == 'match' and not e['cancelled']),
+            'cancelled_count': sum(1 for e in events if e['cancelled']),
+            'recurring_count': sum(1 for e in events if e['recurring']),
+            'participant_count': len(self._participants),
+        }
+        return {
+            'events': events,
+            'participants': sorted(self._participants.values(), key=lambda s: s.lower()),
+            'stats': stats,
+        }
 
-    Never raises on malformed input — invalid/incomplete VEVENTs are skipped,
-    duplicates (same UID/RECURRENCE-ID/day/time) are collapsed."""
-    events = []
-    participants = {}
-    seen = set()
-    current = None
-    for line in _unfold_ics_lines(raw or ''):
+    def _decode(self, raw: bytes) -> str:
+        for i in range(self._enc_idx, len(self._encodings)):
+            try:
+                text = raw.decode(self._encodings[i])
+            except (LookupError, UnicodeDecodeError):
+                continue
+            self._enc_idx = i
+            return text
+        self._replaced = True
+        return raw.decode('utf-8', errors='replace')
+
+    def _physical(self, line: str) -> None:
+        # RFC 5545 unfolding: a line starting with space/tab continues the previous one.
+        if not line:
+            return
+        if line[0] in (' ', '\t') and self._pending is not None:
+            if len(self._pending) < MAX_LINE_CHARS:
+                self._pending = (self._pending + line[1:])[:MAX_LINE_CHARS]
+            return
+        self._flush()
+        self._pending = line
+
+    def _flush(self) -> None:
+        if self._pending is not None:
+            line, self._pending = self._pending, None
+            self._logical(line)
+
+    def _logical(self, line: str) -> None:
         if line == 'BEGIN:VEVENT':
-            current = {}
-            continue
+            self._current = {}
+            self._event_chars = 0
+            return
         if line == 'END:VEVENT':
-            if current is not None:
-                ev, dedup_key = _normalize_event(current)
-                if ev and dedup_key not in seen:
-                    seen.add(dedup_key)
-                    events.append(ev)
-            current = None
-            continue
+            if self._current is not None and self._event_chars <= MAX_EVENT_CHARS:
+                ev, dedup_key = _normalize_event(self._current)
+                if ev and dedup_key not in self._seen:
+                    if self.max_events and len(self.events) >= self.max_events:
+                        raise IcsFetchError('too_large', 'ICS obsahuje příliš mnoho událostí (limit %d).'
+                                            % self.max_events, bytes_read=self.bytes_read)
+                    self._seen.add(dedup_key)
+                    self.events.append(ev)
+            self._current = None
+            return
         if ':' not in line:
-            continue
+            return
         head, value = line.split(':', 1)
         name = head.split(';', 1)[0].strip().upper()
         # Participants are collected across the whole file (ATTENDEE/ORGANIZER CN).
         if name in ('ATTENDEE', 'ORGANIZER'):
             cn = _extract_cn(head)
-            if cn:
-                participants.setdefault(cn.lower(), cn)
-        if current is not None:
-            current.setdefault(name, value)  # first occurrence wins
-    stats = {
-        'event_count': len(events),
-        'practice_count': sum(1 for e in events if e['kind'] == 'training' and not e['cancelled']),
-        'game_count': sum(1 for e in events if e['kind'] == 'match' and not e['cancelled']),
-        'cancelled_count': sum(1 for e in events if e['cancelled']),
-        'recurring_count': sum(1 for e in events if e['recurring']),
-        'participant_count': len(participants),
-    }
-    return {
-        'events': events,
-        'participants': sorted(participants.values(), key=lambda s: s.lower()),
-        'stats': stats,
-    }
+            if cn and (cn.lower() in self._participants or len(self._participants) < MAX_PARTICIPANTS):
+                self._participants.setdefault(cn.lower(), cn)
+        if self._current is not None:
+            self._event_chars += len(line)
+            if self._event_chars > MAX_EVENT_CHARS:
+                self._current.clear()       # skipped at END:VEVENT; free it now
+            else:
+                self._current.setdefault(name, value)  # first occurrence wins
+
+
+def parse_ics(raw: str) -> dict:
+    """Parse an ICS document into normalized events + participants + stats.
+
+    Never raises on malformed input — invalid/incomplete VEVENTs are skipped,
+    duplicates (same UID/RECURRENCE-ID/day/time) are collapsed."""
+    parser = IcsStreamParser()
+    parser.feed_text(raw or '')
+    return parser.close()
+
+
+def _as_parsed(body) -> dict:
+    """Parsed feed from a fetch result: streamed already, or ICS text."""
+    return body if isinstance(body, dict) else parse_ics(body)
 
 
 def _normalize_event(props: dict):
@@ -398,19 +573,44 @@ def parse_participants(raw: str) -> list:
 
 
 # ----------------------------- cache I/O -----------------------------
-def _load_cache_payload(team_id: int) -> dict:
-    row = AuditEvent.query.filter_by(team_id=team_id, event=CACHE_EVENT).first()
-    if not row or not row.meta:
+def _decode_payload(meta) -> dict:
+    if not meta:
         return {}
     try:
-        return json.loads(row.meta)
+        return json.loads(meta)
     except Exception:
         return {}
 
 
+def _load_cache_payload(team_id: int) -> dict:
+    """Fresh, caller-owned copy of the payload (write paths mutate it)."""
+    row = (AuditEvent.query.options(undefer(AuditEvent.meta))
+           .filter_by(team_id=team_id, event=CACHE_EVENT).first())
+    return _decode_payload(row.meta if row else None)
+
+
+def _shared_payload(team_id: int) -> dict:
+    """Decoded payload from the process-level cache. Keyed by the team's data
+    revision token: every write to the cache row bumps it, so a hit never needs
+    the row (or its JSON) at all. Read-only for callers."""
+    token = team_revision.token(team_id)
+    if token is None:
+        return _load_cache_payload(team_id)
+    key = ('tymuj.payload', int(team_id), token)
+    val = decoded_cache.get(key)
+    if val is None:
+        row = (db.session.query(AuditEvent.meta)
+               .filter_by(team_id=team_id, event=CACHE_EVENT).first())
+        meta = row[0] if row else None
+        val = _decode_payload(meta)
+        decoded_cache.put(key, val, cost=len(meta or ''))
+    return val
+
+
 def _cache_payload(team_id: int) -> dict:
-    """Read the cache payload, memoized per request to avoid duplicate JSON
-    parsing when several widgets read it on one page."""
+    """Read the cache payload, memoized per request (and across requests via
+    decoded_cache) to avoid duplicate JSON parsing when several widgets read
+    it. Read-only: never mutate the returned dict."""
     if not team_id:
         return {}
     try:
@@ -422,15 +622,50 @@ def _cache_payload(team_id: int) -> dict:
                 g._tymuj_cache = store
             if team_id in store:
                 return store[team_id]
-            val = _load_cache_payload(team_id)
+            val = _shared_payload(team_id)
             store[team_id] = val
             return val
     except Exception:
         pass
-    return _load_cache_payload(team_id)
+    return _shared_payload(team_id)
+
+
+def _replace_events(team_id: int, events: list) -> None:
+    """Swap the team's TymujEvent rows for `events` (normalized dicts) inside
+    the caller's transaction. Insert order follows the ICS, so ordering by id
+    reproduces the legacy JSON list order."""
+    TymujEvent.query.filter_by(team_id=team_id).delete(synchronize_session=False)
+    rows = []
+    for it in events:
+        try:
+            day = date.fromisoformat(it.get('day') or '')
+        except Exception:
+            continue
+        title = it.get('title') or ''
+        kind = it.get('kind') or 'training'
+        time_s = it.get('time') or ''
+        rows.append({
+            'team_id': team_id, 'day': day, 'time': time_s,
+            'end_time': it.get('end_time') or '', 'title': title,
+            'location': (it.get('location') or '')[:200], 'kind': kind,
+            'cancelled': bool(it.get('cancelled')), 'recurring': bool(it.get('recurring')),
+            'uid': (it.get('uid') or '')[:255] or None,
+            'event_key': make_event_key(title, day, time_s, kind, 'tymuj'),
+        })
+    if rows:
+        db.session.execute(TymujEvent.__table__.insert(), rows)
+    event_index.replace_tymuj(team_id, rows)
+    # Bulk statements bypass the flush hook.
+    team_revision.bump(team_id)
 
 
 def _write_cache(team_id: int, payload: dict) -> None:
+    """Persist the status payload; an `events` list in it (fresh parse or a
+    legacy payload) is moved into the TymujEvent table in the same commit."""
+    if isinstance(payload.get('events'), list):
+        _replace_events(team_id, payload['events'])
+        payload = {k: v for k, v in payload.items() if k != 'events'}
+        payload['events_table'] = True
     row = AuditEvent.query.filter_by(team_id=team_id, event=CACHE_EVENT).first()
     if not row:
         row = AuditEvent(event=CACHE_EVENT, team_id=team_id, role='coach')
@@ -445,25 +680,68 @@ def _write_cache(team_id: int, payload: dict) -> None:
         pass
 
 
-def _validate_cache(payload: dict):
+def _validate_cache(payload: dict, team_id: int = None):
     if not payload:
         return False, 'cache is empty'
     if payload.get('cache_schema') != CACHE_SCHEMA:
         return False, 'schema %s != %s' % (payload.get('cache_schema'), CACHE_SCHEMA)
-    if not isinstance(payload.get('events'), list):
+    if payload.get('events_table') and team_id:
+        count = TymujEvent.query.filter_by(team_id=team_id).count()
+    elif isinstance(payload.get('events'), list):
+        count = len(payload['events'])
+    else:
         return False, 'events missing'
     stats = payload.get('stats') or {}
-    if stats.get('event_count', 0) != len(payload.get('events') or []):
+    if stats.get('event_count', 0) != count:
         return False, 'event_count mismatch'
     return True, 'ok'
 
 
+def _has_events(payload: dict) -> bool:
+    if payload.get('events_table'):
+        return bool((payload.get('stats') or {}).get('event_count'))
+    return bool(payload.get('events'))
+
+
+def _stored_events(team_id: int, payload: dict) -> list:
+    """Every cached event as normalized dicts (the JSON payload shape), in
+    ICS order. Only for the owner debug views — pages use get_cached_events()."""
+    if not payload.get('events_table'):
+        return list(payload.get('events') or [])
+    return [{
+        'uid': r.uid or '', 'day': r.day.isoformat(), 'time': r.time or '',
+        'end_time': r.end_time or '', 'title': r.title or '', 'location': r.location or '',
+        'kind': r.kind or 'training', 'cancelled': bool(r.cancelled),
+        'recurring': bool(r.recurring), 'source': 'tymuj',
+    } for r in TymujEvent.query.filter_by(team_id=team_id).order_by(TymujEvent.id.asc())]
+
+
+def _url_hash(url: str) -> str:
+    return hashlib.sha256((url or '').encode('utf-8')).hexdigest()
+
+
+def _validators_for(prev: dict, url: str):
+    """HTTP validators of the stored fetch, or None when the stored data cannot
+    stand in for a fresh parse (other URL, older parser/schema, no events)."""
+    v = prev.get('validators') or {}
+    if not (v.get('etag') or v.get('last_modified') or v.get('sha256')):
+        return None
+    if (prev.get('url_hash') != _url_hash(url)
+            or prev.get('parser_version') != PARSER_VERSION
+            or prev.get('cache_schema') != CACHE_SCHEMA
+            or not (prev.get('events_table') or isinstance(prev.get('events'), list))):
+        return None
+    return v
+
+
 def _build_success_payload(url: str, parsed: dict, meta: dict, prev: dict) -> dict:
     now = datetime.utcnow().isoformat()
     return {
         'cache_schema': CACHE_SCHEMA,
         'parser_version': PARSER_VERSION,
-        'url_hash': hashlib.sha256((url or '').encode('utf-8')).hexdigest(),
+        'url_hash': _url_hash(url),
+        'validators': {'etag': meta.get('etag'), 'last_modified': meta.get('last_modified'),
+                       'sha256': meta.get('sha256')},
         'events': parsed['events'],
         'participants': parsed['participants'],
         'stats': parsed['stats'],
@@ -485,8 +763,10 @@ def refresh_cache(team_id: int, url: str):
         return False, 'Není nastavena Týmuj ICS URL.'
     prev = _load_cache_payload(team_id)
     try:
-        text, meta = _fetch_ics_with_meta(url)
-        parsed = parse_ics(text)
+        body, meta = _fetch_ics_with_meta(url, _validators_for(prev, url), parse=True)
+        if body is None:
+            return _keep_unchanged(team_id, prev, meta)
+        parsed = _as_parsed(body)
         payload = _build_success_payload(url, parsed, meta, prev)
         _write_cache(team_id, payload)
         st = parsed['stats']
@@ -515,15 +795,53 @@ def refresh_cache(team_id: int, url: str):
                   message=info['message'][:300],
                   meta={'reason': info['reason'], 'status': info['status'],
                         'retry_attempted': info['retry_attempted'],
-                        'has_cache': bool(payload.get('events') or payload.get('participants'))})
+                        'has_cache': bool(_has_events(payload) or payload.get('participants'))})
         return False, FAIL_MESSAGE
 
 
+def _keep_unchanged(team_id: int, prev: dict, meta: dict):
+    """The feed is unchanged (304 / same hash): no parse and no rewrite of the
+    events or the payload row (so team caches keyed on the data revision stay
+    warm), unless the previous attempt failed or the cache needs re-stamping."""
+    age = _age_seconds(prev.get('last_success') or prev.get('updated_at'))
+    if prev.get('last_error') or age is None or age >= NOT_MODIFIED_TOUCH_SECONDS:
+        payload = dict(prev)
+        payload['last_success'] = payload['updated_at'] = datetime.utcnow().isoformat()
+        payload['last_error'] = None
+        payload['last_error_code'] = None
+        payload['last_http'] = meta
+        _write_cache(team_id, payload)
+    log_event('integration.tymuj.not_modified', team_id=team_id, role='coach', level='info',
+              message='Tymuj feed unchanged', meta={'status': meta.get('status')})
+    return True, 'Týmuj data jsou aktuální (beze změny).'
+
+
 # ----------------------------- read API (no network) -----------------------------
 def get_cached_events(team_id: int, start_date: date, end_date: date,
                       include_cancelled: bool = False) -> list:
+    """Cached events with start_date <= day <= end_date, in ICS order. Each
+    dict also carries the precomputed attendance `event_key`."""
+    payload = _cache_payload(team_id)
+    if payload.get('events_table'):
+        q = (db.session.query(TymujEvent.day, TymujEvent.time, TymujEvent.title,
+                              TymujEvent.kind, TymujEvent.location, TymujEvent.cancelled,
+                              TymujEvent.event_key)
+             .filter(TymujEvent.team_id == team_id,
+                     TymujEvent.day >= start_date, TymujEvent.day <= end_date))
+        if not include_cancelled:
+            q = q.filter(TymujEvent.cancelled.is_(False))
+        return [{
+            'day': r.day,
+            'time': r.time or '',
+            'title': r.title or '',
+            'kind': r.kind or 'training',
+            'location': r.location or '',
+            'cancelled': bool(r.cancelled),
+            'source': 'tymuj',
+            'event_key': r.event_key,
+        } for r in q.order_by(TymujEvent.id.asc())]
     out = []
-    for item in _cache_payload(team_id).get('events', []) or []:
+    for item in payload.get('events', []) or []:
         if not include_cancelled and item.get('cancelled'):
             continue
         try:
@@ -531,18 +849,53 @@ def get_cached_events(team_id: int, start_date: date, end_date: date,
         except Exception:
             continue
         if start_date <= day <= end_date:
+            title = item.get('title') or ''
+            time_s = item.get('time') or ''
+            kind = item.get('kind') or 'training'
             out.append({
                 'day': day,
-                'time': item.get('time') or '',
-                'title': item.get('title') or '',
-                'kind': item.get('kind') or 'training',
+                'time': time_s,
+                'title': title,
+                'kind': kind,
                 'location': item.get('location') or '',
                 'cancelled': bool(item.get('cancelled')),
                 'source': 'tymuj',
+                'event_key': make_event_key(title, day, time_s, kind, 'tymuj'),
             })
     return out
 
 
+def get_cached_events_by_key(team_id: int, keys, include_cancelled: bool = False) -> dict:
+    """{event_key: event} for the cached events with these attendance keys
+    (same dict shape as get_cached_events()); unknown keys are absent. One read
+    on the (team_id, event_key) index; only a legacy JSON payload falls back
+    to scanning its list."""
+    keys = {k for k in keys or () if k}
+    if not team_id or not keys:
+        return {}
+    q = (db.session.query(TymujEvent.day, TymujEvent.time, TymujEvent.title,
+                          TymujEvent.kind, TymujEvent.location, TymujEvent.cancelled,
+                          TymujEvent.event_key)
+         .filter(TymujEvent.team_id == team_id, TymujEvent.event_key.in_(sorted(keys))))
+    if not include_cancelled:
+        q = q.filter(TymujEvent.cancelled.is_(False))
+    out = {}
+    for r in q.order_by(TymujEvent.id.asc()):
+        out.setdefault(r.event_key, {
+            'day': r.day, 'time': r.time or '', 'title': r.title or '',
+            'kind': r.kind or 'training', 'location': r.location or '',
+            'cancelled': bool(r.cancelled), 'source': 'tymuj', 'event_key': r.event_key})
+    if len(out) == len(keys):
+        return out
+    payload = _cache_payload(team_id)
+    if payload.get('events_table') or not payload.get('events'):
+        return out
+    for e in get_cached_events(team_id, date.min, date.max, include_cancelled):
+        if e['event_key'] in keys:
+            out.setdefault(e['event_key'], e)
+    return out
+
+
 def get_cached_participants(team_id: int) -> list:
     return list(_cache_payload(team_id).get('participants', []) or [])
 
@@ -562,16 +915,16 @@ def get_status(team_id: int) -> dict:
     last_success = payload.get('last_success') or payload.get('updated_at')
     last_failure = payload.get('last_failure') or payload.get('last_failed_at')
     cache_age = _age_seconds(last_success)
-    events = payload.get('events', []) or []
     participants = payload.get('participants', []) or []
+    events_count = stats.get('event_count', len(payload.get('events', []) or []))
     return {
         # legacy keys consumed by existing templates — keep stable
         'updated_at': last_success,
         'last_error': payload.get('last_error'),
         'last_failed_at': last_failure,
-        'events_count': stats.get('event_count', len(events)),
+        'events_count': events_count,
         'participants_count': stats.get('participant_count', len(participants)),
-        'has_cache': bool(events or participants),
+        'has_cache': bool(_has_events(payload) or participants),
         # first-class observability
         'last_success': last_success,
         'last_failure': last_failure,
@@ -611,7 +964,7 @@ def get_debug_summary(team_id: int) -> dict:
     team = Team.query.get(team_id) if team_id else None
     payload = _cache_payload(team_id)
     status = get_status(team_id)
-    events = payload.get('events') or []
+    events = _stored_events(team_id, payload)
     stats = payload.get('stats') or {}
     today = date.today()
 
@@ -628,13 +981,12 @@ def get_debug_summary(team_id: int) -> dict:
         normalized.append({'name': nm, 'normalized': n, 'exists': n in norm_existing})
 
     window = get_cached_events(team_id, today - timedelta(days=45), today + timedelta(days=180))
-    keys = [make_event_key(e['title'], e['day'], e.get('time') or '', e.get('kind') or 'training', 'tymuj')
-            for e in window]
+    keys = [e['event_key'] for e in window]
     attended = ({a.event_key for a in AttendanceEntry.query.filter_by(team_id=team_id).all()}
                 if team_id else set())
     mapped = sum(1 for k in keys if k in attended)
 
-    valid, vmsg = _validate_cache(payload) if payload else (False, 'cache is empty')
+    valid, vmsg = _validate_cache(payload, team_id) if payload else (False, 'cache is empty')
     return {
         'team': team,
         'team_id': team_id,
@@ -702,7 +1054,7 @@ def diagnostic_refresh(team_id: int):
     try:
         trace.append({'step': 'HTTP request', 'ok': True, 'value': _mask_url(url),
                       'timeout': TIMEOUT, 'retry_timeout': RETRY_TIMEOUT})
-        text, meta = _fetch_ics_with_meta(url)
+        body, meta = _fetch_ics_with_meta(url, parse=True)
         trace.append({'step': 'Response status', 'ok': True, 'value': meta.get('status'),
                       'redirected': meta.get('redirected'),
                       'retry_attempted': meta.get('retry_attempted'),
@@ -711,7 +1063,7 @@ def diagnostic_refresh(team_id: int):
         trace.append({'step': 'Encoding', 'ok': True, 'value': meta.get('encoding'),
                       'content_type': meta.get('content_type')})
         trace.append({'step': 'Parser', 'ok': True, 'value': 'ics v%d' % PARSER_VERSION})
-        parsed = parse_ics(text)
+        parsed = _as_parsed(body)
         st = parsed['stats']
         trace.append({'step': 'Events parsed', 'ok': True, 'count': st['event_count']})
         trace.append({'step': 'Practices parsed', 'ok': True, 'count': st['practice_count']})
@@ -728,8 +1080,7 @@ def diagnostic_refresh(team_id: int):
         trace.append({'step': 'Cache write', 'ok': True, 'schema': CACHE_SCHEMA})
         today = date.today()
         window = get_cached_events(team_id, today - timedelta(days=45), today + timedelta(days=180))
-        keys = [make_event_key(e['title'], e['day'], e.get('time') or '', e.get('kind') or 'training', 'tymuj')
-                for e in window]
+        keys = [e['event_key'] for e in window]
         attended = {a.event_key for a in AttendanceEntry.query.filter_by(team_id=team_id).all()}
         mapped = sum(1 for k in keys if k in attended)
         trace.append({'step': 'Attendance mapping', 'ok': True, 'count': len(keys),
@@ -772,7 +1123,7 @@ def diagnostic_refresh(team_id: int):
                       'headers': info['headers'],
                       'retry_attempted': info['retry_attempted'],
                       'timeout': TIMEOUT, 'retry_timeout': RETRY_TIMEOUT,
-                      'cache_preserved': bool(payload.get('events'))})
+                      'cache_preserved': _has_events(payload)})
         log_event('integration.tymuj.debug.diagnostic_refresh', team_id=team_id, role='owner',
                   level='error', message=info['message'][:300],
                   meta={'ok': False, 'reason': info['reason'], 'status': info['status'],
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""Minimal streaming XLSX writer (one worksheet) for the CSV-style exports.
+
+Pure-stdlib, the write-side counterpart of the attendance_import reader: the
+workbook is a zip written into a non-seekable sink, and the worksheet XML is
+produced row by row through `ZipFile.open(..., 'w')`. `iter_xlsx` yields the
+compressed bytes as they accumulate, so a Flask `Response` can stream it and
+the workbook is never held in memory.
+
+Strings are written as inline strings (no shared-string table to keep), so a
+cell value is always text or a number — never a formula, whatever it starts
+with. Characters XML 1.0 cannot carry are dropped.
+
+Pure module: no Flask imports.
+"""
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Compressed bytes buffered before a chunk is yielded.
+CHUNK_BYTES = 64 * 1024
+
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_BAD_TITLE = re.compile(r'[\[\]:*?/\\]')
+
+_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>')
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="%s">'
+    '<Relationship Id="rId1" Type="%s/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>' % (_PKG_REL_NS, _REL_NS))
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="%s" xmlns:r="%s"><sheets>'
+    '<sheet name="%%s" sheetId="1" r:id="rId1"/>'
+    '</sheets></workbook>' % (_NS, _REL_NS))
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="%s">'
+    '<Relationship Id="rId1" Type="%s/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="%s/styles" Target="styles.xml"/>'
+    '</Relationships>' % (_PKG_REL_NS, _REL_NS, _REL_NS))
+# Two cell formats: 0 = default, 1 = bold (header row).
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="%s">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>' % _NS)
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<worksheet xmlns="%s"><sheetData>' % _NS).encode('utf-8')
+_SHEET_TAIL = b'</sheetData></worksheet>'
+
+
+class _Sink:
+    """Write-only file object for ZipFile; `drain` hands out what was written.
+    Having no tell()/seek() makes ZipFile stream (data descriptors) instead of
+    seeking back to patch local headers."""
+
+    def __init__(self):
+        self._parts = []
+        self.size = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        out = b''.join(self._parts)
+        self._parts.clear()
+        self.size = 0
+        return out
+
+
+def col_letters(i):
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA'."""
+    out = ''
+    i += 1
+    while i:
+        i, rem = divmod(i - 1, 26)
+        out = chr(65 + rem) + out
+    return out
+
+
+def sheet_title(text):
+    """A worksheet name Excel accepts: no []:*?/\\, at most 31 characters."""
+    t = _BAD_TITLE.sub('', _ILLEGAL_XML.sub('', text or '')).strip()[:31]
+    return t or 'List1'
+
+
+def _cell_xml(ref, value, style):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return '<c r="%s"%s><v>%r</v></c>' % (ref, style, value)
+    text = escape(_ILLEGAL_XML.sub('', str(value)))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return '<c r="%s"%s t="inlineStr"><is><t%s>%s</t></is></c>' % (ref, style, space, text)
+
+
+def iter_xlsx(rows, title='List1', header_rows=1):
+    """Yield the bytes of a one-sheet workbook holding `rows` (iterables of
+    str / int / float / None), consuming `rows` lazily. The first
+    `header_rows` rows are bold."""
+    sink = _Sink()
+    letters = []
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _ROOT_RELS)
+        zf.writestr('xl/workbook.xml', _WORKBOOK % escape(sheet_title(title), {'"': '&quot;'}))
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        zf.writestr('xl/styles.xml', _STYLES)
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as fh:
+            fh.write(_SHEET_HEAD)
+            for r, row in enumerate(rows, 1):
+                style = ' s="1"' if r <= header_rows else ''
+                parts = ['<row r="%d">' % r]
+                for ci, value in enumerate(row):
+                    if ci >= len(letters):
+                        letters.append(col_letters(ci))
+                    parts.append(_cell_xml('%s%d' % (letters[ci], r), value, style))
+                parts.append('</row>')
+                fh.write(''.join(parts).encode('utf-8'))
+                if sink.size >= CHUNK_BYTES:
+                    yield sink.drain()
+            fh.write(_SHEET_TAIL)
+    yield sink.drain()
@@ -112,27 +112,55 @@
   applyLockState();          // render the locked state immediately
 
   // ---- cell editing ----
+  // Clicks are applied to the UI at once and queued; the queue is sent as one
+  // /attendance/batch request after BATCH_DELAY ms without a click (or when the
+  // page is hidden). Repeated clicks on one cell coalesce to the last status.
+  var BATCH_DELAY = 400;
+  var pending = {};          // 'pid|key' -> {btn, pid, key, prev, next}
+  var flushTimer = null;
+
   function setCell(btn, next) {
     // Authoritative client-side guard: every mutation path goes through here,
     // so a future caller cannot bypass the lock by accident.
     if (!canEdit()) return;
     var pid = parseInt(btn.getAttribute('data-pid'), 10), key = btn.getAttribute('data-key');
-    var prev = statusOf(pid, key);
+    var id = pid + '|' + key;
+    var prev = pending[id] ? pending[id].prev : statusOf(pid, key);
     status[pid] = status[pid] || {}; status[pid][key] = next;
     paintCell(btn, next);
     recomputeEvent(key); recomputePlayer(pid); recomputeKPIs();
-    fetch(CFG.cellUrl, {
-      method: 'POST', credentials: 'same-origin',
+    pending[id] = { btn: btn, pid: pid, key: key, prev: prev, next: next };
+    clearTimeout(flushTimer);
+    flushTimer = setTimeout(flush, BATCH_DELAY);
+  }
+  function flush(keepalive) {
+    clearTimeout(flushTimer); flushTimer = null;
+    var sent = Object.keys(pending).map(function (id) { return pending[id]; });
+    pending = {};
+    if (!sent.length) return;
+    fetch(CFG.batchUrl, {
+      method: 'POST', credentials: 'same-origin', keepalive: !!keepalive,
       headers: { 'Content-Type': 'application/json', 'X-CSRFToken': CFG.csrf },
-      body: JSON.stringify({ player_id: pid, event_key: key, status: next })
+      body: JSON.stringify({ changes: sent.map(function (c) { return { player_id: c.pid, event_key: c.key, status: c.next }; }) })
     }).then(function (r) { return r.ok ? r.json() : Promise.reject(r); })
-      .then(function (j) { if (j && j.event_summary) { /* server authoritative; UI already matches */ } })
+      .then(function (j) { if (j && j.event_summaries) { /* server authoritative; UI already matches */ } })
       .catch(function () {
-        status[pid][key] = prev; paintCell(btn, prev);
-        recomputeEvent(key); recomputePlayer(pid); recomputeKPIs();
+        // Roll back only cells nobody clicked again since; a newer queued
+        // change keeps its status but inherits the last saved one.
+        sent.forEach(function (c) {
+          var id = c.pid + '|' + c.key;
+          if (pending[id]) { pending[id].prev = c.prev; return; }
+          status[c.pid][c.key] = c.prev; paintCell(c.btn, c.prev);
+          recomputeEvent(c.key); recomputePlayer(c.pid);
+        });
+        recomputeKPIs();
         announce('Uložení se nezdařilo, zkus to znovu.');
       });
   }
+  document.addEventListener('visibilitychange', function () {
+    if (document.visibilityState === 'hidden') flush(true);
+  });
+  window.addEventListener('pagehide', function () { flush(true); });
   function paintCell(btn, st) {
     STATUSES.forEach(function (s) { btn.classList.remove('am-' + s); });
     btn.classList.add('am-' + st);
@@ -15,7 +15,15 @@ engine is already cached, so the override is silently ignored and the test's
 This module rebinds the engine to an in-memory database ONCE, before any test
 runs (while the app is still mutable), and then hard-asserts the binding before
 every test. A stray ``drop_all()`` can never reach a file-backed database again.
+
+Likewise, the file folders the app writes to (exports, drill image blobs, the
+PDF image cache) point at a throwaway directory for the whole run, so export
+and upload tests never leave files in ``coach/``.
 """
+import os
+import shutil
+import tempfile
+
 import pytest
 
 from coach.app import app
@@ -54,6 +62,21 @@ def _force_in_memory_db():
     yield
 
 
+FILE_FOLDERS = ("EXPORT_FOLDER", "BLOB_FOLDER", "PAGE_CACHE_FOLDER")
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _temp_file_folders():
+    root = tempfile.mkdtemp(prefix="coach-tests-")
+    saved = {key: app.config.get(key) for key in FILE_FOLDERS}
+    for key in FILE_FOLDERS:
+        app.config[key] = os.path.join(root, key.lower())
+        os.makedirs(app.config[key], exist_ok=True)
+    yield
+    app.config.update(saved)
+    shutil.rmtree(root, ignore_errors=True)
+
+
 @pytest.fixture(autouse=True)
 def _guard_against_real_db():
     """Per-test guard: refuse to run if the engine is bound to a real database."""
@@ -3,9 +3,12 @@
 import unittest
 from datetime import date, timedelta
 
+from sqlalchemy import event
+
 from coach.app import app
 from coach.extensions import db
 from coach.models import AttendanceEntry, Player, Team, TeamKey, TrainingEvent
+from coach.services.attendance_import import _read_xlsx
 from coach.services.keys import hash_team_key
 
 
@@ -86,6 +89,54 @@ class ExportTest(unittest.TestCase):
         # Jan is 'going' on the future event -> a 'Jdu' cell exists
         self.assertIn('Jdu', text)
 
+    def test_export_streams_and_reads_only_exported_entries(self):
+        self._coach()
+        db.session.add(AttendanceEntry(team_id=self.tid, player_id=self.p2.id,
+                                       event_key='local:%d' % self.e_past.id, status='maybe',
+                                       event_day=self.e_past.day, source='coachhub_coach'))
+        db.session.commit()
+        seen = []
+
+        def _on_exec(conn, cursor, statement, params, *a):
+            if 'FROM attendance_entry' in statement:
+                seen.append((statement, params))
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            r = self.client.get('/attendance/export?format=long&range=future')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        self.assertTrue(r.is_streamed)
+        self.assertEqual(len(seen), 1)
+        statement, params = seen[0]
+        self.assertIn('IN', statement)
+        self.assertIn('local:%d' % self.e_future.id, params)
+        self.assertNotIn('local:%d' % self.e_past.id, params)
+        lines = r.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 1 + 2)                 # header + 2 players x 1 event
+        self.assertIn('Jan Novák;F;', lines[1] + lines[2])
+        self.assertNotIn('Možná', r.get_data(as_text=True))
+
+    def test_xlsx_export_round_trips(self):
+        self._coach()
+        r = self.client.get('/attendance/export?format=matrix&range=all&file=xlsx')
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.is_streamed)
+        self.assertIn('spreadsheetml', r.content_type)
+        self.assertIn('.xlsx"', r.headers['Content-Disposition'])
+        grid = _read_xlsx(r.get_data())
+        self.assertEqual(grid[0][:2], ['Hráč', 'Pozice'])
+        self.assertTrue(grid[0][2].endswith('Past Zápas'))          # chronological columns
+        self.assertTrue(grid[0][3].endswith('Future Trénink'))
+        self.assertEqual(grid[1:], [['Jan Novák', 'F', 'Nevyplněno', 'Jdu'],
+                                    ['Petr Brankář', 'G', 'Nevyplněno', 'Nevyplněno']])
+        long_grid = _read_xlsx(self.client.get(
+            '/attendance/export?format=long&range=future&file=xlsx').get_data())
+        self.assertEqual(long_grid[0], ['Hráč', 'Pozice', 'Datum', 'Čas', 'Typ', 'Událost',
+                                        'Stav', 'Zdroj', 'Aktualizováno'])
+        self.assertEqual(long_grid[1][:7], ['Jan Novák', 'F', self.e_future.day.strftime('%d.%m.%Y'),
+                                            '18:00', 'Trénink', 'Future Trénink', 'Jdu'])
+        self.assertEqual(long_grid[1][7], 'CoachHub Coach')
+
     def test_legacy_range_value_in_export(self):
         self._coach()
         r = self.client.get('/attendance/export?format=long&range=season')   # -> all
@@ -4,9 +4,12 @@ import io
 import unittest
 import zipfile
 
+from sqlalchemy import event
+
 from coach.app import app
 from coach.extensions import db
 from coach.models import AttendanceEntry, AttendanceImport, Player, TrainingEvent
+from coach.scripts.import_reference import rowwise_confirm, synthetic_sheet
 from coach.services import attendance_import as ai
 
 
@@ -89,6 +92,41 @@ class ParserTest(unittest.TestCase):
         self.assertEqual(len(p['cells']), 4)
 
 
+    def _shared_xlsx(self, rows_xml, strings):
+        ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as zf:
+            zf.writestr('xl/sharedStrings.xml', '<sst xmlns="%s">%s</sst>' % (ns, ''.join(strings)))
+            zf.writestr('xl/worksheets/sheet1.xml',
+                        '<worksheet xmlns="%s"><sheetData>%s</sheetData></worksheet>' % (ns, rows_xml))
+        return buf.getvalue()
+
+    def test_xlsx_streaming_shared_strings_and_sparse_cells(self):
+        strings = ['<si><t>Jméno</t></si>', '<si><t>14.11.2024 Trénink</t></si>',
+                   '<si><r><t>Jan </t></r><r><t>Novák</t></r></si>', '<si><t>Ano</t></si>',
+                   '<si><t>=HYPERLINK("x")</t></si>'] + ['<si><t>unused %d</t></si>' % i for i in range(50)]
+        rows = ('<row r="1"><c r="A1" t="s"><v>0</v></c><c r="C1" t="s"><v>1</v></c></row>'
+                '<row r="2"><c r="A2" t="s"><v>2</v></c><c r="C2" t="s"><v>3</v></c>'
+                '<c r="D2"><f>1+1</f><v>2</v></c><c r="E2" t="s"><v>4</v></c>'
+                '<c r="F2" t="s"><v>x</v></c></row>')
+        data = self._shared_xlsx(rows, strings)
+        self.assertEqual(ai._read_xlsx(data), [
+            ['Jméno', '', '14.11.2024 Trénink'],
+            ['Jan Novák', '', 'Ano', '2', 'HYPERLINK("x")', '']])
+        zf = zipfile.ZipFile(io.BytesIO(data))
+        shared = ai._SharedStrings(zf, 'xl/sharedStrings.xml')
+        self.assertEqual(shared.get(3), 'Ano')
+        self.assertEqual(len(shared._items), 4)          # parsed only as far as asked
+        self.assertEqual(shared.get(999), '')
+
+    def test_xlsx_row_cap_and_broken_xml(self):
+        rows = ''.join('<row r="%d"><c r="A%d" t="inlineStr"><is><t>Hráč %d</t></is></c></row>'
+                       % (i + 1, i + 1, i) for i in range(ai.MAX_ROWS + 5))
+        self.assertEqual(len(ai._read_xlsx(self._shared_xlsx(rows, []))), ai.MAX_ROWS)
+        with self.assertRaises(ai.AttendanceImportError):
+            ai.parse_attendance_file('a.xlsx', self._shared_xlsx('<row r="1"><c>', []))
+
+
 class PreviewConfirmTest(unittest.TestCase):
     def setUp(self):
         app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
@@ -138,6 +176,7 @@ class PreviewConfirmTest(unittest.TestCase):
         rows = AttendanceEntry.query.all()
         self.assertTrue(all(r.source == ai.SOURCE_IMPORT for r in rows))
         self.assertTrue(all(r.source_detail == str(batch.id) for r in rows))
+        self.assertTrue(all(r.event_id == int(r.event_key[6:]) for r in rows))   # bulk insert too
 
     def test_reimport_skips_by_default_overwrites_when_requested(self):
         p = ai.parse_attendance_file('a.csv', CSV_MATRIX.encode())
@@ -198,6 +237,47 @@ class PreviewConfirmTest(unittest.TestCase):
         self.assertEqual(batch.players_created, 0)
         self.assertEqual(Player.query.filter_by(name='Petr Svoboda').count(), 0)
 
+    def test_bulk_confirm_matches_rowwise_reference(self):
+        sheet = synthetic_sheet(4, 6)
+        # a repeated cell and a merge onto the existing player exercise the
+        # in-file "last one wins" and the prefetched-row paths
+        sheet['cells'].append({'p': 0, 'e': 0, 'status': 'maybe'})
+        jan = Player.query.first()
+        pdec = {0: 'merge:%d' % jan.id, 3: 'merge:999999'}
+        edec = {e['idx']: 'create' for e in sheet['events']}
+        results = []
+        for confirm in (rowwise_confirm, ai.confirm_import):
+            for overwrite in (False, True):
+                AttendanceEntry.query.delete()
+                db.session.commit()
+                b = confirm(self.tid, sheet, pdec, edec, overwrite_imported=overwrite)
+                keys = {'local:%d' % e.id: e.title for e in TrainingEvent.query}
+                rows = sorted((e.player_id == jan.id, keys[e.event_key], e.status, e.source)
+                              for e in AttendanceEntry.query)
+                results.append((overwrite, rows, b.players_created, b.events_created,
+                                b.attendance_imported, b.skipped, b.overwritten))
+        self.assertEqual(results[:2], results[2:])
+
+    def test_confirm_statements_do_not_grow_with_cells(self):
+        sheet = synthetic_sheet(10, 30)
+        edec = {e['idx']: 'create' for e in sheet['events']}
+        ai.confirm_import(self.tid, sheet, {}, edec)
+        ids = [p.id for p in Player.query.filter(Player.name.like('Hráč%')).order_by(Player.id)]
+        evs = [e.id for e in TrainingEvent.query.order_by(TrainingEvent.id)]
+        seen = []
+
+        def _on_exec(conn, cursor, statement, *a):
+            seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            b = ai.confirm_import(self.tid, sheet, {i: 'merge:%d' % pid for i, pid in enumerate(ids)},
+                                  {j: 'use:local:%d' % eid for j, eid in enumerate(evs)},
+                                  overwrite_imported=True)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        self.assertEqual(b.overwritten, 300)
+        self.assertLessEqual(len(seen), 10)
+
     def test_source_breakdown_and_recent_imports(self):
         p = ai.parse_attendance_file('a.csv', CSV_MATRIX.encode())
         prev = ai.build_import_preview(self.tid, p)
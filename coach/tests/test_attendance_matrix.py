@@ -3,13 +3,19 @@
 import json
 import unittest
 from datetime import date, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import event
 
 from coach.app import app
 from coach.extensions import db
-from coach.models import AttendanceEntry, Player, Team, TeamKey, TrainingEvent
+from coach.models import AttendanceEntry, Player, Team, TeamKey, TrainingEvent, local_event_id
+from coach.scripts.matrix_reference import dict_view, synthetic_matrix
 from coach.services import attendance_stats as stats
+from coach.services import team_revision
+from coach.services import tymuj as tymuj_svc
 from coach.services.keys import hash_team_key
-from coach.tests.session_helpers import login_session
+from coach.tests.session_helpers import login_session, login_shared_key_session
 
 
 def _ev(key, d, kind='training', title='T', time='18:00'):
@@ -78,6 +84,46 @@ class StatsServiceTest(unittest.TestCase):
         self.assertNotIn(self.p2.id, v['status_map'])        # p2 unknown -> absent
 
 
+class GridEngineTest(unittest.TestCase):
+    """The bytearray grid engine returns exactly the old dict-engine view."""
+    today = date(2026, 1, 15)
+
+    def _same(self, events, players, entries):
+        self.assertEqual(stats.build_matrix_view(events, players, entries, today=self.today),
+                         dict_view(events, players, entries, today=self.today))
+
+    def test_matches_dict_engine_on_synthetic_season(self):
+        for seed, (n_players, n_events) in enumerate([(1, 1), (7, 30), (26, 90)]):
+            self._same(*synthetic_matrix(n_players, n_events, self.today, seed=seed))
+
+    def test_edge_shapes(self):
+        events, players, entries = synthetic_matrix(6, 12, self.today, seed=3)
+        self._same([], players, entries)
+        self._same(events, [], entries)
+        self._same([], [], [])
+
+    def test_duplicates_overrides_and_ties(self):
+        p = SimpleNamespace(id=1, name='Jan', position=None)
+        q = SimpleNamespace(id=2, name='Petr', position='D')
+        events = [_ev('a', date(2026, 1, 10)), _ev('b', date(2026, 1, 10), time='07:00'),
+                  _ev('a', date(2026, 1, 12), kind='match'), _ev('c', self.today, time='')]
+        entries = [SimpleNamespace(player_id=1, event_key='a', status='going'),
+                   SimpleNamespace(player_id=1, event_key='b', status='maybe'),
+                   SimpleNamespace(player_id=2, event_key='c', status='going'),
+                   SimpleNamespace(player_id=1, event_key='b', status=None),   # later row wins
+                   SimpleNamespace(player_id=2, event_key='gone', status='going')]
+        self._same(events, [p, q, p], entries)
+
+
+class LocalEventIdTest(unittest.TestCase):
+    def test_only_canonical_local_keys_have_an_id(self):
+        self.assertEqual(local_event_id('local:7'), 7)
+        self.assertEqual(local_event_id('local:1234'), 1234)
+        for key in ('local:07', 'local:', 'local:-1', 'local:x', 'series:x:2026-01-01',
+                    'tymuj:abc', '', None):
+            self.assertIsNone(local_event_id(key), key)
+
+
 class CellEndpointTest(unittest.TestCase):
     def setUp(self):
         app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
@@ -112,6 +158,7 @@ class CellEndpointTest(unittest.TestCase):
         e = AttendanceEntry.query.filter_by(team_id=self.tid, event_key=self.key).first()
         self.assertEqual(e.status, 'going')
         self.assertEqual(e.source, 'coachhub_coach')
+        self.assertEqual(e.event_id, int(self.key[6:]))
 
     def test_player_cannot_use_coach_cell(self):
         self._login('player')
@@ -126,6 +173,54 @@ class CellEndpointTest(unittest.TestCase):
             'player_id': self.player.id, 'event_key': 'local:9999', 'status': 'going'})
         self.assertEqual(r.status_code, 404)
 
+    def test_cell_resolves_keys_without_loading_the_window(self):
+        self._login('coach')
+        other = Team(name='O'); db.session.add(other); db.session.flush()
+        day = date.today() + timedelta(days=5)
+        tymuj_svc._write_cache(self.tid, {
+            'cache_schema': tymuj_svc.CACHE_SCHEMA, 'participants': [], 'stats': {'event_count': 1},
+            'events': [{'uid': 'u1', 'day': day.isoformat(), 'time': '10:00', 'title': 'Zápas',
+                        'kind': 'match', 'cancelled': False, 'source': 'tymuj'}]})
+        foreign = TrainingEvent(team_id=other.id, day=day, title='Cizí', kind='training')
+        db.session.add_all([foreign, Player(team_id=self.tid, name='Petr', position='D')])
+        db.session.commit()
+        ext_key = tymuj_svc.make_event_key('Zápas', day, '10:00', 'match', 'tymuj')
+        seen = []
+
+        def _on_exec(conn, cursor, statement, *a):
+            seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            r = self.client.post('/attendance/cell', json={
+                'player_id': self.player.id, 'event_key': ext_key, 'status': 'maybe'})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.get_json()['event_summary'],
+                         {'going': 0, 'not_going': 0, 'maybe': 1, 'unknown': 1,
+                          'total': 2, 'pct': 0, 'color': 'red'})
+        entry = AttendanceEntry.query.filter_by(event_key=ext_key).one()
+        self.assertEqual((entry.event_title, entry.event_source, entry.event_id),
+                         ('Zápas', 'tymuj', None))
+        self.assertFalse([q for q in seen if 'FROM training_event' in q])
+        self.assertFalse([q for q in seen if 'FROM audit_event' in q])
+        for key in ('local:%d' % foreign.id, 'local:0%s' % self.key[6:], 'nope'):
+            r = self.client.post('/attendance/cell', json={
+                'player_id': self.player.id, 'event_key': key, 'status': 'going'})
+            self.assertEqual(r.status_code, 404, key)
+
+    def test_summary_ignores_other_teams_and_unknown(self):
+        self._login('coach')
+        other = Team(name='O'); db.session.add(other); db.session.flush()
+        stranger = Player(team_id=other.id, name='X', position='F'); db.session.add(stranger); db.session.flush()
+        db.session.add(AttendanceEntry(team_id=self.tid, player_id=stranger.id, event_key=self.key,
+                                       status='going', event_day=date.today()))
+        db.session.commit()
+        r = self.client.post('/attendance/cell', json={
+            'player_id': self.player.id, 'event_key': self.key, 'status': 'unknown'})
+        self.assertEqual(r.get_json()['event_summary'],
+                         stats.event_summary([self.player], AttendanceEntry.query.all()))
+
     def test_matrix_page_renders(self):
         self._login('coach')
         r = self.client.get('/dochazka')
@@ -138,6 +233,95 @@ class CellEndpointTest(unittest.TestCase):
         self.assertIn('id="am-left"', html)
 
 
+class BatchEndpointTest(unittest.TestCase):
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        self.team = Team(name='T'); db.session.add(self.team); db.session.flush()
+        self.tid = self.team.id
+        self.players = [Player(team_id=self.tid, name='Hráč %d' % i, position='F') for i in range(6)]
+        evs = [TrainingEvent(team_id=self.tid, day=date.today() + timedelta(days=i),
+                             time='18:00', title='Trénink %d' % i, kind='training') for i in range(4)]
+        db.session.add_all(self.players + evs); db.session.commit()
+        self.keys = ['local:%d' % e.id for e in evs]
+        self.client = app.test_client()
+
+    def tearDown(self):
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+
+    def _post(self, changes):
+        return self.client.post('/attendance/batch', json={'changes': changes})
+
+    def test_coach_batch_is_one_bounded_transaction(self):
+        login_session(self.client, self.tid, 'coach')
+        imported = AttendanceEntry(team_id=self.tid, player_id=self.players[0].id,
+                                   event_key=self.keys[0], status='not_going',
+                                   source='tymuj_import', event_day=date.today())
+        db.session.add(imported); db.session.commit()
+        rev = team_revision.current(self.tid)[0]
+        changes = [{'player_id': p.id, 'event_key': k, 'status': 'going'}
+                   for p in self.players for k in self.keys]
+        changes.append({'player_id': self.players[1].id, 'event_key': self.keys[1], 'status': 'maybe'})
+        seen = []
+
+        def _on_exec(conn, cursor, statement, *a):
+            seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            r = self._post(changes)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        self.assertEqual(r.status_code, 200)
+        body = r.get_json()
+        self.assertEqual(body['applied'], 24)                       # last change per cell wins
+        self.assertLessEqual(len(seen), 12)                         # not one round trip per cell
+        self.assertEqual(body['event_summaries'][self.keys[0]]['going'], 6)
+        self.assertEqual(body['event_summaries'][self.keys[1]],
+                         {'going': 5, 'not_going': 0, 'maybe': 1, 'unknown': 0,
+                          'total': 6, 'pct': 83, 'color': 'green'})
+        self.assertEqual(AttendanceEntry.query.count(), 24)
+        db.session.expire_all()
+        self.assertEqual((imported.status, imported.source), ('going', 'coachhub_coach'))
+        new = AttendanceEntry.query.filter_by(event_key=self.keys[3]).first()
+        self.assertEqual((new.event_title, new.updated_by_role), ('Trénink 3', 'coach'))
+        self.assertEqual(new.event_id, int(self.keys[3][6:]))
+        self.assertGreater(team_revision.current(self.tid)[0], rev)
+
+    def test_bad_item_rejects_the_whole_batch(self):
+        login_session(self.client, self.tid, 'coach')
+        other = Team(name='O'); db.session.add(other); db.session.flush()
+        stranger = Player(team_id=other.id, name='X', position='F')
+        foreign = TrainingEvent(team_id=other.id, day=date.today(), title='Cizí', kind='training')
+        db.session.add_all([stranger, foreign]); db.session.commit()
+        ok = {'player_id': self.players[0].id, 'event_key': self.keys[0], 'status': 'going'}
+        for bad, code in ((dict(ok, status='present'), 400),
+                          (dict(ok, player_id=stranger.id), 404),
+                          (dict(ok, event_key='local:%d' % foreign.id), 404)):
+            self.assertEqual(self._post([ok, bad]).status_code, code, bad)
+        self.assertEqual(self._post([]).status_code, 400)
+        self.assertEqual(self.client.post('/attendance/batch', json=ok).status_code, 400)
+        self.assertEqual(AttendanceEntry.query.count(), 0)
+
+    def test_player_writes_only_themselves(self):
+        me = self.players[2]
+        login_session(self.client, self.tid, 'player', player_id=me.id)
+        r = self._post([{'player_id': self.players[0].id, 'event_key': k, 'status': 'going'}
+                        for k in self.keys[:2]])
+        self.assertEqual(r.status_code, 200)
+        rows = AttendanceEntry.query.all()
+        self.assertEqual({(e.player_id, e.source) for e in rows}, {(me.id, 'coachhub_player')})
+        self.assertEqual(len(rows), 2)
+
+    def test_shared_key_session_cannot_write(self):
+        login_shared_key_session(self.client, self.tid)
+        r = self._post([{'player_id': self.players[0].id, 'event_key': self.keys[0],
+                         'status': 'going'}])
+        self.assertNotEqual(r.status_code, 200)
+        self.assertEqual(AttendanceEntry.query.count(), 0)
+
+
 class RangeModelTest(unittest.TestCase):
     """Shared range model used by BOTH player page and coach matrix."""
     def test_codes_and_default(self):
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Dashboard month navigation: `/calendar/month.json` returns only the grid
+(local + cached Týmuj events by day) with an ETag, and the dashboard ships the
+add/edit form templates the client-side grid clones."""
+import unittest
+from datetime import date
+
+from sqlalchemy import event
+
+from coach.app import app
+from coach.extensions import db
+from coach.models import Team, TrainingEvent
+from coach.services import decoded_cache
+from coach.services import tymuj as tymuj_svc
+
+URL = '/calendar/month.json?year=2026&month=9'
+
+
+class MonthJsonTest(unittest.TestCase):
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        decoded_cache.invalidate()
+        t = Team(name='HC Grid'); db.session.add(t); db.session.commit()
+        self.tid = t.id
+        db.session.add_all([
+            TrainingEvent(team_id=self.tid, day=date(2026, 9, 8), time='18:00',
+                          title='Trénink <A>', kind='training', series_id='s1'),
+            TrainingEvent(team_id=self.tid, day=date(2026, 9, 8), time='07:00',
+                          title='Ranní led', kind='training'),
+            TrainingEvent(team_id=self.tid, day=date(2026, 10, 1), time='18:00',
+                          title='Říjen', kind='match'),
+        ])
+        db.session.commit()
+        tymuj_svc._write_cache(self.tid, {
+            'cache_schema': tymuj_svc.CACHE_SCHEMA, 'participants': [], 'stats': {'event_count': 1},
+            'events': [{'uid': 'u1', 'day': '2026-09-12', 'time': '10:00', 'end_time': '',
+                        'title': 'Zápas Týmuj', 'location': '', 'kind': 'match',
+                        'cancelled': False, 'recurring': False, 'source': 'tymuj'}]})
+        self.client = app.test_client()
+        self._login('coach')
+
+    def tearDown(self):
+        decoded_cache.invalidate()
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+
+    def _login(self, role):
+        with self.client.session_transaction() as s:
+            s['team_id'] = self.tid; s['team_role'] = role; s['team_login'] = True
+
+    def test_month_payload(self):
+        r = self.client.get(URL)
+        self.assertEqual(r.status_code, 200)
+        data = r.get_json()
+        self.assertEqual((data['year'], data['month'], data['title']), (2026, 9, 'září 2026'))
+        self.assertEqual(data['prev'], {'year': 2026, 'month': 8})
+        self.assertEqual(data['next'], {'year': 2026, 'month': 10})
+        self.assertEqual(data['weeks'][0][0], '2026-08-31')          # Monday-first grid
+        day = data['events_by_day']['2026-09-08']
+        self.assertEqual([e['time'] for e in day], ['07:00', '18:00'])
+        self.assertEqual(day[1]['title'], 'Trénink <A>')
+        self.assertEqual(day[1]['series_id'], 's1')
+        ext = data['events_by_day']['2026-09-12'][0]
+        self.assertEqual((ext['source'], ext['kind'], ext['id']), ('tymuj', 'match', None))
+        self.assertNotIn('2026-10-01', data['events_by_day'])
+
+    def test_only_grid_queries_and_etag_revalidation(self):
+        seen = []
+
+        def _on_exec(conn, cursor, statement, *a):
+            seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            first = self.client.get(URL)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        for table in ('lineup_session', 'drill', 'player ', 'league_integration'):
+            self.assertFalse([s for s in seen if 'FROM %s' % table in s], table)
+        etag = first.headers['ETag']
+        again = self.client.get(URL, headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+
+    def test_change_invalidates_and_months_differ(self):
+        etag = self.client.get(URL).headers['ETag']
+        db.session.add(TrainingEvent(team_id=self.tid, day=date(2026, 9, 20), time='09:00',
+                                     title='Nový', kind='training'))
+        db.session.commit()
+        r = self.client.get(URL, headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 200)
+        self.assertIn('2026-09-20', r.get_json()['events_by_day'])
+        other = self.client.get('/calendar/month.json?year=2026&month=10')
+        self.assertNotEqual(other.headers['ETag'], r.headers['ETag'])
+
+    def test_requires_login(self):
+        with self.client.session_transaction() as s:
+            s.clear()
+        self.assertNotEqual(self.client.get(URL).status_code, 200)
+
+    def test_dashboard_ships_templates_for_coach_only(self):
+        h = self.client.get('/app?year=2026&month=9').get_data(as_text=True)
+        self.assertIn('data-month-url="/calendar/month.json"', h)
+        self.assertIn('<template id="calAddTpl">', h)
+        self.assertIn('<template id="calEditTpl">', h)
+        self.assertIn('Ranní led', h)                                # first paint stays server-side
+        self._login('player')
+        h = self.client.get('/app?year=2026&month=9').get_data(as_text=True)
+        self.assertNotIn('calAddTpl', h)
+
+
+if __name__ == '__main__':
+    unittest.main()
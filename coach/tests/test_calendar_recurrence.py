@@ -2,10 +2,15 @@
 """Calendar 2.0 — recurring events: generation, create/edit/delete, attendance."""
 import unittest
 from datetime import date, timedelta
+from unittest import mock
+
+from sqlalchemy import event as sa_event
 
 from coach.app import app
 from coach.extensions import db
-from coach.models import AttendanceEntry, Player, Team, TeamKey, TrainingEvent
+from coach.models import (AttendanceEntry, EventSeries, EventSeriesException, Player, Team,
+                          TeamKey, TrainingEvent)
+from coach.services import event_series
 from coach.services import recurrence as rec
 from coach.services.keys import hash_team_key
 
@@ -159,6 +164,43 @@ class CalendarRoutesTest(unittest.TestCase):
         self.client.post('/calendar/delete', data={'id': evs[2].id, 'scope': 'future'})
         self.assertEqual(len(self._events()), 2)     # first two remain
 
+    def test_series_scope_edit_and_delete_are_set_based(self):
+        self._login()
+        self.client.post('/calendar/add', data={'day': '2026-09-07', 'title': 'T', 'kind': 'training',
+                                                 'repeat': 'weekly', 'weekday': ['MO'], 'count': '40'})
+        evs = self._events()
+        other = TrainingEvent(team_id=self.tid, day=date(2026, 10, 5), title='Zápas', kind='match')
+        db.session.add(other)
+        p = Player(team_id=self.tid, name='Jan', position='F'); db.session.add(p); db.session.commit()
+        for ev in (evs[0], evs[20], evs[39], other):
+            db.session.add(AttendanceEntry(team_id=self.tid, player_id=p.id, event_key='local:%d' % ev.id,
+                                           status='going', event_day=ev.day, source='coachhub_coach'))
+        db.session.commit()
+        keep = {'local:%d' % evs[0].id, 'local:%d' % other.id}
+        stmts = []
+        listener = lambda conn, cur, statement, params, ctx, many: stmts.append(statement)
+        sa_event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            r = self.client.post('/calendar/update', data={'id': evs[10].id, 'title': 'Pozdě',
+                                                            'kind': 'training', 'scope': 'future'})
+            updates = [s for s in stmts if s.lstrip().startswith('UPDATE training_event')]
+            del stmts[:]
+            self.client.post('/calendar/delete', data={'id': evs[1].id, 'scope': 'future'})
+            deletes = {s.split()[2]: s for s in stmts if s.lstrip().startswith('DELETE')}
+            n_deletes = sum(1 for s in stmts if s.lstrip().startswith('DELETE'))
+        finally:
+            sa_event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(r.status_code, 302)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(n_deletes, len(deletes))
+        self.assertIn('attendance_entry', deletes)
+        self.assertIn('training_event', deletes)
+        # matched on the integer event_id in SQL, not by key strings bound one by one
+        self.assertIn('event_id IN (SELECT', deletes['attendance_entry'])
+        self.assertNotIn('local:', deletes['attendance_entry'])
+        self.assertEqual([e.title for e in self._events()], ['T', 'Zápas'])
+        self.assertEqual({a.event_key for a in AttendanceEntry.query}, keep)
+
     def test_occurrences_have_independent_attendance(self):
         evs = self._make_series()
         p = Player(team_id=self.tid, name='Jan', position='F'); db.session.add(p); db.session.commit()
@@ -259,5 +301,173 @@ class CalendarRoutesTest(unittest.TestCase):
         self.assertEqual(rows[0].event_key, 'local:%d' % evs[1].id)        # only that occurrence
 
 
+# ----------------------------- lazy series (LAZY_SERIES) -----------------------------
+class LazySeriesTest(unittest.TestCase):
+    """Rule stored once, occurrences expanded on read, stable `series:` keys."""
+
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, LAZY_SERIES=True,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        self.team = Team(name='HC Lazy'); db.session.add(self.team); db.session.commit()
+        self.tid = self.team.id
+        self.client = app.test_client()
+        with self.client.session_transaction() as s:
+            s['team_id'] = self.tid; s['team_role'] = 'coach'; s['team_login'] = True
+
+    def tearDown(self):
+        app.config['LAZY_SERIES'] = False
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+
+    def _make_series(self, **extra):
+        data = {'day': '2026-09-07', 'time_hour': '18', 'time_minute': '30', 'title': 'Trénink',
+                'kind': 'training', 'repeat': 'weekly', 'weekday': ['MO'], 'count': '4'}
+        data.update(extra)
+        self.client.post('/calendar/add', data=data)
+        return self._events()
+
+    def _events(self):
+        from coach.blueprints.calendar import _collect_events_for_team
+        return _collect_events_for_team(self.tid, date(2026, 1, 1), date(2027, 12, 31))
+
+    def test_create_stores_rule_once(self):
+        evs = self._make_series()
+        self.assertEqual(TrainingEvent.query.count(), 0)
+        self.assertEqual(EventSeries.query.count(), 1)
+        self.assertEqual([e['day'] for e in evs],
+                         [date(2026, 9, 7), date(2026, 9, 14), date(2026, 9, 21), date(2026, 9, 28)])
+        sid = evs[0]['series_id']
+        self.assertEqual([e['key'] for e in evs],
+                         ['series:%s:%s' % (sid, e['day'].isoformat()) for e in evs])
+        self.assertTrue(all(e['id'] == e['key'] and e['source'] == 'local' for e in evs))
+        grid = self.client.get('/calendar/month.json?year=2026&month=9').get_json()
+        item = grid['events_by_day']['2026-09-14'][0]
+        self.assertEqual((item['id'], item['time'], item['series_id']), (evs[1]['key'], '18:30', sid))
+        self.assertIn('Trénink', self.client.get('/app?year=2026&month=9').get_data(as_text=True))
+
+    def test_edit_one_is_an_exception_and_keeps_keys(self):
+        evs = self._make_series()
+        self.client.post('/calendar/update', data={'id': evs[1]['key'], 'title': 'Změněný',
+                                                    'time_hour': '19', 'time_minute': '00',
+                                                    'kind': 'match', 'scope': 'one'})
+        after = self._events()
+        self.assertEqual([e['key'] for e in after], [e['key'] for e in evs])
+        self.assertEqual([(e['title'], e['time'], e['kind']) for e in after][:3],
+                         [('Trénink', '18:30', 'training'), ('Změněný', '19:00', 'match'),
+                          ('Trénink', '18:30', 'training')])
+        self.assertEqual(EventSeriesException.query.count(), 1)
+
+    def test_edit_future_splits_rule_and_keeps_keys_and_attendance(self):
+        evs = self._make_series(repeat='biweekly', count='5')
+        p = Player(team_id=self.tid, name='Jan', position='F'); db.session.add(p); db.session.commit()
+        db.session.add(AttendanceEntry(team_id=self.tid, player_id=p.id, event_key=evs[3]['key'],
+                                       status='going', event_day=evs[3]['day'], source='coachhub_coach'))
+        db.session.commit()
+        self.client.post('/calendar/update', data={'id': evs[2]['key'], 'title': 'Pozdě',
+                                                    'time_hour': '20', 'time_minute': '00',
+                                                    'kind': 'training', 'scope': 'future'})
+        after = self._events()
+        self.assertEqual([e['key'] for e in after], [e['key'] for e in evs])
+        self.assertEqual([e['title'] for e in after], ['Trénink', 'Trénink', 'Pozdě', 'Pozdě', 'Pozdě'])
+        self.assertEqual(EventSeries.query.count(), 2)
+        self.assertEqual(AttendanceEntry.query.filter_by(event_key=evs[3]['key']).count(), 1)
+
+    def test_edit_series_overrides_occurrence_edits(self):
+        evs = self._make_series()
+        self.client.post('/calendar/update', data={'id': evs[1]['key'], 'title': 'Jedna', 'scope': 'one'})
+        self.client.post('/calendar/update', data={'id': evs[3]['key'], 'title': 'Celá',
+                                                    'time_hour': '07', 'time_minute': '15',
+                                                    'kind': 'match', 'scope': 'series'})
+        self.assertTrue(all((e['title'], e['time'], e['kind']) == ('Celá', '07:15', 'match')
+                            for e in self._events()))
+
+    def test_delete_one_future_and_series(self):
+        evs = self._make_series(count='6')
+        p = Player(team_id=self.tid, name='Jan', position='F'); db.session.add(p); db.session.commit()
+        for ev in (evs[0], evs[1]):
+            db.session.add(AttendanceEntry(team_id=self.tid, player_id=p.id, event_key=ev['key'],
+                                           status='going', event_day=ev['day'], source='coachhub_coach'))
+        db.session.commit()
+        self.client.post('/calendar/delete', data={'id': evs[1]['key'], 'scope': 'one'})
+        self.assertEqual([e['key'] for e in self._events()],
+                         [evs[0]['key']] + [e['key'] for e in evs[2:]])
+        self.assertEqual([a.event_key for a in AttendanceEntry.query], [evs[0]['key']])
+        # a cancelled occurrence cannot be edited back into existence
+        self.client.post('/calendar/update', data={'id': evs[1]['key'], 'title': 'X', 'scope': 'one'})
+        self.assertEqual(len(self._events()), 5)
+        self.client.post('/calendar/delete', data={'id': evs[4]['key'], 'scope': 'future'})
+        self.assertEqual([e['key'] for e in self._events()],
+                         [evs[0]['key'], evs[2]['key'], evs[3]['key']])
+        self.client.post('/calendar/delete', data={'id': evs[2]['key'], 'scope': 'series'})
+        self.assertEqual(self._events(), [])
+        self.assertEqual((EventSeries.query.count(), EventSeriesException.query.count(),
+                          AttendanceEntry.query.count()), (0, 0, 0))
+
+    def test_edit_of_an_occurrence_gone_meanwhile_is_not_found(self):
+        evs = self._make_series()
+        # deleted by another request between the lookup and the edit
+        with mock.patch.object(event_series, 'update', return_value=None):
+            r = self.client.post('/calendar/update', data={'id': evs[1]['key'], 'title': 'X',
+                                                            'scope': 'one'})
+        self.assertEqual(r.status_code, 302)
+        with self.client.session_transaction() as s:
+            self.assertIn(('error', 'Událost nebyla nalezena.'), s['_flashes'])
+
+    def test_delete_future_clears_only_this_series_key_range(self):
+        evs = self._make_series(count='6')
+        sid = evs[0]['series_id']
+        p = Player(team_id=self.tid, name='Jan', position='F'); db.session.add(p); db.session.commit()
+        keys = [evs[1]['key'], evs[2]['key'], evs[5]['key'],
+                'series:%sf:2026-10-05' % sid, 'local:1']      # a series id extending this one
+        for k in keys:
+            db.session.add(AttendanceEntry(team_id=self.tid, player_id=p.id, event_key=k, status='going',
+                                           event_day=date(2026, 9, 14), source='coachhub_coach'))
+        db.session.commit()
+        self.client.post('/calendar/delete', data={'id': evs[2]['key'], 'scope': 'future'})
+        self.assertEqual(sorted(a.event_key for a in AttendanceEntry.query),
+                         sorted([keys[0]] + keys[3:]))
+
+    def test_keys_resolve_for_attendance_and_stay_team_scoped(self):
+        from coach.blueprints.calendar import _resolve_events_for_team
+        evs = self._make_series()
+        key = evs[2]['key']
+        got = _resolve_events_for_team(self.tid, [key, key[:-1] + '9', 'series:nope'],
+                                       date(2026, 1, 1), date(2026, 12, 31))
+        self.assertEqual(list(got), [key])
+        self.assertEqual(got[key]['day'], date(2026, 9, 21))
+        other = Team(name='Other'); db.session.add(other); db.session.commit()
+        self.assertEqual(_resolve_events_for_team(other.id, [key], date(2026, 1, 1),
+                                                  date(2026, 12, 31)), {})
+        with self.client.session_transaction() as s:
+            s['team_id'] = other.id
+        self.client.post('/calendar/delete', data={'id': key, 'scope': 'series'})
+        self.assertEqual(EventSeries.query.count(), 1)
+
+    def test_split_tail_reproduces_rule_dates(self):
+        for freq, wds, start in (('biweekly', ['TU', 'FR'], date(2026, 9, 2)),
+                                 ('monthly', [], date(2026, 1, 31)),
+                                 ('weekly', ['MO', 'WE', 'SA'], date(2026, 9, 3))):
+            dates, _ = rec.generate_dates(start, freq, weekdays=wds, count=20)
+            sid = event_series.create(self.tid, start, dates, freq, wds, '18:00', 'T', 'training')
+            db.session.commit()
+            cut = dates[7]
+            event_series.update(self.tid, event_series.occurrence_key(sid, cut), 'future',
+                                '19:00', 'T2', 'training')
+            db.session.commit()
+            got = [oc.day for oc in event_series.occurrences(self.tid, date(2025, 1, 1), date(2031, 1, 1))
+                   if oc.series_id == sid]
+            self.assertEqual(got, dates, freq)
+
+    def test_team_context_sees_todays_occurrence(self):
+        from coach.services import team_context
+        today = date.today()
+        self.client.post('/calendar/add', data={'day': today.isoformat(), 'title': 'Ranní',
+                                                 'kind': 'training', 'repeat': 'daily', 'count': '3'})
+        snap = team_context.load_snapshot(self.tid, today=today)
+        self.assertTrue(snap.has_today_event)
+        self.assertEqual(snap.today_event_title, 'Ranní')
+
+
 if __name__ == '__main__':
     unittest.main()
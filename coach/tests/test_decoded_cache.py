@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Process-level decoded-payload cache (Týmuj status payload, league view).
+
+- The LRU stays inside its memory budget and evicts least recently used first.
+- Repeated reads skip JSON decoding until the source row is written again.
+- A write (refresh, team match change) is visible on the very next read.
+"""
+import json
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+from coach.app import app
+from coach.extensions import db
+from coach.models import AuditEvent, Team
+from coach.services import decoded_cache
+from coach.services import tymuj as tymuj_svc
+from coach.services.league import get_connector
+from coach.services.league import service as league_svc
+from coach.services.league.base import decode_html, parse_doc
+from coach.tests.test_league_parser import SAMPLE, URL
+
+
+class LruTest(unittest.TestCase):
+    def setUp(self):
+        decoded_cache.invalidate()
+
+    def tearDown(self):
+        decoded_cache.invalidate()
+
+    def test_evicts_least_recently_used_within_budget(self):
+        budget = 10 * decoded_cache._OVERHEAD
+        with patch.object(decoded_cache, 'MAX_BYTES', budget):
+            decoded_cache.put(('ns', 1), 'a', cost=4)
+            decoded_cache.put(('ns', 2), 'b', cost=4)
+            self.assertEqual(decoded_cache.get(('ns', 1)), 'a')   # 1 is now most recent
+            decoded_cache.put(('ns', 3), 'c', cost=4)
+            self.assertIsNone(decoded_cache.get(('ns', 2)))
+            self.assertEqual(decoded_cache.get(('ns', 1)), 'a')
+            self.assertLessEqual(decoded_cache.stats()['bytes'], budget)
+            decoded_cache.put(('ns', 4), 'huge', cost=11)
+            self.assertIsNone(decoded_cache.get(('ns', 4)))
+
+    def test_invalidate_by_team(self):
+        decoded_cache.put(('a', 1, 'x'), {}, cost=1)
+        decoded_cache.put(('a', 2, 'x'), {}, cost=1)
+        decoded_cache.invalidate(team_id=1)
+        self.assertIsNone(decoded_cache.get(('a', 1, 'x')))
+        self.assertEqual(decoded_cache.get(('a', 2, 'x')), {})
+
+
+class _DbBase(unittest.TestCase):
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        decoded_cache.invalidate()
+        self.team = Team(name='HC Smíchov 1913'); db.session.add(self.team); db.session.commit()
+        self.tid = self.team.id
+
+    def tearDown(self):
+        decoded_cache.invalidate()
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+
+
+class LeagueViewCacheTest(_DbBase):
+    def _seed(self):
+        league_svc.save_config(self.tid, True, URL, 'HC Smíchov')
+        li = league_svc.get_integration(self.tid)
+        data = get_connector(URL).parse(
+            parse_doc(decode_html(SAMPLE.encode('cp1250'), 'charset=windows-1250')), URL).to_dict()
+        data['_schema'] = league_svc.CACHE_SCHEMA
+        li.data_json = json.dumps(data, ensure_ascii=False)
+        db.session.commit()
+        return li
+
+    def test_repeat_view_skips_decoding(self):
+        self._seed()
+        first = league_svc.get_view(self.tid)
+        with patch.object(league_svc.json, 'loads', wraps=json.loads) as loads:
+            again = league_svc.get_view(self.tid)
+        self.assertFalse(loads.called)
+        self.assertIs(again['standings'], first['standings'])
+        self.assertEqual(again['team_row'], first['team_row'])
+
+    def test_error_is_fresh_and_team_change_rebuilds(self):
+        li = self._seed()
+        first = league_svc.get_view(self.tid)
+        self.assertEqual(first['team_row']['team_name'], 'HC Smíchov 1913')
+        li.last_error = 'timeout'; db.session.commit()
+        self.assertEqual(league_svc.get_view(self.tid)['error'], 'timeout')
+        other = next(s['team_name'] for s in first['standings']
+                     if s['team_name'] != 'HC Smíchov 1913')
+        li.highlight_team = other; db.session.commit()
+        self.assertEqual(league_svc.get_view(self.tid)['team_row']['team_name'], other)
+
+
+class TymujPayloadCacheTest(_DbBase):
+    def _payload(self, **extra):
+        p = {'cache_schema': tymuj_svc.CACHE_SCHEMA, 'participants': ['Jan'],
+             'stats': {'event_count': 0}, 'last_success': '2026-07-01T10:00:00'}
+        p.update(extra)
+        return p
+
+    def test_repeat_read_skips_the_payload_row(self):
+        tymuj_svc._write_cache(self.tid, self._payload())
+        self.assertEqual(tymuj_svc._cache_payload(self.tid)['participants'], ['Jan'])
+        seen = []
+
+        def _on_exec(conn, cursor, statement, *a):
+            seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            again = tymuj_svc._cache_payload(self.tid)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        self.assertEqual(again['participants'], ['Jan'])
+        self.assertFalse([s for s in seen if 'audit_event' in s])
+
+    def test_write_is_visible_on_next_read(self):
+        tymuj_svc._write_cache(self.tid, self._payload())
+        tymuj_svc._cache_payload(self.tid)
+        tymuj_svc._write_cache(self.tid, self._payload(participants=['Petr']))
+        self.assertEqual(tymuj_svc.get_cached_participants(self.tid), ['Petr'])
+
+    def test_load_for_write_returns_private_copy(self):
+        tymuj_svc._write_cache(self.tid, self._payload())
+        shared = tymuj_svc._cache_payload(self.tid)
+        own = tymuj_svc._load_cache_payload(self.tid)
+        own['participants'].append('X')
+        self.assertEqual(shared['participants'], ['Jan'])
+        self.assertEqual(AuditEvent.query.filter_by(event=tymuj_svc.CACHE_EVENT).count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
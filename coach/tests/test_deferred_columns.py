@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Heavy text columns (Drill.image_data/path_data, LeagueIntegration.data_json,
+AuditEvent.meta) are deferred: list pages never SELECT them, and only the views
+that render them load them — in the same query, not one per row."""
+import json
+import unittest
+
+from sqlalchemy import event
+
+from coach.app import app
+from coach.extensions import db
+from coach.models import AuditEvent, Drill, LeagueIntegration, Team
+from coach.services import decoded_cache
+from coach.services import tymuj as tymuj_svc
+from coach.services.league import service as league_svc
+from coach.tests.session_helpers import login_session
+
+
+class DeferredColumnsTest(unittest.TestCase):
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        decoded_cache.invalidate()
+        t = Team(name='HC Lehký'); db.session.add(t); db.session.flush()
+        self.tid = t.id
+        self.drills = [Drill(team_id=self.tid, name='Cvičení %d' % i, category='Útok',
+                             path_data=json.dumps([{'tool': 'line', 'points': [[i, i]] * 50}]))
+                       for i in range(5)]
+        db.session.add_all(self.drills)
+        db.session.add_all([AuditEvent(event='message', team_id=self.tid, role='coach',
+                                       meta=json.dumps({'text': 'Zpráva %d' % i}))
+                            for i in range(3)])
+        db.session.commit()
+        self.client = app.test_client()
+        login_session(self.client, self.tid, 'coach')
+
+    def tearDown(self):
+        decoded_cache.invalidate()
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+
+    def _statements(self, fn):
+        seen = []
+
+        def _on_exec(conn, cursor, statement, *a):
+            seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        return result, seen
+
+    def test_drill_lists_do_not_select_heavy_columns(self):
+        for page in ('/drills', '/drills/select', '/drills/Útok', '/drill-sessions', '/app'):
+            r, seen = self._statements(lambda: self.client.get(page))
+            self.assertEqual(r.status_code, 200, page)
+            heavy = [s for s in seen if 'image_data' in s or 'path_data' in s]
+            self.assertEqual(heavy, [], page)
+
+    def test_drill_detail_loads_path_data_with_the_row(self):
+        drill_id = self.drills[2].id
+        db.session.expunge_all()                                     # a fresh request session
+        r, seen = self._statements(lambda: self.client.get('/drill/%d' % drill_id))
+        self.assertEqual(r.status_code, 200)
+        self.assertIn('points', r.get_data(as_text=True))
+        drill_selects = [s for s in seen if 'FROM drill' in s and 'drill.id = ' in s]
+        self.assertEqual(len(drill_selects), 1)
+        self.assertIn('path_data', drill_selects[0])
+        self.assertNotIn('image_data', drill_selects[0])
+
+    def test_message_views_load_meta_in_one_query(self):
+        for page in ('/nastenka', '/app'):
+            r, seen = self._statements(lambda: self.client.get(page))
+            self.assertEqual(r.status_code, 200, page)
+            meta_loads = [s for s in seen if 'audit_event.meta' in s]
+            self.assertLessEqual(len(meta_loads), 2, page)     # list query (+ Týmuj status)
+            self.assertIn('Zpráva 1', r.get_data(as_text=True), page)
+
+    def test_league_view_reads_data_json_only_on_a_cache_miss(self):
+        db.session.add(LeagueIntegration(team_id=self.tid, enabled=True, connector='vysledky',
+                                         source_url='https://example.com/x', highlight_team='HC Lehký',
+                                         data_json=json.dumps({'_schema': league_svc.CACHE_SCHEMA,
+                                                               'standings': [], 'results': []})))
+        db.session.commit()
+        db.session.expunge_all()
+        first, seen = self._statements(lambda: league_svc.get_view(self.tid))
+        data_loads = [s for s in seen if 'data_json' in s]
+        self.assertEqual(len(data_loads), 1)
+        self.assertNotIn('last_error', data_loads[0])                # the lookup leaves it out
+        db.session.expunge_all()
+        second, seen = self._statements(lambda: league_svc.get_view(self.tid))
+        self.assertEqual(second, first)
+        self.assertFalse([s for s in seen if 'data_json' in s])
+
+    def test_tymuj_cache_payload_is_undeferred(self):
+        tymuj_svc._write_cache(self.tid, {'cache_schema': tymuj_svc.CACHE_SCHEMA, 'participants': [],
+                                          'stats': {'event_count': 0}, 'events': []})
+        db.session.expunge_all()
+        payload, seen = self._statements(lambda: tymuj_svc._load_cache_payload(self.tid))
+        self.assertEqual(payload['stats'], {'event_count': 0})
+        self.assertEqual(len(seen), 1)
+        self.assertNotIn('audit_event.meta', AuditEvent.query.statement.compile().string)
+
+
+if __name__ == '__main__':
+    unittest.main()
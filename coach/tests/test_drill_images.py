@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Drill snapshots live in the content-addressed blob store: the editor's data
+URL is stored once per distinct image, rows keep only its sha256, and pages
+link to a team-checked, immutably cached image URL (cards: a small thumbnail)."""
+import base64
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+
+from coach.app import app
+from coach.extensions import db
+from coach.models import Drill, Team
+from coach.services import blob_store, drill_media
+from coach.tests.session_helpers import login_session
+
+
+def _data_url(color, size=(8, 6)):
+    buf = io.BytesIO()
+    Image.new('RGB', size, color).save(buf, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+class DrillImageStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.blobs = tempfile.mkdtemp()
+        self._folder = app.config.get('BLOB_FOLDER')
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, BLOB_FOLDER=self.blobs,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        self.team = Team(name='HC Obraz'); self.other = Team(name='HC Cizí')
+        db.session.add_all([self.team, self.other]); db.session.commit()
+        self.tid = self.team.id
+        self.client = app.test_client()
+        login_session(self.client, self.tid, 'coach')
+
+    def tearDown(self):
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+        app.config['BLOB_FOLDER'] = self._folder
+        shutil.rmtree(self.blobs, ignore_errors=True)
+
+    def _save(self, name, image):
+        self.client.post('/drill/save', data={'name': name, 'category': 'Útok',
+                                              'image_data': image, 'path_data': '[]'})
+        return Drill.query.filter_by(name=name).one()
+
+    def _files(self):
+        return sorted(f for _, _, files in os.walk(self.blobs) for f in files)
+
+    def test_save_stores_each_distinct_image_once(self):
+        a = self._save('A', _data_url('red'))
+        b = self._save('B', _data_url('red'))
+        c = self._save('C', _data_url('blue'))
+        self.assertTrue(blob_store.is_digest(a.image_hash))
+        self.assertEqual(a.image_hash, b.image_hash)
+        self.assertNotEqual(a.image_hash, c.image_hash)
+        self.assertEqual(self._files(), sorted({a.image_hash, c.image_hash, a.thumb_hash, c.thumb_hash}))
+        self.assertIsNone(a.image_data)
+        with Image.open(io.BytesIO(blob_store.get(a.image_hash))) as im:
+            self.assertEqual(im.size, (8, 6))
+        for bad in ('', 'data:text/html;base64,' + base64.b64encode(b'<b>x</b>').decode(), '%%%'):
+            self.assertIsNone(self._save('X%d' % len(bad), bad).image_hash)
+
+    def test_thumbnail_is_small_and_served(self):
+        d = self._save('A', _data_url('red', (900, 600)))
+        thumb = blob_store.get(d.thumb_hash)
+        with Image.open(io.BytesIO(thumb)) as im:
+            self.assertLessEqual(im.size[0], drill_media.THUMB_BOX[0])
+            self.assertEqual(im.size[0] * 2, im.size[1] * 3)         # aspect kept
+        self.assertLess(len(thumb), len(blob_store.get(d.image_hash)))
+        r = self.client.get('/drill-image/%s' % d.thumb_hash)
+        self.assertEqual(r.status_code, 200)
+        self.assertIn(r.mimetype, ('image/webp', 'image/png'))
+        self.assertIn('immutable', r.headers['Cache-Control'])
+
+    def test_update_replaces_or_keeps_the_snapshot(self):
+        d = self._save('A', _data_url('red'))
+        first = d.image_hash
+        form = {'name': 'A', 'category': 'Útok', 'path_data': '[]'}
+        self.client.post('/drill/%d/update' % d.id, data=dict(form, image_data=''))
+        db.session.expire_all()
+        self.assertEqual(d.image_hash, first)
+        self.client.post('/drill/%d/update' % d.id, data=dict(form, image_data=_data_url('green')))
+        db.session.expire_all()
+        self.assertNotEqual(d.image_hash, first)
+
+    def test_image_route_is_immutable_and_team_scoped(self):
+        d = self._save('A', _data_url('red'))
+        url = '/drill-image/%s' % d.image_hash
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.mimetype, 'image/png')
+        cc = r.headers['Cache-Control']
+        for part in ('private', 'immutable', 'max-age=31536000'):
+            self.assertIn(part, cc)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': '"%s"' % d.image_hash}).status_code, 304)
+        self.assertEqual(self.client.get('/drill-image/' + 'f' * 64).status_code, 404)
+        self.assertEqual(self.client.get('/drill-image/..%2F..%2Fapp.py').status_code, 404)
+        other = app.test_client()
+        login_session(other, self.other.id, 'coach')
+        self.assertEqual(other.get(url).status_code, 404)
+
+    def test_pages_link_the_blob_instead_of_inlining_it(self):
+        d = self._save('Přesilovka', _data_url('red'))
+        html = self.client.get('/drill/%d' % d.id).get_data(as_text=True)
+        self.assertIn('/drill-image/%s' % d.image_hash, html)         # full snapshot
+        for page in ('/drills', '/drills/select', '/drills/Útok'):
+            html = self.client.get(page).get_data(as_text=True)
+            self.assertNotIn('data:image/png;base64', html, page)
+            self.assertIn('/drill-image/%s' % d.thumb_hash, html, page)
+            self.assertNotIn('/drill-image/%s' % d.image_hash, html, page)
+            self.assertIn('loading="lazy"', html, page)
+        d.thumb_hash = None; db.session.commit()                    # not backfilled yet
+        self.assertIn('/drill-image/%s' % d.image_hash,
+                      self.client.get('/drills/select').get_data(as_text=True))
+
+    def test_library_page_size_does_not_grow_with_images(self):
+        for i in range(40):
+            self._save('Cvičení %02d' % i, _data_url((i * 6, 0, 0), (900, 600)))
+        self.assertLess(len(self.client.get('/drills').data), 100 * 1024)
+        self.assertLess(len(self.client.get('/drills/select').data), 100 * 1024)
+
+    def test_sweep_keeps_referenced_blobs(self):
+        keep = self._save('A', _data_url('red')).image_hash
+        thumb = Drill.query.filter_by(name='A').one().thumb_hash
+        gone = blob_store.put_data_url(_data_url('black'))
+        self.assertEqual(blob_store.sweep({keep, thumb}, min_age=3600), 0)   # too young
+        self.assertEqual(blob_store.sweep({keep, thumb}, min_age=-1), 1)
+        self.assertEqual(self._files(), sorted([keep, thumb]))
+        self.assertIsNone(blob_store.get(gone))
+
+
+if __name__ == '__main__':
+    unittest.main()
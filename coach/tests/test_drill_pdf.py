@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""Drill sheet PDFs are vector: text stays text, a snapshot is embedded once
+per document, prepared snapshots are cached by digest + layout version (a
+re-export prepares nothing), and uncached ones are prepared serially unless
+PDF_WORKERS enables the worker pool, which is bounded by a timeout and
+switched off for good after its first failure."""
+import io
+import os
+import re
+import shutil
+import tempfile
+import unittest
+import zlib
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from PIL import Image
+
+from coach.app import app
+from coach.extensions import db
+from coach.models import Drill, Team
+from coach.services import blob_store, drill_pdf, pdf_writer
+
+
+def _png(color, size=(300, 200)):
+    buf = io.BytesIO()
+    Image.new('RGB', size, color).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def _content(data):
+    """Decompressed page content streams of a PDF."""
+    out = []
+    for body, stream in re.findall(rb'obj\n(<<.*?>>)\nstream\n(.*?)\nendstream', data, re.S):
+        if b'/Subtype /Image' not in body:
+            out.append(zlib.decompress(stream))
+    return b'\n'.join(out)
+
+
+class PdfWriterTest(unittest.TestCase):
+    def test_structure_text_and_shared_images(self):
+        buf = io.BytesIO()
+        pdf = pdf_writer.PdfWriter(buf)
+        for _ in range(2):
+            page = pdf_writer.Page()
+            page.text(36, 36, 'Přihrávka (zpět) \\ ŘŽČ', size=18, bold=True)
+            page.line(36, 60, 559, 60)
+            page.image(pdf.add_image('a', (2, 1), b'\xff\x00\x00\x00\xff\x00'), 36, 72, 200, 100)
+            pdf.add_page(page)
+        pdf.close()
+        data = buf.getvalue()
+        self.assertTrue(data.startswith(b'%PDF-1.4') and data.rstrip().endswith(b'%%EOF'))
+        self.assertIn(b'/Count 2', data)
+        self.assertEqual(data.count(b'/Subtype /Image'), 1)
+        self.assertEqual(data.count(b'/BaseFont /Helvetica-Bold'), 1)
+        xref = int(data.rsplit(b'startxref', 1)[1].split()[0])
+        self.assertTrue(data[xref:].startswith(b'xref'))
+        for num, offset in enumerate(re.findall(rb'(\d{10}) 00000 n', data), start=1):
+            self.assertTrue(data[int(offset):].startswith(b'%d 0 obj' % num))
+        content = _content(data)
+        self.assertIn('(Přihrávka \\(zpět\\) \\\\ ŘŽČ) Tj'.encode('cp1250'), content)
+        self.assertIn(b'36 782 m 559 782 l S', content)
+        self.assertIn(b'q 200 0 0 100 36 670 cm /Im1 Do Q', content)
+
+    def test_encoding_covers_czech_and_slovak(self):
+        encoding = pdf_writer._ENCODING
+        for ch in 'ěščřžůťďňľĺŕĚŠČŘŽŮŤĎŇĽĹŔ':
+            code = ch.encode('cp1250')[0]
+            if ch in pdf_writer._GLYPHS:
+                self.assertIn(b'%d /%s' % (code, pdf_writer._GLYPHS[ch].encode()), encoding, ch)
+            else:                                                    # already WinAnsi (š, ž)
+                self.assertEqual(ch.encode('cp1252')[0], code, ch)
+        self.assertEqual(pdf_writer._pdf_string('Ω'), b'(?)')
+
+    def test_wrap_uses_helvetica_metrics(self):
+        self.assertEqual(pdf_writer.text_width('Mi', 10), (833 + 222) / 100)
+        self.assertEqual(pdf_writer.text_width('č', 10), pdf_writer.text_width('c', 10))
+        lines = pdf_writer.wrap('slovo ' * 100, 12, 200, max_lines=6)
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(all(pdf_writer.text_width(l, 12) <= 200 for l in lines))
+
+
+class DrillPdfTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self._config = {k: app.config.get(k) for k in ('BLOB_FOLDER', 'PAGE_CACHE_FOLDER')}
+        app.config.update(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///:memory:',
+                          BLOB_FOLDER=os.path.join(self.tmp, 'blobs'),
+                          PAGE_CACHE_FOLDER=os.path.join(self.tmp, 'pages'))
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        t = Team(name='HC Papír'); db.session.add(t); db.session.flush()
+        self.drills = [Drill(team_id=t.id, name='Cvičení %d' % i, category='Útok', duration=10 + i,
+                             description='Přihrávka do pohybu a střela z první. ' * 8,
+                             image_hash=blob_store.put(_png((40 * i, 90, 160))))
+                       for i in range(3)]
+        self.drills.append(Drill(team_id=t.id, name='Bez obrázku'))
+        db.session.add_all(self.drills); db.session.commit()
+        self.workers = mock.patch.object(drill_pdf, 'WORKERS', 0)    # serial unless a test opts in
+        self.workers.start()
+
+    def tearDown(self):
+        self.workers.stop()
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+        app.config.update(self._config)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _export(self, drills=None):
+        path = os.path.join(self.tmp, 'out.pdf')
+        stats = drill_pdf.export(drills or self.drills, path)
+        with open(path, 'rb') as fh:
+            return stats, fh.read()
+
+    def test_pages_carry_real_text_and_the_snapshot(self):
+        stats, data = self._export()
+        self.assertEqual(stats, {'pages': 4, 'images': 3, 'cached': 0, 'rendered': 3})
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', data)), 4)
+        self.assertEqual(data.count(b'/Subtype /Image /Width 300 /Height 200'), 3)
+        content = _content(data)
+        for text in ('Cvičení 1', 'Kategorie: Útok  •  Doba: 11 min', 'Přihrávka do pohybu',
+                     '(Bez náhledu cvičení)'):
+            self.assertIn(text.replace('(', '\\(').replace(')', '\\)').encode('cp1250'), content, text)
+
+    def test_a_snapshot_is_embedded_once(self):
+        stats, data = self._export([self.drills[0]] * 3)
+        self.assertEqual((stats['pages'], stats['images'], stats['rendered']), (3, 1, 1))
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', data)), 3)
+        self.assertEqual(data.count(b'/Subtype /Image'), 1)
+        self.assertEqual(_content(data).count(b'/Im1 Do'), 3)
+
+    def test_reexport_reads_every_snapshot_from_the_cache(self):
+        _, first = self._export()
+        with mock.patch.object(drill_pdf, 'prepare_image', side_effect=AssertionError('prepared')):
+            stats, again = self._export()
+        self.assertEqual(stats, {'pages': 4, 'images': 3, 'cached': 3, 'rendered': 0})
+        self.assertEqual(again, first)
+
+    def test_only_new_snapshots_and_layout_changes_are_prepared(self):
+        self._export()
+        self.drills[1].description = 'Nový popis'
+        self.drills[2].image_hash = blob_store.put(_png('white'))
+        stats, data = self._export()
+        self.assertEqual((stats['cached'], stats['rendered']), (2, 1))
+        self.assertIn(b'(Nov\xfd popis) Tj', _content(data))
+        with mock.patch.object(drill_pdf, 'LAYOUT_VERSION', drill_pdf.LAYOUT_VERSION + 1):
+            stats, _ = self._export()
+        self.assertEqual(stats['rendered'], 3)
+
+    def test_pool_is_off_unless_configured(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('PDF_WORKERS', None)
+            self.assertEqual(drill_pdf._env_workers(), 0)
+            os.environ['PDF_WORKERS'] = 'four'
+            self.assertEqual(drill_pdf._env_workers(), 0)
+            os.environ['PDF_WORKERS'] = '3'
+            self.assertEqual(drill_pdf._env_workers(), 3)
+        with mock.patch.object(drill_pdf, 'ProcessPoolExecutor') as executor:
+            stats, _ = self._export()
+        self.assertEqual(stats['rendered'], 3)
+        executor.assert_not_called()
+
+    def test_uncached_snapshots_go_through_the_pool_with_a_timeout(self):
+        pool = mock.Mock()
+        pool.map.side_effect = lambda fn, paths, timeout: [fn(p) for p in paths]
+        with mock.patch.object(drill_pdf, '_executor', return_value=pool):
+            stats, _ = self._export()
+        self.assertEqual(stats['rendered'], 3)
+        paths = list(pool.map.call_args[0][1])
+        self.assertEqual(len(paths), 3)
+        self.assertTrue(all(os.path.isfile(p) for p in paths))       # workers need no app context
+        self.assertEqual(pool.map.call_args[1]['timeout'], drill_pdf.POOL_TIMEOUT)
+
+    def test_real_pool_prepares_the_same_streams(self):
+        paths = [blob_store.locate(d.image_hash)[0] for d in self.drills[:2]]
+        with mock.patch.object(drill_pdf, 'WORKERS', 2):
+            try:
+                pooled = drill_pdf._prepare_all(paths)
+            finally:
+                drill_pdf._shutdown_pool()
+        self.assertFalse(drill_pdf._pool_failed)
+        self.assertEqual(pooled, [drill_pdf.prepare_image(p) for p in paths])
+
+    def test_failed_pool_stays_off_for_the_process(self):
+        for failure in (BrokenProcessPool('worker died'), TimeoutError()):
+            shutil.rmtree(app.config['PAGE_CACHE_FOLDER'], ignore_errors=True)
+            with mock.patch.object(drill_pdf, 'WORKERS', 2), \
+                    mock.patch.object(drill_pdf, '_pool_failed', False), \
+                    mock.patch.object(drill_pdf, 'ProcessPoolExecutor') as executor:
+                executor.return_value.map.side_effect = failure
+                stats, _ = self._export()
+                self.assertEqual(stats['rendered'], 3)               # serially, same export
+                self.assertTrue(drill_pdf._pool_failed)
+                executor.return_value.shutdown.assert_called_once()
+                shutil.rmtree(app.config['PAGE_CACHE_FOLDER'], ignore_errors=True)
+                stats, _ = self._export()
+                self.assertEqual(stats['rendered'], 3)
+                executor.assert_called_once()                        # never restarted
+                self.assertEqual(executor.return_value.map.call_count, 1)
+
+    def test_prune_cache_drops_stale_entries(self):
+        self._export()
+        folder = app.config['PAGE_CACHE_FOLDER']
+        names = sorted(os.listdir(folder))
+        old = os.path.join(folder, names[0])
+        os.utime(old, (0, 0))
+        drill_pdf.prune_cache()
+        self.assertEqual(sorted(os.listdir(folder)), names[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
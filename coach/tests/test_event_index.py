@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Team event index: one table of local, lazy-series and Týmuj events that the
+attendance pages read, kept in step with every write to its sources."""
+import unittest
+from datetime import date
+from unittest import mock
+
+from sqlalchemy import event, update
+from sqlalchemy.exc import OperationalError
+
+from coach.app import app
+from coach.blueprints.calendar import _collect_events_for_team, _resolve_events_for_team
+from coach.extensions import db
+from coach.models import TeamEventIndex, Team, TrainingEvent
+from coach.services import decoded_cache, event_index, event_series
+from coach.services import recurrence as rec
+from coach.services import tymuj as tymuj_svc
+
+START, END = date(2026, 1, 1), date(2027, 12, 31)
+
+
+def _tymuj_payload(*events):
+    return {'cache_schema': tymuj_svc.CACHE_SCHEMA, 'participants': [],
+            'stats': {'event_count': len(events)},
+            'events': [dict({'uid': '', 'end_time': '', 'location': '', 'kind': 'training',
+                             'cancelled': False, 'recurring': False, 'source': 'tymuj'}, **e)
+                       for e in events]}
+
+
+class EventIndexTest(unittest.TestCase):
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        decoded_cache.invalidate()
+        t = Team(name='HC Index'); db.session.add(t); db.session.commit()
+        self.tid = t.id
+
+    def tearDown(self):
+        decoded_cache.invalidate()
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+
+    def _index(self):
+        return sorted((r.source, r.event_key, r.day, r.time, r.title, r.kind)
+                      for r in TeamEventIndex.query.filter_by(team_id=self.tid))
+
+    def _rebuilt(self):
+        before = self._index()
+        event_index.rebuild(self.tid)
+        db.session.commit()
+        return before, self._index()
+
+    def test_orm_and_bulk_writes_are_mirrored(self):
+        a = TrainingEvent(team_id=self.tid, day=date(2026, 9, 7), time='18:00', title='',
+                          kind=None, series_id='s1')
+        b = TrainingEvent(team_id=self.tid, day=date(2026, 9, 14), time=None, title='Led',
+                          kind='match', series_id='s1')
+        db.session.add_all([a, b]); db.session.commit()
+        self.assertEqual(self._index(), [
+            ('local', 'local:%d' % a.id, date(2026, 9, 7), '18:00', 'Trénink', 'training'),
+            ('local', 'local:%d' % b.id, date(2026, 9, 14), '', 'Led', 'match')])
+        a.title = 'Změna'; db.session.commit()
+        db.session.execute(update(TrainingEvent).where(TrainingEvent.series_id == 's1')
+                           .values(time='07:00').execution_options(synchronize_session=False))
+        db.session.commit()
+        self.assertEqual([(r[4], r[3]) for r in self._index()], [('Změna', '07:00'), ('Led', '07:00')])
+        TrainingEvent.query.filter_by(id=b.id).delete(); db.session.commit()
+        db.session.delete(a); db.session.commit()
+        self.assertEqual(self._index(), [])
+
+    def test_bulk_update_of_a_filtered_column_reindexes_the_matched_rows(self):
+        ev = TrainingEvent(team_id=self.tid, day=date(2026, 9, 7), title='A')
+        db.session.add(ev); db.session.commit()
+        db.session.execute(update(TrainingEvent).where(TrainingEvent.title == 'A')
+                           .values(title='B').execution_options(synchronize_session=False))
+        db.session.commit()
+        self.assertEqual([r[4] for r in self._index()], ['B'])
+
+    def test_only_a_missing_index_table_is_tolerated(self):
+        ev = TrainingEvent(team_id=self.tid, day=date(2026, 9, 7), title='A')
+        db.session.add(ev); db.session.commit()
+        TeamEventIndex.__table__.drop(db.engine)
+        with mock.patch.object(event_index, '_warned', False):
+            ev.title = 'B'; db.session.commit()
+            TrainingEvent.query.filter_by(id=ev.id).update({'time': '07:00'})
+            db.session.commit()
+        self.assertEqual((ev.title, ev.time), ('B', '07:00'))
+        TeamEventIndex.__table__.create(db.engine)
+        broken = OperationalError('INSERT', {}, Exception('disk I/O error'))
+        with mock.patch.object(event_index, 'sync_local', side_effect=broken):
+            with self.assertRaises(OperationalError):
+                TrainingEvent.query.filter_by(id=ev.id).update({'time': '08:00'})
+        db.session.rollback()
+
+    def test_tymuj_refresh_replaces_its_rows_and_skips_cancelled(self):
+        db.session.add(TrainingEvent(team_id=self.tid, day=date(2026, 9, 12), title='Trénink'))
+        db.session.commit()
+        tymuj_svc._write_cache(self.tid, _tymuj_payload(
+            {'day': '2026-09-12', 'time': '10:00', 'title': 'Zápas', 'kind': 'match'},
+            {'day': '2026-09-13', 'time': '10:00', 'title': 'Zrušeno', 'cancelled': True}))
+        rows = self._index()
+        self.assertEqual([r[0] for r in rows], ['local', 'tymuj'])
+        self.assertEqual(rows[1][1], tymuj_svc.make_event_key('Zápas', date(2026, 9, 12), '10:00',
+                                                              'match', 'tymuj'))
+        tymuj_svc._write_cache(self.tid, _tymuj_payload(
+            {'day': '2026-09-20', 'time': '', 'title': 'Nový'}))
+        self.assertEqual([(r[0], r[4]) for r in self._index()], [('local', 'Trénink'), ('tymuj', 'Nový')])
+
+    def test_lazy_series_writes_are_mirrored(self):
+        anchor = date(2026, 9, 7)
+        dates, _ = rec.generate_dates(anchor, 'weekly', weekdays=['MO'], count=6)
+        sid = event_series.create(self.tid, anchor, dates, 'weekly', ['MO'], '18:00', 'T', 'training')
+        db.session.commit()
+        key = lambda d: event_series.occurrence_key(sid, d)
+        event_series.update(self.tid, key(dates[1]), 'one', '19:00', 'Jedna', 'match')
+        event_series.delete(self.tid, key(dates[2]), 'one')
+        event_series.update(self.tid, key(dates[4]), 'future', '20:00', 'Pozdě', 'training')
+        db.session.commit()
+        live = [oc.as_event() for oc in event_series.occurrences(self.tid, START, END)]
+        self.assertEqual(_collect_events_for_team(self.tid, START, END), live)
+        self.assertEqual([e['title'] for e in live], ['T', 'Jedna', 'T', 'Pozdě', 'Pozdě'])
+        event_series.delete(self.tid, key(dates[0]), 'series'); db.session.commit()
+        self.assertEqual(self._index(), [])
+
+    def test_series_writes_rewrite_only_the_rows_they_touch(self):
+        anchor = date(2026, 9, 7)
+        dates, _ = rec.generate_dates(anchor, 'weekly', weekdays=['MO'], count=100)
+        sid = event_series.create(self.tid, anchor, dates, 'weekly', ['MO'], '18:00', 'T', 'training')
+        db.session.commit()
+        key = lambda d: event_series.occurrence_key(sid, d)
+
+        def row_ids():
+            return {r.event_key: r.id for r in TeamEventIndex.query.filter_by(team_id=self.tid)}
+        before = row_ids()
+        event_series.update(self.tid, key(dates[10]), 'one', '19:00', 'Jedna', 'match')
+        event_series.delete(self.tid, key(dates[20]), 'one')
+        db.session.commit()
+        after = row_ids()
+        self.assertEqual(after, {k: i for k, i in before.items() if k != key(dates[20])})
+        row = TeamEventIndex.query.filter_by(event_key=key(dates[10])).one()
+        self.assertEqual((row.time, row.title, row.kind), ('19:00', 'Jedna', 'match'))
+        event_series.update(self.tid, key(dates[50]), 'future', '20:00', 'Pozdě', 'training')
+        db.session.commit()
+        later = row_ids()
+        self.assertEqual({k: i for k, i in later.items() if k < key(dates[50])},
+                         {k: i for k, i in after.items() if k < key(dates[50])})
+        self.assertEqual({r.title for r in TeamEventIndex.query.filter(
+            TeamEventIndex.event_key >= key(dates[50]))}, {'Pozdě'})
+        event_series.delete(self.tid, key(dates[90]), 'future'); db.session.commit()
+        self.assertEqual(len(row_ids()), 89)
+        maintained, rebuilt = self._rebuilt()
+        self.assertEqual(maintained, rebuilt)
+
+    def test_pages_read_one_ordered_range_query(self):
+        db.session.add_all([
+            TrainingEvent(team_id=self.tid, day=date(2026, 9, 8), time='18:00', title='B'),
+            TrainingEvent(team_id=self.tid, day=date(2026, 9, 8), time='07:00', title='A'),
+        ])
+        db.session.commit()
+        tymuj_svc._write_cache(self.tid, _tymuj_payload(
+            {'day': '2026-09-08', 'time': '07:00', 'title': 'Led', 'kind': 'match'}))
+        seen = []
+        listener = lambda conn, cur, statement, params, ctx, many: seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            evs = _collect_events_for_team(self.tid, START, END)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(seen), 1)
+        self.assertIn('team_event_index', seen[0])
+        self.assertEqual([(e['time'], e['title'], e['source']) for e in evs],
+                         [('07:00', 'A', 'local'), ('07:00', 'Led', 'tymuj'), ('18:00', 'B', 'local')])
+        got = _resolve_events_for_team(self.tid, [evs[1]['key'], 'local:999', ' '], START, END)
+        self.assertEqual(got, {evs[1]['key']: evs[1]})
+        self.assertEqual(_resolve_events_for_team(self.tid, [evs[0]['key']],
+                                                  date(2026, 10, 1), END), {})
+
+    def test_rebuild_matches_the_maintained_index(self):
+        db.session.add(TrainingEvent(team_id=self.tid, day=date(2026, 9, 8), title='Led'))
+        dates, _ = rec.generate_dates(date(2026, 9, 2), 'daily', count=3)
+        event_series.create(self.tid, dates[0], dates, 'daily', [], '', 'D', 'training')
+        db.session.commit()
+        tymuj_svc._write_cache(self.tid, _tymuj_payload({'day': '2026-09-12', 'title': 'Z'}))
+        before, after = self._rebuilt()
+        self.assertEqual(len(after), 5)
+        self.assertEqual(before, after)
+
+
+if __name__ == '__main__':
+    unittest.main()
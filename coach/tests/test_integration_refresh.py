@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""Scheduled integration refresh (`flask integrations:refresh-all`).
+
+Planning respects cache freshness and failure back-off, jobs report outcome and
+duration per team, the per-host limit holds under the thread pool, and league
+jobs go through `maybe_auto_refresh`.
+"""
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from coach.app import app
+from coach.extensions import db
+from coach.models import AuditEvent, LeagueIntegration, Team
+from coach.services import integration_refresh as ir
+from coach.services import tymuj as tymuj_svc
+from coach.services.league import service as league_svc
+
+ICS = """BEGIN:VCALENDAR
+BEGIN:VEVENT
+UID:1@t
+DTSTART:20260701T173000
+SUMMARY:Trénink
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def _meta():
+    return {'status': 200, 'content_type': 'text/calendar', 'bytes': len(ICS),
+            'encoding': 'utf-8', 'final_url': 'http://feed.test/c.ics', 'redirected': False}
+
+
+class _Base(unittest.TestCase):
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        self.team = Team(name='HC Feed', tymuj_ics_url='http://feed.test/c.ics')
+        self.quiet = Team(name='HC Quiet')
+        db.session.add_all([self.team, self.quiet]); db.session.commit()
+        self.tid = self.team.id
+
+    def tearDown(self):
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+
+    def _seed_cache(self, age_seconds):
+        ts = (datetime.utcnow() - timedelta(seconds=age_seconds)).isoformat()
+        tymuj_svc._write_cache(self.tid, {'cache_schema': tymuj_svc.CACHE_SCHEMA,
+                                          'events': [], 'participants': [],
+                                          'stats': {'event_count': 0},
+                                          'last_success': ts, 'updated_at': ts})
+
+
+class PlanTest(_Base):
+    def test_never_refreshed_team_is_due_and_unconfigured_team_ignored(self):
+        jobs, skipped = ir.plan_jobs()
+        self.assertEqual([(j.team_id, j.kind, j.host) for j in jobs],
+                         [(self.tid, 'tymuj', 'feed.test')])
+        self.assertEqual(skipped, [])
+
+    def test_fresh_cache_is_skipped_unless_forced(self):
+        self._seed_cache(60)
+        jobs, skipped = ir.plan_jobs()
+        self.assertEqual(jobs, [])
+        self.assertEqual(skipped[0].outcome, 'skipped')
+        jobs, _ = ir.plan_jobs(force=True)
+        self.assertEqual(len(jobs), 1)
+
+    def test_old_cache_is_due(self):
+        self._seed_cache(ir.TYMUJ_REFRESH_SECONDS + 60)
+        jobs, _ = ir.plan_jobs()
+        self.assertEqual(len(jobs), 1)
+
+    def test_refresh_interval_never_exceeds_stale_threshold(self):
+        with patch.object(ir, 'TYMUJ_REFRESH_SECONDS', tymuj_svc.STALE_AFTER_SECONDS * 2):
+            self._seed_cache(tymuj_svc.STALE_AFTER_SECONDS + 1)
+            jobs, _ = ir.plan_jobs()
+        self.assertEqual(len(jobs), 1)
+
+    def test_enabled_league_is_planned(self):
+        db.session.add(LeagueIntegration(team_id=self.quiet.id, enabled=True,
+                                         source_url='https://www.vysledky.com/x'))
+        db.session.add(LeagueIntegration(team_id=self.tid, enabled=False,
+                                         source_url='https://www.vysledky.com/y'))
+        db.session.commit()
+        jobs, _ = ir.plan_jobs(team_ids=[self.quiet.id])
+        self.assertEqual([(j.team_id, j.kind, j.host) for j in jobs],
+                         [(self.quiet.id, 'league', 'www.vysledky.com')])
+
+
+class RunTest(_Base):
+    def test_inline_run_reports_outcome_and_duration(self):
+        with patch.object(tymuj_svc, '_fetch_ics_with_meta', return_value=(ICS, _meta())):
+            results = ir.run_all(app, workers=1, jitter=0)
+        self.assertEqual([(r.team_id, r.kind, r.outcome) for r in results],
+                         [(self.tid, 'tymuj', 'ok')])
+        self.assertGreaterEqual(results[0].duration, 0)
+        self.assertEqual(tymuj_svc.get_status(self.tid)['events_count'], 1)
+        self.assertIsNotNone(AuditEvent.query.filter_by(event='integration.refresh_all').first())
+
+    def test_failed_fetch_is_reported_not_raised(self):
+        with patch.object(tymuj_svc, '_fetch_ics_with_meta', side_effect=TimeoutError('slow')):
+            results = ir.run_all(app, workers=1, jitter=0)
+        self.assertEqual(results[0].outcome, 'failed')
+        self.assertEqual(results[0].message, tymuj_svc.FAIL_MESSAGE)
+
+    def test_league_job_uses_maybe_auto_refresh(self):
+        db.session.add(LeagueIntegration(team_id=self.quiet.id, enabled=True,
+                                         source_url='https://www.vysledky.com/x',
+                                         last_updated=datetime.utcnow(),
+                                         data_json='{"_schema": %d}' % league_svc.CACHE_SCHEMA))
+        db.session.commit()
+        with patch.object(league_svc, 'refresh') as refresh:
+            results = ir.run_all(app, workers=1, jitter=0, team_ids=[self.quiet.id])
+        self.assertFalse(refresh.called)
+        self.assertEqual([(r.kind, r.outcome) for r in results], [('league', 'skipped')])
+        with patch.object(league_svc, 'refresh', return_value=(True, 'ok')) as refresh:
+            results = ir.run_all(app, workers=1, jitter=0, team_ids=[self.quiet.id], force=True)
+        self.assertTrue(refresh.called)
+        self.assertEqual(results[0].outcome, 'ok')
+
+    def test_pool_respects_per_host_limit(self):
+        jobs = [ir.RefreshJob(i, 'tymuj', 'http://a.test/%d' % i, 'a.test') for i in range(6)]
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def fake_refresh(job, force):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return 'ok', ''
+        with patch.object(ir, 'plan_jobs', return_value=(jobs, [])), \
+             patch.object(ir, '_refresh', side_effect=fake_refresh):
+            results = ir.run_all(app, workers=6, per_host=2, jitter=0)
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(r.outcome == 'ok' for r in results))
+        self.assertLessEqual(peak[0], 2)
+
+    def test_cli_command(self):
+        with patch.object(tymuj_svc, '_fetch_ics_with_meta', return_value=(ICS, _meta())):
+            res = app.test_cli_runner().invoke(
+                args=['integrations:refresh-all', '--workers', '1', '--jitter', '0'])
+        self.assertEqual(res.exit_code, 0, res.output)
+        self.assertIn('tymuj', res.output)
+        self.assertIn('Refreshed: 1, total: 1', res.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
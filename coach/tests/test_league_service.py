@@ -91,3 +91,27 @@ def test_sanity_guard_rejects_corrupt_points(ctx):
     db.session.commit()
     v = svc.get_view(ctx)
     assert v['stale_schema'] is True
+
+
+def test_refresh_not_modified_keeps_cache(ctx):
+    import urllib.error
+    from unittest.mock import patch
+    from coach.services.league import base
+    li = _seed(ctx)
+    data = json.loads(li.data_json)
+    data['_http'] = {'etag': '"abc"', 'last_modified': None, 'sha256': None,
+                     'form_team': 'HC Smíchov 1913'}
+    li.data_json = json.dumps(data, ensure_ascii=False)
+    db.session.commit()
+    before = li.data_json
+    not_modified = urllib.error.HTTPError(URL, 304, 'Not Modified', {}, None)
+    with patch.object(base, 'validate_public_http_url', return_value=(True, '')), \
+         patch.object(base, 'safe_urlopen', side_effect=not_modified) as opener, \
+         patch.object(svc, 'parse_doc') as parse:
+        ok, _msg = svc.refresh(ctx, manual=True)
+    assert ok is True
+    assert opener.call_args.kwargs['headers']['If-None-Match'] == '"abc"'
+    assert not parse.called
+    li = svc.get_integration(ctx)
+    assert li.data_json == before
+    assert li.last_error is None and li.last_updated is not None
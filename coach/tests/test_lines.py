@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 """Formace 2.0: render, modes, substitutes, special teams, save/load, export."""
+import os
+import re
 import unittest
+import zlib
+from urllib.parse import parse_qs, urlparse
 
 from coach.app import app
 from coach.extensions import db
@@ -102,6 +106,24 @@ class LinesTest(unittest.TestCase):
         r = self.client.post('/lines/export_pdf', data={'opponent': 'Rival', 'date': '2026-09-01'})
         self.assertEqual(r.status_code, 302)             # redirect to export result
 
+    def test_export_pdf_is_text(self):
+        self._login('coach')
+        db.session.add(LineAssignment(team_id=self.tid, player_id=self.f.id, slot='L1LW'))
+        db.session.commit()
+        r = self.client.post('/lines/export_pdf', data={'opponent': 'Rival', 'date': '2026-09-01'})
+        filename = parse_qs(urlparse(r.headers['Location']).query)['file'][0]
+        path = os.path.join(app.config['EXPORT_FOLDER'], filename)
+        try:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+        finally:
+            os.remove(path)
+        self.assertNotIn(b'/Subtype /Image', data)
+        stream = re.search(rb'stream\n(.*?)\nendstream', data, re.S).group(1)
+        content = zlib.decompress(stream)
+        self.assertIn('(Útok: Forward One – - – -) Tj'.encode('cp1250'), content)
+        self.assertIn('(Brankáři) Tj'.encode('cp1250'), content)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -6,6 +6,7 @@ from datetime import date
 from coach.app import app
 from coach.extensions import db
 from coach.models import Player, Team, TeamKey, PaymentPeriod, PaymentStatus
+from coach.services.attendance_import import _read_xlsx
 from coach.services.keys import hash_team_key
 from coach.tests.session_helpers import login_session
 
@@ -139,5 +140,48 @@ class PokladnaTest(unittest.TestCase):
         self.assertIn('Červenec 2026', r.get_data(as_text=True))
 
 
+    # ---- XLSX export ----
+    def test_month_export_xlsx(self):
+        self._login('coach')
+        p = PaymentPeriod(team_id=self.tid, year=2026, month=7, amount=2500)
+        db.session.add(p); db.session.flush()
+        db.session.add(PaymentStatus(team_id=self.tid, period_id=p.id,
+                                     player_id=self.players[0].id, status='paid'))
+        db.session.add(PaymentStatus(team_id=self.tid, period_id=p.id,
+                                     player_id=self.players[2].id, status='partial'))
+        db.session.commit()
+        r = self.client.get('/pokladna/2026/7/export.xlsx')
+        self.assertEqual(r.status_code, 200)
+        self.assertIn('pokladna_2026_07.xlsx', r.headers['Content-Disposition'])
+        self.assertEqual(_read_xlsx(r.get_data()), [
+            ['Hráč', 'Pozice', 'Stav', 'Příspěvek (Kč)'],
+            ['Jan Dvořák', 'F', 'Částečně', '2500'],
+            ['Martin Novák', 'F', 'Zaplaceno', '2500'],
+            ['Petr Svoboda', 'F', 'Nezaplaceno', '2500']])
+        self.assertEqual(self.client.get('/pokladna/2026/8/export.xlsx').status_code, 302)
+
+    def test_year_export_xlsx(self):
+        self._login('coach')
+        jul = PaymentPeriod(team_id=self.tid, year=2026, month=7, amount=2500)
+        sep = PaymentPeriod(team_id=self.tid, year=2026, month=9, amount=3000)
+        db.session.add_all([jul, sep, PaymentPeriod(team_id=self.tid, year=2025, month=9, amount=1)])
+        db.session.flush()
+        db.session.add(PaymentStatus(team_id=self.tid, period_id=sep.id,
+                                     player_id=self.players[1].id, status='paid'))
+        db.session.commit()
+        grid = _read_xlsx(self.client.get('/pokladna/2026/export.xlsx').get_data())
+        self.assertEqual(grid[0][:3], ['Hráč', 'Pozice', 'Leden'])
+        self.assertEqual(grid[0][-1], 'Prosinec')
+        self.assertEqual(grid[1][8:11], ['2500', '', '3000'])        # Červenec, Srpen, Září
+        petr = next(row for row in grid if row[0] == 'Petr Svoboda')
+        self.assertEqual(petr[8:11], ['Nezaplaceno', '', 'Zaplaceno'])
+        self.assertEqual(petr[2:8], [''] * 6)
+
+    def test_exports_are_coach_only(self):
+        self._login('player')
+        self.assertEqual(self.client.get('/pokladna/2026/export.xlsx').status_code, 302)
+        self.assertEqual(self.client.get('/pokladna/2026/7/export.xlsx').status_code, 302)
+
+
 if __name__ == '__main__':
     unittest.main()
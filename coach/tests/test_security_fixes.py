@@ -79,7 +79,9 @@ class _FakeResp:
     def __init__(self, body=b'OK'):
         self._body = body
     def read(self, n=-1):
-        return self._body if n is None or n < 0 else self._body[:n]
+        n = len(self._body) if n is None or n < 0 else n
+        out, self._body = self._body[:n], self._body[n:]
+        return out
     def __enter__(self):
         return self
     def __exit__(self, *a):
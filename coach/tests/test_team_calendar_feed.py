@@ -9,12 +9,14 @@ import re
 import unittest
 from datetime import date, timedelta
 
+from sqlalchemy import event
+
 from coach.app import app
 from coach.extensions import db
 from coach.models import (Team, TeamKey, Player, TrainingEvent,
                           TeamCalendarFeedToken)
 from coach.services.keys import hash_team_key
-from coach.services import calendar_feed
+from coach.services import calendar_feed, decoded_cache
 
 TOKEN_RE = re.compile(r'chhcal_[A-Za-z0-9_-]{20,}')
 
@@ -127,6 +129,67 @@ class FeedRouteTest(_Base):
         self.assertEqual(self._feed(new).status_code, 200)   # new works
 
 
+class FeedCacheTest(_Base):
+    """Polling is a cache lookup; clients revalidate with ETag/Last-Modified."""
+
+    def setUp(self):
+        super().setUp()
+        decoded_cache.invalidate()
+        self.tok = calendar_feed.get_or_create_active_token(self.aid).token
+        self.url = '/calendar/team/%s.ics' % self.tok
+
+    def tearDown(self):
+        decoded_cache.invalidate()
+        super().tearDown()
+
+    def _statements(self, fn):
+        seen = []
+
+        def _on_exec(conn, cursor, statement, *a):
+            seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            res = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        return res, seen
+
+    def test_repeat_poll_skips_event_query_and_is_identical(self):
+        first = self.client.get(self.url)
+        second, seen = self._statements(lambda: self.client.get(self.url))
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertFalse([s for s in seen if 'FROM training_event' in s])
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+        self.assertIn('Last-Modified', second.headers)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url).headers['ETag']
+        r = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r.get_data(), b'')
+        lm = self.client.get(self.url).headers['Last-Modified']
+        self.assertEqual(self.client.get(self.url, headers={'If-Modified-Since': lm}).status_code, 304)
+
+    def test_event_change_invalidates(self):
+        etag = self.client.get(self.url).headers['ETag']
+        db.session.add(TrainingEvent(team_id=self.aid, day=date.today() + timedelta(days=7),
+                                     time='19:00', title='Nová akce', kind='training',
+                                     source='coachhub_manual'))
+        db.session.commit()
+        r = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 200)
+        self.assertIn('Nová akce', r.get_data(as_text=True))
+        self.assertNotEqual(r.headers['ETag'], etag)
+
+    def test_other_team_change_keeps_cache(self):
+        etag = self.client.get(self.url).headers['ETag']
+        db.session.add(TrainingEvent(team_id=self.bid, day=date.today() + timedelta(days=7),
+                                     time='19:00', title='Beta 2', kind='training',
+                                     source='coachhub_manual'))
+        db.session.commit()
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 304)
+
+
 class DashboardUiTest(_Base):
     def test_dashboard_shows_team_feed_section_not_single_event(self):
         self._login(role='coach')
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Team context snapshot shared by the global context processors.
+
+- The snapshot carries exactly what brand / drill nav / notifications used to
+  query one by one.
+- It is built in at most two statements, memoized per request and cached
+  across requests.
+- The cross-request cache is keyed by the team's data revision, so a rename, a
+  new drill category or a new message shows up on the next page.
+"""
+import json
+import unittest
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from coach.app import app
+from coach.extensions import db
+from coach.models import (AuditEvent, Drill, PaymentPeriod, PaymentStatus, Player,
+                          Team, TrainingEvent)
+from coach.services import team_context
+
+
+class _Base(unittest.TestCase):
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        team_context.invalidate()
+        self.team = Team(name='HC Snapshot', primary_color='#112233')
+        db.session.add(self.team); db.session.commit()
+        self.tid = self.team.id
+        self.client = app.test_client()
+
+    def tearDown(self):
+        team_context.invalidate()
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+
+    def _login(self, role='coach'):
+        with self.client.session_transaction() as s:
+            s['team_id'] = self.tid; s['team_role'] = role; s['team_login'] = True
+
+    def _count_statements(self, fn):
+        seen = []
+
+        def _on_exec(conn, cursor, statement, *a):
+            seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        return result, seen
+
+
+class SnapshotContentTest(_Base):
+    def test_snapshot_matches_source_rows(self):
+        today = date.today()
+        db.session.add_all([
+            TrainingEvent(team_id=self.tid, day=today, time='18:00', title='Led', kind='training'),
+            TrainingEvent(team_id=self.tid, day=today + timedelta(days=1), time='19:00',
+                          title='Derby', kind='match'),
+            Drill(team_id=self.tid, name='A', category='Bruslení'),
+            Drill(team_id=self.tid, name='B', category='Bruslení'),
+            Drill(team_id=self.tid, name='C', category=None),
+            AuditEvent(event='message', team_id=self.tid, meta=json.dumps({'text': 'x'}),
+                       created_at=datetime.utcnow()),
+            AuditEvent(event='message', team_id=self.tid, meta=json.dumps({'text': 'old'}),
+                       created_at=datetime.utcnow() - timedelta(days=3)),
+        ])
+        p1, p2 = Player(team_id=self.tid, name='P1', position='F'), Player(team_id=self.tid, name='P2', position='D')
+        db.session.add_all([p1, p2]); db.session.flush()
+        period = PaymentPeriod(team_id=self.tid, year=today.year, month=today.month, amount=500)
+        db.session.add(period); db.session.flush()
+        db.session.add(PaymentStatus(team_id=self.tid, period_id=period.id, player_id=p1.id, status='paid'))
+        db.session.commit()
+
+        snap = team_context.load_snapshot(self.tid)
+        self.assertEqual(snap.team_name, 'HC Snapshot')
+        self.assertEqual(snap.primary_color, '#112233')
+        self.assertEqual(snap.drill_categories, ['Bruslení'])
+        self.assertTrue(snap.has_today_event)
+        self.assertEqual((snap.today_event_title, snap.today_event_kind), ('Led', 'training'))
+        self.assertTrue(snap.has_tomorrow_game)
+        self.assertEqual(snap.tomorrow_game_title, 'Derby')
+        self.assertEqual(snap.recent_message_count, 1)
+        self.assertEqual(snap.unpaid_count, 1)
+
+    def test_no_payment_period_means_no_unpaid_nag(self):
+        db.session.add(Player(team_id=self.tid, name='P1', position='F')); db.session.commit()
+        self.assertIsNone(team_context.load_snapshot(self.tid).unpaid_count)
+
+    def test_missing_team_returns_none(self):
+        self.assertIsNone(team_context.load_snapshot(self.tid + 999))
+
+    def test_snapshot_is_two_statements(self):
+        _snap, stmts = self._count_statements(lambda: team_context.load_snapshot(self.tid))
+        self.assertLessEqual(len(stmts), 2)
+
+
+class SnapshotCachingTest(_Base):
+    def test_cached_across_calls_until_the_revision_moves(self):
+        first = team_context.get_snapshot(self.tid)
+        again, stmts = self._count_statements(lambda: team_context.get_snapshot(self.tid))
+        self.assertIs(again, first)
+        # Only the primary-key revision lookup remains.
+        self.assertEqual(len(stmts), 1)
+        self.assertIn('team_data_revision', stmts[0])
+
+        self.team.name = 'HC Renamed'
+        db.session.commit()
+        self.assertEqual(team_context.get_snapshot(self.tid).team_name, 'HC Renamed')
+
+    def test_new_drill_category_invalidates(self):
+        self.assertEqual(team_context.get_snapshot(self.tid).drill_categories, [])
+        db.session.add(Drill(team_id=self.tid, name='A', category='Střelba')); db.session.commit()
+        self.assertEqual(team_context.get_snapshot(self.tid).drill_categories, ['Střelba'])
+
+    def test_other_team_write_keeps_cache(self):
+        other = Team(name='HC Other'); db.session.add(other); db.session.commit()
+        first = team_context.get_snapshot(self.tid)
+        db.session.add(Drill(team_id=other.id, name='X', category='Y')); db.session.commit()
+        self.assertIs(team_context.get_snapshot(self.tid), first)
+
+
+class ContextProcessorTest(_Base):
+    def test_page_renders_brand_and_notifications_from_snapshot(self):
+        db.session.add(TrainingEvent(team_id=self.tid, day=date.today(), time='18:00',
+                                     title='Večerní led', kind='training'))
+        db.session.commit()
+        self._login()
+        body = self.client.get('/players').get_data(as_text=True)
+        self.assertIn('HC Snapshot', body)
+        self.assertIn('Dnes Trénink: Večerní led', body)
+
+    def test_repeat_page_load_skips_snapshot_queries(self):
+        self._login()
+        self.client.get('/players')
+        _r, stmts = self._count_statements(lambda: self.client.get('/players'))
+        self.assertFalse([s for s in stmts if 'payment_period' in s or 'drill.category' in s])
+
+
+if __name__ == '__main__':
+    unittest.main()
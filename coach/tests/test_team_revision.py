@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Per-team data revision counter.
+
+The revision is the single cache key for team data, so it must move on every
+tracked write (and only for the owning team), stay put for pure bookkeeping
+writes (audit logs, login timestamps, refresh attempts), and roll back with
+the transaction that bumped it.
+"""
+import json
+import unittest
+from datetime import date, datetime
+
+from coach.app import app
+from coach.extensions import db
+from coach.models import (AttendanceEntry, AuditEvent, Drill, LeagueIntegration, Player,
+                          Team, TeamDataRevision, TrainingEvent)
+from coach.services import team_revision
+from coach.services.logging import log_event
+
+
+class _Base(unittest.TestCase):
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context(); self.ctx.push()
+        db.drop_all(); db.create_all()
+        self.team = Team(name='HC Rev'); db.session.add(self.team)
+        self.other = Team(name='HC Other'); db.session.add(self.other)
+        db.session.commit()
+        self.tid = self.team.id
+
+    def tearDown(self):
+        db.session.remove(); db.drop_all(); self.ctx.pop()
+
+    def rev(self, tid=None):
+        row = TeamDataRevision.query.filter_by(team_id=tid or self.tid).first()
+        return row.revision if row else 0
+
+
+class BumpOnFlushTest(_Base):
+    def test_team_creation_seeds_a_revision(self):
+        self.assertEqual(self.rev(), 1)
+        self.assertIsNotNone(team_revision.token(self.tid))
+
+    def test_tracked_insert_update_delete_bump(self):
+        start = self.rev()
+        ev = TrainingEvent(team_id=self.tid, day=date.today(), title='Led')
+        db.session.add(ev); db.session.commit()
+        self.assertEqual(self.rev(), start + 1)
+        ev.title = 'Led 2'; db.session.commit()
+        self.assertEqual(self.rev(), start + 2)
+        db.session.delete(ev); db.session.commit()
+        self.assertEqual(self.rev(), start + 3)
+
+    def test_one_bump_per_flush_and_only_owning_team(self):
+        other_start, start = self.rev(self.other.id), self.rev()
+        p = Player(team_id=self.tid, name='A', position='F')
+        db.session.add_all([p, Drill(team_id=self.tid, name='D')]); db.session.flush()
+        db.session.add(AttendanceEntry(team_id=self.tid, player_id=p.id, event_key='local:1',
+                                       event_day=date.today(), status='going'))
+        db.session.commit()
+        self.assertEqual(self.rev(), start + 2)
+        self.assertEqual(self.rev(self.other.id), other_start)
+
+    def test_messages_and_tymuj_cache_bump_but_audit_log_does_not(self):
+        start = self.rev()
+        log_event('team.login', team_id=self.tid, role='coach')
+        self.assertEqual(self.rev(), start)
+        db.session.add(AuditEvent(event='message', team_id=self.tid, meta=json.dumps({'text': 'x'})))
+        db.session.commit()
+        self.assertEqual(self.rev(), start + 1)
+        db.session.add(AuditEvent(event='tymuj.cache', team_id=self.tid, meta='{}'))
+        db.session.commit()
+        self.assertEqual(self.rev(), start + 2)
+
+    def test_team_bookkeeping_columns_do_not_bump(self):
+        start = self.rev()
+        self.team.last_active_at = datetime.utcnow(); db.session.commit()
+        self.assertEqual(self.rev(), start)
+        self.team.primary_color = '#ff0000'; db.session.commit()
+        self.assertEqual(self.rev(), start + 1)
+
+    def test_league_data_bumps_but_refresh_attempt_does_not(self):
+        li = LeagueIntegration(team_id=self.tid, enabled=True, source_url='http://x.invalid')
+        db.session.add(li); db.session.commit()
+        start = self.rev()
+        li.last_attempt = datetime.utcnow(); db.session.commit()
+        self.assertEqual(self.rev(), start)
+        li.data_json = '{"standings": []}'; db.session.commit()
+        self.assertEqual(self.rev(), start + 1)
+
+    def test_rollback_discards_the_bump(self):
+        start = self.rev()
+        db.session.add(Drill(team_id=self.tid, name='D')); db.session.flush()
+        db.session.rollback()
+        self.assertEqual(self.rev(), start)
+
+
+class TokenTest(_Base):
+    def test_token_changes_with_data(self):
+        with app.test_request_context('/'):
+            before = team_revision.token(self.tid)
+            db.session.add(Drill(team_id=self.tid, name='D')); db.session.commit()
+            self.assertNotEqual(team_revision.token(self.tid), before)
+
+    def test_explicit_bump_for_bulk_statements(self):
+        start = self.rev()
+        TrainingEvent.query.filter_by(team_id=self.tid).delete()
+        team_revision.bump(self.tid)
+        db.session.commit()
+        self.assertEqual(self.rev(), start + 1)
+
+    def test_missing_row_means_no_token(self):
+        db.session.query(TeamDataRevision).filter_by(team_id=self.tid).delete()
+        db.session.commit()
+        self.assertIsNone(team_revision.token(self.tid))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,15 +3,21 @@
 
 Covers parser robustness, cache lifecycle + fallback, refresh failure handling,
 attendance/import/dashboard reading only from cache, the no-fetch-on-render
-guarantee, the diagnostic trace and the owner debug page.
+guarantee, the diagnostic trace, the owner debug page and the indexed
+TymujEvent store behind the cache.
 """
+import json
 import unittest
+import urllib.error
 from datetime import date, timedelta
 from unittest.mock import patch
 
+from sqlalchemy import event
+
 from coach.app import app
 from coach.extensions import db
-from coach.models import AttendanceEntry, AuditEvent, Player, Team
+from coach.models import AttendanceEntry, AuditEvent, Player, Team, TymujEvent
+from coach.services import team_revision
 from coach.services import tymuj as tymuj_svc
 
 
@@ -110,6 +116,56 @@ class TymujParserTest(unittest.TestCase):
         self.assertEqual(enc.lower().replace('-', ''), 'windows1250')
 
 
+class TymujStreamParserTest(unittest.TestCase):
+    """IcsStreamParser: same result as parse_ics() whatever the chunking, and
+    the byte / event / line caps stop pathological feeds early."""
+
+    def _stream(self, raw, size, **kw):
+        parser = tymuj_svc.IcsStreamParser(**kw)
+        for i in range(0, len(raw), size):
+            parser.feed(raw[i:i + size])
+        return parser.close()
+
+    def test_any_chunking_matches_text_parse(self):
+        expected = tymuj_svc.parse_ics(ICS_RICH)
+        raw = ICS_RICH.replace('\n', '\r\n').replace('Trénink mládeže', 'Trénink\r\n  mládeže').encode('utf-8')
+        for size in (1, 3, 7, 64, len(raw)):
+            self.assertEqual(self._stream(raw, size), expected, size)
+
+    def test_events_come_back_as_they_complete(self):
+        parser = tymuj_svc.IcsStreamParser()
+        head, _sep, rest = ICS_RICH.partition('UID:2@t')
+        self.assertEqual([e['uid'] for e in parser.feed(head.encode('utf-8'))], ['1@t'])
+        self.assertEqual(len(parser.feed((_sep + rest).encode('utf-8'))), 3)
+
+    def test_windows1250_fallback_sticks(self):
+        out = self._stream(ICS_RICH.encode('cp1250'), 5)
+        self.assertEqual(out['participants'], ['Jan Novák', 'Petr Svoboda'])
+        parser = tymuj_svc.IcsStreamParser('text/calendar; charset=windows-1250')
+        parser.feed(ICS_RICH.encode('cp1250'))
+        parser.close()
+        self.assertEqual(parser.encoding, 'windows-1250')
+
+    def test_event_cap(self):
+        with self.assertRaises(tymuj_svc.IcsFetchError) as cm:
+            self._stream(ICS_RICH.encode('utf-8'), 64, max_events=2)
+        self.assertEqual(cm.exception.reason, 'too_large')
+
+    def test_byte_and_line_caps(self):
+        with self.assertRaises(tymuj_svc.IcsFetchError):
+            self._stream(ICS_RICH.encode('utf-8'), 64, max_bytes=100)
+        with self.assertRaises(tymuj_svc.IcsFetchError):
+            self._stream(b'BEGIN:VCALENDAR\n' + b'x' * (tymuj_svc.MAX_LINE_BYTES + 1), 4096)
+
+    def test_oversized_event_is_skipped(self):
+        blob = 'DESCRIPTION:' + 'x' * 70 + '\n' + ''.join(' %s\n' % ('y' * 70) for _ in range(40))
+        ics = ICS_RICH.replace('UID:3@t\n', 'UID:3@t\n' + blob)
+        with patch.object(tymuj_svc, 'MAX_EVENT_CHARS', 1000):
+            out = tymuj_svc.parse_ics(ics)
+        self.assertNotIn('3@t', {e['uid'] for e in out['events']})
+        self.assertEqual(out['stats']['event_count'], 3)
+
+
 # --------------------------------------------------------------------------
 # Cache lifecycle / refresh / fallback (DB :memory:)
 # --------------------------------------------------------------------------
@@ -237,6 +293,93 @@ class TymujCacheTest(unittest.TestCase):
         self.assertIn('Týmuj', res.get_data(as_text=True))
 
 
+class TymujEventStoreTest(unittest.TestCase):
+    """Events live in the indexed TymujEvent table; the AuditEvent payload
+    keeps only status/participants."""
+
+    def setUp(self):
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                          SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        self.team = Team(name='HC Store', tymuj_ics_url='http://feed.test/c.ics')
+        db.session.add(self.team)
+        db.session.commit()
+        self.tid = self.team.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _refresh(self, ics=ICS_RICH):
+        with patch.object(tymuj_svc, '_fetch_ics_with_meta', return_value=(ics, _meta())):
+            return tymuj_svc.refresh_cache(self.tid, self.team.tymuj_ics_url)
+
+    def test_refresh_writes_rows_and_slim_payload(self):
+        self._refresh()
+        self.assertEqual(TymujEvent.query.filter_by(team_id=self.tid).count(), 4)
+        row = AuditEvent.query.filter_by(team_id=self.tid, event=tymuj_svc.CACHE_EVENT).first()
+        payload = json.loads(row.meta)
+        self.assertNotIn('events', payload)
+        self.assertTrue(payload['events_table'])
+        self.assertEqual(payload['participants'], ['Jan Novák', 'Petr Svoboda'])
+        ev = TymujEvent.query.filter_by(team_id=self.tid, day=date(2026, 7, 3)).one()
+        self.assertEqual(ev.kind, 'match')
+        self.assertEqual(ev.event_key, tymuj_svc.make_event_key(
+            'Zápas s HC Soupeř', date(2026, 7, 3), '18:00', 'match', 'tymuj'))
+
+    def test_range_read_is_one_indexed_query(self):
+        self._refresh()
+        seen = []
+
+        def _on_exec(conn, cursor, statement, *a):
+            seen.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', _on_exec)
+        try:
+            evs = tymuj_svc.get_cached_events(self.tid, date(2026, 7, 2), date(2026, 7, 4))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _on_exec)
+        self.assertEqual([e['title'] for e in evs], ['Zápas s HC Soupeř'])
+        range_reads = [s for s in seen if 'FROM tymuj_event' in s]
+        self.assertEqual(len(range_reads), 1)
+        self.assertIn('tymuj_event.day >=', range_reads[0])
+
+    def test_refresh_replaces_previous_rows(self):
+        self._refresh()
+        self._refresh(ICS_RICH.replace('SUMMARY:Zápas s HC Soupeř', 'SUMMARY:Zápas s HC Jiný'))
+        titles = sorted(e.title for e in TymujEvent.query.filter_by(team_id=self.tid))
+        self.assertIn('Zápas s HC Jiný', titles)
+        self.assertNotIn('Zápas s HC Soupeř', titles)
+        self.assertEqual(len(titles), 4)
+
+    def test_failed_refresh_keeps_rows(self):
+        self._refresh()
+        with patch.object(tymuj_svc, '_fetch_ics_with_meta', side_effect=TimeoutError('boom')):
+            tymuj_svc.refresh_cache(self.tid, self.team.tymuj_ics_url)
+        self.assertEqual(TymujEvent.query.filter_by(team_id=self.tid).count(), 4)
+        self.assertTrue(tymuj_svc.get_status(self.tid)['has_cache'])
+
+    def test_legacy_json_payload_is_read_then_moved_on_write(self):
+        legacy = {'cache_schema': tymuj_svc.CACHE_SCHEMA, 'participants': [],
+                  'stats': {'event_count': 1},
+                  'events': [{'day': '2026-07-01', 'time': '18:00', 'title': 'Led',
+                              'kind': 'training', 'cancelled': False}]}
+        db.session.add(AuditEvent(event=tymuj_svc.CACHE_EVENT, team_id=self.tid,
+                                  meta=json.dumps(legacy)))
+        db.session.commit()
+        before = tymuj_svc.get_cached_events(self.tid, date(2026, 7, 1), date(2026, 7, 1))
+        self.assertEqual(TymujEvent.query.count(), 0)
+        tymuj_svc._write_cache(self.tid, tymuj_svc._load_cache_payload(self.tid))
+        self.assertEqual(TymujEvent.query.filter_by(team_id=self.tid).count(), 1)
+        after = tymuj_svc.get_cached_events(self.tid, date(2026, 7, 1), date(2026, 7, 1))
+        self.assertEqual(before, after)
+        self.assertEqual(tymuj_svc._validate_cache(tymuj_svc._load_cache_payload(self.tid),
+                                                   self.tid), (True, 'ok'))
+
+
 class _FakeResp:
     """Minimal urllib-response stand-in for safe_urlopen patches."""
     def __init__(self, body=b'', status=200, headers=None, raise_on_read=None):
@@ -249,7 +392,9 @@ class _FakeResp:
     def read(self, n=-1):
         if self._raise:
             raise self._raise
-        return self._body if (n is None or n < 0) else self._body[:n]
+        n = len(self._body) if (n is None or n < 0) else n
+        out, self._body = self._body[:n], self._body[n:]
+        return out
 
     def geturl(self):
         return 'http://feed.test/c.ics'
@@ -348,6 +493,16 @@ class TymujFetchReliabilityTest(unittest.TestCase):
         self.assertFalse(ok)
         self.assertEqual(tymuj_svc.get_status(self.tid)['last_error_code'], 'too_large')
 
+    def test_event_cap_rejected_in_fetch_path(self):
+        with patch.object(tymuj_svc, 'MAX_EVENTS', 2), \
+             patch.object(tymuj_svc, 'READ_CHUNK', 16), \
+             patch.object(tymuj_svc, 'safe_urlopen', return_value=_FakeResp(self._body())):
+            ok, _msg = tymuj_svc.refresh_cache(self.tid, self.team.tymuj_ics_url)
+        self.assertFalse(ok)
+        st = tymuj_svc.get_status(self.tid)
+        self.assertEqual(st['last_error_code'], 'too_large')
+        self.assertEqual(st['last_http']['status'], 200)
+
     def test_headers_captured_in_diagnostic_trace(self):
         with patch.object(tymuj_svc, 'safe_urlopen', return_value=_FakeResp(self._body())):
             ok, _msg, trace = tymuj_svc.diagnostic_refresh(self.tid)
@@ -368,6 +523,66 @@ class TymujFetchReliabilityTest(unittest.TestCase):
         self.assertEqual(fail['reason'], 'read_timeout')
         self.assertTrue(fail['retry_attempted'])
 
+    def _cache_row(self):
+        return AuditEvent.query.filter_by(team_id=self.tid, event=tymuj_svc.CACHE_EVENT).first().meta
+
+    def _first_refresh(self):
+        hdrs = {'Content-Type': 'text/calendar; charset=utf-8', 'ETag': '"v1"',
+                'Last-Modified': 'Wed, 01 Jul 2026 10:00:00 GMT'}
+        with patch.object(tymuj_svc, 'safe_urlopen', return_value=_FakeResp(self._body(), headers=hdrs)):
+            self.assertTrue(tymuj_svc.refresh_cache(self.tid, self.team.tymuj_ics_url)[0])
+
+    def test_validators_are_stored_and_sent(self):
+        self._first_refresh()
+        v = tymuj_svc._load_cache_payload(self.tid)['validators']
+        self.assertEqual(v['etag'], '"v1"')
+        self.assertEqual(len(v['sha256']), 64)
+        not_modified = urllib.error.HTTPError('http://feed.test/c.ics', 304, 'Not Modified', {}, None)
+        with patch.object(tymuj_svc, 'safe_urlopen', side_effect=not_modified) as opener:
+            tymuj_svc.refresh_cache(self.tid, self.team.tymuj_ics_url)
+        sent = opener.call_args.kwargs['headers']
+        self.assertEqual(sent['If-None-Match'], '"v1"')
+        self.assertEqual(sent['If-Modified-Since'], 'Wed, 01 Jul 2026 10:00:00 GMT')
+
+    def test_304_skips_parse_and_rewrite(self):
+        self._first_refresh()
+        before_row, before_rev = self._cache_row(), team_revision.current(self.tid)
+        not_modified = urllib.error.HTTPError('http://feed.test/c.ics', 304, 'Not Modified', {}, None)
+        with patch.object(tymuj_svc, 'safe_urlopen', side_effect=not_modified), \
+             patch.object(tymuj_svc, 'parse_ics') as parse:
+            ok, msg = tymuj_svc.refresh_cache(self.tid, self.team.tymuj_ics_url)
+        self.assertTrue(ok, msg)
+        self.assertFalse(parse.called)
+        self.assertEqual(self._cache_row(), before_row)
+        self.assertEqual(team_revision.current(self.tid), before_rev)
+        self.assertGreater(tymuj_svc.get_status(self.tid)['events_count'], 0)
+
+    def test_identical_body_skips_rewrite(self):
+        self._first_refresh()
+        before_row, before_rev = self._cache_row(), team_revision.current(self.tid)
+        with patch.object(tymuj_svc, 'safe_urlopen', return_value=_FakeResp(self._body())):
+            ok, _msg = tymuj_svc.refresh_cache(self.tid, self.team.tymuj_ics_url)
+        self.assertTrue(ok)
+        self.assertEqual(self._cache_row(), before_row)
+        self.assertEqual(team_revision.current(self.tid), before_rev)
+
+    def test_changed_body_is_parsed(self):
+        self._first_refresh()
+        body = ICS_RICH.replace('Zápas s HC Soupeř', 'Zápas s HC Jiný').encode('utf-8')
+        with patch.object(tymuj_svc, 'safe_urlopen', return_value=_FakeResp(body)):
+            tymuj_svc.refresh_cache(self.tid, self.team.tymuj_ics_url)
+        titles = {e.title for e in TymujEvent.query.filter_by(team_id=self.tid)}
+        self.assertIn('Zápas s HC Jiný', titles)
+
+    def test_unchanged_old_cache_is_restamped(self):
+        self._first_refresh()
+        payload = tymuj_svc._load_cache_payload(self.tid)
+        payload['last_success'] = payload['updated_at'] = '2000-01-01T00:00:00'
+        tymuj_svc._write_cache(self.tid, payload)
+        with patch.object(tymuj_svc, 'safe_urlopen', return_value=_FakeResp(self._body())):
+            tymuj_svc.refresh_cache(self.tid, self.team.tymuj_ics_url)
+        self.assertFalse(tymuj_svc.get_status(self.tid)['stale'])
+
     def test_url_token_is_masked(self):
         masked = tymuj_svc._mask_url('https://api2.tymuj.cz/event/calendar/SECRETTOKEN123.ics')
         self.assertNotIn('SECRETTOKEN123', masked)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Stdlib XLSX writer: workbooks round-trip through the import reader, are
+produced lazily in chunks, and never carry formulas or XML-illegal text."""
+import io
+import unittest
+import zipfile
+
+from coach.services import xlsx_writer
+from coach.services.attendance_import import _read_xlsx
+
+
+def _workbook(rows, **kw):
+    return b''.join(xlsx_writer.iter_xlsx(rows, **kw))
+
+
+class XlsxWriterTest(unittest.TestCase):
+    def test_round_trip_through_reader(self):
+        rows = [['Hráč', 'Pozice', 'Stav'],
+                ['Jan <Novák> & "syn"', 'F', 'Jdu'],
+                ['Petr', None, 3],
+                ['', '', 1.5]]
+        grid = _read_xlsx(_workbook(rows))
+        self.assertEqual(grid, [['Hráč', 'Pozice', 'Stav'],
+                                ['Jan <Novák> & "syn"', 'F', 'Jdu'],
+                                ['Petr', '', '3'],
+                                ['', '', '1.5']])
+
+    def test_package_parts_and_sheet_title(self):
+        zf = zipfile.ZipFile(io.BytesIO(_workbook([['a']], title='Docházka [2026]: A/B')))
+        self.assertIsNone(zf.testzip())
+        self.assertEqual(set(zf.namelist()), {
+            '[Content_Types].xml', '_rels/.rels', 'xl/workbook.xml',
+            'xl/_rels/workbook.xml.rels', 'xl/styles.xml', 'xl/worksheets/sheet1.xml'})
+        self.assertIn('name="Docházka 2026 AB"', zf.read('xl/workbook.xml').decode('utf-8'))
+        self.assertIn('s="1"', zf.read('xl/worksheets/sheet1.xml').decode('utf-8'))
+
+    def test_no_formulas_and_illegal_chars_dropped(self):
+        sheet = zipfile.ZipFile(io.BytesIO(_workbook([['=HYPERLINK("x")', 'a\x01b\x0bc']]))
+                                ).read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertNotIn('<f>', sheet)
+        self.assertIn('t="inlineStr"', sheet)
+        self.assertIn('<t>abc</t>', sheet)
+
+    def test_rows_consumed_lazily_in_chunks(self):
+        consumed = []
+
+        def rows():
+            for i in range(20000):
+                consumed.append(i)
+                yield ['Hráč %05d' % i, 'Jdu', i]
+        it = xlsx_writer.iter_xlsx(rows())
+        first = next(it)
+        self.assertLess(len(consumed), 20000)              # header parts come out first
+        chunks = [first] + list(it)
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(len(consumed), 20000)
+        sheet = zipfile.ZipFile(io.BytesIO(b''.join(chunks))).read('xl/worksheets/sheet1.xml')
+        self.assertIn('<row r="20000"><c r="A20000" t="inlineStr"><is><t>Hráč 19999</t>'.encode('utf-8'),
+                      sheet)
+
+    def test_col_letters(self):
+        self.assertEqual([xlsx_writer.col_letters(i) for i in (0, 25, 26, 51, 701, 702)],
+                         ['A', 'Z', 'AA', 'AZ', 'ZZ', 'AAA'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Team event index: one table of every event the attendance pages list.
+
+Adds ``team_event_index`` — local TrainingEvents, lazy series occurrences and
+live Týmuj events of a team with their attendance key precomputed, read by
+``(team_id, day, time)`` range and by ``(team_id, event_key)``.
+
+Backfill: every TrainingEvent (key ``local:<id>``) and every non-cancelled
+``tymuj_event`` row, in SQL. Lazy series occurrences need the app's
+recurrence rules to expand, so they are not backfilled here: if LAZY_SERIES
+was enabled before this revision, run ``flask events:reindex`` afterwards.
+
+Revision ID: a5b6c7d8e9f1
+Revises: f4b5c6d7e8f9
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'a5b6c7d8e9f1'
+down_revision = 'f4b5c6d7e8f9'
+branch_labels = None
+depends_on = None
+
+_COLUMNS = ('team_id', 'day', 'time', 'title', 'kind', 'source', 'event_key', 'local_id',
+            'series_id')
+
+
+def upgrade():
+    index = op.create_table(
+        'team_event_index',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('time', sa.String(length=10), nullable=False, server_default=''),
+        sa.Column('title', sa.Text(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False, server_default='training'),
+        sa.Column('source', sa.String(length=10), nullable=False),
+        sa.Column('event_key', sa.String(length=120), nullable=False),
+        sa.Column('local_id', sa.Integer(), nullable=True),
+        sa.Column('series_id', sa.String(length=36), nullable=True),
+    )
+    op.create_index('ix_team_event_index_team_day', 'team_event_index', ['team_id', 'day', 'time'])
+    op.create_index('ix_team_event_index_team_key', 'team_event_index', ['team_id', 'event_key'])
+    op.create_index('ix_team_event_index_team_series', 'team_event_index', ['team_id', 'series_id'])
+    op.create_index(op.f('ix_team_event_index_local_id'), 'team_event_index', ['local_id'])
+
+    ev = sa.table('training_event', *[sa.column(c) for c in (
+        'id', 'team_id', 'day', 'time', 'title', 'kind', 'series_id')])
+    op.execute(index.insert().from_select(_COLUMNS, sa.select(
+        ev.c.team_id, ev.c.day,
+        sa.func.coalesce(ev.c.time, ''),
+        sa.func.coalesce(sa.func.nullif(ev.c.title, ''), 'Trénink'),
+        sa.func.coalesce(sa.func.nullif(ev.c.kind, ''), 'training'),
+        sa.literal('local', sa.String),
+        sa.literal('local:', sa.String) + sa.cast(ev.c.id, sa.String),
+        ev.c.id, ev.c.series_id,
+    ).where(ev.c.team_id.isnot(None))))
+
+    ty = sa.table('tymuj_event', *[sa.column(c) for c in (
+        'id', 'team_id', 'day', 'time', 'title', 'kind', 'event_key')],
+        sa.column('cancelled', sa.Boolean()))
+    op.execute(index.insert().from_select(_COLUMNS, sa.select(
+        ty.c.team_id, ty.c.day,
+        sa.func.coalesce(ty.c.time, ''),
+        sa.func.coalesce(ty.c.title, ''),
+        sa.func.coalesce(sa.func.nullif(ty.c.kind, ''), 'training'),
+        sa.literal('tymuj', sa.String),
+        ty.c.event_key,
+        sa.null(), sa.null(),
+    ).where(ty.c.cancelled == sa.false()).order_by(ty.c.id)))
+
+
+def downgrade():
+    op.drop_index(op.f('ix_team_event_index_local_id'), table_name='team_event_index')
+    op.drop_index('ix_team_event_index_team_series', table_name='team_event_index')
+    op.drop_index('ix_team_event_index_team_key', table_name='team_event_index')
+    op.drop_index('ix_team_event_index_team_day', table_name='team_event_index')
+    op.drop_table('team_event_index')
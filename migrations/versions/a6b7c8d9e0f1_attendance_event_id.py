@@ -0,0 +1,64 @@
+"""Integer event id on attendance_entry.
+
+Adds nullable ``attendance_entry.event_id`` — the TrainingEvent id behind a
+``local:<id>`` event_key (NULL for series and Týmuj keys) — and the composite
+index ``(team_id, event_id, player_id)``, so local-event attendance joins and
+cascades compare integers instead of building key strings.
+
+No foreign key: Týmuj imports may record keys of events deleted since, and
+MySQL would reject those rows.
+
+Backfill: only keys in canonical form whose TrainingEvent still exists in the
+same team get an id; orphans stay NULL. Done in Python in batches, because
+matching ``'local:' || id`` in SQL cannot use any index.
+
+Revision ID: a6b7c8d9e0f1
+Revises: a5b6c7d8e9f1
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'a6b7c8d9e0f1'
+down_revision = 'a5b6c7d8e9f1'
+branch_labels = None
+depends_on = None
+
+_BATCH = 1000
+
+
+def _local_id(key):
+    # Frozen copy of coach.models.local_event_id.
+    n = (key or '')[6:]
+    return int(n) if key.startswith('local:') and n.isdigit() and n == str(int(n)) else None
+
+
+def upgrade():
+    with op.batch_alter_table('attendance_entry') as batch:
+        batch.add_column(sa.Column('event_id', sa.Integer(), nullable=True))
+    op.create_index('ix_attendance_team_event_player', 'attendance_entry',
+                    ['team_id', 'event_id', 'player_id'])
+
+    bind = op.get_bind()
+    ev = sa.table('training_event', sa.column('id'), sa.column('team_id'))
+    att = sa.table('attendance_entry', sa.column('id'), sa.column('team_id'),
+                   sa.column('event_key'), sa.column('event_id'))
+    events = {(r.id, r.team_id) for r in bind.execute(sa.select(ev.c.id, ev.c.team_id))}
+    rows = bind.execute(sa.select(att.c.id, att.c.team_id, att.c.event_key)
+                        .where(att.c.event_key.like('local:%'))).fetchall()
+    updates = []
+    for r in rows:
+        eid = _local_id(r.event_key)
+        if eid is not None and (eid, r.team_id) in events:
+            updates.append({'row_id': r.id, 'eid': eid})
+    stmt = (att.update().where(att.c.id == sa.bindparam('row_id'))
+            .values(event_id=sa.bindparam('eid')))
+    for i in range(0, len(updates), _BATCH):
+        bind.execute(stmt, updates[i:i + _BATCH])
+
+
+def downgrade():
+    op.drop_index('ix_attendance_team_event_player', table_name='attendance_entry')
+    with op.batch_alter_table('attendance_entry') as batch:
+        batch.drop_column('event_id')
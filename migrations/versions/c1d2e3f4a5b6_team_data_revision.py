@@ -0,0 +1,56 @@
+"""Per-team data revision counter (cache invalidation key).
+
+Adds ``team_data_revision``: one row per team holding a monotonically
+increasing ``revision`` that the app bumps from its Session flush hooks
+whenever team-scoped data changes (see services/team_revision.py).
+
+New table only — no existing table is altered. Every existing team gets a
+seed row (revision 1) so caches can key on it from the first request after
+deploy. No foreign key to ``team`` on purpose: the row must never block the
+settings "delete team" path.
+
+Revision ID: c1d2e3f4a5b6
+Revises: b7c8d9e0f1a2
+Create Date: 2026-10-18
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import DATETIME as MYSQL_DATETIME
+
+
+revision = 'c1d2e3f4a5b6'
+down_revision = 'b7c8d9e0f1a2'
+branch_labels = None
+depends_on = None
+
+_DT6 = sa.DateTime().with_variant(MYSQL_DATETIME(fsp=6), 'mysql')
+
+
+def upgrade():
+    op.create_table(
+        'team_data_revision',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', _DT6, nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_team_data_revision_team_id'), 'team_data_revision',
+                    ['team_id'], unique=True)
+    bind = op.get_bind()
+    team_ids = [r[0] for r in bind.execute(sa.text('SELECT id FROM team'))]
+    if team_ids:
+        rev = sa.table('team_data_revision',
+                       sa.column('team_id', sa.Integer()),
+                       sa.column('revision', sa.BigInteger()),
+                       sa.column('updated_at', sa.DateTime()))
+        now = datetime.utcnow()
+        op.bulk_insert(rev, [{'team_id': tid, 'revision': 1, 'updated_at': now}
+                             for tid in team_ids])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_team_data_revision_team_id'), table_name='team_data_revision')
+    op.drop_table('team_data_revision')
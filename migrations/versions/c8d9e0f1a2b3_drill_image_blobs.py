@@ -0,0 +1,117 @@
+"""Drill images move to the content-addressed blob store.
+
+Adds ``drill.image_hash`` (sha256 hex, indexed) and moves every base64
+``drill.image_data`` snapshot into BLOB_FOLDER as ``<ab>/<digest>``, then
+empties ``image_data``: list pages stop dragging megabytes of base64 per row,
+and identical snapshots (copied drills, other teams) are stored once.
+
+Values that do not decode to an image are left in ``image_data`` untouched
+(nothing renders them any more). Rows are read in small batches because each
+can be megabytes. Downgrade inlines the stored bytes back as data URLs; the
+files stay on disk.
+
+Revision ID: c8d9e0f1a2b3
+Revises: a6b7c8d9e0f1
+Create Date: 2026-10-18
+"""
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+revision = 'c8d9e0f1a2b3'
+down_revision = 'a6b7c8d9e0f1'
+branch_labels = None
+depends_on = None
+
+_BATCH = 50
+
+# Frozen copy of coach.services.blob_store's format check and layout.
+_SIGNATURES = ((b'\x89PNG\r\n\x1a\n', 'image/png'), (b'\xff\xd8\xff', 'image/jpeg'),
+               (b'GIF87a', 'image/gif'), (b'GIF89a', 'image/gif'))
+
+
+def _mimetype(data):
+    for magic, mt in _SIGNATURES:
+        if data.startswith(magic):
+            return mt
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def _path(digest):
+    return os.path.join(current_app.config['BLOB_FOLDER'], digest[:2], digest)
+
+
+def _put(value):
+    b64 = value.split(',', 1)[1] if ',' in value else value
+    try:
+        data = base64.b64decode(b64, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    if not data or _mimetype(data) is None:
+        return None
+    digest = hashlib.sha256(data).hexdigest()
+    path = _path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    return digest
+
+
+_drill = sa.table('drill', sa.column('id'), sa.column('image_data'), sa.column('image_hash'))
+
+
+def _ids(bind, where):
+    return [r[0] for r in bind.execute(sa.select(_drill.c.id).where(where).order_by(_drill.c.id))]
+
+
+def upgrade():
+    with op.batch_alter_table('drill') as batch:
+        batch.add_column(sa.Column('image_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_drill_image_hash'), 'drill', ['image_hash'])
+
+    bind = op.get_bind()
+    ids = _ids(bind, sa.and_(_drill.c.image_data.isnot(None), _drill.c.image_data != ''))
+    stmt = (_drill.update().where(_drill.c.id == sa.bindparam('row_id'))
+            .values(image_hash=sa.bindparam('digest'), image_data=None))
+    for i in range(0, len(ids), _BATCH):
+        rows = bind.execute(sa.select(_drill.c.id, _drill.c.image_data)
+                            .where(_drill.c.id.in_(ids[i:i + _BATCH]))).fetchall()
+        moved = [{'row_id': r.id, 'digest': d} for r in rows for d in [_put(r.image_data)] if d]
+        if moved:
+            bind.execute(stmt, moved)
+
+
+def downgrade():
+    bind = op.get_bind()
+    ids = _ids(bind, _drill.c.image_hash.isnot(None))
+    stmt = (_drill.update().where(_drill.c.id == sa.bindparam('row_id'))
+            .values(image_data=sa.bindparam('data_url')))
+    for i in range(0, len(ids), _BATCH):
+        rows = bind.execute(sa.select(_drill.c.id, _drill.c.image_hash)
+                            .where(_drill.c.id.in_(ids[i:i + _BATCH]))).fetchall()
+        inlined = []
+        for r in rows:
+            try:
+                with open(_path(r.image_hash), 'rb') as fh:
+                    data = fh.read()
+            except OSError:
+                continue
+            inlined.append({'row_id': r.id, 'data_url': 'data:%s;base64,%s' % (
+                _mimetype(data), base64.b64encode(data).decode('ascii'))})
+        if inlined:
+            bind.execute(stmt, inlined)
+    op.drop_index(op.f('ix_drill_image_hash'), table_name='drill')
+    with op.batch_alter_table('drill') as batch:
+        batch.drop_column('image_hash')
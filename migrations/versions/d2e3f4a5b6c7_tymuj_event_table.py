@@ -0,0 +1,127 @@
+"""Týmuj events: indexed table instead of a JSON list in AuditEvent.meta.
+
+Adds ``tymuj_event`` — one row per normalized Týmuj calendar event, indexed by
+``(team_id, day)`` so the dashboard, attendance pages and exports read only the
+date window they render instead of decoding the whole season's JSON.
+
+Backfill: each team's existing ``AuditEvent(event='tymuj.cache')`` payload has
+its ``events`` list copied into the table; the list is then dropped from the
+payload and ``events_table: true`` is set (the status/participants part of the
+payload stays where it is). Payloads that do not parse are left untouched and
+are still read by the app's legacy JSON fallback until the next refresh.
+
+Downgrade re-embeds the rows into the payloads before dropping the table, so
+no cached event is lost either way.
+
+Revision ID: d2e3f4a5b6c7
+Revises: c1d2e3f4a5b6
+Create Date: 2026-10-18
+"""
+import hashlib
+import json
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd2e3f4a5b6c7'
+down_revision = 'c1d2e3f4a5b6'
+branch_labels = None
+depends_on = None
+
+_audit = sa.table('audit_event',
+                  sa.column('id', sa.Integer()),
+                  sa.column('event', sa.String()),
+                  sa.column('team_id', sa.Integer()),
+                  sa.column('meta', sa.Text()))
+
+
+def _event_key(title, day, time_s, kind):
+    # Frozen copy of services.tymuj.make_event_key (source='tymuj').
+    payload = 'tymuj|%s|%s|%s|%s' % (day.isoformat(), time_s or '', kind or 'training', title or '')
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    tymuj_event = op.create_table(
+        'tymuj_event',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('team_id', sa.Integer(), sa.ForeignKey('team.id'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('time', sa.String(length=10), nullable=True),
+        sa.Column('end_time', sa.String(length=10), nullable=True),
+        sa.Column('title', sa.Text(), nullable=False),
+        sa.Column('location', sa.String(length=200), nullable=True),
+        sa.Column('kind', sa.String(length=20), nullable=False, server_default='training'),
+        sa.Column('cancelled', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('recurring', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('uid', sa.String(length=255), nullable=True),
+        sa.Column('event_key', sa.String(length=40), nullable=False),
+    )
+    # Range reads: one team's events between two days.
+    op.create_index('ix_tymuj_event_team_day', 'tymuj_event', ['team_id', 'day'])
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(_audit.c.id, _audit.c.team_id, _audit.c.meta)
+                        .where(_audit.c.event == 'tymuj.cache')).fetchall()
+    for row in rows:
+        try:
+            payload = json.loads(row.meta or '')
+        except Exception:
+            continue
+        if not isinstance(payload, dict) or not isinstance(payload.get('events'), list):
+            continue
+        values = []
+        for it in payload['events']:
+            try:
+                d = date.fromisoformat(it.get('day') or '')
+            except Exception:
+                continue
+            title = it.get('title') or ''
+            kind = it.get('kind') or 'training'
+            values.append({
+                'team_id': row.team_id, 'day': d, 'time': it.get('time') or '',
+                'end_time': it.get('end_time') or '', 'title': title,
+                'location': (it.get('location') or '')[:200], 'kind': kind,
+                'cancelled': bool(it.get('cancelled')), 'recurring': bool(it.get('recurring')),
+                'uid': (it.get('uid') or '')[:255] or None,
+                'event_key': _event_key(title, d, it.get('time') or '', kind),
+            })
+        if values:
+            op.bulk_insert(tymuj_event, values)
+        payload.pop('events', None)
+        payload['events_table'] = True
+        bind.execute(_audit.update().where(_audit.c.id == row.id)
+                     .values(meta=json.dumps(payload, ensure_ascii=False)))
+
+
+def downgrade():
+    bind = op.get_bind()
+    ev = sa.table('tymuj_event', *[sa.column(c) for c in (
+        'team_id', 'day', 'time', 'end_time', 'title', 'location', 'kind',
+        'cancelled', 'recurring', 'uid', 'id')])
+    rows = bind.execute(sa.select(_audit.c.id, _audit.c.team_id, _audit.c.meta)
+                        .where(_audit.c.event == 'tymuj.cache')).fetchall()
+    for row in rows:
+        try:
+            payload = json.loads(row.meta or '')
+        except Exception:
+            continue
+        if not isinstance(payload, dict) or not payload.get('events_table'):
+            continue
+        events = []
+        for e in bind.execute(sa.select(ev).where(ev.c.team_id == row.team_id)
+                              .order_by(ev.c.id)).fetchall():
+            d = e.day if isinstance(e.day, date) else date.fromisoformat(str(e.day))
+            events.append({'uid': e.uid or '', 'day': d.isoformat(), 'time': e.time or '',
+                           'end_time': e.end_time or '', 'title': e.title or '',
+                           'location': e.location or '', 'kind': e.kind or 'training',
+                           'cancelled': bool(e.cancelled), 'recurring': bool(e.recurring),
+                           'source': 'tymuj'})
+        payload['events'] = events
+        payload.pop('events_table', None)
+        bind.execute(_audit.update().where(_audit.c.id == row.id)
+                     .values(meta=json.dumps(payload, ensure_ascii=False)))
+    op.drop_index('ix_tymuj_event_team_day', table_name='tymuj_event')
+    op.drop_table('tymuj_event')
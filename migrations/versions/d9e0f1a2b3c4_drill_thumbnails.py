@@ -0,0 +1,32 @@
+"""Drill thumbnails.
+
+Adds ``drill.thumb_hash`` (indexed): the blob-store digest of the small
+WebP/PNG preview the library and picker cards show. New and edited drills get
+one on save; pages fall back to the full snapshot until then. Generating
+thumbnails needs the app's image code, so existing drills are not backfilled
+here: run ``flask drills:thumbnails`` after upgrading.
+
+Revision ID: d9e0f1a2b3c4
+Revises: c8d9e0f1a2b3
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd9e0f1a2b3c4'
+down_revision = 'c8d9e0f1a2b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('drill') as batch:
+        batch.add_column(sa.Column('thumb_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_drill_thumb_hash'), 'drill', ['thumb_hash'])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_drill_thumb_hash'), table_name='drill')
+    with op.batch_alter_table('drill') as batch:
+        batch.drop_column('thumb_hash')
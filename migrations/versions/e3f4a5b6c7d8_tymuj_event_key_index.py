@@ -0,0 +1,25 @@
+"""Týmuj events: (team_id, event_key) index for single-key lookups.
+
+Attendance writes validate one ``event_key`` at a time; with this index the
+Týmuj side of that check is one indexed read instead of a two-year range scan
+of the team's events. Index only — no data changes.
+
+Revision ID: e3f4a5b6c7d8
+Revises: d2e3f4a5b6c7
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = 'e3f4a5b6c7d8'
+down_revision = 'd2e3f4a5b6c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_tymuj_event_team_key', 'tymuj_event', ['team_id', 'event_key'])
+
+
+def downgrade():
+    op.drop_index('ix_tymuj_event_team_key', table_name='tymuj_event')
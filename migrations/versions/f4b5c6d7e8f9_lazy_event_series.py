@@ -0,0 +1,64 @@
+"""Lazily expanded recurring series: rule segments + per-occurrence exceptions.
+
+Adds ``event_series`` (one row per rule segment; occurrences are expanded on
+read) and ``event_series_exception`` (edited or cancelled occurrences, keyed by
+the day the rule puts them on). Used only for series created with
+LAZY_SERIES on; existing materialized series are untouched. Schema only — no
+data changes.
+
+Revision ID: f4b5c6d7e8f9
+Revises: e3f4a5b6c7d8
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import DATETIME as MYSQL_DATETIME
+
+
+revision = 'f4b5c6d7e8f9'
+down_revision = 'e3f4a5b6c7d8'
+branch_labels = None
+depends_on = None
+
+_DT6 = sa.DateTime().with_variant(MYSQL_DATETIME(fsp=6), 'mysql')
+
+
+def upgrade():
+    op.create_table(
+        'event_series',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('team_id', sa.Integer(), sa.ForeignKey('team.id'), nullable=False),
+        sa.Column('series_id', sa.String(length=36), nullable=False),
+        sa.Column('start_day', sa.Date(), nullable=False),
+        sa.Column('until', sa.Date(), nullable=False),
+        sa.Column('freq', sa.String(length=12), nullable=False),
+        sa.Column('weekdays', sa.String(length=30), nullable=True),
+        sa.Column('time', sa.String(length=10), nullable=True),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=True),
+        sa.Column('created_at', _DT6, nullable=True),
+    )
+    op.create_index('ix_event_series_series_id', 'event_series', ['series_id'])
+    op.create_index('ix_event_series_team_range', 'event_series', ['team_id', 'start_day', 'until'])
+    op.create_table(
+        'event_series_exception',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('team_id', sa.Integer(), sa.ForeignKey('team.id'), nullable=False),
+        sa.Column('series_id', sa.String(length=36), nullable=False),
+        sa.Column('occurrence_day', sa.Date(), nullable=False),
+        sa.Column('cancelled', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('time', sa.String(length=10), nullable=True),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('kind', sa.String(length=20), nullable=True),
+        sa.Column('updated_at', _DT6, nullable=True),
+        sa.UniqueConstraint('series_id', 'occurrence_day', name='uq_series_exception'),
+    )
+    op.create_index('ix_event_series_exception_team_id', 'event_series_exception', ['team_id'])
+
+
+def downgrade():
+    op.drop_index('ix_event_series_exception_team_id', table_name='event_series_exception')
+    op.drop_table('event_series_exception')
+    op.drop_index('ix_event_series_team_range', table_name='event_series')
+    op.drop_index('ix_event_series_series_id', table_name='event_series')
+    op.drop_table('event_series')